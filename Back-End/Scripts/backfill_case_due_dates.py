@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script to backfill case due dates
+
+New cases get sla_days and due_at on creation (business days of their slowest test, skipping
+weekends and Colombian holidays). Cases created before that have no due_at and never show up
+in the overdue list. This script computes both fields for them.
+
+Usage:
+    python3 Scripts/backfill_case_due_dates.py [--dry-run] [--all] [--batch-size 500]
+
+Arguments:
+    --dry-run: Only show what would be done without executing real changes
+    --all: Also recompute cases that already have a due date (e.g. after changing test times)
+    --batch-size: Number of updates sent per bulk_write
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.services.due_dates import DueDateCalculator
+
+
+async def backfill(dry_run: bool = False, recompute_all: bool = False, batch_size: int = 500) -> None:
+    db = await get_database()
+    query = {"created_at": {"$type": "date"}}
+    if not recompute_all:
+        query["due_at"] = {"$exists": False}
+    projection = {"created_at": 1, "samples.tests.id": 1}
+    calculator = DueDateCalculator(db)
+
+    pending, updated, scanned = [], 0, 0
+    try:
+        async for doc in db.cases.find(query, projection):
+            scanned += 1
+            due = await calculator.due_at(doc["created_at"], doc.get("samples"))
+            pending.append(UpdateOne({"_id": doc["_id"]}, {"$set": due}))
+            if len(pending) >= batch_size:
+                if not dry_run:
+                    await db.cases.bulk_write(pending, ordered=False)
+                updated += len(pending)
+                pending = []
+        if pending:
+            if not dry_run:
+                await db.cases.bulk_write(pending, ordered=False)
+            updated += len(pending)
+        action = "Would update" if dry_run else "Updated"
+        print(f"Scanned {scanned} cases. {action} {updated} cases with due_at.")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Backfill sla_days and due_at for existing cases")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would be done without executing real changes")
+    parser.add_argument("--all", dest="recompute_all", action="store_true", help="Also recompute cases that already have due_at")
+    parser.add_argument("--batch-size", type=int, default=500, help="Number of updates sent per bulk_write")
+    args = parser.parse_args()
+    asyncio.run(backfill(dry_run=args.dry_run, recompute_all=args.recompute_all, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Script to backfill sanitized result HTML
+
+Cases saved before sanitize-on-write have no result.sanitized_html. This script computes it
+for those cases so that PDF rendering and other readers never sanitize on read.
+
+Usage:
+    python3 Scripts/backfill_sanitized_results.py [--dry-run] [--batch-size 500]
+
+Arguments:
+    --dry-run: Only show what would be done without executing real changes
+    --batch-size: Number of updates sent per bulk_write
+"""
+
+import sys
+import os
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.services.html_sanitizer import sanitize_result_fields
+
+
+async def backfill(dry_run: bool = False, batch_size: int = 500) -> None:
+    db = await get_database()
+    query = {"result": {"$type": "object"}, "result.sanitized_html": {"$exists": False}}
+    projection = {"case_code": 1, "result": 1}
+
+    pending, updated, scanned = [], 0, 0
+    try:
+        async for doc in db.cases.find(query, projection):
+            scanned += 1
+            sanitized = sanitize_result_fields(doc.get("result") or {})
+            if not sanitized:
+                continue
+            pending.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"result.sanitized_html": sanitized}}))
+            if len(pending) >= batch_size:
+                if not dry_run:
+                    await db.cases.bulk_write(pending, ordered=False)
+                updated += len(pending)
+                pending = []
+        if pending:
+            if not dry_run:
+                await db.cases.bulk_write(pending, ordered=False)
+            updated += len(pending)
+        action = "Would update" if dry_run else "Updated"
+        print(f"Scanned {scanned} cases. {action} {updated} cases with sanitized_html.")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Backfill result.sanitized_html for existing cases")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would be done without executing real changes")
+    parser.add_argument("--batch-size", type=int, default=500, help="Updates per bulk_write")
+    args = parser.parse_args()
+    asyncio.run(backfill(dry_run=args.dry_run, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
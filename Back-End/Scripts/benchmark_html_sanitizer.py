@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark del sanitizador HTML de resultados
+
+Compara el sanitizador de una sola pasada (app.modules.cases.services.html_sanitizer)
+contra la implementación anterior de cinco re.sub compilados en cada llamada, sobre
+campos típicos del editor (macro, micro, diagnóstico, observaciones).
+
+Usage:
+    python3 Scripts/benchmark_html_sanitizer.py [--iterations 2000]
+"""
+
+import sys
+import os
+import re
+import time
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modules.cases.services.html_sanitizer import sanitize_html
+
+
+def legacy_sanitize(html):
+    """Implementación previa (referencia), tal como estaba en CasePdfService._sanitize_html."""
+    if not html:
+        return ""
+    clean = re.sub(r"(?is)<(script|style).*?>.*?</\\1>", "", html)
+    clean = re.sub(r"\son[a-zA-Z]+\s*=\s*(\".*?\"|\'.*?\'|[^\s>]+)", "", clean)
+    allowed_props = {"text-align", "font-weight", "font-style", "text-decoration"}
+
+    def _clean_style(match):
+        kept = []
+        for decl in [p.strip() for p in match.group(1).split(";") if p.strip()]:
+            if ":" not in decl:
+                continue
+            prop, val = decl.split(":", 1)
+            if prop.strip().lower() in allowed_props:
+                kept.append(f"{prop.strip().lower()}: {val.strip()}")
+        return f' style="{"; ".join(kept)}"' if kept else ""
+
+    clean = re.sub(r"\sstyle\s*=\s*\"(.*?)\"", _clean_style, clean)
+    clean = re.sub(r"\sstyle\s*=\s*\'(.*?)\'", _clean_style, clean)
+    allowed_tags = {"div", "span", "br", "p", "b", "strong", "i", "em", "u", "ul", "ol", "li"}
+
+    def _filter_tag(match):
+        return match.group(0) if match.group(1).lower() in allowed_tags else ""
+
+    return re.sub(r"</?([a-zA-Z0-9]+)(\b[^>]*)?>", _filter_tag, clean)
+
+
+PARAGRAPH = (
+    '<p style="text-align: justify">Se recibe fragmento de tejido de <strong>1.2 x 0.8 cm</strong>, '
+    'color pardo, consistencia <em>firme</em>.</p>'
+)
+FIELDS = {
+    "macro_result": PARAGRAPH * 8,
+    "micro_result": (PARAGRAPH + "<ul><li>Borde libre</li><li>Sin invasión</li></ul>") * 12,
+    "diagnosis": '<div><b>Carcinoma basocelular</b> nodular<br/>Bordes libres.</div>',
+    "observations": "Sin observaciones",
+}
+
+
+def bench(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for value in FIELDS.values():
+            fn(value)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark del sanitizador HTML")
+    parser.add_argument("--iterations", type=int, default=2000, help="Informes simulados (4 campos cada uno)")
+    args = parser.parse_args()
+
+    legacy_us = bench(legacy_sanitize, args.iterations)
+    single_us = bench(sanitize_html, args.iterations)
+    print(f"Campos por informe: {len(FIELDS)} ({sum(len(v) for v in FIELDS.values())} caracteres)")
+    print(f"Legacy (5 re.sub):     {legacy_us:8.1f} µs/informe")
+    print(f"Una pasada:            {single_us:8.1f} µs/informe ({legacy_us / single_us:.1f}x)")
+    print("Con sanitize-on-write el costo por render es 0: se lee result.sanitized_html")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pipeline completo de PDF con base de datos simulada
+
+Genera informes de casos sintéticos a través de CasePdfService (lectura del caso, firma,
+aprobaciones, plantilla y motor de PDF) y reporta el tiempo y la memoria de cada fase,
+usando los mismos spans que se publican en producción (app.core.tracing).
+
+Escenarios:
+    small         Un caso con una muestra y resultados cortos
+    large         Resultados macro/micro extensos (~20 KB de HTML cada uno)
+    many_samples  40 muestras con 3 pruebas cada una, notas y pruebas complementarias
+
+Usage:
+    python3 Scripts/benchmark_pdf_pipeline.py [--runs 5] [--backend reportlab] [--db-latency-ms 2] [--trace-memory] [--json]
+
+Arguments:
+    --runs: Informes por escenario
+    --backend: Motor de PDF (chromium | reportlab)
+    --scenario: Escenario a ejecutar (por defecto todos)
+    --db-latency-ms: Latencia simulada por consulta a MongoDB
+    --trace-memory: Medir memoria por fase con tracemalloc (encarece los tiempos; usar en corridas aparte)
+    --json: Salida en JSON para comparar entre versiones
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tracemalloc
+import contextlib
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from app.core.tracing import record_phases
+from app.modules.cases.services.html_sanitizer import sanitize_result_fields
+from app.modules.cases.services.pdf_renderers import get_pdf_renderer
+from app.modules.cases.services.pdf_service import CasePdfService
+
+CASE_CODE = "2025-00001"
+
+PARAGRAPH = (
+    '<p style="text-align: justify">Se recibe fragmento de tejido de <strong>1.2 x 0.8 cm</strong>, '
+    'color pardo claro, consistencia <em>firme</em>. Se incluye en su totalidad.</p>'
+)
+
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict[str, Any]], latency: float):
+        self.docs = docs
+        self.latency = latency
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    async def to_list(self, length: Optional[int] = None):
+        await asyncio.sleep(self.latency)
+        return [dict(d) for d in self.docs[:length] if d]
+
+
+class FakeCollection:
+    def __init__(self, docs: List[Dict[str, Any]], latency: float):
+        self.docs = docs
+        self.latency = latency
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return dict(self.docs[0]) if self.docs else None
+
+    def find(self, query: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        return FakeCursor(self.docs, self.latency)
+
+
+class FakeDatabase:
+    """Base de datos en memoria: cada colección retorna los documentos configurados."""
+
+    def __init__(self, collections: Dict[str, List[Dict[str, Any]]], latency: float):
+        self._collections = {name: FakeCollection(docs, latency) for name, docs in collections.items()}
+        self._latency = latency
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        return self._collections.setdefault(name, FakeCollection([], self._latency))
+
+    def get_collection(self, name: str) -> FakeCollection:
+        return self[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+def build_case(samples: int, tests_per_sample: int, paragraphs: int, notes: int) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    result = {
+        "method": ["Hematoxilina-Eosina", "Inmunohistoquímica"],
+        "macro_result": PARAGRAPH * paragraphs,
+        "micro_result": (PARAGRAPH + "<ul><li>Borde libre</li><li>Sin invasión linfovascular</li></ul>") * paragraphs,
+        "diagnosis": "<div><b>Carcinoma basocelular</b> nodular<br/>Bordes quirúrgicos libres.</div>",
+        "observations": "Correlacionar con hallazgos clínicos.",
+        "cie10_diagnosis": {"code": "C44", "name": "Otros tumores malignos de la piel"},
+        "cieo_diagnosis": {"code": "8090/3", "name": "Carcinoma basocelular"},
+        "updated_at": now,
+    }
+    result["sanitized_html"] = sanitize_result_fields(result)
+    return {
+        "_id": ObjectId(),
+        "case_code": CASE_CODE,
+        "patient_info": {
+            "patient_code": "1-12345678",
+            "identification_type": 1,
+            "identification_number": "12345678",
+            "name": "Paciente de Prueba",
+            "age": 47,
+            "gender": "Femenino",
+            "entity_info": {"id": "ENT-1", "name": "Entidad de Prueba"},
+            "care_type": "Ambulatorio",
+        },
+        "requesting_physician": "Dr. Remitente",
+        "service": "Dermatología",
+        "samples": [
+            {
+                "body_region": f"Región {i + 1}",
+                "tests": [{"id": f"8981{j:02d}", "name": f"Prueba {j + 1}", "quantity": 1} for j in range(tests_per_sample)],
+            }
+            for i in range(samples)
+        ],
+        "state": "Por entregar",
+        "priority": "Normal",
+        "created_at": now - timedelta(days=3),
+        "updated_at": now,
+        "signed_at": now,
+        "assigned_pathologist": {"id": "P-BENCH", "name": "Dra. Patóloga"},
+        "result": result,
+        "additional_notes": [{"date": now, "note": f"Nota adicional {i + 1}"} for i in range(notes)],
+    }
+
+
+def build_approval() -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    return {
+        "_id": ObjectId(),
+        "approval_code": "AP-2025-001",
+        "original_case_code": CASE_CODE,
+        "approval_state": "request_made",
+        "complementary_tests": [{"code": "IHQ", "name": "Inmunohistoquímica", "quantity": 2}],
+        "approval_info": {"reason": "Confirmar diagnóstico", "request_date": now},
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+SCENARIOS = {
+    "small": lambda: ({"cases": [build_case(1, 1, 1, 0)]}),
+    "large": lambda: ({"cases": [build_case(2, 2, 60, 2)]}),
+    "many_samples": lambda: ({"cases": [build_case(40, 3, 4, 15)], "approval_requests": [build_approval()]}),
+}
+
+
+async def run_scenario(name: str, backend: str, runs: int, latency_ms: float) -> Dict[str, Any]:
+    trace_memory = tracemalloc.is_tracing()
+    db = FakeDatabase(SCENARIOS[name](), latency_ms / 1000)
+    service = CasePdfService(db)
+    service.renderer = get_pdf_renderer(backend, service.jinja_env)
+
+    totals: List[float] = []
+    phase_totals: Dict[str, Dict[str, float]] = {}
+    size = 0
+    for _ in range(runs):
+        # El servicio imprime trazas DEBUG; se silencian para no mezclar con el reporte
+        with contextlib.redirect_stdout(io.StringIO()), record_phases() as phases:
+            started = time.perf_counter()
+            pdf_bytes, _ = await service.generate_case_pdf(CASE_CODE)
+            totals.append((time.perf_counter() - started) * 1000)
+        size = len(pdf_bytes)
+        for phase, data in phases.items():
+            agg = phase_totals.setdefault(phase, {"ms": 0.0, "mem_kb": 0.0})
+            agg["ms"] += data["ms"]
+            agg["mem_kb"] += data.get("mem_kb", 0.0)
+
+    return {
+        "scenario": name,
+        "backend": backend,
+        "runs": runs,
+        "trace_memory": trace_memory,
+        "total_ms_mean": round(sum(totals) / len(totals), 1),
+        "total_ms_first": round(totals[0], 1),
+        "pdf_kb": round(size / 1024, 1),
+        "rss_peak_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "phases": {
+            phase: {"ms_mean": round(v["ms"] / runs, 2), "mem_kb_mean": round(v["mem_kb"] / runs, 1)}
+            for phase, v in phase_totals.items()
+        },
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    for res in results:
+        if "error" in res:
+            print(f"\n[{res['scenario']}] ERROR: {res['error']}")
+            continue
+        print(
+            f"\n[{res['scenario']}] backend={res['backend']} runs={res['runs']} "
+            f"mean={res['total_ms_mean']} ms first={res['total_ms_first']} ms "
+            f"pdf={res['pdf_kb']} KB rss_peak={res['rss_peak_mb']} MB"
+        )
+        mem_header = f"{'mem KB (media)':>18}" if res["trace_memory"] else ""
+        print(f"  {'fase':<22}{'ms (media)':>12}{mem_header}")
+        for phase, data in res["phases"].items():
+            mem = f"{data['mem_kb_mean']:>18}" if res["trace_memory"] else ""
+            print(f"  {phase:<22}{data['ms_mean']:>12}{mem}")
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    if args.trace_memory:
+        tracemalloc.start()
+    results = []
+    scenarios = [args.scenario] if args.scenario else list(SCENARIOS)
+    for name in scenarios:
+        try:
+            results.append(await run_scenario(name, args.backend, args.runs, args.db_latency_ms))
+        except Exception as e:
+            results.append({"scenario": name, "backend": args.backend, "error": (str(e).strip().splitlines() or [type(e).__name__])[0]})
+    if args.trace_memory:
+        tracemalloc.stop()
+    return results
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de PDF con base de datos simulada")
+    parser.add_argument("--runs", type=int, default=5, help="Informes por escenario")
+    parser.add_argument("--backend", choices=["chromium", "reportlab"], default="chromium")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default=None)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="Latencia simulada por consulta")
+    parser.add_argument("--trace-memory", action="store_true", help="Memoria por fase con tracemalloc")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
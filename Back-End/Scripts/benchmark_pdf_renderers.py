@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los motores de PDF (Chromium vs ReportLab)
+
+Renderiza el mismo informe sintético (sin base de datos) con cada motor y reporta
+latencia (primera ejecución, media, p50, p95) y memoria pico (RSS). Cada motor corre
+en un subproceso aparte para que la memoria de uno no contamine la medición del otro.
+
+Usage:
+    python3 Scripts/benchmark_pdf_renderers.py [--runs 10] [--backend all|chromium|reportlab]
+
+Arguments:
+    --runs: Número de informes a generar por motor
+    --backend: Motor a medir; "all" ejecuta todos en subprocesos separados
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import resource
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, Tuple
+from unittest.mock import MagicMock
+
+# Add project root directory to path
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_ROOT)
+
+from app.modules.cases.services.pdf_renderers import get_pdf_renderer
+from app.modules.cases.services.pdf_service import CasePdfService
+
+BACKENDS = ["chromium", "reportlab"]
+
+LONG_TEXT = (
+    "Se recibe fragmento de tejido de color pardo claro que mide 1.2 x 0.8 x 0.5 cm, "
+    "de consistencia firme. Se incluye en su totalidad en un casete. "
+) * 6
+
+
+def sample_context() -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Contexto equivalente al que arma CasePdfService.build_report_context, y los logos."""
+    service = CasePdfService(MagicMock())
+    html = f"<p>{LONG_TEXT}</p><ul><li><strong>Borde</strong> libre</li><li>Sin invasión</li></ul>"
+    return {
+        "case": {
+            "caso_code": "2025-00001",
+            "fecha_creacion": datetime(2025, 3, 3, 9, 30),
+            "fecha_firma": datetime(2025, 3, 6, 16, 0),
+            "paciente": {
+                "nombre": "Paciente de Prueba",
+                "paciente_code": "1-12345678",
+                "edad": 47,
+                "sexo": "Femenino",
+                "entidad_info": {"nombre": "Entidad de Prueba"},
+            },
+            "servicio": "Dermatología",
+            "medico_solicitante": "Dr. Remitente",
+            "patologo_asignado": {"nombre": "Dra. Patóloga", "codigo": "P-1"},
+            "muestras": [{"region_cuerpo": "Piel", "pruebas": []}, {"region_cuerpo": "Ganglio", "pruebas": []}],
+            "resultado": {
+                "metodo": ["Hematoxilina-Eosina", "Inmunohistoquímica"],
+                "resultado_macro": service._sanitize_html(html),
+                "resultado_micro": service._sanitize_html(html * 2),
+                "diagnostico": service._sanitize_html("<b>Carcinoma basocelular</b> nodular, bordes libres."),
+                "diagnostico_cie10": {"codigo": "C44", "nombre": "Otros tumores malignos de la piel"},
+                "diagnostico_cieo": {"codigo": "8090/3", "nombre": "Carcinoma basocelular"},
+            },
+            "notas_adicionales": [{"date": datetime(2025, 3, 7), "note": "Se adiciona nota de control."}],
+        },
+        "pathologist_signature": None,
+        "pruebas_complementarias": None,
+    }, service.logos
+
+
+def _peak_rss_mb() -> dict:
+    # ru_maxrss está en KB en Linux; en los hijos es el pico del mayor subproceso (p. ej. Chromium)
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {"rss_peak_mb": round(own, 1), "rss_peak_children_mb": round(children, 1)}
+
+
+async def run_backend(backend: str, runs: int) -> dict:
+    context, logos = sample_context()
+    renderer = get_pdf_renderer(backend, CasePdfService(MagicMock()).jinja_env)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    timings = []
+    size = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        pdf_bytes = await renderer.render(context, logos)
+        timings.append((time.perf_counter() - started) * 1000)
+        size = len(pdf_bytes)
+    ordered = sorted(timings)
+    return {
+        "backend": backend,
+        "runs": runs,
+        "first_ms": round(timings[0], 1),
+        "mean_ms": round(statistics.mean(timings), 1),
+        "p50_ms": round(ordered[len(ordered) // 2], 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        "pdf_kb": round(size / 1024, 1),
+        "rss_baseline_mb": round(rss_before, 1),
+        **_peak_rss_mb(),
+    }
+
+
+def print_table(results: list) -> None:
+    columns = ["backend", "runs", "first_ms", "mean_ms", "p50_ms", "p95_ms", "pdf_kb",
+               "rss_baseline_mb", "rss_peak_mb", "rss_peak_children_mb"]
+    print(" | ".join(f"{c:>20}" for c in columns))
+    for row in results:
+        if "error" in row:
+            print(f"{row['backend']:>20} | ERROR: {row['error']}")
+            continue
+        print(" | ".join(f"{str(row.get(c, '')):>20}" for c in columns))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark de motores de PDF")
+    parser.add_argument("--runs", type=int, default=10, help="Informes a generar por motor")
+    parser.add_argument("--backend", choices=["all"] + BACKENDS, default="all")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON (uso interno de subprocesos)")
+    args = parser.parse_args()
+
+    if args.backend != "all":
+        try:
+            result = asyncio.run(run_backend(args.backend, args.runs))
+        except Exception as e:
+            result = {"backend": args.backend, "error": (str(e).strip().splitlines() or [type(e).__name__])[0]}
+        print(json.dumps(result) if args.json else result)
+        return
+
+    results = []
+    for backend in BACKENDS:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--backend", backend, "--runs", str(args.runs), "--json"],
+            capture_output=True, text=True, cwd=BACKEND_ROOT,
+        )
+        try:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        except (IndexError, json.JSONDecodeError):
+            results.append({"backend": backend, "error": (proc.stderr.strip().splitlines() or ["sin salida"])[-1]})
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las estadísticas de pruebas sobre un mes sintético
+
+Siembra en una base de datos aparte (nunca la de la aplicación) un mes de casos completados con
+varias muestras y pruebas por caso, y compara el pipeline anterior de rendimiento mensual
+($lookup a tests por cada prueba desenrollada) con el actual (agrupa por código y resuelve
+el nombre una vez por código desde el catálogo en memoria).
+
+Usage:
+    python3 Scripts/benchmark_test_statistics.py [--cases 8000] [--tests-per-case 5] [--catalog 300] [--runs 5] [--keep]
+
+Arguments:
+    --cases: Casos completados en el mes (cases * tests-per-case ≈ filas de prueba desenrolladas)
+    --tests-per-case: Pruebas promedio por caso, repartidas en 1-3 muestras
+    --catalog: Tamaño del catálogo de pruebas
+    --runs: Ejecuciones por variante (se reporta mediana y mínimo)
+    --database: Base de datos desechable para el benchmark
+    --keep: No borrar la base de datos al terminar
+"""
+
+import sys
+import os
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.config.settings import settings
+from app.modules.tests.repositories.test_catalog import test_catalog
+from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+
+MONTH, YEAR = 3, 2025
+
+
+def legacy_pipeline(start: datetime, end: datetime):
+    """Pipeline anterior: $lookup a tests por cada prueba desenrollada."""
+    return [
+        {"$match": {"state": "Completado", "signed_at": {"$gte": start, "$lt": end}, "samples.tests": {"$exists": True, "$ne": []}}},
+        {"$unwind": "$samples"},
+        {"$unwind": "$samples.tests"},
+        {"$lookup": {"from": "tests", "localField": "samples.tests.id", "foreignField": "test_code", "as": "test_info"}},
+        {"$unwind": {"path": "$test_info", "preserveNullAndEmptyArrays": True}},
+        {
+            "$group": {
+                "_id": {"test_code": "$samples.tests.id"},
+                "test_name": {"$first": "$test_info.name"},
+                "total_solicitadas": {"$sum": 1},
+                "avg_business_days": {"$avg": {"$ifNull": ["$business_days", 0]}},
+            }
+        },
+        {"$sort": {"total_solicitadas": -1}},
+    ]
+
+
+async def seed(db, cases: int, tests_per_case: int, catalog_size: int) -> int:
+    rng = random.Random(36)
+    await db.tests.insert_many([
+        {"test_code": f"T-{i:04d}", "name": f"Prueba sintética {i}", "is_active": True} for i in range(catalog_size)
+    ])
+    await db.tests.create_index("test_code", unique=True)
+
+    rows = 0
+    batch = []
+    for i in range(cases):
+        samples = []
+        for _ in range(rng.randint(1, 3)):
+            count = max(1, round(rng.gauss(tests_per_case / 2, 1)))
+            samples.append({
+                "body_region": "Piel",
+                "tests": [{"id": f"T-{rng.randint(0, catalog_size - 1):04d}", "name": "Nombre guardado", "quantity": 1} for _ in range(count)],
+            })
+            rows += count
+        batch.append({
+            "case_code": f"{YEAR}-{i:05d}",
+            "state": "Completado",
+            "signed_at": datetime(YEAR, MONTH, 1) + timedelta(minutes=rng.randint(0, 30 * 24 * 60)),
+            "business_days": rng.randint(1, 15),
+            "patient_info": {"entity_info": {"id": "ENT-1", "name": "Entidad Demo"}, "care_type": "Ambulatorio"},
+            "assigned_pathologist": {"id": "P-1", "name": "Dra. Demo"},
+            "samples": samples,
+            # Relleno para que los documentos tengan un tamaño parecido al real
+            "result": {"macro_result": "x" * 1500, "micro_result": "y" * 2500},
+        })
+        if len(batch) == 1000:
+            await db.cases.insert_many(batch)
+            batch = []
+    if batch:
+        await db.cases.insert_many(batch)
+    await db.cases.create_index([("state", 1), ("signed_at", 1)])
+    return rows
+
+
+async def timed(label: str, runs: int, func) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(samples)
+    print(f"  {label:<34} mediana {median:8.1f} ms   mínimo {min(samples):8.1f} ms")
+    return median
+
+
+async def run(args) -> None:
+    if args.database == settings.DATABASE_NAME:
+        raise SystemExit("Usa una base de datos distinta a la de la aplicación")
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[args.database]
+    try:
+        await client.drop_database(args.database)
+        rows = await seed(db, args.cases, args.tests_per_case, args.catalog)
+        print(f"Mes sintético: {args.cases} casos, {rows} filas de prueba, catálogo de {args.catalog} pruebas")
+
+        start, end = datetime(YEAR, MONTH, 1), datetime(YEAR, MONTH + 1, 1)
+        repo = TestStatisticsRepository(db)
+
+        async def legacy():
+            await db.cases.aggregate(legacy_pipeline(start, end)).to_list(length=1000)
+
+        async def current_cold():
+            test_catalog.invalidate()
+            await repo.get_monthly_test_performance(MONTH, YEAR)
+
+        async def current_warm():
+            await repo.get_monthly_test_performance(MONTH, YEAR)
+
+        legacy_ms = await timed("$lookup por fila (anterior)", args.runs, legacy)
+        await timed("agrupar + catálogo (catálogo frío)", args.runs, current_cold)
+        current_ms = await timed("agrupar + catálogo (catálogo en caché)", args.runs, current_warm)
+        if current_ms > 0:
+            print(f"Aceleración con catálogo en caché: {legacy_ms / current_ms:.1f}x")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.database)
+        client.close()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark de las estadísticas mensuales de pruebas")
+    parser.add_argument("--cases", type=int, default=8000, help="Casos completados en el mes")
+    parser.add_argument("--tests-per-case", type=int, default=5, help="Pruebas promedio por caso")
+    parser.add_argument("--catalog", type=int, default=300, help="Tamaño del catálogo de pruebas")
+    parser.add_argument("--runs", type=int, default=5, help="Ejecuciones por variante")
+    parser.add_argument("--database", default="pathsys_benchmark_test_stats", help="Base de datos desechable")
+    parser.add_argument("--keep", action="store_true", help="No borrar la base de datos al terminar")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
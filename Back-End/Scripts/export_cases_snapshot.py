@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script to export the columnar snapshot of cases used by the statistics pivot endpoint
+
+Cases are flattened into one row per requested test and written as Arrow IPC files under
+CASES_SNAPSHOT_DIR. Each run is incremental: it appends the cases whose updated_at is at or after
+the previous watermark, plus tombstones for cases deleted since. Run it periodically (e.g. from
+cron every few minutes); /statistics/snapshot/pivot reloads the snapshot when its version changes.
+
+Usage:
+    python3 Scripts/export_cases_snapshot.py [--full] [--compact] [--dir snapshots/cases]
+
+Arguments:
+    --full: Rewrite the snapshot from all cases instead of appending changes
+    --compact: Merge all parts into a single file after exporting
+    --dir: Snapshot directory (defaults to CASES_SNAPSHOT_DIR)
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.config.settings import settings
+from app.modules.cases.repositories.statistics.case_snapshot import CaseSnapshotExporter, CaseSnapshotStore
+
+
+async def export(full: bool = False, compact: bool = False, directory: str = None) -> None:
+    db = await get_database()
+    try:
+        store = CaseSnapshotStore(directory or settings.CASES_SNAPSHOT_DIR)
+        started = time.perf_counter()
+        summary = await CaseSnapshotExporter(db, store).export(full=full)
+        if compact and len(summary["manifest"]["parts"]) > 1:
+            summary["manifest"] = store.compact()
+        elapsed = time.perf_counter() - started
+        manifest = summary["manifest"]
+        print(
+            f"{'Full' if summary['full'] else 'Incremental'} export: {summary['cases']} cases, "
+            f"{summary['deleted']} deleted, {summary['rows']} rows written in {elapsed:.1f}s."
+        )
+        print(f"Snapshot version {manifest['version']}: {len(manifest['parts'])} parts, watermark {manifest['watermark']}.")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Export the columnar snapshot of cases")
+    parser.add_argument("--full", action="store_true", help="Rewrite the snapshot from all cases")
+    parser.add_argument("--compact", action="store_true", help="Merge all parts into a single file")
+    parser.add_argument("--dir", help="Snapshot directory (defaults to CASES_SNAPSHOT_DIR)")
+    args = parser.parse_args()
+    asyncio.run(export(full=args.full, compact=args.compact, directory=args.dir))
+
+
+if __name__ == "__main__":
+    main()
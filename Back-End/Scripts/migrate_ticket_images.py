@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Script to migrate ticket images to the image store
+
+Ticket images used to be saved as base64 Data URLs inside the ticket document, so every ticket
+list carried the full images. New uploads go to the "ticket_images" GridFS bucket and the ticket
+only keeps the image and thumbnail URLs. This script moves the existing Data URLs to the bucket.
+
+Usage:
+    python3 Scripts/migrate_ticket_images.py [--dry-run]
+
+Arguments:
+    --dry-run: Only show what would be done without executing real changes
+"""
+
+import sys
+import os
+import io
+import asyncio
+import argparse
+import base64
+import binascii
+from typing import Optional, Tuple
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from app.config.database import get_database, close_mongo_connection
+from app.core.exceptions import BadRequestError
+from app.modules.tickets.repositories.image_store import TicketImageStore, image_url, thumbnail_url
+
+
+def parse_data_url(value: str) -> Optional[Tuple[str, bytes]]:
+    """(mime, bytes) of a base64 Data URL, or None if it is not one."""
+    header, _, data = value.partition(",")
+    if not header.startswith("data:") or not header.endswith(";base64"):
+        return None
+    try:
+        return header[5:-7] or "application/octet-stream", base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+async def migrate(dry_run: bool = False) -> None:
+    db = await get_database()
+    store = TicketImageStore(db)
+    migrated, skipped, scanned = 0, 0, 0
+    try:
+        # Small batches: each document carries a whole image
+        cursor = db.tickets.find({"image": {"$regex": "^data:"}}, {"ticket_code": 1, "image": 1}).batch_size(20)
+        async for doc in cursor:
+            scanned += 1
+            parsed = parse_data_url(doc["image"])
+            if not parsed:
+                print(f"  {doc.get('ticket_code')}: invalid Data URL, skipped")
+                skipped += 1
+                continue
+            mime, content = parsed
+            if dry_run:
+                print(f"  {doc.get('ticket_code')}: {mime}, {len(content)} bytes")
+                migrated += 1
+                continue
+            upload = UploadFile(
+                file=io.BytesIO(content),
+                filename=doc.get("ticket_code"),
+                headers=Headers({"content-type": mime}),
+            )
+            try:
+                stored = await store.save(upload)
+            except BadRequestError as e:
+                print(f"  {doc.get('ticket_code')}: {e}, skipped")
+                skipped += 1
+                continue
+            # Only if the image did not change while migrating
+            await db.tickets.update_one(
+                {"_id": doc["_id"], "image": doc["image"]},
+                {"$set": {"image": image_url(stored["id"]), "image_thumbnail": thumbnail_url(stored["id"])}},
+            )
+            migrated += 1
+        action = "Would migrate" if dry_run else "Migrated"
+        print(f"Scanned {scanned} tickets. {action} {migrated} images, skipped {skipped}.")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Move ticket images from Data URLs to the image store")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would be done without executing real changes")
+    args = parser.parse_args()
+    asyncio.run(migrate(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script to precompute the monthly statistics of closed months
+
+The API serves closed months (opportunity, test, entity and pathologist monthly statistics) from
+the statistics_closed_months collection and only computes the current month live. A background
+task in the API precomputes pending months automatically. Run this script after bulk imports or
+backfills that bypass the API, since those do not invalidate the stored months.
+
+Usage:
+    python3 Scripts/prewarm_statistics.py [--from 2024-01] [--to 2025-06]
+    python3 Scripts/prewarm_statistics.py --pending [--lookback 12]
+
+Arguments:
+    --from / --to: Inclusive month range to recompute (YYYY-MM); defaults to the last closed month
+    --pending: Only precompute closed months that are missing or were invalidated
+    --lookback: Closed months considered by --pending
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.statistics.closed_month_store import ClosedMonthStore, closed_months_back
+from app.modules.cases.services.statistics.stats_cache import stats_cache
+from app.modules.cases.services.statistics.statistics_prewarm import PREWARM_NAMESPACES, StatisticsPrewarmer
+
+
+def parse_month(value: str):
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+def month_range(first, last):
+    months = []
+    year, month = first
+    while (year, month) <= last:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+async def prewarm(first=None, last=None, pending: bool = False, lookback: int = 12) -> None:
+    db = await get_database()
+    try:
+        store = ClosedMonthStore(db)
+        await store.ensure_indexes()
+        stats_cache.attach_closed_month_store(store, PREWARM_NAMESPACES)
+        prewarmer = StatisticsPrewarmer(db)
+
+        if pending:
+            months = await prewarmer.pending_months(lookback)
+        else:
+            first = first or closed_months_back(1)[0]
+            months = month_range(first, last or first)
+
+        for year, month in months:
+            started = time.perf_counter()
+            summary = await prewarmer.prewarm_month(year, month)
+            elapsed = time.perf_counter() - started
+            print(
+                f"{year:04d}-{month:02d}: {summary['results']} results "
+                f"({summary['entities']} entities, {summary['failures']} failures"
+                f"{'' if summary['stored'] else ', not stored: will be retried'}) in {elapsed:.1f}s"
+            )
+        if not months:
+            print("No months to precompute.")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Precompute the monthly statistics of closed months")
+    parser.add_argument("--from", dest="first", type=parse_month, help="First month (YYYY-MM)")
+    parser.add_argument("--to", dest="last", type=parse_month, help="Last month, inclusive (YYYY-MM)")
+    parser.add_argument("--pending", action="store_true", help="Only missing or invalidated closed months")
+    parser.add_argument("--lookback", type=int, default=12, help="Closed months considered by --pending")
+    args = parser.parse_args()
+    asyncio.run(prewarm(args.first, args.last, args.pending, args.lookback))
+
+
+if __name__ == "__main__":
+    main()
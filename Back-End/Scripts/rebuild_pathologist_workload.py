@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the pathologist workload counters
+
+The pathologist_workload collection (open cases per pathologist by creation day, state and
+priority, plus recent signatures per day) is maintained incrementally on every case write.
+This script recomputes it from the cases collection. Run it once after deploying the counters,
+after bulk imports that bypass the API, and periodically (e.g. weekly) to drop the signature
+days that fell out of the throughput window.
+
+Usage:
+    python3 Scripts/rebuild_pathologist_workload.py [--batch-size 1000]
+
+Arguments:
+    --batch-size: Cases read per cursor batch and documents inserted per insert_many
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.workload_repository import WorkloadRepository
+
+
+async def rebuild(batch_size: int = 1000) -> None:
+    db = await get_database()
+    try:
+        started = time.perf_counter()
+        summary = await WorkloadRepository(db).rebuild(batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Rebuilt workload from {summary['cases']} cases for {summary['pathologists']} pathologists in {elapsed:.1f}s.")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Rebuild the pathologist workload counters from the cases collection")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Cursor batch size and documents per insert_many")
+    args = parser.parse_args()
+    asyncio.run(rebuild(batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
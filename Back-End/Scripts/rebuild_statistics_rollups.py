@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the monthly statistics rollups
+
+The case_stats_monthly collection is maintained incrementally on every case write. This script
+recomputes it from scratch from the cases collection. Run it once after deploying the rollups
+(statistics keep reading the raw cases until the first rebuild finishes), and whenever the
+rollups are suspected to be out of sync (e.g. after bulk imports that bypass the API).
+Also run it after upgrading the rollup schema: turnaround percentiles read the per-row
+business-days histograms (schema version 2) and fall back to the raw cases until then.
+
+Usage:
+    python3 Scripts/rebuild_statistics_rollups.py [--batch-size 1000]
+
+Arguments:
+    --batch-size: Cases read per cursor batch and rollup rows inserted per insert_many
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.statistics.rollup_repository import CaseStatsRollupRepository
+
+
+async def rebuild(batch_size: int = 1000) -> None:
+    db = await get_database()
+    try:
+        started = time.perf_counter()
+        summary = await CaseStatsRollupRepository(db).rebuild(batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"Rebuilt rollups from {summary['cases']} cases into {summary['rows']} rows in {elapsed:.1f}s.")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Rebuild the monthly statistics rollups from the cases collection")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Cursor batch size and rows per insert_many")
+    args = parser.parse_args()
+    asyncio.run(rebuild(batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Script to seed the entity alias table used by the statistics filters
+
+Statistics resolve the entity filter (code, alias, name or part of the name) to entity codes and
+match patient_info.entity_info.id by equality. This script fills the entity_aliases collection
+with the abbreviations that used to be hard-coded as regexes, resolving each one against the
+entities catalog, and can add or replace a single alias by hand.
+
+It also reports entity codes present in cases but missing from the entities catalog: those
+cases can only be filtered through an explicit alias.
+
+Usage:
+    python3 Scripts/seed_entity_aliases.py [--dry-run]
+    python3 Scripts/seed_entity_aliases.py --alias HAMA --codes HAMA,HAMA2
+
+Arguments:
+    --dry-run: Show what would be written without modifying the database
+    --alias: Alias to add or replace (requires --codes)
+    --codes: Comma-separated entity codes for --alias
+"""
+
+import sys
+import os
+import re
+import asyncio
+import argparse
+
+# Add project root directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import get_database, close_mongo_connection
+from app.modules.cases.repositories.statistics.entity_filter import (
+    CASE_ENTITY_FIELD,
+    LEGACY_ABBREVIATIONS,
+    EntityFilterResolver,
+)
+
+
+async def seed(dry_run: bool = False, alias: str = None, codes: str = None) -> None:
+    db = await get_database()
+    try:
+        resolver = EntityFilterResolver(db)
+        await resolver.ensure_indexes()
+
+        if alias:
+            entity_codes = [c.strip().upper() for c in (codes or "").split(",") if c.strip()]
+            if not entity_codes:
+                print("--alias requires at least one code in --codes")
+                return
+            if not dry_run:
+                await resolver.upsert_alias(alias, entity_codes)
+            print(f"{alias} -> {', '.join(entity_codes)}")
+            return
+
+        entities = await db.entities.find({}, {"_id": 0, "entity_code": 1, "code": 1, "name": 1}).to_list(length=None)
+        catalog = [(e.get("entity_code") or e.get("code"), e.get("name") or "") for e in entities]
+        catalog = [(code, name) for code, name in catalog if code]
+
+        written = 0
+        for abbreviation, pattern in LEGACY_ABBREVIATIONS.items():
+            regex = re.compile(pattern, re.IGNORECASE)
+            matched = sorted({code for code, name in catalog if regex.search(name)})
+            if not matched:
+                print(f"  {abbreviation}: no entity in the catalog matches '{pattern}', skipped")
+                continue
+            print(f"  {abbreviation} -> {', '.join(matched)}")
+            if not dry_run:
+                await resolver.upsert_alias(abbreviation, matched)
+            written += 1
+        print(f"{'Would write' if dry_run else 'Wrote'} {written} aliases.")
+
+        known = {code for code, _ in catalog}
+        in_cases = await db.cases.distinct(CASE_ENTITY_FIELD)
+        missing = sorted(code for code in in_cases if code and code not in known)
+        if missing:
+            print(f"Entity codes in cases but not in the catalog ({len(missing)}): {', '.join(missing)}")
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Seed the entity alias table used by the statistics filters")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be written without modifying the database")
+    parser.add_argument("--alias", help="Alias to add or replace")
+    parser.add_argument("--codes", help="Comma-separated entity codes for --alias")
+    args = parser.parse_args()
+    asyncio.run(seed(dry_run=args.dry_run, alias=args.alias, codes=args.codes))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ from app.modules.diseases.routes.disease_routes import router as diseases_router
 from app.modules.tickets.routes import router as tickets_router
 from app.modules.approvals.routes import approval_router as approvals_router
 from app.modules.unread_cases.routes import router as unread_cases_router
+from app.modules.events.routes import events_router
 
 api_router = APIRouter()
 
@@ -29,6 +30,7 @@ api_router.include_router(billing_router, prefix="/billing", tags=["billing"])
 api_router.include_router(diseases_router, prefix="/diseases", tags=["diseases"])
 api_router.include_router(tickets_router, prefix="/tickets", tags=["tickets"])
 api_router.include_router(approvals_router, prefix="/approvals", tags=["approvals"])
+api_router.include_router(events_router, prefix="/events", tags=["events"])
 
 @api_router.get("/health")
 async def health_check():
@@ -60,6 +62,7 @@ async def api_info():
             "tickets",
             "approvals",
             "unread-cases",
+            "events",
         ],
         "modules_pending": []
     }
\ No newline at end of file
@@ -71,6 +71,40 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
     
+    # PDF Generation
+    PDF_RENDERER: str = os.getenv("PDF_RENDERER", "chromium")  # chromium | reportlab
+    PDF_MAX_CONCURRENCY: int = int(os.getenv("PDF_MAX_CONCURRENCY", "2"))
+    PDF_MAX_QUEUE: int = int(os.getenv("PDF_MAX_QUEUE", "20"))
+    PDF_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("PDF_QUEUE_TIMEOUT_SECONDS", "30"))
+    PDF_MAX_PER_USER: int = int(os.getenv("PDF_MAX_PER_USER", "2"))
+    
+    # Statistics Cache
+    STATS_CACHE_ENABLED: bool = os.getenv("STATS_CACHE_ENABLED", "True").lower() == "true"
+    STATS_CACHE_MAX_ENTRIES: int = int(os.getenv("STATS_CACHE_MAX_ENTRIES", "512"))
+    STATS_CACHE_TTL_SECONDS: float = float(os.getenv("STATS_CACHE_TTL_SECONDS", "60"))
+    # Meses cerrados en la caché local: sin Redis, así se ven las escrituras hechas en otros procesos
+    STATS_CACHE_CLOSED_MONTH_TTL_SECONDS: float = float(os.getenv("STATS_CACHE_CLOSED_MONTH_TTL_SECONDS", "300"))
+    STATS_CACHE_REDIS_URL: str = os.getenv("STATS_CACHE_REDIS_URL", "")  # vacío = solo caché en proceso
+    STATS_CACHE_SHARED_TTL_SECONDS: float = float(os.getenv("STATS_CACHE_SHARED_TTL_SECONDS", "86400"))
+    # Pre-cálculo de estadísticas de meses cerrados (tarea de fondo de la API)
+    STATS_PREWARM_ENABLED: bool = os.getenv("STATS_PREWARM_ENABLED", "True").lower() == "true"
+    STATS_PREWARM_INTERVAL_SECONDS: float = float(os.getenv("STATS_PREWARM_INTERVAL_SECONDS", "3600"))
+    STATS_PREWARM_LOOKBACK_MONTHS: int = int(os.getenv("STATS_PREWARM_LOOKBACK_MONTHS", "12"))
+    
+    # Eventos en tiempo real (change streams; consulta periódica si MongoDB es standalone)
+    EVENTS_ENABLED: bool = os.getenv("EVENTS_ENABLED", "True").lower() == "true"
+    EVENTS_BUFFER_SIZE: int = int(os.getenv("EVENTS_BUFFER_SIZE", "1000"))
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+    EVENTS_MAX_SUBSCRIBERS: int = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "500"))
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_POLL_INTERVAL_SECONDS: float = float(os.getenv("EVENTS_POLL_INTERVAL_SECONDS", "2"))
+    # Identidad del proceso para sus tokens de reanudación; vacío = nombre del host. Cada proceso de
+    # la API sigue sus propios change streams: varios workers en un mismo host necesitan ids distintos
+    EVENTS_CONSUMER_ID: str = os.getenv("EVENTS_CONSUMER_ID", "")
+    
+    # Snapshot columnar de casos para tablas cruzadas (Scripts/export_cases_snapshot.py)
+    CASES_SNAPSHOT_DIR: str = os.getenv("CASES_SNAPSHOT_DIR", "snapshots/cases")
+    
     # Email Configuration (for future use)
     SMTP_HOST: str = os.getenv("SMTP_HOST", "")
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
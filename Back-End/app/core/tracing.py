@@ -0,0 +1,67 @@
+"""Spans de trazas y registro de tiempos por fase.
+
+Si OpenTelemetry está instalado y configurado, cada span se exporta como un span real;
+si no, el costo es solo medir el tiempo. Dentro de `record_phases()` los tiempos (y la
+memoria, cuando tracemalloc está activo) se acumulan por nombre de fase.
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+try:  # Dependencia opcional
+    from opentelemetry import trace as _otel_trace  # type: ignore
+    _tracer = _otel_trace.get_tracer("pathsys")
+except Exception:  # ImportError u otros errores de inicialización
+    _tracer = None
+
+_current_phases: ContextVar[Optional[Dict[str, Dict[str, float]]]] = ContextVar("current_phases", default=None)
+
+
+@contextmanager
+def record_phases() -> Iterator[Dict[str, Dict[str, float]]]:
+    """Recolecta {fase: {"ms": ..., "calls": ..., "mem_kb": ...}} de los spans ejecutados en el bloque.
+    Comentario: las tareas hijas (gather, to_thread) heredan el contexto y escriben en el mismo dict."""
+    phases: Dict[str, Dict[str, float]] = {}
+    token = _current_phases.set(phases)
+    try:
+        yield phases
+    finally:
+        _current_phases.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """Mide una fase y la publica como span de OpenTelemetry cuando está disponible."""
+    phases = _current_phases.get()
+    tracing_memory = phases is not None and tracemalloc.is_tracing()
+    mem_before = tracemalloc.get_traced_memory()[0] if tracing_memory else 0
+    started = time.perf_counter()
+
+    otel_cm = _tracer.start_as_current_span(name, attributes=attributes or None) if _tracer else None
+    if otel_cm is not None:
+        otel_cm.__enter__()
+    exc_info: tuple = (None, None, None)
+    try:
+        yield
+    except BaseException as exc:
+        exc_info = (type(exc), exc, exc.__traceback__)
+        raise
+    finally:
+        if otel_cm is not None:
+            otel_cm.__exit__(*exc_info)
+        if phases is not None:
+            entry = phases.setdefault(name, {"ms": 0.0, "calls": 0})
+            entry["ms"] += (time.perf_counter() - started) * 1000
+            entry["calls"] += 1
+            if tracing_memory:
+                entry["mem_kb"] = entry.get("mem_kb", 0.0) + (tracemalloc.get_traced_memory()[0] - mem_before) / 1024
+
+
+def server_timing_header(phases: Dict[str, Dict[str, float]]) -> str:
+    """Formatea las fases para el encabezado Server-Timing (visible en las devtools del navegador)."""
+    return ", ".join(f"{name.replace('.', '-')};dur={data['ms']:.1f}" for name, data in phases.items())
@@ -5,15 +5,23 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.encoders import jsonable_encoder
-import os, logging
+import os, logging, asyncio
 from app.config.settings import settings
 from app.config.database import connect_to_mongo, close_mongo_connection, get_database
 from app.modules.cases.repositories.case_repository import CaseRepository
 from app.modules.cases.repositories.consecutive_repository import CaseConsecutiveRepository
+from app.modules.cases.repositories.urgent_cases_repository import UrgentCasesRepository
+from app.modules.cases.repositories.statistics.rollup_repository import CaseStatsRollupRepository
+from app.modules.cases.repositories.statistics.entity_filter import EntityFilterResolver
+from app.modules.cases.repositories.statistics.closed_month_store import ClosedMonthStore
+from app.modules.cases.services.statistics.stats_cache import stats_cache
+from app.modules.cases.services.statistics.statistics_prewarm import PREWARM_NAMESPACES, run_prewarm_scheduler
 from app.modules.approvals.repositories.approval_repository import ApprovalRepository
 from app.modules.approvals.repositories.consecutive_repository import ApprovalConsecutiveRepository
 from app.modules.patients.repositories.patient_repository import PatientRepository
 from app.modules.unread_cases.repositories.unread_case_repository import UnreadCaseRepository
+from app.modules.events.repositories.change_sources import build_sources
+from app.modules.events.services.event_hub import EVENT_COLLECTIONS, event_hub
 
 app = FastAPI(title="WEB-LIS PathSys - New Backend", version="1.0.0")
 
@@ -46,6 +54,15 @@ async def on_startup():
     # Casos
     await CaseRepository(db).ensure_indexes()
     await CaseConsecutiveRepository(db).ensure_indexes()
+    await UrgentCasesRepository(db).ensure_indexes()
+    await CaseStatsRollupRepository(db).ensure_indexes()
+    await EntityFilterResolver(db).ensure_indexes()
+    # Estadísticas de meses cerrados: se sirven persistidas y se pre-calculan en segundo plano
+    closed_months = ClosedMonthStore(db)
+    await closed_months.ensure_indexes()
+    stats_cache.attach_closed_month_store(closed_months, PREWARM_NAMESPACES)
+    if settings.STATS_PREWARM_ENABLED:
+        app.state.stats_prewarm_task = asyncio.create_task(run_prewarm_scheduler(db))
     # Aprobaciones
     await ApprovalRepository(db).ensure_indexes()
     await ApprovalConsecutiveRepository(db).ensure_indexes()
@@ -53,9 +70,16 @@ async def on_startup():
     await PatientRepository(db).ensure_indexes()
     # Casos sin lectura
     await UnreadCaseRepository(db).ensure_indexes()
+    # Eventos en tiempo real para los clientes (reemplazan el sondeo de listas)
+    if settings.EVENTS_ENABLED:
+        event_hub.start(build_sources(db, list(EVENT_COLLECTIONS)))
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    task = getattr(app.state, "stats_prewarm_task", None)
+    if task is not None:
+        task.cancel()
+    await event_hub.stop()
     # Cerrar conexión a Mongo limpiamente
     await close_mongo_connection()
 
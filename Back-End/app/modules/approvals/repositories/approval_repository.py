@@ -21,6 +21,8 @@ class ApprovalRepository(BaseRepository[ApprovalRequest, dict, dict]):
         await self.collection.create_index([("original_case_code", 1)], unique=True)
         await self.collection.create_index([("approval_state", 1)])
         await self.collection.create_index([("created_at", -1)])
+        # Consulta periódica del hub de eventos cuando no hay change streams
+        await self.collection.create_index([("updated_at", 1)])
 
     async def get_by_approval_code(self, approval_code: str) -> Optional[ApprovalRequest]:
         """Obtener solicitud por código de aprobación."""
@@ -32,6 +34,16 @@ class ApprovalRepository(BaseRepository[ApprovalRequest, dict, dict]):
         doc = await self.collection.find_one({"original_case_code": original_case_code})
         return ApprovalRequest(**doc) if doc else None
 
+    async def get_by_original_case_code_and_states(self, original_case_code: str, states: List[ApprovalStateEnum]) -> List[ApprovalRequest]:
+        """Obtener solicitudes de un caso original en cualquiera de los estados dados (una sola consulta)."""
+        q = {"original_case_code": original_case_code, "approval_state": {"$in": [s.value for s in states]}}
+        docs = await self.collection.find(q).sort("created_at", -1).to_list(length=len(states) or None)
+        result = []
+        for d in docs:
+            d['id'] = str(d['_id'])
+            result.append(ApprovalRequest(**d))
+        return result
+
     async def get_by_original_case_code_with_id(self, original_case_code: str) -> tuple[Optional[dict], Optional[ApprovalRequest]]:
         """Obtener solicitud por código del caso original con ID del documento."""
         doc = await self.collection.find_one({"original_case_code": original_case_code})
@@ -1,7 +1,6 @@
 """Servicio para solicitudes de aprobación."""
 
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
 from app.modules.approvals.models.approval_request import ApprovalRequest, ApprovalStateEnum, ApprovalInfo, AssignedPathologistInfo
@@ -15,8 +14,8 @@ from app.modules.approvals.schemas.approval import (
 from app.modules.approvals.repositories.approval_repository import ApprovalRepository
 from app.modules.approvals.repositories.consecutive_repository import ApprovalConsecutiveRepository
 from app.modules.cases.repositories.case_repository import CaseRepository
-from app.modules.cases.repositories.consecutive_repository import CaseConsecutiveRepository
-from app.modules.cases.schemas.case import CaseCreate, SampleInfo, PatientInfo as CasePatientInfo
+from app.modules.cases.schemas.case import CaseCreate, CaseUpdate, AssignedPathologist, SampleInfo, PatientInfo as CasePatientInfo
+from app.modules.cases.services.case_service import CaseService
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
 
 
@@ -28,7 +27,7 @@ class ApprovalService:
         self.repository = ApprovalRepository(database)
         self.consecutive_repo = ApprovalConsecutiveRepository(database)
         self.case_repository = CaseRepository(database)
-        self.case_consecutive_repo = CaseConsecutiveRepository(database)
+        self.case_service = CaseService(database)
 
     def _clean_object_ids(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Convertir ObjectIds a strings para serialización JSON."""
@@ -116,6 +115,13 @@ class ApprovalService:
         approvals = await self.repository.search(search_params, skip, limit)
         return [self._map(approval) for approval in approvals]
 
+    async def get_pending_approvals_for_case(self, original_case_code: str) -> List[ApprovalRequestResponse]:
+        """Obtener solicitudes pendientes de un caso, priorizando las recién solicitadas."""
+        states = [ApprovalStateEnum.REQUEST_MADE, ApprovalStateEnum.PENDING_APPROVAL]
+        approvals = await self.repository.get_by_original_case_code_and_states(original_case_code, states)
+        approvals.sort(key=lambda a: states.index(a.approval_state))
+        return [self._map(approval) for approval in approvals]
+
     async def count_approvals(self, search_params: ApprovalRequestSearch) -> int:
         """Contar solicitudes que coinciden con los filtros."""
         return await self.repository.count(search_params)
@@ -148,10 +154,6 @@ class ApprovalService:
             if not original_case:
                 return {"approval": await self.get_approval_by_code(approval_code), "new_case": None}
 
-            # Generar nuevo código de caso
-            year = datetime.now(timezone.utc).year
-            new_case_code = await self.case_consecutive_repo.generate_case_code(year)
-
             # Preparar muestras con pruebas complementarias
             region = "General"
             if original_case.get("samples") and len(original_case["samples"]) > 0:
@@ -181,22 +183,18 @@ class ApprovalService:
                 observations=observations
             )
 
-            # Crear el caso con el código generado
-            case_data = new_case.model_dump()
-            case_data["case_code"] = new_case_code
-            created_case = await self.case_repository.create(case_data)
+            # Crear el caso por CaseService: código, fecha límite, rollups, carga y caché
+            created_case = await self.case_service.create_case(new_case)
 
             # Asignar patólogo si existe en el caso original
             if original_case.get("assigned_pathologist"):
                 try:
-                    await self.case_repository.update_by_case_code(
-                        created_case["case_code"],
-                        {
-                            "assigned_pathologist": {
-                                "id": original_case["assigned_pathologist"]["id"],
-                                "name": original_case["assigned_pathologist"]["name"]
-                            }
-                        }
+                    created_case = await self.case_service.update_case(
+                        created_case.case_code,
+                        CaseUpdate(assigned_pathologist=AssignedPathologist(
+                            id=original_case["assigned_pathologist"]["id"],
+                            name=original_case["assigned_pathologist"]["name"]
+                        ))
                     )
                 except Exception:
                     pass  # No bloquear si falla la asignación
@@ -204,7 +202,7 @@ class ApprovalService:
             approval_response = await self.get_approval_by_code(approval_code)
             
             # Limpiar ObjectIds para serialización JSON
-            cleaned_case = self._clean_object_ids(created_case) if created_case else None
+            cleaned_case = self._clean_object_ids(created_case.model_dump()) if created_case else None
             
             return {"approval": approval_response, "new_case": cleaned_case}
 
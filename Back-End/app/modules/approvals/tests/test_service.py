@@ -1,6 +1,7 @@
 import pytest
 import types
 from datetime import datetime, timezone
+from unittest.mock import AsyncMock
 
 from app.modules.approvals.services.approval_service import ApprovalService
 from app.modules.approvals.models.approval_request import ApprovalStateEnum, ApprovalRequest
@@ -9,6 +10,8 @@ from app.modules.approvals.schemas.approval import (
     ApprovalRequestUpdate,
     ApprovalRequestSearch,
 )
+from app.modules.cases.services.case_service import CaseService
+from app.modules.cases.services.statistics.stats_cache import stats_cache
 from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
 
 
@@ -131,6 +134,9 @@ class FakeCaseRepo:
         self.updated = []
 
     async def get_by_case_code(self, case_code: str):
+        for doc in self.created:
+            if doc["case_code"] == case_code:
+                return dict(doc)
         if case_code in self.exists_case_codes:
             # valores en español, nombres de campos en inglés (esquema válido)
             return {
@@ -151,12 +157,19 @@ class FakeCaseRepo:
         return None
 
     async def create(self, data: dict):
-        self.created.append(dict(data))
-        return dict(data)
+        from bson import ObjectId
+        doc = {**data, "_id": ObjectId(), "updated_at": data.get("created_at") or datetime.now(timezone.utc)}
+        self.created.append(doc)
+        return dict(doc)
 
-    async def update_by_case_code(self, code: str, update_data: dict):
+    async def update_with_previous(self, code: str, update_data: dict):
         self.updated.append((code, dict(update_data)))
-        return True
+        for doc in self.created:
+            if doc["case_code"] == code:
+                previous = dict(doc)
+                doc.update(update_data)
+                return previous, dict(doc)
+        return None, None
 
 
 class FakeCaseConsecutive:
@@ -168,6 +181,19 @@ class FakeCaseConsecutive:
         return f"{year}-{self.n:05d}"
 
 
+def _fake_case_service(case_repo):
+    service = CaseService(_DummyDB())
+    service.repo = case_repo
+    service.seq = FakeCaseConsecutive()
+    service.rollups = types.SimpleNamespace(apply_change=AsyncMock())
+    service.workload = types.SimpleNamespace(apply_change=AsyncMock())
+    service.due_dates = types.SimpleNamespace(due_at=AsyncMock(return_value={
+        "sla_days": 6,
+        "due_at": datetime(2025, 3, 24, 5, tzinfo=timezone.utc),
+    }))
+    return service
+
+
 class _DummyDB:
     def __init__(self):
         self.approval_requests = object()
@@ -185,7 +211,7 @@ async def test_service_full_flow_create_manage_approve_reject_update_delete():
     svc.repository = FakeApprovalRepo()
     svc.consecutive_repo = FakeApprovalConsecutiveRepo()
     svc.case_repository = FakeCaseRepo(exists_case_codes={"2025-00001", "2025-00002", "2025-00003"})
-    svc.case_consecutive_repo = FakeCaseConsecutive()
+    svc.case_service = _fake_case_service(svc.case_repository)
 
     # Crear solicitud (caso existe)
     created = await svc.create_approval_request(ApprovalRequestCreate(
@@ -284,11 +310,80 @@ async def test_service_create_not_found_case():
     svc.repository = FakeApprovalRepo()
     svc.consecutive_repo = FakeApprovalConsecutiveRepo()
     svc.case_repository = FakeCaseRepo(exists_case_codes=set())
-    svc.case_consecutive_repo = FakeCaseConsecutive()
+    svc.case_service = _fake_case_service(svc.case_repository)
 
     with pytest.raises(NotFoundError):
         await svc.create_approval_request(ApprovalRequestCreate(
             original_case_code="NO-CASE",
             complementary_tests=[{"code": "T-1", "name": "X", "quantity": 1}],
             reason="NA"
-        ))
\ No newline at end of file
+        ))
+
+
+@pytest.mark.asyncio
+async def test_approved_case_goes_through_case_write_hooks(monkeypatch):
+    invalidate = AsyncMock()
+    monkeypatch.setattr(stats_cache, "invalidate_case_change", invalidate)
+    svc = ApprovalService(_DummyDB())
+    svc.repository = FakeApprovalRepo()
+    svc.consecutive_repo = FakeApprovalConsecutiveRepo()
+    svc.case_repository = FakeCaseRepo(exists_case_codes={"2025-00001"})
+    svc.case_service = _fake_case_service(svc.case_repository)
+    created = await svc.create_approval_request(ApprovalRequestCreate(
+        original_case_code="2025-00001",
+        complementary_tests=[{"code": "T-101", "name": "Inmuno", "quantity": 2}],
+        reason="Necesito más pruebas"
+    ))
+
+    res = await svc.approve_request(created.approval_code)
+
+    new_case = res["new_case"]
+    assert new_case["assigned_pathologist"] == {"id": "pat-1", "name": "Dra. García"}
+    # Alta y asignación de patólogo llegan a rollups y caché
+    rollups = svc.case_service.rollups.apply_change
+    assert rollups.await_count == 2 and invalidate.await_count == 2
+    assert rollups.await_args_list[0].args[0] is None
+
+
+@pytest.mark.asyncio
+async def test_approved_case_gets_due_date():
+    svc = ApprovalService(_DummyDB())
+    svc.repository = FakeApprovalRepo()
+    svc.consecutive_repo = FakeApprovalConsecutiveRepo()
+    svc.case_repository = FakeCaseRepo(exists_case_codes={"2025-00001"})
+    svc.case_service = _fake_case_service(svc.case_repository)
+    created = await svc.create_approval_request(ApprovalRequestCreate(
+        original_case_code="2025-00001",
+        complementary_tests=[{"code": "T-101", "name": "Inmuno", "quantity": 2}],
+        reason="Necesito más pruebas"
+    ))
+
+    res = await svc.approve_request(created.approval_code)
+
+    # Sin due_at el caso nunca aparecería en /urgent/overdue
+    assert res["new_case"]["due_at"] == datetime(2025, 3, 24, 5, tzinfo=timezone.utc)
+    assert res["new_case"]["sla_days"] == 6
+    samples = svc.case_service.due_dates.due_at.await_args.args[1]
+    assert samples[0]["tests"][0]["id"] == "T-101"
+
+
+@pytest.mark.asyncio
+async def test_approved_case_pathologist_assignment_updates_workload():
+    svc = ApprovalService(_DummyDB())
+    svc.repository = FakeApprovalRepo()
+    svc.consecutive_repo = FakeApprovalConsecutiveRepo()
+    svc.case_repository = FakeCaseRepo(exists_case_codes={"2025-00001"})
+    svc.case_service = _fake_case_service(svc.case_repository)
+    created = await svc.create_approval_request(ApprovalRequestCreate(
+        original_case_code="2025-00001",
+        complementary_tests=[{"code": "T-101", "name": "Inmuno", "quantity": 2}],
+        reason="Necesito más pruebas"
+    ))
+
+    await svc.approve_request(created.approval_code)
+
+    workload = svc.case_service.workload.apply_change
+    assert workload.await_count == 2
+    previous, updated = workload.await_args_list[1].args
+    assert "assigned_pathologist" not in previous
+    assert updated["assigned_pathologist"]["id"] == "pat-1"
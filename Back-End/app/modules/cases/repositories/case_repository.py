@@ -1,7 +1,31 @@
 # Repositorio de casos: acceso CRUD y creación de índices.
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+
+
+# Índices de estadísticas, derivados de los $match de repositories/statistics. Regla: primero los campos
+# de igualdad (patólogo, entidad, prueba), luego el rango de fechas. Casi todas las consultas son sobre
+# casos completados por fecha de firma, así que esos índices son parciales sobre state = "Completado".
+COMPLETED_CASES_FILTER = {"state": "Completado"}
+STATISTICS_INDEXES = [
+    # {state, signed_at[, business_days]}: rendimiento, oportunidad y tendencias generales
+    ("stats_completed_signed", [("signed_at", 1), ("business_days", 1)], COMPLETED_CASES_FILTER),
+    # {state, signed_at, assigned_pathologist.id}: oportunidad y métricas por patólogo
+    ("stats_completed_pathologist", [("assigned_pathologist.id", 1), ("signed_at", 1), ("business_days", 1)], COMPLETED_CASES_FILTER),
+    # {state, signed_at, patient_info.entity_info.id}: filtros por entidad
+    ("stats_completed_entity", [("patient_info.entity_info.id", 1), ("signed_at", 1)], COMPLETED_CASES_FILTER),
+    # {state, signed_at, samples.tests.id}: detalle de una prueba
+    ("stats_completed_test", [("samples.tests.id", 1), ("signed_at", 1)], COMPLETED_CASES_FILTER),
+    # {created_at, assigned_pathologist.id}: dashboard del patólogo (sin filtro de estado)
+    ("stats_created_pathologist", [("assigned_pathologist.id", 1), ("created_at", 1)], None),
+]
+# Compuestos anteriores que quedan cubiertos por los de arriba
+OBSOLETE_STATISTICS_INDEXES = [
+    "state_1_signed_at_1_assigned_pathologist.id_1_business_days_1",
+]
 
 
 class CaseRepository:
@@ -16,6 +40,8 @@ class CaseRepository:
         await self.collection.create_index("patient_info.identification_type")
         await self.collection.create_index("state")
         await self.collection.create_index("created_at")
+        # Marca de agua de la exportación incremental del snapshot de casos
+        await self.collection.create_index("updated_at")
         await self.collection.create_index("assigned_pathologist.name")
         await self.collection.create_index("assigned_pathologist.id")
         await self.collection.create_index("patient_info.entity_info.name")
@@ -26,6 +52,18 @@ class CaseRepository:
             ("state", 1),
             ("assigned_pathologist.name", 1)
         ])
+        await self.ensure_statistics_indexes()
+
+    async def ensure_statistics_indexes(self):
+        # Índices de las estadísticas (ver STATISTICS_INDEXES); reemplazan a los compuestos anteriores
+        for name in OBSOLETE_STATISTICS_INDEXES:
+            try:
+                await self.collection.drop_index(name)
+            except OperationFailure:
+                pass
+        for name, keys, partial_filter in STATISTICS_INDEXES:
+            options = {"partialFilterExpression": partial_filter} if partial_filter else {}
+            await self.collection.create_index(keys, name=name, **options)
 
     # Obtiene un caso por su código único.
     async def get_by_case_code(self, case_code: str) -> Optional[Dict[str, Any]]:
@@ -45,6 +83,25 @@ class CaseRepository:
         await self.collection.update_one({"case_code": case_code}, {"$set": update})
         return await self.get_by_case_code(case_code)
 
+    # Actualiza y devuelve (antes, después) de la misma escritura atómica: los contadores
+    # derivados (rollups, carga de trabajo) aplican la diferencia exacta aunque haya
+    # actualizaciones concurrentes del mismo caso.
+    async def update_with_previous(
+        self, case_code: str, update: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        update["updated_at"] = datetime.now(timezone.utc)
+        before = await self.collection.find_one_and_update(
+            {"case_code": case_code}, {"$set": update}, return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
+            return None, None
+        # Las llaves de update son campos de primer nivel: el $set equivale a reemplazarlos
+        return before, {**before, **update}
+
+    # Elimina un caso y devuelve el documento borrado (None si no existía).
+    async def delete_returning_previous(self, case_code: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one_and_delete({"case_code": case_code})
+
     # Elimina un caso por su código.
     async def delete_by_case_code(self, case_code: str) -> bool:
         res = await self.collection.delete_one({"case_code": case_code})
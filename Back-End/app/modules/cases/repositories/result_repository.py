@@ -10,7 +10,11 @@ class ResultRepository:
     async def update_result(self, case_code: str, result_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         now = datetime.now(timezone.utc)
         doc = await self.collection.find_one({"case_code": case_code})
-        result = {**(doc.get("result", {}) if doc else {}), **result_data, "updated_at": now}
+        current = (doc.get("result") or {}) if doc else {}
+        result = {**current, **result_data, "updated_at": now}
+        if "sanitized_html" in result_data:
+            # Conservar la versión sanitizada de los campos que no cambian en esta actualización
+            result["sanitized_html"] = {**(current.get("sanitized_html") or {}), **result_data["sanitized_html"]}
         await self.collection.update_one({"case_code": case_code}, {"$set": {"result": result, "updated_at": now}})
         return await self.collection.find_one({"case_code": case_code})
 
@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 
 
 class SignRepository:
@@ -8,6 +9,13 @@ class SignRepository:
         self.collection = db.cases
 
     async def sign_case(self, case_code: str, sign_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        _, updated = await self.sign_case_with_previous(case_code, sign_data)
+        return updated
+
+    async def sign_case_with_previous(
+        self, case_code: str, sign_data: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Firma y devuelve (antes, después) de la misma escritura atómica."""
         now = datetime.now(timezone.utc)
         result = {k: v for k, v in {
             "method": sign_data.get("method"),
@@ -17,13 +25,16 @@ class SignRepository:
             "observations": sign_data.get("observations"),
             "cie10_diagnosis": sign_data.get("cie10_diagnosis"),
             "cieo_diagnosis": sign_data.get("cieo_diagnosis"),
+            "sanitized_html": sign_data.get("sanitized_html"),
             "updated_at": now
         }.items() if v is not None}
-        await self.collection.update_one(
-            {"case_code": case_code},
-            {"$set": {"state": "Por entregar", "signed_at": now, "updated_at": now, "result": result}}
+        changes = {"state": "Por entregar", "signed_at": now, "updated_at": now, "result": result}
+        before = await self.collection.find_one_and_update(
+            {"case_code": case_code}, {"$set": changes}, return_document=ReturnDocument.BEFORE
         )
-        return await self.collection.find_one({"case_code": case_code})
+        if before is None:
+            return None, None
+        return before, {**before, **changes}
 
     async def validate_case_can_be_signed(self, case_code: str) -> bool:
         doc = await self.collection.find_one({"case_code": case_code}, {"state": 1, "assigned_pathologist": 1})
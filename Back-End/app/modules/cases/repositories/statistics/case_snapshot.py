@@ -0,0 +1,274 @@
+# Snapshot columnar de los casos para análisis ad-hoc (tablas cruzadas) fuera de MongoDB.
+# Cada caso se aplana en una fila por prueba solicitada y se escribe en archivos Arrow IPC, que se
+# pueden mapear en memoria sin copiar. Las exportaciones son incrementales por updated_at: cada una
+# agrega un archivo (parte) con los casos modificados desde la marca anterior; al leer, la versión
+# más reciente de cada caso reemplaza a las anteriores.
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.rollup_repository import OPPORTUNITY_THRESHOLD_DAYS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+# Con más partes que esto la exportación compacta el snapshot en un solo archivo
+MAX_PARTS = 24
+EXPORT_BATCH_SIZE = 5000
+# Relectura antes de la marca de agua: una escritura que se confirma tarde puede llevar un
+# updated_at anterior al último caso exportado
+WATERMARK_OVERLAP_SECONDS = 10
+
+# (columna, tipo Arrow)
+SNAPSHOT_COLUMNS = (
+    ("case_code", "string"),
+    ("state", "string"),
+    ("entity_code", "string"),
+    ("entity_name", "string"),
+    ("pathologist_code", "string"),
+    ("pathologist_name", "string"),
+    ("care_type", "string"),
+    ("test_code", "string"),
+    ("test_name", "string"),
+    ("created_at", "timestamp"),
+    ("signed_at", "timestamp"),
+    ("business_days", "float64"),
+    ("within_opportunity", "bool"),
+    ("samples", "int32"),
+    ("updated_at", "timestamp"),
+    # Lápida: el caso se eliminó de MongoDB y sus filas anteriores dejan de contar
+    ("deleted", "bool"),
+)
+
+CASE_PROJECTION = {
+    "_id": 0,
+    "case_code": 1,
+    "state": 1,
+    "created_at": 1,
+    "signed_at": 1,
+    "updated_at": 1,
+    "business_days": 1,
+    "patient_info.entity_info": 1,
+    "patient_info.care_type": 1,
+    "assigned_pathologist": 1,
+    "samples.tests.id": 1,
+    "samples.tests.name": 1,
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # type: ignore
+        import pyarrow.compute  # type: ignore  # noqa: F401
+        import pyarrow.ipc  # type: ignore  # noqa: F401
+    except ImportError as e:  # pragma: no cover - depende del entorno
+        raise RuntimeError("El snapshot de casos requiere el paquete 'pyarrow' (pip install pyarrow)") from e
+    return pyarrow
+
+
+def _utc(value: Any) -> Optional[datetime]:
+    # MongoDB guarda UTC; las fechas naive que devuelve Motor ya están en UTC
+    if not isinstance(value, datetime):
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def flatten_case(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Filas del snapshot para un caso: una por prueba solicitada (una sin prueba si no tiene)."""
+    patient = doc.get("patient_info") or {}
+    entity = patient.get("entity_info") or {}
+    pathologist = doc.get("assigned_pathologist") or {}
+    business_days = doc.get("business_days")
+    numeric = isinstance(business_days, (int, float)) and not isinstance(business_days, bool)
+    samples = doc.get("samples") or []
+    base = {
+        "case_code": doc.get("case_code"),
+        "state": doc.get("state"),
+        "entity_code": entity.get("id"),
+        "entity_name": entity.get("name"),
+        "pathologist_code": pathologist.get("id"),
+        "pathologist_name": pathologist.get("name"),
+        "care_type": patient.get("care_type"),
+        "created_at": _utc(doc.get("created_at")),
+        "signed_at": _utc(doc.get("signed_at")),
+        "business_days": float(business_days) if numeric else None,
+        # Mismo criterio que las estadísticas: un valor nulo cuenta como dentro de oportunidad
+        "within_opportunity": business_days is None or (numeric and business_days <= OPPORTUNITY_THRESHOLD_DAYS),
+        "samples": len(samples),
+        "updated_at": _utc(doc.get("updated_at")),
+        "deleted": False,
+    }
+    tests = [test or {} for sample in samples for test in (sample or {}).get("tests") or []]
+    if not tests:
+        return [{**base, "test_code": None, "test_name": None}]
+    return [{**base, "test_code": test.get("id"), "test_name": test.get("name")} for test in tests]
+
+
+def tombstone(case_code: str) -> Dict[str, Any]:
+    row: Dict[str, Any] = {column: None for column, _ in SNAPSHOT_COLUMNS}
+    row.update({"case_code": case_code, "deleted": True})
+    return row
+
+
+class CaseSnapshotStore:
+    """Directorio del snapshot: partes Arrow IPC numeradas y un manifest con la marca de agua."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"version": 0, "watermark": None, "parts": [], "rows": 0}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        # Escritura atómica: los lectores nunca ven un manifest a medias
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def _schema(self):
+        pa = _require_pyarrow()
+        types = {
+            "string": pa.string(),
+            "timestamp": pa.timestamp("ms"),
+            "float64": pa.float64(),
+            "bool": pa.bool_(),
+            "int32": pa.int32(),
+        }
+        return pa.schema([(column, types[kind]) for column, kind in SNAPSHOT_COLUMNS])
+
+    def append(self, rows: List[Dict[str, Any]], watermark: Optional[datetime], replace: bool = False) -> Dict[str, Any]:
+        """Escribe una parte nueva con las filas y avanza la marca de agua.
+        Con replace=True la parte reemplaza todo el snapshot (exportación completa o compactación)."""
+        pa = _require_pyarrow()
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self.read_manifest()
+        version = manifest["version"] + 1
+        name = f"part-{version:06d}.arrow"
+        table = pa.Table.from_pylist(rows, schema=self._schema())
+        tmp = os.path.join(self.directory, f"{name}.tmp")
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, os.path.join(self.directory, name))
+
+        previous = manifest["parts"]
+        manifest.update({
+            "version": version,
+            "watermark": watermark.isoformat() if watermark else manifest["watermark"],
+            "parts": [name] if replace else previous + [name],
+            "rows": len(rows) if replace else manifest["rows"] + len(rows),
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+        })
+        self._write_manifest(manifest)
+        if replace:
+            for old in previous:
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except FileNotFoundError:
+                    pass
+        return manifest
+
+    def load_table(self, manifest: Optional[Dict[str, Any]] = None):
+        """Tabla Arrow con la versión vigente de cada caso; las partes se leen mapeadas en memoria."""
+        pa = _require_pyarrow()
+        manifest = manifest or self.read_manifest()
+        tables = []
+        for name in manifest["parts"]:
+            source = pa.memory_map(os.path.join(self.directory, name), "r")
+            tables.append(pa.ipc.open_file(source).read_all())
+        if not tables:
+            return self._schema().empty_table()
+        if len(tables) == 1:
+            table = tables[0]
+        else:
+            table = _latest_versions(pa, tables)
+        return table.filter(pa.compute.invert(table["deleted"]))
+
+    def compact(self) -> Dict[str, Any]:
+        """Reescribe el snapshot vigente (sin lápidas ni versiones viejas) en una sola parte."""
+        manifest = self.read_manifest()
+        table = self.load_table(manifest)
+        watermark = datetime.fromisoformat(manifest["watermark"]) if manifest["watermark"] else None
+        return self.append(table.to_pylist(), watermark, replace=True)
+
+
+def _latest_versions(pa, tables):
+    # Las partes van en orden de exportación: un caso presente en una parte posterior descarta
+    # sus filas de todas las anteriores
+    pc = pa.compute
+    kept = []
+    seen = None
+    for table in reversed(tables):
+        codes = table["case_code"].unique()
+        if seen is not None:
+            table = table.filter(pc.invert(pc.is_in(table["case_code"], value_set=seen)))
+        kept.append(table)
+        seen = codes if seen is None else pa.concat_arrays([seen, codes])
+    return pa.concat_tables(list(reversed(kept)))
+
+
+class CaseSnapshotExporter:
+    """Exporta los casos de MongoDB al snapshot, de forma incremental por updated_at."""
+
+    def __init__(self, database: AsyncIOMotorDatabase, store: CaseSnapshotStore):
+        self.collection = database.cases
+        self.store = store
+
+    async def export(self, full: bool = False) -> Dict[str, Any]:
+        manifest = self.store.read_manifest()
+        full = full or not manifest["parts"]
+        query: Dict[str, Any] = {}
+        if not full and manifest["watermark"]:
+            since = datetime.fromisoformat(manifest["watermark"]) - timedelta(seconds=WATERMARK_OVERLAP_SECONDS)
+            query["updated_at"] = {"$gte": since}
+
+        # Versión (updated_at) de cada caso ya exportado: lo releído por la ventana que no cambió se omite
+        exported_versions: Dict[str, Any] = {}
+        if not full:
+            table = self.store.load_table(manifest)
+            exported_versions = dict(zip(table.column("case_code").to_pylist(), table.column("updated_at").to_pylist()))
+
+        latest: Dict[Any, Dict[str, Any]] = {}
+        watermark = None
+        cursor = self.collection.find(query, CASE_PROJECTION).batch_size(EXPORT_BATCH_SIZE)
+        async for doc in cursor:
+            updated_at = _utc(doc.get("updated_at"))
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+            code = doc.get("case_code")
+            known = exported_versions.get(code)
+            if known and updated_at and updated_at <= known:
+                continue
+            # Un caso modificado durante la lectura puede aparecer dos veces: queda la versión más reciente
+            current = latest.get(code)
+            if current is None or (updated_at or datetime.min) >= (_utc(current.get("updated_at")) or datetime.min):
+                latest[code] = doc
+        rows: List[Dict[str, Any]] = [row for doc in latest.values() for row in flatten_case(doc)]
+        exported = len(latest)
+
+        deleted = 0
+        if not full:
+            # Los casos eliminados no aparecen por updated_at: se detectan comparando los códigos
+            live = set(await self.collection.distinct("case_code"))
+            gone = sorted(code for code in set(exported_versions) - live if code)
+            rows.extend(tombstone(code) for code in gone)
+            deleted = len(gone)
+
+        if not rows and not full:
+            return {"full": False, "cases": 0, "deleted": 0, "rows": 0, "manifest": manifest}
+
+        manifest = self.store.append(rows, watermark, replace=full)
+        if len(manifest["parts"]) > MAX_PARTS:
+            manifest = self.store.compact()
+        logger.info("Snapshot de casos: %s casos exportados, %s eliminados (%s)", exported, deleted, "completo" if full else "incremental")
+        return {"full": full, "cases": exported, "deleted": deleted, "rows": len(rows), "manifest": manifest}
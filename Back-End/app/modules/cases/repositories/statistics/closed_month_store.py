@@ -0,0 +1,99 @@
+# Resultados persistidos de estadísticas de meses cerrados. Un mes cerrado solo cambia si una
+# escritura toca un caso de ese mes (o una importación masiva), así que su resultado se calcula una
+# vez, se guarda y se sirve desde aquí; la invalidación de la caché de estadísticas lo descarta.
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, List, Optional, Set, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+CLOSED_MONTHS_COLLECTION = "statistics_closed_months"
+PREWARM_COLLECTION = "statistics_prewarm"
+# Documento de PREWARM_COLLECTION que hace de candado entre procesos para el pre-cálculo
+LEASE_ID = "lease"
+
+Month = Tuple[int, int]
+
+
+def is_closed_month(month: Month, now: Optional[datetime] = None) -> bool:
+    """Un mes está cerrado cuando es anterior al mes en curso (UTC)."""
+    now = now or datetime.now(timezone.utc)
+    return tuple(month) < (now.year, now.month)
+
+
+class ClosedMonthStore:
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.collection = getattr(database, CLOSED_MONTHS_COLLECTION)
+        self.prewarm = getattr(database, PREWARM_COLLECTION)
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index([("year", 1), ("month", 1)])
+
+    async def get(self, key: str) -> Optional[Any]:
+        doc = await self.collection.find_one({"key": key}, {"_id": 0, "value": 1})
+        return doc.get("value") if doc else None
+
+    async def put(self, key: str, namespace: str, month: Month, value: Any) -> None:
+        await self.collection.replace_one(
+            {"key": key},
+            {
+                "key": key,
+                "namespace": namespace,
+                "year": month[0],
+                "month": month[1],
+                "value": value,
+                "computed_at": datetime.now(timezone.utc),
+            },
+            upsert=True,
+        )
+
+    async def drop_months(self, months: Iterable[Month]) -> int:
+        """Descarta los resultados de esos meses y su marca de pre-cálculo (se vuelven a calcular)."""
+        conditions = [{"year": year, "month": month} for year, month in sorted(set(months))]
+        if not conditions:
+            return 0
+        result = await self.collection.delete_many({"$or": conditions})
+        await self.prewarm.delete_many({"$or": conditions})
+        return result.deleted_count
+
+    async def mark_prewarmed(self, month: Month, results: int) -> None:
+        await self.prewarm.replace_one(
+            {"_id": f"{month[0]:04d}-{month[1]:02d}"},
+            {"year": month[0], "month": month[1], "results": results, "prewarmed_at": datetime.now(timezone.utc)},
+            upsert=True,
+        )
+
+    async def prewarmed_months(self, months: Iterable[Month]) -> Set[Month]:
+        conditions = [{"year": year, "month": month} for year, month in months]
+        if not conditions:
+            return set()
+        docs = await self.prewarm.find({"$or": conditions}, {"_id": 0, "year": 1, "month": 1}).to_list(length=None)
+        return {(doc["year"], doc["month"]) for doc in docs}
+
+    async def acquire_lease(self, owner: str, seconds: float) -> bool:
+        """Toma (o renueva) el candado del pre-cálculo; falso si otro proceso lo tiene vigente."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.prewarm.update_one(
+                {"_id": LEASE_ID, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # El candado existe, es de otro proceso y sigue vigente
+            return False
+        return True
+
+    async def release_lease(self, owner: str) -> None:
+        await self.prewarm.delete_one({"_id": LEASE_ID, "owner": owner})
+
+
+def closed_months_back(count: int, now: Optional[datetime] = None) -> List[Month]:
+    """Los últimos `count` meses cerrados, del más reciente al más antiguo."""
+    now = now or datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    months = []
+    for _ in range(max(0, count)):
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        months.append((year, month))
+    return months
@@ -1,11 +1,33 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.rollup_repository import CaseStatsRollupRepository
+
+
+# Clave de paciente: patient_code o, si falta, "tipo-número" de identificación
+PATIENT_KEY_EXPRESSION = {
+    "$ifNull": [
+        "$patient_info.patient_code",
+        {
+            "$cond": [
+                {
+                    "$and": [
+                        {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
+                        {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
+                    ]
+                },
+                {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
+                "$patient_info.identification_number"
+            ]
+        }
+    ]
+}
 
 
 class DashboardStatisticsRepository:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.cases
+        self.rollups = CaseStatsRollupRepository(db)
 
     # Cantidad de casos por mes del año indicado.
     async def get_cases_by_month(self, year: int) -> Dict[str, Any]:
@@ -32,7 +54,14 @@ class DashboardStatisticsRepository:
             }
         ]
         
-        results = await self.collection.aggregate(pipeline).to_list(length=12)
+        if await self.rollups.is_ready():
+            results = await self.rollups.aggregate([
+                {"$match": self.rollups.period_match("created", "case", year)},
+                {"$group": {"_id": "$month", "count": {"$sum": "$cases"}}},
+                {"$sort": {"_id": 1}}
+            ], length=12)
+        else:
+            results = await self.collection.aggregate(pipeline).to_list(length=12)
         monthly_data = [0] * 12
         for result in results:
             month_index = result["_id"] - 1
@@ -121,11 +150,14 @@ class DashboardStatisticsRepository:
                 "$count": "total"
             }
         ]
-        total_pipeline = [
-            {
-                "$count": "total"
-            }
-        ]
+        current_month_result = await self.collection.aggregate(current_month_pipeline).to_list(1)
+        previous_month_result = await self.collection.aggregate(previous_month_pipeline).to_list(1)
+        casos_mes_actual = current_month_result[0]["total"] if current_month_result else 0
+        casos_mes_anterior = previous_month_result[0]["total"] if previous_month_result else 0
+        return self.build_overview(casos_mes_actual, casos_mes_anterior, await self.get_state_counts())
+
+    async def get_state_counts(self) -> Dict[Any, int]:
+        # Casos por estado; el total es la suma, así basta un recorrido en lugar de $count + $group
         cases_by_state_pipeline = [
             {
                 "$group": {
@@ -134,22 +166,18 @@ class DashboardStatisticsRepository:
                 }
             }
         ]
-        current_month_result = await self.collection.aggregate(current_month_pipeline).to_list(1)
-        previous_month_result = await self.collection.aggregate(previous_month_pipeline).to_list(1)
-        total_result = await self.collection.aggregate(total_pipeline).to_list(1)
         cases_by_state_result = await self.collection.aggregate(cases_by_state_pipeline).to_list(length=None)
-        casos_mes_actual = current_month_result[0]["total"] if current_month_result else 0
-        casos_mes_anterior = previous_month_result[0]["total"] if previous_month_result else 0
-        total_casos = total_result[0]["total"] if total_result else 0
+        return {result["_id"]: result["count"] for result in cases_by_state_result}
+
+    @staticmethod
+    def build_overview(casos_mes_actual: int, casos_mes_anterior: int, casos_por_estado: Dict[Any, int]) -> Dict[str, Any]:
+        """Resumen del dashboard a partir de los conteos del mes actual/anterior y por estado."""
         if casos_mes_anterior > 0:
             cambio_porcentual = ((casos_mes_actual - casos_mes_anterior) / casos_mes_anterior) * 100
         else:
             cambio_porcentual = 100.0 if casos_mes_actual > 0 else 0.0
-        casos_por_estado = {}
-        for result in cases_by_state_result:
-            casos_por_estado[result["_id"]] = result["count"]
         return {
-            "total_casos": total_casos,
+            "total_casos": sum(casos_por_estado.values()),
             "casos_mes_actual": casos_mes_actual,
             "casos_mes_anterior": casos_mes_anterior,
             "cambio_porcentual": round(cambio_porcentual, 2),
@@ -173,202 +201,8 @@ class DashboardStatisticsRepository:
         else:
             next_month_start = datetime(now.year, now.month + 1, 1, tzinfo=timezone.utc)
         
-        # Pipeline para pacientes del mes actual
-        current_month_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    }
-                }
-            },
-            {
-                "$addFields": {
-                    "patient_key": {
-                        "$ifNull": [
-                            "$patient_info.patient_code",
-                            {
-                                "$cond": [
-                                    {
-                                        "$and": [
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
-                                        ]
-                                    },
-                                    {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
-                                    "$patient_info.identification_number"
-                                ]
-                            }
-                        ]
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para pacientes del mes anterior
-        previous_month_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    }
-                }
-            },
-            {
-                "$addFields": {
-                    "patient_key": {
-                        "$ifNull": [
-                            "$patient_info.patient_code",
-                            {
-                                "$cond": [
-                                    {
-                                        "$and": [
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
-                                        ]
-                                    },
-                                    {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
-                                    "$patient_info.identification_number"
-                                ]
-                            }
-                        ]
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del mes actual
-        current_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del mes anterior
-        previous_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    }
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Ejecutar agregaciones
-        current_month_patients_result = await self.collection.aggregate(current_month_patients_pipeline).to_list(1)
-        previous_month_patients_result = await self.collection.aggregate(previous_month_patients_pipeline).to_list(1)
-        current_month_cases_result = await self.collection.aggregate(current_month_cases_pipeline).to_list(1)
-        previous_month_cases_result = await self.collection.aggregate(previous_month_cases_pipeline).to_list(1)
-        
-        # Procesar resultados
-        pacientes_mes_actual = current_month_patients_result[0]["total"] if current_month_patients_result else 0
-        pacientes_mes_anterior = previous_month_patients_result[0]["total"] if previous_month_patients_result else 0
-        casos_mes_actual = current_month_cases_result[0]["total"] if current_month_cases_result else 0
-        casos_mes_anterior = previous_month_cases_result[0]["total"] if previous_month_cases_result else 0
-        
-        # Calcular cambios porcentuales con ventanas rodantes de 30 días
-        from datetime import timedelta
-        last30_start = now - timedelta(days=30)
-        prev30_start = now - timedelta(days=60)
-        prev30_end = last30_start
-
-        # Pacientes últimos 30 días (únicos por clave de paciente)
-        last30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": last30_start, "$lt": now}
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
-        prev30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": prev30_start, "$lt": prev30_end}
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
-
-        # Casos últimos 30 días (conteo total)
-        last30_cases_pipeline = [
-            {"$match": {"created_at": {"$gte": last30_start, "$lt": now}}},
-            {"$count": "total"}
-        ]
-        prev30_cases_pipeline = [
-            {"$match": {"created_at": {"$gte": prev30_start, "$lt": prev30_end}}},
-            {"$count": "total"}
-        ]
-
-        last30_patients_result = await self.collection.aggregate(last30_patients_pipeline).to_list(1)
-        prev30_patients_result = await self.collection.aggregate(prev30_patients_pipeline).to_list(1)
-        last30_cases_result = await self.collection.aggregate(last30_cases_pipeline).to_list(1)
-        prev30_cases_result = await self.collection.aggregate(prev30_cases_pipeline).to_list(1)
-
-        pacientes_last30 = last30_patients_result[0]["total"] if last30_patients_result else 0
-        pacientes_prev30 = prev30_patients_result[0]["total"] if prev30_patients_result else 0
-        casos_last30 = last30_cases_result[0]["total"] if last30_cases_result else 0
-        casos_prev30 = prev30_cases_result[0]["total"] if prev30_cases_result else 0
-
-        if pacientes_prev30 > 0:
-            pacientes_cambio = ((pacientes_last30 - pacientes_prev30) / pacientes_prev30) * 100
-        else:
-            pacientes_cambio = 100.0 if pacientes_last30 > 0 else 0.0
-        
-        if casos_prev30 > 0:
-            casos_cambio = ((casos_last30 - casos_prev30) / casos_prev30) * 100
-        else:
-            casos_cambio = 100.0 if casos_last30 > 0 else 0.0
-        
-        return {
-            "pacientes": {
-                "mes_actual": pacientes_mes_actual,
-                "mes_anterior": pacientes_mes_anterior,
-                "cambio_porcentual": round(pacientes_cambio, 2)
-            },
-            "casos": {
-                "mes_actual": casos_mes_actual,
-                "mes_anterior": casos_mes_anterior,
-                "cambio_porcentual": round(casos_cambio, 2)
-            }
-        }
+        counts = await self._count_metrics_windows(now, previous_month_start, current_month_start, next_month_start)
+        return self._build_metrics(counts)
 
     async def get_metrics_pathologist(self, pathologist_code: str) -> Dict[str, Any]:
         """Obtener métricas específicas de un patólogo"""
@@ -387,163 +221,86 @@ class DashboardStatisticsRepository:
         else:
             next_month_start = datetime(now.year, now.month + 1, 1)
         
-        # Pipeline para pacientes del patólogo en el mes actual
-        current_month_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {
-                "$group": {
-                    "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
+        counts = await self._count_metrics_windows(
+            now, previous_month_start, current_month_start, next_month_start,
+            extra_match={"assigned_pathologist.id": pathologist_code}
+        )
+        return self._build_metrics(counts)
+
+    async def _count_metrics_windows(
+        self,
+        now: datetime,
+        previous_month_start: datetime,
+        current_month_start: datetime,
+        next_month_start: datetime,
+        extra_match: Dict[str, Any] = None
+    ) -> Dict[str, int]:
+        """Pacientes únicos y casos del mes actual, el anterior y las ventanas rodantes de 30 días.
+        Una sola agregación: se filtra el rango que cubre todas las ventanas y cada caso se marca
+        con las ventanas a las que pertenece; luego se agrupa por paciente y se suman las marcas."""
+        last30_start = now - timedelta(days=30)
+        prev30_start = now - timedelta(days=60)
+        windows = {
+            "mes_actual": (current_month_start, next_month_start),
+            "mes_anterior": (previous_month_start, current_month_start),
+            "last30": (last30_start, now),
+            "prev30": (prev30_start, last30_start),
+        }
+        match_conditions = {
+            "created_at": {
+                "$gte": min(start for start, _ in windows.values()),
+                "$lt": max(end for _, end in windows.values())
             }
-        ]
+        }
+        match_conditions.update(extra_match or {})
         
-        # Pipeline para pacientes del patólogo en el mes anterior
-        previous_month_patients_pipeline = [
+        pipeline = [
+            {"$match": match_conditions},
             {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code
+                "$project": {
+                    "patient_key": PATIENT_KEY_EXPRESSION,
+                    **{
+                        name: {"$cond": [{"$and": [{"$gte": ["$created_at", start]}, {"$lt": ["$created_at", end]}]}, 1, 0]}
+                        for name, (start, end) in windows.items()
+                    }
                 }
             },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
             {
                 "$group": {
                     "_id": "$patient_key",
-                    "count": {"$sum": 1}
-                }
-            },
-            {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del patólogo en el mes actual
-        current_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": current_month_start,
-                        "$lt": next_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code
+                    **{f"casos_{name}": {"$sum": f"${name}"} for name in windows},
+                    # 1 si el paciente tiene al menos un caso en la ventana
+                    **{f"pacientes_{name}": {"$max": f"${name}"} for name in windows}
                 }
             },
             {
-                "$count": "total"
-            }
-        ]
-        
-        # Pipeline para casos del patólogo en el mes anterior
-        previous_month_cases_pipeline = [
-            {
-                "$match": {
-                    "created_at": {
-                        "$gte": previous_month_start,
-                        "$lt": current_month_start
-                    },
-                    "assigned_pathologist.id": pathologist_code
+                "$group": {
+                    "_id": None,
+                    **{f"{kind}_{name}": {"$sum": f"${kind}_{name}"} for kind in ("casos", "pacientes") for name in windows}
                 }
-            },
-            {
-                "$count": "total"
             }
         ]
         
-        # Ejecutar agregaciones
-        current_month_patients_result = await self.collection.aggregate(current_month_patients_pipeline).to_list(1)
-        previous_month_patients_result = await self.collection.aggregate(previous_month_patients_pipeline).to_list(1)
-        current_month_cases_result = await self.collection.aggregate(current_month_cases_pipeline).to_list(1)
-        previous_month_cases_result = await self.collection.aggregate(previous_month_cases_pipeline).to_list(1)
-        
-        # Procesar resultados
-        pacientes_mes_actual = current_month_patients_result[0]["total"] if current_month_patients_result else 0
-        pacientes_mes_anterior = previous_month_patients_result[0]["total"] if previous_month_patients_result else 0
-        casos_mes_actual = current_month_cases_result[0]["total"] if current_month_cases_result else 0
-        casos_mes_anterior = previous_month_cases_result[0]["total"] if previous_month_cases_result else 0
-        
-        # Calcular cambios porcentuales con ventanas rodantes de 30 días (filtrando por patólogo)
-        from datetime import timedelta
-        last30_start = now - timedelta(days=30)
-        prev30_start = now - timedelta(days=60)
-        prev30_end = last30_start
-
-        last30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": last30_start, "$lt": now},
-                    "assigned_pathologist.id": pathologist_code
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
-        prev30_patients_pipeline = [
-            {
-                "$match": {
-                    "created_at": {"$gte": prev30_start, "$lt": prev30_end},
-                    "assigned_pathologist.id": pathologist_code
-                }
-            },
-            {"$addFields": {"patient_key": {"$ifNull": ["$patient_info.patient_code", {"$cond": [{"$and": [{"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]}, {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}]}, {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]}, "$patient_info.identification_number"]}]}}},
-            {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
-            {"$count": "total"}
-        ]
-
-        last30_cases_pipeline = [
-            {"$match": {"created_at": {"$gte": last30_start, "$lt": now}, "assigned_pathologist.id": pathologist_code}},
-            {"$count": "total"}
-        ]
-        prev30_cases_pipeline = [
-            {"$match": {"created_at": {"$gte": prev30_start, "$lt": prev30_end}, "assigned_pathologist.id": pathologist_code}},
-            {"$count": "total"}
-        ]
-
-        last30_patients_result = await self.collection.aggregate(last30_patients_pipeline).to_list(1)
-        prev30_patients_result = await self.collection.aggregate(prev30_patients_pipeline).to_list(1)
-        last30_cases_result = await self.collection.aggregate(last30_cases_pipeline).to_list(1)
-        prev30_cases_result = await self.collection.aggregate(prev30_cases_pipeline).to_list(1)
-
-        pacientes_last30 = last30_patients_result[0]["total"] if last30_patients_result else 0
-        pacientes_prev30 = prev30_patients_result[0]["total"] if prev30_patients_result else 0
-        casos_last30 = last30_cases_result[0]["total"] if last30_cases_result else 0
-        casos_prev30 = prev30_cases_result[0]["total"] if prev30_cases_result else 0
-
-        if pacientes_prev30 > 0:
-            pacientes_cambio = ((pacientes_last30 - pacientes_prev30) / pacientes_prev30) * 100
-        else:
-            pacientes_cambio = 100.0 if pacientes_last30 > 0 else 0.0
-        
-        if casos_prev30 > 0:
-            casos_cambio = ((casos_last30 - casos_prev30) / casos_prev30) * 100
-        else:
-            casos_cambio = 100.0 if casos_last30 > 0 else 0.0
-        
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        totals = result[0] if result else {}
         return {
-            "pacientes": {
-                "mes_actual": pacientes_mes_actual,
-                "mes_anterior": pacientes_mes_anterior,
-                "cambio_porcentual": round(pacientes_cambio, 2)
-            },
-            "casos": {
-                "mes_actual": casos_mes_actual,
-                "mes_anterior": casos_mes_anterior,
-                "cambio_porcentual": round(casos_cambio, 2)
-            }
+            f"{kind}_{name}": totals.get(f"{kind}_{name}", 0)
+            for kind in ("casos", "pacientes") for name in windows
         }
+
+    def _build_metrics(self, counts: Dict[str, int]) -> Dict[str, Any]:
+        # Cambios porcentuales con ventanas rodantes de 30 días
+        metrics = {}
+        for kind in ("pacientes", "casos"):
+            last30 = counts[f"{kind}_last30"]
+            prev30 = counts[f"{kind}_prev30"]
+            if prev30 > 0:
+                cambio = ((last30 - prev30) / prev30) * 100
+            else:
+                cambio = 100.0 if last30 > 0 else 0.0
+            metrics[kind] = {
+                "mes_actual": counts[f"{kind}_mes_actual"],
+                "mes_anterior": counts[f"{kind}_mes_anterior"],
+                "cambio_porcentual": round(cambio, 2)
+            }
+        return metrics
@@ -0,0 +1,84 @@
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from app.modules.entities.repositories.entity_catalog import ALIASES_COLLECTION, entity_catalog
+from app.shared.repositories.catalog_cache import normalize_key
+
+# Campo indexado de los casos por el que filtran todas las estadísticas
+CASE_ENTITY_FIELD = "patient_info.entity_info.id"
+# Campo de nombre que acompaña a cada campo de código (casos y rollups)
+ENTITY_NAME_FIELDS = {CASE_ENTITY_FIELD: "patient_info.entity_info.name", "entity_id": "entity_name"}
+
+# Abreviaturas que antes estaban fijas como regex en TestStatisticsRepository; se siembran en entity_aliases
+LEGACY_ABBREVIATIONS = {
+    "HAMA": r"Hospital Alma Máter de Antioquia",
+    "HGM": r"Hospital General de Medellín Luz Castro G\.",
+    "HUSVP": r"Hospital Universitario San Vicente de Paul",
+    "CES": r"Clínica CES",
+    "VID": r"Clínica VID - Fundación Santa María",
+    "SURA": r"SURA",
+    "PROLAB": r"PROLAB S\.A\.S",
+    "LIME": r"LIME",
+    "TEM": r"TEM - SIU",
+    "INVESTIGACION": r"Investigación",
+    "MICROBIOLOGIA": r"Microbiología",
+    "PATOLOGIA": r"Patología",
+    "SUESCUN": r"Patología Suescún S\.A\.S",
+    "INTEGRAL": r"Patología Integral S\.A",
+    "HSVF": r"Centros Especializados HSVF Rionegro",
+    "RENALES": r"Renales IPS Clínica León XIII",
+    "AMBULATORIOS": r"Hospitales Ambulatorios",
+    "CARDIOLOGICA": r"Clínica Cardiovascular Santa María",
+    "NEUROCENTRO": r"Neurocentro - Pereira",
+    "IPS": r"IPS Universitaria Ambulatoria",
+    "HOSPITAL": r"Hospital",
+    "CLINICA": r"Clínica",
+}
+
+
+class EntityFilterResolver:
+    """Resuelve filtros de entidad de las estadísticas a condiciones de igualdad sobre el código."""
+
+    def __init__(self, database):
+        self.entities = entity_catalog.collection(database)
+        self.aliases = getattr(database, ALIASES_COLLECTION, None)
+
+    async def ensure_indexes(self) -> None:
+        if self.aliases is not None:
+            await self.aliases.create_index("alias_key", unique=True)
+
+    async def codes(self, entity: Optional[str]) -> Optional[List[str]]:
+        if not entity or not entity.strip():
+            return None
+        if self.entities is None:
+            return []
+        return await entity_catalog.resolve(self.entities, self.aliases, entity)
+
+    async def cache_key(self, entity: Optional[str]) -> Union[List[str], str, None]:
+        """Forma canónica del filtro para las llaves de caché: los códigos resueltos, de modo que el
+        código, un alias o el nombre de la misma entidad compartan el resultado (y lo pre-calculado)."""
+        codes = await self.codes(entity)
+        if codes is None:
+            return None
+        return codes or entity.strip()
+
+    async def apply(self, match_conditions: Dict[str, Any], entity: Optional[str], field: str = CASE_ENTITY_FIELD) -> Dict[str, Any]:
+        """Agrega a match_conditions el filtro por código de entidad (si se pidió una entidad).
+
+        Si la entidad no está en el catálogo se filtra como antes, por nombre sin distinguir
+        mayúsculas, para no devolver estadísticas vacías de entidades que faltan en el catálogo."""
+        codes = await self.codes(entity)
+        if codes:
+            match_conditions[field] = codes[0] if len(codes) == 1 else {"$in": codes}
+        elif codes is not None:
+            match_conditions[ENTITY_NAME_FIELDS[field]] = {"$regex": re.escape(entity.strip()), "$options": "i"}
+        return match_conditions
+
+    async def upsert_alias(self, alias: str, entity_codes: List[str]) -> None:
+        key = normalize_key(alias)
+        await self.aliases.update_one(
+            {"alias_key": key},
+            {"$set": {"alias_key": key, "alias": alias.strip(), "entity_codes": sorted(set(entity_codes))}},
+            upsert=True,
+        )
+        entity_catalog.invalidate()
@@ -1,11 +1,18 @@
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.entity_filter import EntityFilterResolver
+from app.modules.cases.repositories.statistics.rollup_repository import (
+    CaseStatsRollupRepository,
+    average_expression,
+)
 
 
 class EntityStatisticsRepository:
     def __init__(self, database: AsyncIOMotorDatabase):
         self.collection = database.cases
+        self.rollups = CaseStatsRollupRepository(database)
+        self.entity_filter = EntityFilterResolver(database)
 
     # Rendimiento mensual por entidad (solo casos completados).
     async def get_monthly_entity_performance(
@@ -14,45 +21,98 @@ class EntityStatisticsRepository:
         year: int,
         entity_name: str = None
     ) -> Dict[str, Any]:
-        start_date = datetime(year, month, 1)
-        end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
-        match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date},
-            "patient_info.entity_info.name": {"$exists": True, "$ne": None, "$ne": ""}
+        if await self.rollups.is_ready():
+            results = await self._monthly_entity_performance_from_rollups(month, year, entity_name)
+        else:
+            start_date = datetime(year, month, 1)
+            end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+            match_conditions = {
+                "state": "Completado",
+                "signed_at": {"$gte": start_date, "$lt": end_date},
+                "patient_info.entity_info.name": {"$exists": True, "$ne": None, "$ne": ""}
+            }
+            await self.entity_filter.apply(match_conditions, entity_name)
+
+            pipeline = [
+                {"$match": match_conditions},
+                {
+                    "$group": {
+                        "_id": {
+                            "entity_name": "$patient_info.entity_info.name",
+                            "entity_code": "$patient_info.entity_info.id"
+                        },
+                        "total_cases": {"$sum": 1},
+                        "ambulatorios": {
+                            "$sum": {
+                                "$cond": [
+                                    {"$eq": ["$patient_info.care_type", "Ambulatorio"]},
+                                    1,
+                                    0
+                                ]
+                            }
+                        },
+                        "hospitalizados": {
+                            "$sum": {
+                                "$cond": [
+                                    {"$eq": ["$patient_info.care_type", "Hospitalizado"]},
+                                    1,
+                                    0
+                                ]
+                            }
+                        },
+                        "total_business_days": {"$sum": "$business_days"},
+                        "avg_business_days": {"$avg": "$business_days"}
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "nombre": "$_id.entity_name",
+                        "codigo": "$_id.entity_code",
+                        "ambulatorios": 1,
+                        "hospitalizados": 1,
+                        "total": "$total_cases",
+                        "avg_business_days": {"$round": ["$avg_business_days", 2]}
+                    }
+                },
+                {"$sort": {"total": -1}}
+            ]
+            results = await self.collection.aggregate(pipeline).to_list(length=1000)
+        total_ambulatorios = sum(entity["ambulatorios"] for entity in results)
+        total_hospitalizados = sum(entity["hospitalizados"] for entity in results)
+        total_cases = sum(entity["total"] for entity in results)
+        weighted_days = sum((entity["avg_business_days"] or 0) * entity["total"] for entity in results)
+        tiempo_promedio = weighted_days / total_cases if total_cases > 0 else 0
+        
+        summary = {
+            "total": total_cases,
+            "ambulatorios": total_ambulatorios,
+            "hospitalizados": total_hospitalizados,
+            "tiempoPromedio": round(tiempo_promedio, 2)
         }
-        if entity_name:
-            match_conditions["patient_info.entity_info.name"] = {"$regex": entity_name.strip(), "$options": "i"}
         
+        return {"entities": results, "summary": summary}
+
+    # Misma agregación que get_monthly_entity_performance pero sobre los rollups mensuales.
+    async def _monthly_entity_performance_from_rollups(
+        self,
+        month: int,
+        year: int,
+        entity_name: str = None
+    ) -> List[Dict[str, Any]]:
+        match_conditions = self.rollups.period_match("signed", "case", year, month, state="Completado")
+        match_conditions["entity_name"] = {"$nin": [None, ""]}
+        await self.entity_filter.apply(match_conditions, entity_name, field="entity_id")
         pipeline = [
             {"$match": match_conditions},
             {
                 "$group": {
-                    "_id": {
-                        "entity_name": "$patient_info.entity_info.name",
-                        "entity_code": "$patient_info.entity_info.id"
-                    },
-                    "total_cases": {"$sum": 1},
-                    "ambulatorios": {
-                        "$sum": {
-                            "$cond": [
-                                {"$eq": ["$patient_info.care_type", "Ambulatorio"]},
-                                1,
-                                0
-                            ]
-                        }
-                    },
-                    "hospitalizados": {
-                        "$sum": {
-                            "$cond": [
-                                {"$eq": ["$patient_info.care_type", "Hospitalizado"]},
-                                1,
-                                0
-                            ]
-                        }
-                    },
-                    "total_business_days": {"$sum": "$business_days"},
-                    "avg_business_days": {"$avg": "$business_days"}
+                    "_id": {"entity_name": "$entity_name", "entity_code": "$entity_id"},
+                    "total_cases": {"$sum": "$cases"},
+                    "ambulatorios": {"$sum": {"$cond": [{"$eq": ["$care_type", "Ambulatorio"]}, "$cases", 0]}},
+                    "hospitalizados": {"$sum": {"$cond": [{"$eq": ["$care_type", "Hospitalizado"]}, "$cases", 0]}},
+                    "business_days_sum": {"$sum": "$business_days_sum"},
+                    "business_days_count": {"$sum": "$business_days_count"}
                 }
             },
             {
@@ -63,27 +123,12 @@ class EntityStatisticsRepository:
                     "ambulatorios": 1,
                     "hospitalizados": 1,
                     "total": "$total_cases",
-                    "avg_business_days": {"$round": ["$avg_business_days", 2]}
+                    "avg_business_days": {"$round": [average_expression(), 2]}
                 }
             },
             {"$sort": {"total": -1}}
         ]
-        
-        results = await self.collection.aggregate(pipeline).to_list(length=1000)
-        total_ambulatorios = sum(entity["ambulatorios"] for entity in results)
-        total_hospitalizados = sum(entity["hospitalizados"] for entity in results)
-        total_cases = sum(entity["total"] for entity in results)
-        weighted_days = sum(entity["avg_business_days"] * entity["total"] for entity in results)
-        tiempo_promedio = weighted_days / total_cases if total_cases > 0 else 0
-        
-        summary = {
-            "total": total_cases,
-            "ambulatorios": total_ambulatorios,
-            "hospitalizados": total_hospitalizados,
-            "tiempoPromedio": round(tiempo_promedio, 2)
-        }
-        
-        return {"entities": results, "summary": summary}
+        return await self.rollups.aggregate(pipeline, length=1000)
 
     # Detalle estadístico de una entidad en el mes.
     async def get_entity_details(
@@ -95,124 +140,91 @@ class EntityStatisticsRepository:
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
         match_conditions = {
-            "patient_info.entity_info.name": {"$regex": entity_name.strip(), "$options": "i"},
             "state": "Completado",
             "signed_at": {"$gte": start_date, "$lt": end_date}
         }
-        basic_stats_pipeline = [
-            {"$match": match_conditions},
-            {
-                "$group": {
-                    "_id": None,
-                    "total_pacientes": {"$sum": 1},
-                    "ambulatorios": {
-                        "$sum": {
-                            "$cond": [
-                                {"$eq": ["$patient_info.care_type", "Ambulatorio"]},
-                                1,
-                                0
-                            ]
-                        }
-                    },
-                    "hospitalizados": {
-                        "$sum": {
-                            "$cond": [
-                                {"$eq": ["$patient_info.care_type", "Hospitalizado"]},
-                                1,
-                                0
-                            ]
-                        }
-                    },
-                    "total_samples": {"$sum": {"$size": {"$ifNull": ["$samples", []]}}},
-                    "business_days_stats": {
-                        "$push": "$business_days"
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "total_pacientes": 1,
-                    "ambulatorios": 1,
-                    "hospitalizados": 1,
-                    "promedio_muestras_por_paciente": {
-                        "$cond": [
-                            {"$gt": ["$total_pacientes", 0]},
-                            {"$round": [{"$divide": ["$total_samples", "$total_pacientes"]}, 2]},
-                            0
-                        ]
-                    }
-                }
-            }
-        ]
-        
-        basic_stats = await self.collection.aggregate(basic_stats_pipeline).to_list(length=None)
-        basic_stats = basic_stats[0] if basic_stats else {
-            "total_pacientes": 0,
-            "ambulatorios": 0,
-            "hospitalizados": 0,
-            "promedio_muestras_por_paciente": 0
-        }
-        business_days_pipeline = [
+        await self.entity_filter.apply(match_conditions, entity_name)
+        # Un solo recorrido de los casos: el resumen y las pruebas salen de facetas sobre el mismo $match
+        pipeline = [
             {"$match": match_conditions},
-            {
-                "$group": {
-                    "_id": None,
-                    "minimo_dias": {"$min": "$business_days"},
-                    "maximo_dias": {"$max": "$business_days"},
-                    "promedio_dias": {"$avg": "$business_days"},
-                    "muestras_completadas": {"$sum": 1}
-                }
-            },
             {
                 "$project": {
                     "_id": 0,
-                    "minimo_dias": 1,
-                    "maximo_dias": 1,
-                    "promedio_dias": {"$round": ["$promedio_dias", 2]},
-                    "muestras_completadas": 1
-                }
-            }
-        ]
-        
-        business_days_stats = await self.collection.aggregate(business_days_pipeline).to_list(length=None)
-        business_days_stats = business_days_stats[0] if business_days_stats else {
-            "minimo_dias": 0,
-            "maximo_dias": 0,
-            "promedio_dias": 0,
-            "muestras_completadas": 0
-        }
-        tests_pipeline = [
-            {"$match": match_conditions},
-            {"$unwind": "$samples"},
-            {"$unwind": "$samples.tests"},
-            {
-                "$group": {
-                    "_id": {
-                        "test_code": "$samples.tests.id",
-                        "test_name": "$samples.tests.name"
-                    },
-                    "total_solicitudes": {"$sum": 1}
+                    "patient_info.care_type": 1,
+                    "business_days": 1,
+                    "samples.tests.id": 1,
+                    "samples.tests.name": 1,
                 }
             },
             {
-                "$project": {
-                    "_id": 0,
-                    "codigo": "$_id.test_code",
-                    "nombre": "$_id.test_name",
-                    "total_solicitudes": 1
+                "$facet": {
+                    "resumen": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "total_pacientes": {"$sum": 1},
+                                "ambulatorios": {
+                                    "$sum": {"$cond": [{"$eq": ["$patient_info.care_type", "Ambulatorio"]}, 1, 0]}
+                                },
+                                "hospitalizados": {
+                                    "$sum": {"$cond": [{"$eq": ["$patient_info.care_type", "Hospitalizado"]}, 1, 0]}
+                                },
+                                "total_samples": {"$sum": {"$size": {"$ifNull": ["$samples", []]}}},
+                                "minimo_dias": {"$min": "$business_days"},
+                                "maximo_dias": {"$max": "$business_days"},
+                                "promedio_dias": {"$avg": "$business_days"},
+                            }
+                        }
+                    ],
+                    "pruebas": [
+                        {"$unwind": "$samples"},
+                        {"$unwind": "$samples.tests"},
+                        {
+                            "$group": {
+                                "_id": {
+                                    "test_code": "$samples.tests.id",
+                                    "test_name": "$samples.tests.name"
+                                },
+                                "total_solicitudes": {"$sum": 1}
+                            }
+                        },
+                        {
+                            "$project": {
+                                "_id": 0,
+                                "codigo": "$_id.test_code",
+                                "nombre": "$_id.test_name",
+                                "total_solicitudes": 1
+                            }
+                        },
+                        {"$sort": {"total_solicitudes": -1}},
+                        {"$limit": 10}
+                    ],
                 }
             },
-            {"$sort": {"total_solicitudes": -1}},
-            {"$limit": 10}
         ]
-        
-        tests_results = await self.collection.aggregate(tests_pipeline).to_list(length=None)
+
+        result = await self.collection.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {}
+        resumen = (facets.get("resumen") or [{}])[0]
+        total_pacientes = resumen.get("total_pacientes", 0)
+        promedio_dias = resumen.get("promedio_dias")
         return {
             "detalles": {
-                "estadisticas_basicas": basic_stats,
-                "tiempos_procesamiento": business_days_stats,
-                "pruebas_mas_solicitadas": tests_results
+                "estadisticas_basicas": {
+                    "total_pacientes": total_pacientes,
+                    "ambulatorios": resumen.get("ambulatorios", 0),
+                    "hospitalizados": resumen.get("hospitalizados", 0),
+                    "promedio_muestras_por_paciente": (
+                        round(resumen.get("total_samples", 0) / total_pacientes, 2) if total_pacientes else 0
+                    )
+                },
+                "tiempos_procesamiento": {
+                    "minimo_dias": resumen.get("minimo_dias", 0),
+                    "maximo_dias": resumen.get("maximo_dias", 0),
+                    "promedio_dias": round(promedio_dias, 2) if promedio_dias is not None else 0,
+                    "muestras_completadas": total_pacientes
+                },
+                "pruebas_mas_solicitadas": facets.get("pruebas") or []
             }
         }
     
@@ -230,14 +242,13 @@ class EntityStatisticsRepository:
         else:
             end_date = datetime(year, month + 1, 1)
         
+        match_conditions = {
+            "state": "Completado",
+            "signed_at": {"$gte": start_date, "$lt": end_date}
+        }
+        await self.entity_filter.apply(match_conditions, entity_name)
         pipeline = [
-            {
-                "$match": {
-                    "patient_info.entity_info.name": {"$regex": entity_name.strip(), "$options": "i"},
-                    "state": "Completado",
-                    "signed_at": {"$gte": start_date, "$lt": end_date}
-                }
-            },
+            {"$match": match_conditions},
             {
                 "$group": {
                     "_id": {
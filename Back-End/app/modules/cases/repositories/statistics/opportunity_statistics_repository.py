@@ -3,12 +3,16 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Optional, Union
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.entity_filter import EntityFilterResolver
+from app.modules.cases.repositories.statistics.pathologist_filter import PathologistFilterResolver
 
 
 class OpportunityStatisticsRepository:
     # Repositorio para métricas de oportunidad (cumplimiento en días hábiles)
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.cases
+        self.entity_filter = EntityFilterResolver(db)
+        self.pathologist_filter = PathologistFilterResolver(db)
 
     def _month_range(self, ref: Optional[datetime] = None) -> Dict[str, datetime]:
         # Calcula inicios de mes: actual, anterior y pre-anterior
@@ -40,25 +44,22 @@ class OpportunityStatisticsRepository:
     ) -> Dict[str, Any]:
         # Calcula porcentaje y tiempos dentro/fuera de oportunidad en un rango
         match_stage: Dict[str, Any] = {
+            "state": "Completado",
             "signed_at": {"$gte": start_date, "$lt": end_date},
+            "business_days": {"$ne": None},
         }
         if pathologist_code:
             match_stage["assigned_pathologist.id"] = pathologist_code
 
-        projection = {
-            "signed_at": 1,
-            "state": 1,
-            "assigned_pathologist.id": 1,
-            "business_days": 1,
-            "_id": 0,
-        }
-
-        cursor = self.collection.find(match_stage, projection=projection)
-        docs = await cursor.to_list(length=None)
-
-        filtered = [d for d in docs if str(d.get("state")) == "Completado" and d.get("signed_at") and d.get("business_days") is not None]
+        # Solo usa campos del índice (state, signed_at, assigned_pathologist.id, business_days)
+        pipeline = [
+            {"$match": match_stage},
+            {"$group": {"_id": None, **self._opportunity_accumulators(opportunity_days_threshold)}},
+        ]
+        result = await self.collection.aggregate(pipeline).to_list(length=1)
+        totals = result[0] if result else {}
 
-        total_considerados = len(filtered)
+        total_considerados = totals.get("count", 0)
         if total_considerados == 0:
             return {
                 "porcentaje_oportunidad": 0.0,
@@ -68,28 +69,27 @@ class OpportunityStatisticsRepository:
                 "total_casos_mes_anterior": 0,
             }
 
-        diffs_days = []
-        dentro = 0
-        fuera = 0
-        for d in filtered:
-            business_days: int = d["business_days"]
-            diffs_days.append(business_days)
-            if business_days <= opportunity_days_threshold:
-                dentro += 1
-            else:
-                fuera += 1
-
-        promedio = sum(diffs_days) / len(diffs_days) if diffs_days else 0.0
-        porcentaje = (dentro / total_considerados) * 100.0 if total_considerados else 0.0
+        dentro = totals["within"]
+        promedio = totals["sumDays"] / total_considerados
+        porcentaje = (dentro / total_considerados) * 100.0
 
         return {
             "porcentaje_oportunidad": round(porcentaje, 2),
             "tiempo_promedio": round(promedio, 2),
             "casos_dentro_oportunidad": dentro,
-            "casos_fuera_oportunidad": fuera,
+            "casos_fuera_oportunidad": total_considerados - dentro,
             "total_casos_mes_anterior": total_considerados,
         }
 
+    def _opportunity_accumulators(self, threshold_days: int) -> Dict[str, Any]:
+        # Conteos dentro/fuera de oportunidad y suma de días hábiles para un $group
+        return {
+            "count": {"$sum": 1},
+            "within": {"$sum": {"$cond": [{"$lte": ["$business_days", threshold_days]}, 1, 0]}},
+            "out": {"$sum": {"$cond": [{"$gt": ["$business_days", threshold_days]}, 1, 0]}},
+            "sumDays": {"$sum": "$business_days"},
+        }
+
     async def get_opportunity_general(self, opportunity_days_threshold: int = 7) -> Dict[str, Any]:
         # Métricas de oportunidad generales del mes anterior y variación vs. mes previo
         rng = self._month_range()
@@ -210,130 +210,87 @@ class OpportunityStatisticsRepository:
         match_stage: Dict[str, Any] = {
             "state": "Completado",
             "signed_at": {"$gte": start, "$lt": end},
+            "business_days": {"$ne": None},
         }
 
-        if entity:
-            match_stage["patient_info.entity_info.name"] = {"$regex": entity, "$options": "i"}
-
-        if pathologist:
-            match_stage["$or"] = [
-                {"assigned_pathologist.id": pathologist},
-                {"assigned_pathologist.name": {"$regex": pathologist, "$options": "i"}},
-            ]
-
-        projection = {
-            "signed_at": 1,
-            "state": 1,
-            "assigned_pathologist.id": 1,
-            "assigned_pathologist.name": 1,
-            "patient_info.entity_info.name": 1,
-            "samples.tests.id": 1,
-            "samples.tests.name": 1,
-            "business_days": 1,
-            "_id": 0,
-        }
+        await self.entity_filter.apply(match_stage, entity)
+        await self.pathologist_filter.apply(match_stage, pathologist)
+
+        accumulators = self._opportunity_accumulators(threshold_days)
+        test_code = {"$ifNull": ["$samples.tests.id", ""]}
+        test_name = {"$ifNull": ["$samples.tests.name", ""]}
+        pathologist_code = {"$ifNull": ["$assigned_pathologist.id", ""]}
+        pathologist_name = {"$ifNull": ["$assigned_pathologist.name", ""]}
+
+        # Un solo documento de salida: su tamaño depende de cuántas pruebas y patólogos hay, no del volumen de casos
+        pipeline = [
+            {"$match": match_stage},
+            {
+                "$project": {
+                    "_id": 0,
+                    "business_days": 1,
+                    "assigned_pathologist.id": 1,
+                    "assigned_pathologist.name": 1,
+                    "samples.tests.id": 1,
+                    "samples.tests.name": 1,
+                }
+            },
+            {
+                "$facet": {
+                    "summary": [{"$group": {"_id": None, **accumulators}}],
+                    "tests": [
+                        {"$unwind": "$samples"},
+                        {"$unwind": "$samples.tests"},
+                        {"$addFields": {"code": test_code, "name": test_name}},
+                        {"$match": {"$or": [{"code": {"$ne": ""}}, {"name": {"$ne": ""}}]}},
+                        {
+                            "$group": {
+                                "_id": {"$cond": [{"$ne": ["$code", ""]}, "$code", "$name"]},
+                                "code": {"$first": "$code"},
+                                "name": {"$first": "$name"},
+                                **accumulators,
+                            }
+                        },
+                        {"$sort": {"count": -1, "_id": 1}},
+                    ],
+                    "pathologists": [
+                        {"$addFields": {"code": pathologist_code, "name": pathologist_name}},
+                        {"$match": {"$or": [{"code": {"$ne": ""}}, {"name": {"$ne": ""}}]}},
+                        {
+                            "$group": {
+                                "_id": {"$cond": [{"$ne": ["$code", ""]}, "$code", "$name"]},
+                                "code": {"$first": "$code"},
+                                "name": {"$first": "$name"},
+                                **accumulators,
+                            }
+                        },
+                        {"$sort": {"count": -1, "_id": 1}},
+                    ],
+                }
+            },
+        ]
 
-        cursor = self.collection.find(match_stage, projection=projection)
-        docs = await cursor.to_list(length=None)
-
-        tests_map: Dict[str, Dict[str, Any]] = {}
-        pat_map: Dict[str, Dict[str, Any]] = {}
-        total = 0
-        total_within = 0
-        sum_days_all = 0.0
-
-        for d in docs:
-            signed_at: Optional[datetime] = d.get("signed_at")
-            business_days: Optional[int] = d.get("business_days")
-            if not signed_at or business_days is None:
-                continue
-            days = business_days
-            within = days <= threshold_days
-            total += 1
-            sum_days_all += days
-            if within:
-                total_within += 1
-
-            # Aggregate by tests
-            samples = d.get("samples") or []
-            for s in samples:
-                for t in s.get("tests", []) or []:
-                    code = str(t.get("id") or "")
-                    name = str(t.get("name") or "")
-                    if not code and not name:
-                        continue
-                    key = code or name
-                    rec = tests_map.get(key)
-                    if not rec:
-                        rec = {
-                            "code": code,
-                            "name": name,
-                            "within": 0,
-                            "out": 0,
-                            "sumDays": 0.0,
-                            "count": 0,
-                        }
-                        tests_map[key] = rec
-                    rec["sumDays"] += days
-                    rec["count"] += 1
-                    if within:
-                        rec["within"] += 1
-                    else:
-                        rec["out"] += 1
-
-            # Aggregate by pathologist
-            ap = d.get("assigned_pathologist") or {}
-            pcode = str(ap.get("id") or "")
-            pname = str(ap.get("name") or "")
-            pkey = pcode or pname
-            if pkey:
-                prec = pat_map.get(pkey)
-                if not prec:
-                    prec = {
-                        "code": pcode,
-                        "name": pname,
-                        "within": 0,
-                        "out": 0,
-                        "sumDays": 0.0,
-                        "count": 0,
-                    }
-                    pat_map[pkey] = prec
-                prec["sumDays"] += days
-                prec["count"] += 1
-                if within:
-                    prec["within"] += 1
-                else:
-                    prec["out"] += 1
-
-        def to_test_item(v: Dict[str, Any]) -> Dict[str, Any]:
-            count = max(1, int(v.get("count", 0)))
-            avg = (float(v.get("sumDays", 0.0)) / count) if count else 0.0
-            return {
-                "code": v.get("code", ""),
-                "name": v.get("name", ""),
-                "withinOpportunity": int(v.get("within", 0)),
-                "outOfOpportunity": int(v.get("out", 0)),
-                "averageDays": round(avg, 2),
-            }
+        result = await self.collection.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {}
 
-        def to_pat_item(v: Dict[str, Any]) -> Dict[str, Any]:
+        def to_item(v: Dict[str, Any]) -> Dict[str, Any]:
             count = max(1, int(v.get("count", 0)))
-            avg = (float(v.get("sumDays", 0.0)) / count) if count else 0.0
             return {
-                "code": v.get("code", ""),
-                "name": v.get("name", ""),
+                "code": str(v.get("code") or ""),
+                "name": str(v.get("name") or ""),
                 "withinOpportunity": int(v.get("within", 0)),
                 "outOfOpportunity": int(v.get("out", 0)),
-                "averageDays": round(avg, 2),
+                "averageDays": round(float(v.get("sumDays", 0.0)) / count, 2),
             }
 
-        tests = [to_test_item(v) for v in tests_map.values()]
-        pathologists = [to_pat_item(v) for v in pat_map.values()]
-        avg_all = round((sum_days_all / total), 2) if total else 0.0
+        summary = (facets.get("summary") or [{}])[0]
+        total = int(summary.get("count", 0))
+        total_within = int(summary.get("within", 0))
+        avg_all = round((summary.get("sumDays", 0.0) / total), 2) if total else 0.0
 
         return {
-            "tests": tests,
-            "pathologists": pathologists,
+            "tests": [to_item(v) for v in facets.get("tests", [])],
+            "pathologists": [to_item(v) for v in facets.get("pathologists", [])],
             "summary": {
                 "total": total,
                 "within": total_within,
@@ -342,13 +299,52 @@ class OpportunityStatisticsRepository:
             },
         }
 
-    async def get_yearly_opportunity(self, year: int, threshold_days: int = 7) -> list[float]:
+    async def get_yearly_opportunity(
+        self,
+        year: int,
+        threshold_days: int = 7,
+        entity: Union[str, None] = None,
+        pathologist: Union[str, None] = None,
+    ) -> list[float]:
         # Serie de 12 meses con porcentajes de oportunidad para un año
-        out: list[float] = []
-        for m in range(1, 13):
-            monthly = await self.get_monthly_opportunity(m, year, threshold_days)
-            total = monthly.get("summary", {}).get("total", 0)
-            within = monthly.get("summary", {}).get("within", 0)
-            pct = round((within / total) * 100.0, 1) if total else 0.0
-            out.append(pct)
-        return out
+        series = await self.get_yearly_opportunity_series([year], threshold_days, entity, pathologist)
+        return series[year]
+
+    async def get_yearly_opportunity_series(
+        self,
+        years: list[int],
+        threshold_days: int = 7,
+        entity: Union[str, None] = None,
+        pathologist: Union[str, None] = None,
+    ) -> Dict[int, list[float]]:
+        # Porcentaje de oportunidad por mes para uno o varios años en una sola agregación
+        # (agrupada por año/mes de firma y con la comparación contra el umbral en el servidor)
+        match_stage: Dict[str, Any] = {
+            "state": "Completado",
+            "business_days": {"$ne": None},
+            "$or": [
+                {"signed_at": {"$gte": datetime(y, 1, 1, tzinfo=timezone.utc), "$lt": datetime(y + 1, 1, 1, tzinfo=timezone.utc)}}
+                for y in sorted(set(years))
+            ],
+        }
+        await self.entity_filter.apply(match_stage, entity)
+        await self.pathologist_filter.apply(match_stage, pathologist)
+
+        pipeline = [
+            {"$match": match_stage},
+            {
+                "$group": {
+                    "_id": {"year": {"$year": "$signed_at"}, "month": {"$month": "$signed_at"}},
+                    "total": {"$sum": 1},
+                    "within": {"$sum": {"$cond": [{"$lte": ["$business_days", threshold_days]}, 1, 0]}},
+                }
+            },
+        ]
+        rows = await self.collection.aggregate(pipeline).to_list(length=12 * len(years))
+
+        series: Dict[int, list[float]] = {y: [0.0] * 12 for y in years}
+        for row in rows:
+            y, m = row["_id"]["year"], row["_id"]["month"]
+            if y in series and row["total"]:
+                series[y][m - 1] = round((row["within"] / row["total"]) * 100.0, 1)
+        return series
@@ -0,0 +1,45 @@
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from app.modules.pathologists.repositories.pathologist_catalog import pathologist_catalog
+
+# Campo indexado de los casos por el que filtran las estadísticas de patólogos
+CASE_PATHOLOGIST_FIELD = "assigned_pathologist.id"
+# Campo de nombre que acompaña a cada campo de código (casos y rollups)
+PATHOLOGIST_NAME_FIELDS = {CASE_PATHOLOGIST_FIELD: "assigned_pathologist.name", "pathologist_id": "pathologist_name"}
+
+
+class PathologistFilterResolver:
+    """Resuelve filtros de patólogo de las estadísticas a condiciones de igualdad sobre el código."""
+
+    def __init__(self, database):
+        self.pathologists = pathologist_catalog.collection(database)
+
+    async def codes(self, pathologist: Optional[str]) -> Optional[List[str]]:
+        if not pathologist or not pathologist.strip():
+            return None
+        if self.pathologists is None:
+            return [pathologist.strip()]
+        return await pathologist_catalog.resolve(self.pathologists, pathologist)
+
+    async def cache_key(self, pathologist: Optional[str]) -> Union[List[str], str, None]:
+        """Forma canónica del filtro para las llaves de caché: los códigos resueltos, de modo que el
+        código y el nombre del mismo patólogo compartan el resultado."""
+        codes = await self.codes(pathologist)
+        if codes is None:
+            return None
+        return codes or pathologist.strip()
+
+    async def apply(
+        self, match_conditions: Dict[str, Any], pathologist: Optional[str], field: str = CASE_PATHOLOGIST_FIELD
+    ) -> Dict[str, Any]:
+        """Agrega a match_conditions el filtro por código de patólogo (si se pidió un patólogo).
+
+        Si el patólogo no está en el catálogo se filtra como antes, por nombre sin distinguir
+        mayúsculas, para no devolver estadísticas vacías de patólogos que faltan en el catálogo."""
+        codes = await self.codes(pathologist)
+        if codes:
+            match_conditions[field] = codes[0] if len(codes) == 1 else {"$in": codes}
+        elif codes is not None:
+            match_conditions[PATHOLOGIST_NAME_FIELDS[field]] = {"$regex": re.escape(pathologist.strip()), "$options": "i"}
+        return match_conditions
@@ -1,11 +1,20 @@
 from typing import Dict, Any, List
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.rollup_repository import (
+    CaseStatsRollupRepository,
+    OPPORTUNITY_THRESHOLD_DAYS,
+    average_expression,
+)
+from app.modules.cases.repositories.statistics.pathologist_filter import PathologistFilterResolver
 
 
 class PathologistStatisticsRepository:
     def __init__(self, database: AsyncIOMotorDatabase):
-        self.collection = database["cases"]
+        self.collection = database.cases
+        self.rollups = CaseStatsRollupRepository(database)
+        # El patólogo llega como código o nombre y se resuelve a códigos con el catálogo de patólogos
+        self.pathologist_filter = PathologistFilterResolver(database)
 
     # Rendimiento mensual por patólogo (casos completados).
     async def get_pathologist_monthly_performance(
@@ -13,48 +22,87 @@ class PathologistStatisticsRepository:
         month: int,
         year: int,
         threshold_days: int = 7,
-        pathologist_name: str = None
+        pathologist: str = None
     ) -> Dict[str, Any]:
-        start_date = datetime(year, month, 1)
-        end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
-        match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date}
-        }
-        if pathologist_name:
-            match_conditions["assigned_pathologist.name"] = {"$regex": pathologist_name.strip(), "$options": "i"}
-        
+        # Los rollups guardan la oportunidad con el umbral estándar; otros umbrales van a los casos
+        if threshold_days == OPPORTUNITY_THRESHOLD_DAYS and await self.rollups.is_ready():
+            results = await self._monthly_performance_from_rollups(month, year, pathologist)
+        else:
+            start_date = datetime(year, month, 1)
+            end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+            match_conditions = {
+                "state": "Completado",
+                "signed_at": {"$gte": start_date, "$lt": end_date}
+            }
+            await self.pathologist_filter.apply(match_conditions, pathologist)
+
+            pipeline = [
+                {"$match": match_conditions},
+                {
+                    "$group": {
+                        "_id": {
+                            "pathologist_code": "$assigned_pathologist.id",
+                            "pathologist_name": "$assigned_pathologist.name"
+                        },
+                        "total_cases": {"$sum": 1},
+                        "within_opportunity": {
+                            "$sum": {
+                                "$cond": [
+                                    {"$lte": ["$business_days", threshold_days]},
+                                    1,
+                                    0
+                                ]
+                            }
+                        },
+                        "out_of_opportunity": {
+                            "$sum": {
+                                "$cond": [
+                                    {"$gt": ["$business_days", threshold_days]},
+                                    1,
+                                    0
+                                ]
+                            }
+                        },
+                        "total_business_days": {"$sum": "$business_days"},
+                        "avg_business_days": {"$avg": "$business_days"}
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "code": "$_id.pathologist_code",
+                        "name": "$_id.pathologist_name",
+                        "withinOpportunity": "$within_opportunity",
+                        "outOfOpportunity": "$out_of_opportunity",
+                        "averageDays": {"$round": ["$avg_business_days", 2]}
+                    }
+                },
+                {"$sort": {"total_cases": -1}}
+            ]
+            results = await self.collection.aggregate(pipeline).to_list(length=None)
+        return {"pathologists": results}
+
+    async def _monthly_performance_from_rollups(
+        self,
+        month: int,
+        year: int,
+        pathologist: str = None
+    ) -> List[Dict[str, Any]]:
+        match_conditions = self.rollups.period_match("signed", "case", year, month, state="Completado")
+        await self.pathologist_filter.apply(match_conditions, pathologist, field="pathologist_id")
         pipeline = [
             {"$match": match_conditions},
             {
                 "$group": {
-                    "_id": {
-                        "pathologist_code": "$assigned_pathologist.id",
-                        "pathologist_name": "$assigned_pathologist.name"
-                    },
-                    "total_cases": {"$sum": 1},
-                    "within_opportunity": {
-                        "$sum": {
-                            "$cond": [
-                                {"$lte": ["$business_days", threshold_days]},
-                                1,
-                                0
-                            ]
-                        }
-                    },
-                    "out_of_opportunity": {
-                        "$sum": {
-                            "$cond": [
-                                {"$gt": ["$business_days", threshold_days]},
-                                1,
-                                0
-                            ]
-                        }
-                    },
-                    "total_business_days": {"$sum": "$business_days"},
-                    "avg_business_days": {"$avg": "$business_days"}
+                    "_id": {"pathologist_code": "$pathologist_id", "pathologist_name": "$pathologist_name"},
+                    "total_cases": {"$sum": "$cases"},
+                    "within_opportunity": {"$sum": "$within_opportunity"},
+                    "out_of_opportunity": {"$sum": "$out_of_opportunity"},
+                    "business_days_sum": {"$sum": "$business_days_sum"},
+                    "business_days_count": {"$sum": "$business_days_count"}
                 }
             },
+            {"$sort": {"total_cases": -1}},
             {
                 "$project": {
                     "_id": 0,
@@ -62,38 +110,31 @@ class PathologistStatisticsRepository:
                     "name": "$_id.pathologist_name",
                     "withinOpportunity": "$within_opportunity",
                     "outOfOpportunity": "$out_of_opportunity",
-                    "averageDays": {"$round": ["$avg_business_days", 2]}
+                    "averageDays": {"$round": [average_expression(), 2]}
                 }
-            },
-            {"$sort": {"total_cases": -1}}
+            }
         ]
-        
-        results = await self.collection.aggregate(pipeline).to_list(length=None)
-        return {"pathologists": results}
+        return await self.rollups.aggregate(pipeline)
     
     # Entidades en las que trabaja un patólogo.
     async def get_pathologist_entities(
         self,
-        pathologist_name: str,
+        pathologist: str,
         month: int,
         year: int
     ) -> Dict[str, Any]:
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+        match_conditions = await self.pathologist_filter.apply({}, pathologist)
+        match_conditions.update({"state": "Completado", "signed_at": {"$gte": start_date, "$lt": end_date}})
         
         pipeline = [
-            {
-                "$match": {
-                    "assigned_pathologist.name": {"$regex": pathologist_name.strip(), "$options": "i"},
-                    "state": "Completado",
-                    "signed_at": {"$gte": start_date, "$lt": end_date}
-                }
-            },
+            {"$match": match_conditions},
             {
                 "$group": {
                     "_id": {
                         "entity_name": "$patient_info.entity_info.name",
-                        "entity_code": "$patient_info.entity_info.code"
+                        "entity_code": "$patient_info.entity_info.id"
                     },
                     "casesCount": {"$sum": 1}
                 }
@@ -116,21 +157,17 @@ class PathologistStatisticsRepository:
     # Pruebas asociadas a un patólogo.
     async def get_pathologist_tests(
         self,
-        pathologist_name: str,
+        pathologist: str,
         month: int,
         year: int
     ) -> Dict[str, Any]:
         start_date = datetime(year, month, 1)
         end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+        match_conditions = await self.pathologist_filter.apply({}, pathologist)
+        match_conditions.update({"state": "Completado", "signed_at": {"$gte": start_date, "$lt": end_date}})
         
         pipeline = [
-            {
-                "$match": {
-                    "assigned_pathologist.name": {"$regex": pathologist_name.strip(), "$options": "i"},
-                    "state": "Completado",
-                    "signed_at": {"$gte": start_date, "$lt": end_date}
-                }
-            },
+            {"$match": match_conditions},
             {"$unwind": "$samples"},
             {"$unwind": "$samples.tests"},
             {
@@ -160,18 +197,14 @@ class PathologistStatisticsRepository:
     # Resumen de oportunidad (dentro/fuera) para un patólogo.
     async def get_pathologist_opportunity_summary(
         self,
-        pathologist_name: str,
+        pathologist: str,
         threshold_days: int = 7
     ) -> Dict[str, Any]:
+        # Antes filtraba por el campo heredado pathologist.name; los casos guardan assigned_pathologist
+        match_conditions = await self.pathologist_filter.apply({}, pathologist)
+        match_conditions.update({"state": "Completado", "signed_at": {"$exists": True}, "business_days": {"$exists": True}})
         pipeline = [
-            {
-                "$match": {
-                    "pathologist.name": pathologist_name.strip(),
-                    "state": "Completado",
-                    "signed_at": {"$exists": True},
-                    "business_days": {"$exists": True}
-                }
-            },
+            {"$match": match_conditions},
             {
                 "$group": {
                     "_id": None,
@@ -214,21 +247,17 @@ class PathologistStatisticsRepository:
     # Tendencias mensuales en el año para un patólogo.
     async def get_pathologist_monthly_trends(
         self,
-        pathologist_name: str,
+        pathologist: str,
         year: int,
         threshold_days: int = 7
     ) -> Dict[str, Any]:
         start_date = datetime(year, 1, 1)
         end_date = datetime(year + 1, 1, 1)
+        match_conditions = await self.pathologist_filter.apply({}, pathologist)
+        match_conditions.update({"state": "Completado", "signed_at": {"$gte": start_date, "$lt": end_date}})
         
         pipeline = [
-            {
-                "$match": {
-                    "pathologist.name": pathologist_name.strip(),
-                    "state": "Completado",
-                    "signed_at": {"$gte": start_date, "$lt": end_date}
-                }
-            },
+            {"$match": match_conditions},
             {
                 "$group": {
                     "_id": {
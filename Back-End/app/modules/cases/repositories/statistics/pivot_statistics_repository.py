@@ -0,0 +1,209 @@
+import copy
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics.entity_filter import EntityFilterResolver
+from app.modules.cases.repositories.statistics.pathologist_filter import PathologistFilterResolver
+from app.modules.cases.repositories.statistics.rollup_repository import (
+    OPPORTUNITY_THRESHOLD_DAYS,
+    CaseStatsRollupRepository,
+    average_expression,
+)
+from app.modules.tests.repositories.test_catalog import test_catalog
+
+# Dimensión -> (campo en los rollups, nombre en los rollups, expresión en los casos, nombre en los casos)
+# Las dimensiones de fecha se resuelven con la fecha de la base elegida (ver _case_dimension)
+PIVOT_DIMENSIONS: Dict[str, Tuple[str, Optional[str], Optional[str], Optional[str]]] = {
+    "entity": ("entity_id", "entity_name", "$patient_info.entity_info.id", "$patient_info.entity_info.name"),
+    "pathologist": ("pathologist_id", "pathologist_name", "$assigned_pathologist.id", "$assigned_pathologist.name"),
+    "test": ("test_code", None, "$samples.tests.id", None),
+    "care_type": ("care_type", None, "$patient_info.care_type", None),
+    "state": ("state", None, "$state", None),
+    "year": ("year", None, None, None),
+    "month": ("month", None, None, None),
+}
+# Medida -> contadores que necesita
+PIVOT_MEASURES: Dict[str, Tuple[str, ...]] = {
+    "count": ("cases",),
+    "samples": ("samples",),
+    "avg_business_days": ("business_days_sum", "business_days_count"),
+    "within_opportunity": ("within_opportunity",),
+    "out_of_opportunity": ("out_of_opportunity",),
+    "within_pct": ("within_opportunity", "cases"),
+}
+BASIS_DATE_FIELDS = {"signed": "signed_at", "created": "created_at"}
+# Grupos máximos que devuelve una consulta; más que esto se rechaza en lugar de truncar
+MAX_PIVOT_GROUPS = 2000
+
+Month = Tuple[int, int]
+
+
+def _rollup_accumulator(counter: str) -> Dict[str, Any]:
+    return {"$sum": f"${counter}"}
+
+
+def _case_accumulator(counter: str) -> Dict[str, Any]:
+    # Mismos criterios que _case_counters de los rollups (un valor nulo cuenta como dentro de oportunidad)
+    return {
+        "cases": {"$sum": 1},
+        "samples": {"$sum": {"$size": {"$ifNull": ["$samples", []]}}},
+        "business_days_sum": {"$sum": "$business_days"},
+        "business_days_count": {"$sum": {"$cond": [{"$isNumber": "$business_days"}, 1, 0]}},
+        "within_opportunity": {"$sum": {"$cond": [{"$lte": ["$business_days", OPPORTUNITY_THRESHOLD_DAYS]}, 1, 0]}},
+        "out_of_opportunity": {"$sum": {"$cond": [{"$gt": ["$business_days", OPPORTUNITY_THRESHOLD_DAYS]}, 1, 0]}},
+    }[counter]
+
+
+def _case_dimension(dimension: str, date_field: str) -> Tuple[Any, Optional[str]]:
+    if dimension == "year":
+        return {"$year": f"${date_field}"}, None
+    if dimension == "month":
+        return {"$month": f"${date_field}"}, None
+    _, _, expression, name = PIVOT_DIMENSIONS[dimension]
+    return expression, name
+
+
+@lru_cache(maxsize=256)
+def compile_pivot(source: str, basis: str, dimensions: Tuple[str, ...], measures: Tuple[str, ...]) -> Tuple[Dict[str, Any], ...]:
+    """Etapas $group/$project/$sort para una forma de consulta (fuente, base, dimensiones, medidas).
+
+    Solo dependen de la forma, no de los valores de los filtros, así que se compilan una vez y se
+    reutilizan; el $match con los valores se arma en cada consulta."""
+    date_field = BASIS_DATE_FIELDS[basis]
+    group_id: Dict[str, Any] = {}
+    names: Dict[str, Any] = {}
+    for dimension in dimensions:
+        if source == "rollups":
+            field, name_field, _, _ = PIVOT_DIMENSIONS[dimension]
+            expression, name = f"${field}", (f"${name_field}" if name_field else None)
+        else:
+            expression, name = _case_dimension(dimension, date_field)
+        group_id[dimension] = expression
+        if name:
+            names[f"{dimension}_name"] = {"$first": name}
+
+    counters = sorted({counter for measure in measures for counter in PIVOT_MEASURES[measure]})
+    accumulate = _rollup_accumulator if source == "rollups" else _case_accumulator
+    group = {"_id": group_id, **names, **{counter: accumulate(counter) for counter in counters}}
+
+    project: Dict[str, Any] = {"_id": 0}
+    for dimension in dimensions:
+        project[dimension] = f"$_id.{dimension}"
+        if f"{dimension}_name" in names:
+            project[f"{dimension}_name"] = 1
+    for measure in measures:
+        if measure == "avg_business_days":
+            project[measure] = {"$round": [average_expression(), 2]}
+        elif measure == "within_pct":
+            project[measure] = {
+                "$cond": [
+                    {"$gt": ["$cases", 0]},
+                    {"$round": [{"$multiply": [{"$divide": ["$within_opportunity", "$cases"]}, 100]}, 2]},
+                    0,
+                ]
+            }
+        else:
+            project[measure] = f"${PIVOT_MEASURES[measure][0]}"
+
+    sort = {measures[0]: -1, **{dimension: 1 for dimension in dimensions}}
+    # Un grupo más que el máximo basta para detectar que la consulta excede el límite
+    return ({"$group": group}, {"$project": project}, {"$sort": sort}, {"$limit": MAX_PIVOT_GROUPS + 1})
+
+
+class PivotStatisticsRepository:
+    """Consulta de estadísticas parametrizada: dimensiones, medidas, filtros y rango de meses.
+
+    Se compila a una sola agregación sobre los rollups mensuales o, mientras no estén listos,
+    sobre los casos."""
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.collection = database.cases
+        self.tests = getattr(database, "tests", None)
+        self.rollups = CaseStatsRollupRepository(database)
+        self.entity_filter = EntityFilterResolver(database)
+        self.pathologist_filter = PathologistFilterResolver(database)
+
+    async def pivot(
+        self,
+        dimensions: Sequence[str],
+        measures: Sequence[str],
+        start: Month,
+        end: Month,
+        basis: str = "signed",
+        entity: Optional[str] = None,
+        pathologist: Optional[str] = None,
+        test: Optional[str] = None,
+        care_type: Optional[str] = None,
+        state: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        dimensions, measures = tuple(dimensions), tuple(measures)
+        by_test = "test" in dimensions or bool(test)
+        filters = {"care_type": care_type, "state": state}
+        if await self.rollups.is_ready():
+            source = "rollups"
+            match = self._rollup_match(basis, "test" if by_test else "case", start, end, test, filters)
+            await self.entity_filter.apply(match, entity, field="entity_id")
+            await self.pathologist_filter.apply(match, pathologist, field="pathologist_id")
+            pipeline = [{"$match": match}, *copy.deepcopy(compile_pivot(source, basis, dimensions, measures))]
+            rows = await self.rollups.aggregate(pipeline)
+        else:
+            source = "cases"
+            pipeline = await self._case_pipeline(basis, start, end, by_test, entity, pathologist, test, filters)
+            pipeline += copy.deepcopy(compile_pivot(source, basis, dimensions, measures))
+            rows = await self.collection.aggregate(pipeline).to_list(length=None)
+
+        if len(rows) > MAX_PIVOT_GROUPS:
+            raise BadRequestError(
+                f"La consulta genera más de {MAX_PIVOT_GROUPS} grupos; agregue filtros o use menos dimensiones"
+            )
+        if "test" in dimensions and self.tests is not None:
+            await test_catalog.apply_names(self.tests, rows, code_field="test", name_field="test_name")
+        return {"source": source, "rows": rows}
+
+    @staticmethod
+    def _rollup_match(
+        basis: str, level: str, start: Month, end: Month, test: Optional[str], filters: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Rango de meses sobre (year, month): prefijo del índice rollup_key
+        match: Dict[str, Any] = {"basis": basis, "level": level}
+        if start[0] == end[0]:
+            match.update({"year": start[0], "month": {"$gte": start[1], "$lte": end[1]}})
+        else:
+            match["year"] = {"$gte": start[0], "$lte": end[0]}
+            match["$nor"] = [{"year": start[0], "month": {"$lt": start[1]}}, {"year": end[0], "month": {"$gt": end[1]}}]
+        if test:
+            match["test_code"] = test
+        match.update({field: value for field, value in filters.items() if value})
+        return match
+
+    async def _case_pipeline(
+        self,
+        basis: str,
+        start: Month,
+        end: Month,
+        by_test: bool,
+        entity: Optional[str],
+        pathologist: Optional[str],
+        test: Optional[str],
+        filters: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        date_field = BASIS_DATE_FIELDS[basis]
+        end_date = datetime(end[0] + 1, 1, 1) if end[1] == 12 else datetime(end[0], end[1] + 1, 1)
+        match: Dict[str, Any] = {date_field: {"$gte": datetime(start[0], start[1], 1), "$lt": end_date}}
+        await self.entity_filter.apply(match, entity)
+        await self.pathologist_filter.apply(match, pathologist)
+        if test:
+            match["samples.tests.id"] = test
+        if filters.get("care_type"):
+            match["patient_info.care_type"] = filters["care_type"]
+        if filters.get("state"):
+            match["state"] = filters["state"]
+
+        pipeline: List[Dict[str, Any]] = [{"$match": match}]
+        if by_test:
+            pipeline += [{"$unwind": "$samples"}, {"$unwind": "$samples.tests"}]
+            if test:
+                pipeline.append({"$match": {"samples.tests.id": test}})
+        return pipeline
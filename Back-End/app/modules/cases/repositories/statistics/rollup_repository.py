@@ -0,0 +1,258 @@
+# Rollups mensuales de estadísticas de casos: contadores pre-agregados que se mantienen
+# en cada escritura de casos para no re-agregar la colección completa en cada consulta.
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from app.modules.cases.repositories.statistics.tat_sketch import SKETCH_FIELD, tat_bucket
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "case_stats_monthly"
+META_COLLECTION = "case_stats_meta"
+
+# Días hábiles máximos para considerar un caso dentro de oportunidad
+OPPORTUNITY_THRESHOLD_DAYS = 7
+
+# Versión del esquema de las filas; 2 agrega el histograma de días hábiles (tat_days) para percentiles
+ROLLUP_VERSION = 2
+SKETCH_ROLLUP_VERSION = 2
+
+# basis: "created" agrupa por mes de creación (cualquier estado), "signed" por mes de firma.
+# level: "case" cuenta casos; "test" cuenta cada prueba solicitada (equivale a $unwind de samples.tests).
+KEY_FIELDS = (
+    "basis", "level", "year", "month",
+    "entity_id", "entity_name",
+    "pathologist_id", "pathologist_name",
+    "test_code", "care_type", "state",
+)
+COUNTER_FIELDS = (
+    "cases", "business_days_sum", "business_days_count",
+    "within_opportunity", "out_of_opportunity", "samples",
+)
+# Además de COUNTER_FIELDS, cada fila lleva el histograma SKETCH_FIELD con contadores "tat_days.<días>"
+
+# Campos del caso que determinan su aporte a los rollups (priority es para los contadores de carga de trabajo)
+CASE_PROJECTION = {
+    "_id": 0,
+    "created_at": 1,
+    "signed_at": 1,
+    "state": 1,
+    "business_days": 1,
+    "patient_info.entity_info": 1,
+    "patient_info.care_type": 1,
+    "assigned_pathologist": 1,
+    "priority": 1,
+    "samples.tests.id": 1,
+}
+
+Key = Tuple[Any, ...]
+
+
+def _year_month(value: Any) -> Optional[Tuple[int, int]]:
+    # MongoDB guarda UTC; las fechas naive que devuelve Motor ya están en UTC
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.year, value.month
+
+
+def _case_counters(doc: Dict[str, Any]) -> Dict[str, int]:
+    business_days = doc.get("business_days")
+    numeric = isinstance(business_days, (int, float)) and not isinstance(business_days, bool)
+    # Igual que {"$lte": ["$business_days", 7]} en MongoDB: un valor nulo cuenta como dentro de oportunidad
+    within = business_days is None or (numeric and business_days <= OPPORTUNITY_THRESHOLD_DAYS)
+    counters = {
+        "cases": 1,
+        "business_days_sum": business_days if numeric else 0,
+        "business_days_count": 1 if numeric else 0,
+        "within_opportunity": 1 if within else 0,
+        "out_of_opportunity": 0 if within else 1,
+        "samples": len(doc.get("samples") or []),
+    }
+    bucket = tat_bucket(business_days)
+    if bucket is not None:
+        counters[f"{SKETCH_FIELD}.{bucket}"] = 1
+    return counters
+
+
+def _accumulate(row: Dict[str, int], values: Dict[str, int], sign: int = 1) -> None:
+    for field, value in values.items():
+        row[field] = row.get(field, 0) + sign * value
+
+
+def _as_document(key: Key, values: Dict[str, int]) -> Dict[str, Any]:
+    """Fila de rollup lista para insertar: los contadores "tat_days.<días>" van anidados."""
+    doc: Dict[str, Any] = dict(zip(KEY_FIELDS, key))
+    sketch: Dict[str, int] = {}
+    for field, value in values.items():
+        if field.startswith(f"{SKETCH_FIELD}."):
+            if value:
+                sketch[field.split(".", 1)[1]] = value
+        else:
+            doc[field] = value
+    doc[SKETCH_FIELD] = sketch
+    return doc
+
+
+def case_contributions(doc: Optional[Dict[str, Any]]) -> Dict[Key, Dict[str, int]]:
+    """Filas de rollup (llave -> contadores) que aporta un caso."""
+    if not doc:
+        return {}
+    patient = doc.get("patient_info") or {}
+    entity = patient.get("entity_info") or {}
+    pathologist = doc.get("assigned_pathologist") or {}
+    counters = _case_counters(doc)
+    test_counters = {**counters, "samples": 0}
+    test_codes = [
+        (test or {}).get("id")
+        for sample in doc.get("samples") or []
+        for test in (sample or {}).get("tests") or []
+    ]
+
+    rows: Dict[Key, Dict[str, int]] = {}
+
+    def add(key: Key, values: Dict[str, int]) -> None:
+        _accumulate(rows.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0)), values)
+
+    for basis, date_field in (("created", "created_at"), ("signed", "signed_at")):
+        period = _year_month(doc.get(date_field))
+        if period is None:
+            continue
+        dims = (
+            *period,
+            entity.get("id"), entity.get("name"),
+            pathologist.get("id"), pathologist.get("name"),
+        )
+        add((basis, "case", *dims, None, patient.get("care_type"), doc.get("state")), counters)
+        for test_code in test_codes:
+            add((basis, "test", *dims, test_code, patient.get("care_type"), doc.get("state")), test_counters)
+    return rows
+
+
+def diff_contributions(
+    old_doc: Optional[Dict[str, Any]],
+    new_doc: Optional[Dict[str, Any]],
+) -> Dict[Key, Dict[str, int]]:
+    """Incrementos necesarios para pasar del aporte de old_doc al de new_doc (sin filas en cero)."""
+    delta = case_contributions(new_doc)
+    for key, values in case_contributions(old_doc).items():
+        _accumulate(delta.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0)), values, sign=-1)
+    return {
+        key: {field: value for field, value in values.items() if value}
+        for key, values in delta.items()
+        if any(values.values())
+    }
+
+
+class CaseStatsRollupRepository:
+    # Se marca una vez por proceso cuando existe una reconstrucción completa
+    _ready = False
+    # Versión de esquema de esa reconstrucción (las filas anteriores a la 2 no tienen histograma)
+    _version = 0
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.database = database
+        # Las bases sin la colección (p. ej. dobles de prueba) desactivan el mantenimiento
+        self.collection = getattr(database, ROLLUP_COLLECTION, None)
+        self.meta = getattr(database, META_COLLECTION, None)
+        self.cases = getattr(database, "cases", None)
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([(field, 1) for field in KEY_FIELDS], unique=True, name="rollup_key")
+
+    async def is_ready(self, min_version: int = 1) -> bool:
+        """True cuando los rollups ya se construyeron al menos una vez (ver rebuild) con un esquema
+        de versión min_version o superior."""
+        cls = CaseStatsRollupRepository
+        if cls._ready and (min_version <= 1 or cls._version >= min_version):
+            return True
+        if self.meta is None:
+            return False
+        meta = await self.meta.find_one({"_id": ROLLUP_COLLECTION}, {"built_at": 1, "version": 1})
+        cls._ready = bool(meta and meta.get("built_at"))
+        # Las reconstrucciones anteriores al campo version son de la versión 1
+        cls._version = (meta.get("version") or 1) if cls._ready else 0
+        return cls._ready and cls._version >= min_version
+
+    async def apply_change(
+        self,
+        old_doc: Optional[Dict[str, Any]],
+        new_doc: Optional[Dict[str, Any]],
+    ) -> None:
+        """Aplica a los rollups el cambio de un caso (creación: old_doc=None; borrado: new_doc=None).
+        old_doc debe ser la pre-imagen de la misma escritura (find_one_and_update con
+        ReturnDocument.BEFORE): con una lectura previa, dos actualizaciones concurrentes del caso
+        restarían el mismo estado viejo y los rollups se desviarían hasta un rebuild.
+        Comentario: un fallo aquí no debe tumbar la escritura del caso; se registra y se corrige con rebuild."""
+        if self.collection is None:
+            return
+        delta = diff_contributions(old_doc, new_doc)
+        if not delta:
+            return
+        try:
+            operations = [
+                UpdateOne(dict(zip(KEY_FIELDS, key)), {"$inc": values}, upsert=True)
+                for key, values in delta.items()
+            ]
+            await self.collection.bulk_write(operations, ordered=False)
+            emptied = [dict(zip(KEY_FIELDS, key)) for key, values in delta.items() if values.get("cases", 0) < 0]
+            if emptied:
+                await self.collection.delete_many({"$or": emptied, "cases": {"$lte": 0}})
+        except Exception as e:
+            logger.warning("No se pudieron actualizar los rollups de estadísticas: %s", e)
+
+    async def rebuild(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """Reconstruye todos los rollups desde la colección de casos.
+        Se escribe en una colección temporal que luego reemplaza a la actual, así las consultas
+        nunca ven rollups a medio construir. Las escrituras de casos durante la reconstrucción
+        pueden quedar fuera; conviene ejecutarla en horas de baja actividad."""
+        rows: Dict[Key, Dict[str, int]] = {}
+        total_cases = 0
+        cursor = self.cases.find({}, CASE_PROJECTION, batch_size=batch_size)
+        async for doc in cursor:
+            total_cases += 1
+            for key, values in case_contributions(doc).items():
+                _accumulate(rows.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0)), values)
+
+        temp = self.database[f"{ROLLUP_COLLECTION}_rebuild"]
+        await temp.drop()
+        documents = [_as_document(key, values) for key, values in rows.items()]
+        for start in range(0, len(documents), batch_size):
+            await temp.insert_many(documents[start:start + batch_size], ordered=False)
+        await temp.create_index([(field, 1) for field in KEY_FIELDS], unique=True, name="rollup_key")
+        await temp.rename(ROLLUP_COLLECTION, dropTarget=True)
+
+        built_at = datetime.now(timezone.utc)
+        await self.meta.update_one(
+            {"_id": ROLLUP_COLLECTION},
+            {"$set": {"built_at": built_at, "cases": total_cases, "rows": len(documents), "version": ROLLUP_VERSION}},
+            upsert=True,
+        )
+        CaseStatsRollupRepository._ready = True
+        CaseStatsRollupRepository._version = ROLLUP_VERSION
+        return {"cases": total_cases, "rows": len(documents), "built_at": built_at}
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]], length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self.collection.aggregate(pipeline).to_list(length=length)
+
+    @staticmethod
+    def period_match(basis: str, level: str, year: int, month: Optional[int] = None, **filters: Any) -> Dict[str, Any]:
+        """Filtro $match sobre los rollups para un período (mes opcional) y dimensiones extra."""
+        match: Dict[str, Any] = {"basis": basis, "level": level, "year": year}
+        if month is not None:
+            match["month"] = month
+        match.update({field: value for field, value in filters.items() if value is not None})
+        return match
+
+
+def sum_counters(fields: Iterable[str] = COUNTER_FIELDS) -> Dict[str, Any]:
+    """Acumuladores $group que suman los contadores indicados."""
+    return {field: {"$sum": f"${field}"} for field in fields}
+
+
+def average_expression(sum_field: str = "business_days_sum", count_field: str = "business_days_count") -> Dict[str, Any]:
+    """Promedio a partir de suma y conteo; null si no hay valores (igual que $avg)."""
+    return {"$cond": [{"$gt": [f"${count_field}", 0]}, {"$divide": [f"${sum_field}", f"${count_field}"]}, None]}
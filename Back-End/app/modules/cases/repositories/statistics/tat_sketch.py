@@ -0,0 +1,54 @@
+# Sketch de la distribución del tiempo de respuesta (días hábiles) para percentiles.
+# Los días hábiles son enteros pequeños, así que el sketch es un histograma por día: equivale a un
+# DDSketch con cubetas de ancho 1, es exacto, se combina sumando conteos y admite restas, que es
+# lo que necesitan los rollups incrementales (un caso que cambia resta su aporte anterior).
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+# Campo del rollup con el histograma: {"<días>": conteo}
+SKETCH_FIELD = "tat_days"
+# Última cubeta; agrupa los casos de MAX_TRACKED_DAYS o más días hábiles
+MAX_TRACKED_DAYS = 90
+DEFAULT_PERCENTILES = (50, 90, 95)
+
+
+def tat_bucket(business_days: Any) -> Optional[str]:
+    """Cubeta del histograma para un valor de días hábiles; None si no es numérico."""
+    if isinstance(business_days, bool) or not isinstance(business_days, (int, float)):
+        return None
+    return str(min(max(int(round(business_days)), 0), MAX_TRACKED_DAYS))
+
+
+def merge_sketches(sketches: Iterable[Optional[Mapping[Any, int]]]) -> Dict[int, int]:
+    """Suma varios histogramas (de meses, entidades, pruebas...) en uno solo."""
+    merged: Dict[int, int] = {}
+    for sketch in sketches:
+        for days, count in (sketch or {}).items():
+            if count:
+                merged[int(days)] = merged.get(int(days), 0) + count
+    return {days: count for days, count in merged.items() if count > 0}
+
+
+def sketch_percentiles(sketch: Mapping[int, int], percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """Conteo y percentiles por rango más cercano (el menor valor que cubre el p% de los casos).
+    Un percentil en la última cubeta se reporta como MAX_TRACKED_DAYS (significa "o más")."""
+    total = sum(sketch.values())
+    result: Dict[str, Any] = {"count": total}
+    ordered: List = sorted(sketch.items())
+    for p in percentiles:
+        result[percentile_key(p)] = _rank_value(ordered, total, p) if total else None
+    result["max"] = ordered[-1][0] if total else None
+    return result
+
+
+def _rank_value(ordered: List, total: int, percentile: float) -> int:
+    target = max(1, -(-total * percentile // 100))  # ceil(total * p / 100)
+    seen = 0
+    for days, count in ordered:
+        seen += count
+        if seen >= target:
+            return days
+    return ordered[-1][0]
+
+
+def percentile_key(percentile: float) -> str:
+    return f"p{percentile:g}".replace(".", "_")
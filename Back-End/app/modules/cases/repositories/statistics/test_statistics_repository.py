@@ -1,47 +1,18 @@
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.entity_filter import EntityFilterResolver
+from app.modules.cases.repositories.statistics.rollup_repository import CaseStatsRollupRepository
+from app.modules.tests.repositories.test_catalog import test_catalog
 
 
 class TestStatisticsRepository:
     # Repositorio para estadísticas de pruebas (rendimiento y oportunidad)
     def __init__(self, database: AsyncIOMotorDatabase):
         self.collection = database.cases
-    
-    def _get_entity_filter_pattern(self, entity_name: str) -> str:
-        # Devuelve patrón regex para filtrar entidades (soporta abreviaturas)
-        if not entity_name or not entity_name.strip():
-            return ""
-        
-        entity_name = entity_name.strip()
-        abbreviation_mappings = {
-            'HAMA': r'Hospital Alma Máter de Antioquia',
-            'HGM': r'Hospital General de Medellín Luz Castro G\.',
-            'HUSVP': r'Hospital Universitario San Vicente de Paul',
-            'CES': r'Clínica CES',
-            'VID': r'Clínica VID - Fundación Santa María',
-            'SURA': r'SURA',
-            'PROLAB': r'PROLAB S\.A\.S',
-            'LIME': r'LIME',
-            'TEM': r'TEM - SIU',
-            'INVESTIGACION': r'Investigación',
-            'MICROBIOLOGIA': r'Microbiología',
-            'PATOLOGIA': r'Patología',
-            'SUESCUN': r'Patología Suescún S\.A\.S',
-            'INTEGRAL': r'Patología Integral S\.A',
-            'HSVF': r'Centros Especializados HSVF Rionegro',
-            'RENALES': r'Renales IPS Clínica León XIII',
-            'AMBULATORIOS': r'Hospitales Ambulatorios',
-            'CARDIOLOGICA': r'Clínica Cardiovascular Santa María',
-            'NEUROCENTRO': r'Neurocentro - Pereira',
-            'IPS': r'IPS Universitaria Ambulatoria',
-            'HOSPITAL': r'Hospital',
-            'CLINICA': r'Clínica'
-        }
-        
-        if entity_name.upper() in abbreviation_mappings:
-            return abbreviation_mappings[entity_name.upper()]
-        return f".*{entity_name}.*"
+        self.rollups = CaseStatsRollupRepository(database)
+        self.tests = database.tests
+        self.entity_filter = EntityFilterResolver(database)
     
     async def get_monthly_test_performance(
         self, 
@@ -50,63 +21,55 @@ class TestStatisticsRepository:
         entity_name: Optional[str] = None
     ) -> Dict[str, Any]:
         # Rendimiento mensual de pruebas basado únicamente en casos completados
-        start_date = datetime(year, month, 1)
-        end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
-        match_conditions = {
-            "state": "Completado",
-            "signed_at": {"$gte": start_date, "$lt": end_date},
-            "samples.tests": {"$exists": True, "$ne": []}
-        }
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
-        pipeline = [
-            {"$match": match_conditions},
-            {"$unwind": "$samples"},
-            {"$unwind": "$samples.tests"},
-            {
-                "$lookup": {
-                    "from": "tests",
-                    "localField": "samples.tests.id",
-                    "foreignField": "test_code",
-                    "as": "test_info"
-                }
-            },
-            {"$unwind": {"path": "$test_info", "preserveNullAndEmptyArrays": True}},
-            {
-                "$group": {
-                    "_id": {
-                        "test_code": "$samples.tests.id"
-                    },
-                    "test_name": {"$first": "$test_info.name"},
-                    # Al filtrar por Completado, solicitadas = completadas = total en el período
-                    "total_solicitadas": {"$sum": 1},
-                    "total_completadas": {"$sum": 1},
-                    "total_business_days": {"$sum": {"$ifNull": ["$business_days", 0]}},
-                    "avg_business_days": {"$avg": {"$ifNull": ["$business_days", 0]}}
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "codigo": "$_id.test_code",
-                    "nombre": {"$ifNull": ["$test_name", "$_id.test_code"]},
-                    "solicitadas": "$total_solicitadas",
-                    "completadas": "$total_completadas",
-                    "tiempoPromedio": {"$round": ["$avg_business_days", 2]},
-                    "porcentajeCompletado": {
-                        "$round": [
-                            {"$multiply": [{"$divide": ["$total_completadas", "$total_solicitadas"]}, 100]}, 
-                            2
-                        ]
+        if await self.rollups.is_ready():
+            results = await self._monthly_test_performance_from_rollups(month, year, entity_name)
+        else:
+            start_date = datetime(year, month, 1)
+            end_date = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+            match_conditions = {
+                "state": "Completado",
+                "signed_at": {"$gte": start_date, "$lt": end_date},
+                "samples.tests": {"$exists": True, "$ne": []}
+            }
+            await self.entity_filter.apply(match_conditions, entity_name)
+            pipeline = [
+                {"$match": match_conditions},
+                # Solo los campos que se usan: el $unwind multiplica cada documento por sus pruebas
+                {"$project": {"_id": 0, "samples.tests.id": 1, "business_days": 1}},
+                {"$unwind": "$samples"},
+                {"$unwind": "$samples.tests"},
+                {
+                    "$group": {
+                        "_id": {
+                            "test_code": "$samples.tests.id"
+                        },
+                        # Al filtrar por Completado, solicitadas = completadas = total en el período
+                        "total_solicitadas": {"$sum": 1},
+                        "total_completadas": {"$sum": 1},
+                        "total_business_days": {"$sum": {"$ifNull": ["$business_days", 0]}},
+                        "avg_business_days": {"$avg": {"$ifNull": ["$business_days", 0]}}
                     }
-                }
-            },
-            {"$sort": {"solicitadas": -1}}
-        ]
-        
-        results = await self.collection.aggregate(pipeline).to_list(length=1000)
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "codigo": "$_id.test_code",
+                        "solicitadas": "$total_solicitadas",
+                        "completadas": "$total_completadas",
+                        "tiempoPromedio": {"$round": ["$avg_business_days", 2]},
+                        "porcentajeCompletado": {
+                            "$round": [
+                                {"$multiply": [{"$divide": ["$total_completadas", "$total_solicitadas"]}, 100]}, 
+                                2
+                            ]
+                        }
+                    }
+                },
+                {"$sort": {"solicitadas": -1}}
+            ]
+            results = await self.collection.aggregate(pipeline).to_list(length=1000)
+        # Un nombre por código distinto, desde el catálogo en memoria
+        results = await test_catalog.apply_names(self.tests, results)
         total_solicitadas = sum(test["solicitadas"] for test in results)
         total_completadas = sum(test["completadas"] for test in results)
         if total_solicitadas > 0:
@@ -122,6 +85,39 @@ class TestStatisticsRepository:
                 "tiempoPromedio": round(weighted_avg_days, 2)
             }
         }
+
+    async def _monthly_test_performance_from_rollups(
+        self,
+        month: int,
+        year: int,
+        entity_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        # Rollups a nivel de prueba (una fila por prueba solicitada); el nombre lo pone quien llama
+        match_conditions = self.rollups.period_match("signed", "test", year, month, state="Completado")
+        await self.entity_filter.apply(match_conditions, entity_name, field="entity_id")
+        pipeline = [
+            {"$match": match_conditions},
+            {
+                "$group": {
+                    "_id": "$test_code",
+                    "total": {"$sum": "$cases"},
+                    # Los días nulos cuentan como 0, igual que el pipeline sobre casos
+                    "business_days_sum": {"$sum": "$business_days_sum"}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "codigo": "$_id",
+                    "solicitadas": "$total",
+                    "completadas": "$total",
+                    "tiempoPromedio": {"$round": [{"$divide": ["$business_days_sum", "$total"]}, 2]},
+                    "porcentajeCompletado": {"$literal": 100.0}
+                }
+            },
+            {"$sort": {"solicitadas": -1}}
+        ]
+        return await self.rollups.aggregate(pipeline, length=1000)
     
     async def get_test_details(
         self, 
@@ -137,120 +133,77 @@ class TestStatisticsRepository:
             "signed_at": {"$gte": start_date, "$lt": end_date},
             "samples.tests.id": test_code
         }
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
-        basic_stats_pipeline = [
-            {"$match": match_conditions},
-            {"$unwind": "$samples"},
-            {"$unwind": "$samples.tests"},
-            {"$match": {"samples.tests.id": test_code}},
-            {
-                "$group": {
-                    "_id": None,
-                    "total_solicitadas": {"$sum": 1},
-                    "total_completadas": {"$sum": 1},
-                    "total_business_days": {"$sum": {"$ifNull": ["$business_days", 0]}},
-                    "avg_business_days": {"$avg": {"$ifNull": ["$business_days", 0]}}
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "total_solicitadas": 1,
-                    "total_completadas": 1,
-                    "porcentaje_completado": {
-                        "$round": [
-                            {"$multiply": [{"$divide": ["$total_completadas", "$total_solicitadas"]}, 100]}, 
-                            2
-                        ]
-                    },
-                    "promedio_dias": {"$round": ["$avg_business_days", 2]}
-                }
-            }
-        ]
-        
-        basic_stats_result = await self.collection.aggregate(basic_stats_pipeline).to_list(length=1)
-        basic_stats = basic_stats_result[0] if basic_stats_result else {
-            "total_solicitadas": 0,
-            "total_completadas": 0,
-            "porcentaje_completado": 0,
-            "promedio_dias": 0
-        }
-        opportunity_pipeline = [
+        await self.entity_filter.apply(match_conditions, entity_name)
+        # Un solo recorrido: tras aislar las solicitudes de la prueba, resumen y patólogos salen de facetas
+        pipeline = [
             {"$match": match_conditions},
+            {"$project": {"_id": 0, "samples.tests.id": 1, "business_days": 1, "assigned_pathologist": 1}},
             {"$unwind": "$samples"},
             {"$unwind": "$samples.tests"},
             {"$match": {"samples.tests.id": test_code}},
             {
-                "$group": {
-                    "_id": None,
-                    "dentro_oportunidad": {
-                        "$sum": {
-                            "$cond": [{"$lte": ["$business_days", 7]}, 1, 0]
+                "$facet": {
+                    "resumen": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "total_solicitadas": {"$sum": 1},
+                                "avg_business_days": {"$avg": {"$ifNull": ["$business_days", 0]}},
+                                "dentro_oportunidad": {
+                                    "$sum": {"$cond": [{"$lte": ["$business_days", 7]}, 1, 0]}
+                                },
+                                "fuera_oportunidad": {
+                                    "$sum": {"$cond": [{"$gt": ["$business_days", 7]}, 1, 0]}
+                                }
+                            }
                         }
-                    },
-                    "fuera_oportunidad": {
-                        "$sum": {
-                            "$cond": [{"$gt": ["$business_days", 7]}, 1, 0]
-                        }
-                    },
-                    "total_casos": {"$sum": 1}
-                }
-            }
-        ]
-        
-        opportunity_result = await self.collection.aggregate(opportunity_pipeline).to_list(length=1)
-        opportunity_stats = opportunity_result[0] if opportunity_result else {
-            "dentro_oportunidad": 0,
-            "fuera_oportunidad": 0,
-            "total_casos": 0
-        }
-        
-        # Get pathologists who worked on this test
-        pathologists_pipeline = [
-            {"$match": match_conditions},
-            {"$unwind": "$samples"},
-            {"$unwind": "$samples.tests"},
-            {"$match": {"samples.tests.id": test_code}},
-            {
-                "$group": {
-                    "_id": {
-                        "pathologist_name": "$assigned_pathologist.name",
-                        "pathologist_code": "$assigned_pathologist.id"
-                    },
-                    "total_procesadas": {"$sum": 1},
-                    "avg_business_days": {"$avg": "$business_days"}
+                    ],
+                    "patologos": [
+                        {
+                            "$group": {
+                                "_id": {
+                                    "pathologist_name": "$assigned_pathologist.name",
+                                    "pathologist_code": "$assigned_pathologist.id"
+                                },
+                                "total_procesadas": {"$sum": 1},
+                                "avg_business_days": {"$avg": "$business_days"}
+                            }
+                        },
+                        {
+                            "$project": {
+                                "_id": 0,
+                                "nombre": "$_id.pathologist_name",
+                                "codigo": "$_id.pathologist_code",
+                                "total_procesadas": 1,
+                                "tiempo_promedio": {"$round": ["$avg_business_days", 2]}
+                            }
+                        },
+                        {"$sort": {"total_procesadas": -1}}
+                    ],
                 }
             },
-            {
-                "$project": {
-                    "_id": 0,
-                    "nombre": "$_id.pathologist_name",
-                    "codigo": "$_id.pathologist_code",
-                    "total_procesadas": 1,
-                    "tiempo_promedio": {"$round": ["$avg_business_days", 2]}
-                }
-            },
-            {"$sort": {"total_procesadas": -1}}
         ]
-        
-        pathologists_result = await self.collection.aggregate(pathologists_pipeline).to_list(length=1000)
-        
+
+        result = await self.collection.aggregate(pipeline).to_list(length=1)
+        facets = result[0] if result else {}
+        resumen = (facets.get("resumen") or [{}])[0]
+        # Solo se consultan casos completados: cada solicitud de la prueba cuenta como completada
+        total = resumen.get("total_solicitadas", 0)
+        promedio_dias = resumen.get("avg_business_days")
+
         return {
             "estadisticas_principales": {
-                "total_solicitadas": basic_stats["total_solicitadas"],
-                "total_completadas": basic_stats["total_completadas"],
-                "porcentaje_completado": basic_stats["porcentaje_completado"]
+                "total_solicitadas": total,
+                "total_completadas": total,
+                "porcentaje_completado": 100.0 if total else 0
             },
             "tiempos_procesamiento": {
-                "promedio_dias": basic_stats["promedio_dias"],
-                "dentro_oportunidad": opportunity_stats["dentro_oportunidad"],
-                "fuera_oportunidad": opportunity_stats["fuera_oportunidad"],
-                "total_casos": opportunity_stats["total_casos"]
+                "promedio_dias": round(promedio_dias, 2) if promedio_dias is not None else 0,
+                "dentro_oportunidad": resumen.get("dentro_oportunidad", 0),
+                "fuera_oportunidad": resumen.get("fuera_oportunidad", 0),
+                "total_casos": total
             },
-            "patologos": pathologists_result
+            "patologos": facets.get("patologos") or []
         }
     
     async def get_test_pathologists(
@@ -273,14 +226,12 @@ class TestStatisticsRepository:
             "samples.tests.id": test_code
         }
         
-        # Add entity filter if specified - support partial matching for abbreviated names
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        # Filtro de entidad resuelto a códigos (igualdad sobre campo indexado)
+        await self.entity_filter.apply(match_conditions, entity_name)
         
         pipeline = [
             {"$match": match_conditions},
+            {"$project": {"_id": 0, "samples.tests.id": 1, "business_days": 1, "assigned_pathologist": 1}},
             {"$unwind": "$samples"},
             {"$unwind": "$samples.tests"},
             {"$match": {"samples.tests.id": test_code}},
@@ -329,22 +280,21 @@ class TestStatisticsRepository:
             "samples.tests": {"$exists": True, "$ne": []}
         }
         
-        # Add entity filter if specified - support partial matching for abbreviated names
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                match_conditions["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        # Filtro de entidad resuelto a códigos (igualdad sobre campo indexado)
+        await self.entity_filter.apply(match_conditions, entity_name)
         
         pipeline = [
             {"$match": match_conditions},
+            {"$project": {"_id": 0, "samples.tests.id": 1, "samples.tests.name": 1, "business_days": 1}},
             {"$unwind": "$samples"},
             {"$unwind": "$samples.tests"},
             {
                 "$group": {
+                    # Solo por código: el nombre guardado en el caso puede variar entre casos de la misma prueba
                     "_id": {
-                        "test_code": "$samples.tests.id",
-                        "test_name": "$samples.tests.name"
+                        "test_code": "$samples.tests.id"
                     },
+                    "test_name": {"$first": "$samples.tests.name"},
                     "total_casos": {"$sum": 1},
                     "dentro_oportunidad": {
                         "$sum": {
@@ -363,7 +313,7 @@ class TestStatisticsRepository:
                 "$project": {
                     "_id": 0,
                     "codigo": "$_id.test_code",
-                    "nombre": "$_id.test_name",
+                    "nombre": "$test_name",
                     "total_casos": 1,
                     "dentro_oportunidad": 1,
                     "fuera_oportunidad": 1,
@@ -380,6 +330,7 @@ class TestStatisticsRepository:
         ]
         
         results = await self.collection.aggregate(pipeline).to_list(length=1000)
+        results = await test_catalog.apply_names(self.tests, results)
         
         # Calculate summary
         total_casos = sum(test["total_casos"] for test in results)
@@ -415,6 +366,7 @@ class TestStatisticsRepository:
                     "samples.tests": {"$exists": True, "$ne": []}
                 }
             },
+            {"$project": {"_id": 0, "signed_at": 1, "samples.tests.id": 1, "business_days": 1}},
             {"$unwind": "$samples"},
             {"$unwind": "$samples.tests"},
             {
@@ -439,11 +391,8 @@ class TestStatisticsRepository:
             {"$sort": {"mes": 1, "total_casos": -1}}
         ]
         
-        # Add entity filter if specified - support partial matching for abbreviated names
-        if entity_name:
-            entity_pattern = self._get_entity_filter_pattern(entity_name)
-            if entity_pattern:
-                pipeline[0]["$match"]["patient_info.entity_info.name"] = {"$regex": entity_pattern, "$options": "i"}
+        # Filtro de entidad resuelto a códigos (igualdad sobre campo indexado)
+        await self.entity_filter.apply(pipeline[0]["$match"], entity_name)
         
         results = await self.collection.aggregate(pipeline).to_list(length=1000)
-        return results
\ No newline at end of file
+        return await test_catalog.apply_names(self.tests, results)
\ No newline at end of file
@@ -0,0 +1,188 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.cases.repositories.statistics.entity_filter import EntityFilterResolver
+from app.modules.cases.repositories.statistics.rollup_repository import (
+    SKETCH_ROLLUP_VERSION,
+    CaseStatsRollupRepository,
+)
+from app.modules.cases.repositories.statistics.tat_sketch import (
+    DEFAULT_PERCENTILES,
+    MAX_TRACKED_DAYS,
+    SKETCH_FIELD,
+    merge_sketches,
+    sketch_percentiles,
+)
+from app.modules.tests.repositories.test_catalog import test_catalog
+
+# Dimensión de agrupación -> (campo en los rollups, campo de nombre en los rollups, campo en los casos, nombre en los casos)
+GROUP_FIELDS = {
+    "entity": ("entity_id", "entity_name", "$patient_info.entity_info.id", "$patient_info.entity_info.name"),
+    "pathologist": ("pathologist_id", "pathologist_name", "$assigned_pathologist.id", "$assigned_pathologist.name"),
+    "test": ("test_code", None, "$samples.tests.id", None),
+}
+
+
+class TurnaroundStatisticsRepository:
+    """Percentiles del tiempo de respuesta (días hábiles) de casos completados.
+
+    Se calculan combinando los histogramas de los rollups mensuales (ver tat_sketch); mientras los
+    rollups no tengan histogramas, se arma el mismo histograma agrupando los casos por días hábiles."""
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.collection = database.cases
+        self.tests = getattr(database, "tests", None)
+        self.rollups = CaseStatsRollupRepository(database)
+        self.entity_filter = EntityFilterResolver(database)
+
+    async def get_percentiles(
+        self,
+        year: int,
+        month: Optional[int] = None,
+        group_by: Optional[str] = None,
+        entity: Optional[str] = None,
+        pathologist: Optional[str] = None,
+        test: Optional[str] = None,
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    ) -> Dict[str, Any]:
+        # Una prueba (como filtro o como agrupación) se cuenta por cada solicitud, igual que las demás estadísticas de pruebas
+        by_test = group_by == "test" or bool(test)
+        if await self.rollups.is_ready(min_version=SKETCH_ROLLUP_VERSION):
+            rows = await self._sketches_from_rollups(year, month, group_by, entity, pathologist, test, by_test)
+            source = "rollups"
+        else:
+            rows = await self._sketches_from_cases(year, month, group_by, entity, pathologist, test, by_test)
+            source = "cases"
+
+        overall = merge_sketches(row["sketch"] for row in rows)
+        groups: List[Dict[str, Any]] = []
+        if group_by:
+            merged: Dict[Any, Dict[str, Any]] = {}
+            for row in rows:
+                group = merged.setdefault(row["code"], {"code": row["code"], "name": row.get("name"), "sketches": []})
+                group["name"] = group["name"] or row.get("name")
+                group["sketches"].append(row["sketch"])
+            for group in merged.values():
+                stats = sketch_percentiles(merge_sketches(group["sketches"]), percentiles)
+                groups.append({"code": group["code"], "name": group["name"] or group["code"], **stats})
+            if group_by == "test" and self.tests is not None:
+                await test_catalog.apply_names(self.tests, groups, code_field="code", name_field="name")
+            groups.sort(key=lambda g: (-g["count"], str(g["code"])))
+
+        return {
+            "year": year,
+            "month": month,
+            "groupBy": group_by,
+            "percentiles": list(percentiles),
+            "maxTrackedDays": MAX_TRACKED_DAYS,
+            "source": source,
+            "summary": sketch_percentiles(overall, percentiles),
+            "groups": groups,
+        }
+
+    async def _sketches_from_rollups(
+        self,
+        year: int,
+        month: Optional[int],
+        group_by: Optional[str],
+        entity: Optional[str],
+        pathologist: Optional[str],
+        test: Optional[str],
+        by_test: bool,
+    ) -> List[Dict[str, Any]]:
+        match = self.rollups.period_match(
+            "signed", "test" if by_test else "case", year, month,
+            state="Completado", pathologist_id=pathologist, test_code=test,
+        )
+        await self.entity_filter.apply(match, entity, field="entity_id")
+        code_field, name_field = (GROUP_FIELDS[group_by][:2] if group_by else (None, None))
+        # Suma los histogramas en el servidor: una fila por (grupo, día) y luego una por grupo
+        pipeline = [
+            {"$match": match},
+            {
+                "$project": {
+                    "_id": 0,
+                    "code": f"${code_field}" if code_field else {"$literal": None},
+                    "name": f"${name_field}" if name_field else {"$literal": None},
+                    "buckets": {"$objectToArray": {"$ifNull": [f"${SKETCH_FIELD}", {}]}},
+                }
+            },
+            {"$unwind": "$buckets"},
+            {
+                "$group": {
+                    "_id": {"code": "$code", "days": "$buckets.k"},
+                    "name": {"$first": "$name"},
+                    "count": {"$sum": "$buckets.v"},
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$_id.code",
+                    "name": {"$first": "$name"},
+                    "buckets": {"$push": {"k": "$_id.days", "v": "$count"}},
+                }
+            },
+        ]
+        results = await self.rollups.aggregate(pipeline)
+        return [
+            {"code": r["_id"], "name": r.get("name"), "sketch": {b["k"]: b["v"] for b in r["buckets"]}}
+            for r in results
+        ]
+
+    async def _sketches_from_cases(
+        self,
+        year: int,
+        month: Optional[int],
+        group_by: Optional[str],
+        entity: Optional[str],
+        pathologist: Optional[str],
+        test: Optional[str],
+        by_test: bool,
+    ) -> List[Dict[str, Any]]:
+        if month:
+            start = datetime(year, month, 1)
+            end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+        else:
+            start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+        match: Dict[str, Any] = {
+            "state": "Completado",
+            "signed_at": {"$gte": start, "$lt": end},
+            "business_days": {"$ne": None},
+        }
+        if pathologist:
+            match["assigned_pathologist.id"] = pathologist
+        if test:
+            match["samples.tests.id"] = test
+        await self.entity_filter.apply(match, entity)
+
+        pipeline: List[Dict[str, Any]] = [{"$match": match}]
+        if by_test:
+            pipeline += [{"$unwind": "$samples"}, {"$unwind": "$samples.tests"}]
+            if test:
+                pipeline.append({"$match": {"samples.tests.id": test}})
+        code_expr, name_expr = (GROUP_FIELDS[group_by][2:] if group_by else (None, None))
+        pipeline += [
+            {
+                "$group": {
+                    # Mismas cubetas que tat_bucket: días redondeados y acotados a [0, MAX_TRACKED_DAYS]
+                    "_id": {
+                        "code": code_expr,
+                        "days": {"$min": [{"$max": [{"$round": ["$business_days", 0]}, 0]}, MAX_TRACKED_DAYS]},
+                    },
+                    "name": {"$first": name_expr},
+                    "count": {"$sum": 1},
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$_id.code",
+                    "name": {"$first": "$name"},
+                    "buckets": {"$push": {"k": "$_id.days", "v": "$count"}},
+                }
+            },
+        ]
+        results = await self.collection.aggregate(pipeline).to_list(length=None)
+        return [
+            {"code": r["_id"], "name": r.get("name"), "sketch": {int(b["k"]): b["v"] for b in r["buckets"]}}
+            for r in results
+        ]
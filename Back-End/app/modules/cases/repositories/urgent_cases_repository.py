@@ -1,110 +1,144 @@
 """
-Repositorio de casos urgentes: agrega métricas y lista casos según días en sistema.
+Repositorio de casos urgentes: lista casos abiertos según días hábiles en sistema o fecha límite.
 """
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.shared.services.business_calendar import business_days_between, reached_before
+
+# Estados en los que un caso sigue pendiente del patólogo
+OPEN_STATES = ["En proceso", "Por firmar"]
+# Índices parciales: solo contienen los casos abiertos, así que no crecen con el histórico de
+# completados. Requieren $in en partialFilterExpression (MongoDB 6.0+); la consulta debe repetir
+# exactamente el mismo filtro de estado para poder usarlos.
+OPEN_CASES_FILTER = {"state": {"$in": OPEN_STATES}}
+URGENT_INDEXES = [
+    ("urgent_open_created", [("state", 1), ("created_at", 1)]),
+    ("urgent_open_pathologist_created", [("assigned_pathologist.id", 1), ("state", 1), ("created_at", 1)]),
+    # Vencidos: due_at < ahora (ver services/due_dates.py)
+    ("urgent_open_due", [("state", 1), ("due_at", 1)]),
+    ("urgent_open_pathologist_due", [("assigned_pathologist.id", 1), ("state", 1), ("due_at", 1)]),
+]
+
+# Campos de la lista de urgentes; se proyectan solo sobre los casos que quedan tras el $limit
+URGENT_PROJECTION: Dict[str, Any] = {
+    "_id": 0,
+    "case_code": 1,
+    "patient_name": "$patient_info.name",
+    "patient_code": {
+        "$ifNull": [
+            "$patient_info.patient_code",
+            {
+                "$cond": [
+                    {
+                        "$and": [
+                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_type", ""]}}, 0]},
+                            {"$gt": [{"$strLenCP": {"$ifNull": ["$patient_info.identification_number", ""]}}, 0]}
+                        ]
+                    },
+                    {"$concat": ["$patient_info.identification_type", "-", "$patient_info.identification_number"]},
+                    "$patient_info.identification_number"
+                ]
+            }
+        ]
+    },
+    "entity_name": "$patient_info.entity_info.name",
+    # "código - nombre" de cada prueba sin repetir, sin $unwind/$group sobre el documento completo
+    "tests": {
+        "$setUnion": [
+            {
+                "$reduce": {
+                    "input": {"$ifNull": ["$samples", []]},
+                    "initialValue": [],
+                    "in": {
+                        "$concatArrays": [
+                            "$$value",
+                            {
+                                "$map": {
+                                    "input": {
+                                        "$filter": {
+                                            "input": {"$ifNull": ["$$this.tests", []]},
+                                            "as": "t",
+                                            "cond": {"$ifNull": ["$$t.id", False]},
+                                        }
+                                    },
+                                    "as": "t",
+                                    "in": {"$concat": [
+                                        {"$toString": "$$t.id"},
+                                        " - ",
+                                        {"$ifNull": ["$$t.name", ""]}
+                                    ]},
+                                }
+                            },
+                        ]
+                    },
+                }
+            },
+            [],
+        ]
+    },
+    "pathologist_name": "$assigned_pathologist.name",
+    "created_at": 1,
+    "sla_days": 1,
+    "due_at": 1,
+    "state": 1,
+    "priority": 1,
+}
 
 
 class UrgentCasesRepository:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.cases
 
-    # Retorna casos en estados críticos con días en sistema >= min_days.
+    async def ensure_indexes(self):
+        for name, keys in URGENT_INDEXES:
+            await self.collection.create_index(keys, name=name, partialFilterExpression=OPEN_CASES_FILTER)
+
+    # Retorna casos en estados críticos con días hábiles en sistema >= min_days.
     async def find_urgent_cases(
         self,
         limit: int = 50,
         min_days: int = 6,
         pathologist_code: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
+        # Los días hábiles en sistema crecen al retroceder created_at: el umbral (calendario con
+        # festivos) y el orden se resuelven sobre created_at con el índice parcial.
+        now = datetime.now(timezone.utc)
         match_stage: Dict[str, Any] = {
-            "state": {"$in": ["En proceso", "Por firmar"]},
+            **OPEN_CASES_FILTER,
+            "created_at": {"$lt": reached_before(int(min_days), now)},
         }
+        return await self._find(match_stage, {"created_at": 1}, limit, pathologist_code, now)
+
+    # Retorna casos abiertos cuya fecha límite (due_at) ya pasó, los más vencidos primero.
+    async def find_overdue_cases(
+        self,
+        limit: int = 50,
+        pathologist_code: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        match_stage: Dict[str, Any] = {**OPEN_CASES_FILTER, "due_at": {"$lt": now}}
+        return await self._find(match_stage, {"due_at": 1}, limit, pathologist_code, now)
+
+    async def _find(
+        self,
+        match_stage: Dict[str, Any],
+        sort: Dict[str, int],
+        limit: int,
+        pathologist_code: Optional[str],
+        now: datetime,
+    ) -> List[Dict[str, Any]]:
         if pathologist_code:
             match_stage["assigned_pathologist.id"] = pathologist_code
-
-        # Pipeline: calcula días en sistema, agrupa y proyecta campos clave.
         pipeline: List[Dict[str, Any]] = [
             {"$match": match_stage},
-            {
-                "$addFields": {
-                    "days_in_system": {
-                        "$dateDiff": {
-                            "startDate": "$created_at",
-                            "endDate": "$$NOW",
-                            "unit": "day",
-                        }
-                    }
-                }
-            },
-            {"$match": {"days_in_system": {"$gte": int(min_days)}}},
-            {"$unwind": {"path": "$samples", "preserveNullAndEmptyArrays": True}},
-            {"$unwind": {"path": "$samples.tests", "preserveNullAndEmptyArrays": True}},
-            {
-                "$group": {
-                    "_id": "$case_code",
-                    "doc": {"$first": "$$ROOT"},
-                    "tests_list": {
-                        "$addToSet": {
-                            "$cond": [
-                                {"$ifNull": ["$samples.tests.id", False]},
-                                {"$concat": [
-                                    {"$toString": "$samples.tests.id"},
-                                    " - ",
-                                    {"$ifNull": ["$samples.tests.name", ""]}
-                                ]},
-                                None
-                            ]
-                        }
-                    }
-                }
-            },
-            {
-                "$project": {
-                    "doc": 1,
-                    "tests_list": {
-                        "$filter": {
-                            "input": "$tests_list",
-                            "as": "t",
-                            "cond": {"$ne": ["$$t", None]},
-                        }
-                    }
-                }
-            },
-            {"$sort": {"doc.days_in_system": -1, "doc.created_at": 1}},
+            {"$sort": sort},
             {"$limit": int(limit)},
-            {
-                "$project": {
-                    "_id": 0,
-                    "case_code": "$_id",
-                    "patient_name": "$doc.patient_info.name",
-                    "patient_code": {
-                        "$ifNull": [
-                            "$doc.patient_info.patient_code",
-                            {
-                                "$cond": [
-                                    {
-                                        "$and": [
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$doc.patient_info.identification_type", ""]}}, 0]},
-                                            {"$gt": [{"$strLenCP": {"$ifNull": ["$doc.patient_info.identification_number", ""]}}, 0]}
-                                        ]
-                                    },
-                                    {"$concat": ["$doc.patient_info.identification_type", "-", "$doc.patient_info.identification_number"]},
-                                    "$doc.patient_info.identification_number"
-                                ]
-                            }
-                        ]
-                    },
-                    "entity_name": "$doc.patient_info.entity_info.name",
-                    "tests": "$tests_list",
-                    "pathologist_name": "$doc.assigned_pathologist.name",
-                    "created_at": "$doc.created_at",
-                    "state": "$doc.state",
-                    "priority": "$doc.priority",
-                    "days_in_system": "$doc.days_in_system"
-                }
-            }
+            {"$project": URGENT_PROJECTION},
         ]
-
-        return await self.collection.aggregate(pipeline).to_list(length=limit)
-
-
+        items = await self.collection.aggregate(pipeline).to_list(length=limit)
+        # Días hábiles (sin fines de semana ni festivos) solo sobre los casos devueltos
+        for item in items:
+            created_at = item.get("created_at")
+            item["days_in_system"] = business_days_between(created_at, now) if isinstance(created_at, datetime) else 0
+        return items
@@ -0,0 +1,185 @@
+"""
+Repositorio de carga de trabajo por patólogo: un documento por patólogo con contadores de casos
+abiertos que se mantienen en cada escritura de casos (igual que los rollups de estadísticas), para
+que la asignación consulte un solo documento en lugar de agregar todos los casos abiertos.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+WORKLOAD_COLLECTION = "pathologist_workload"
+# _id del documento que agrupa los casos abiertos sin patólogo asignado
+UNASSIGNED_ID = "sin_asignar"
+CLOSED_STATE = "Completado"
+# Días de firmas que se conservan para estimar el ritmo de cada patólogo
+THROUGHPUT_WINDOW_DAYS = 28
+
+# Campos del caso que determinan su aporte a los contadores
+WORKLOAD_PROJECTION = {
+    "_id": 0,
+    "created_at": 1,
+    "signed_at": 1,
+    "state": 1,
+    "priority": 1,
+    "assigned_pathologist": 1,
+}
+
+
+def _day(value: Any) -> Optional[str]:
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d")
+
+
+def field_key(value: str) -> str:
+    """Segmento de ruta de campo para un valor libre (estado, prioridad): '.' partiría la ruta y '$'
+    la invalidaría. Se codifican como en una URL; unquote() devuelve el valor original."""
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def workload_contributions(doc: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Contadores (documento de patólogo -> campo -> incremento) que aporta un caso.
+
+    Los casos abiertos se cuentan por día de creación, estado y prioridad ("open.<día>.<estado>.<prioridad>"):
+    la antigüedad cambia con el tiempo sin que cambie el caso, así que los rangos de edad se calculan
+    al leer. Las firmas se cuentan por día ("signed.<día>") para estimar el ritmo del patólogo."""
+    if not doc:
+        return {}
+    pathologist = doc.get("assigned_pathologist") or {}
+    owner = pathologist.get("id") or UNASSIGNED_ID
+    counters: Dict[str, int] = {}
+    state = doc.get("state") or "En proceso"
+    created = _day(doc.get("created_at"))
+    if state != CLOSED_STATE and created:
+        counters[f"open.{created}.{field_key(str(state))}.{field_key(str(doc.get('priority') or 'Normal'))}"] = 1
+    signed = _day(doc.get("signed_at"))
+    if signed and owner != UNASSIGNED_ID:
+        counters[f"signed.{signed}"] = 1
+    return {owner: counters} if counters else {}
+
+
+def cleanup_operations(delta: Dict[str, Dict[str, int]], now: datetime) -> List[UpdateOne]:
+    """Operaciones que quitan los contadores que quedaron en cero (y los objetos que quedan vacíos) y
+    las firmas fuera de la ventana de ritmo, para que el documento no crezca con cada día de casos.
+    Van en orden: primero la hoja y después sus padres. El filtro $lte: 0 respeta un contador que otra
+    escritura volvió a incrementar entre el $inc y la limpieza."""
+    window_start = (now - timedelta(days=THROUGHPUT_WINDOW_DAYS)).strftime("%Y-%m-%d")
+    operations = []
+    for owner, counters in delta.items():
+        for field, value in counters.items():
+            if value >= 0 or not field.startswith("open."):
+                continue
+            operations.append(UpdateOne({"_id": owner, field: {"$lte": 0}}, {"$unset": {field: ""}}))
+            # open.<día>.<estado> y open.<día>, solo si quedaron vacíos
+            parts = field.split(".")
+            for depth in (3, 2):
+                parent = ".".join(parts[:depth])
+                operations.append(UpdateOne({"_id": owner, parent: {}}, {"$unset": {parent: ""}}))
+        if any(field.startswith("signed.") for field in counters):
+            operations.append(UpdateOne({"_id": owner}, [{"$set": {"signed": {"$arrayToObject": {"$filter": {
+                "input": {"$objectToArray": {"$ifNull": ["$signed", {}]}},
+                "cond": {"$and": [{"$gt": ["$$this.k", window_start]}, {"$gt": ["$$this.v", 0]}]},
+            }}}}}]))
+    return operations
+
+
+def diff_workload(
+    old_doc: Optional[Dict[str, Any]],
+    new_doc: Optional[Dict[str, Any]],
+) -> Dict[str, Dict[str, int]]:
+    """Incrementos para pasar del aporte de old_doc al de new_doc (sin contadores en cero)."""
+    delta = workload_contributions(new_doc)
+    for owner, counters in workload_contributions(old_doc).items():
+        row = delta.setdefault(owner, {})
+        for field, value in counters.items():
+            row[field] = row.get(field, 0) - value
+    return {
+        owner: {field: value for field, value in counters.items() if value}
+        for owner, counters in delta.items()
+        if any(counters.values())
+    }
+
+
+class WorkloadRepository:
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.database = database
+        # Las bases sin la colección (p. ej. dobles de prueba) desactivan el mantenimiento
+        self.collection = getattr(database, WORKLOAD_COLLECTION, None)
+        self.cases = getattr(database, "cases", None)
+
+    async def apply_change(
+        self,
+        old_doc: Optional[Dict[str, Any]],
+        new_doc: Optional[Dict[str, Any]],
+    ) -> None:
+        """Aplica el cambio de un caso (creación: old_doc=None; borrado: new_doc=None).
+        Un fallo aquí no debe tumbar la escritura del caso; se registra y se corrige con rebuild."""
+        if self.collection is None:
+            return
+        delta = diff_workload(old_doc, new_doc)
+        if not delta:
+            return
+        names = {
+            (doc.get("assigned_pathologist") or {}).get("id"): (doc.get("assigned_pathologist") or {}).get("name")
+            for doc in (old_doc, new_doc)
+            if doc
+        }
+        now = datetime.now(timezone.utc)
+        try:
+            operations = []
+            for owner, counters in delta.items():
+                update: Dict[str, Any] = {"$inc": counters, "$set": {"updated_at": now}}
+                if names.get(owner):
+                    update["$set"]["pathologist_name"] = names[owner]
+                operations.append(UpdateOne({"_id": owner}, update, upsert=True))
+            await self.collection.bulk_write(operations, ordered=False)
+            cleanup = cleanup_operations(delta, now)
+            if cleanup:
+                await self.collection.bulk_write(cleanup, ordered=True)
+        except Exception as e:
+            logger.warning("No se pudieron actualizar los contadores de carga de trabajo: %s", e)
+
+    async def get(self, pathologist_code: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": pathologist_code})
+
+    async def list_all(self) -> List[Dict[str, Any]]:
+        return await self.collection.find({}).to_list(length=None)
+
+    async def rebuild(self, batch_size: int = 1000) -> Dict[str, Any]:
+        """Reconstruye los contadores desde la colección de casos (solo casos abiertos y firmas dentro
+        de la ventana de ritmo). Se escribe en una colección temporal que luego reemplaza a la actual."""
+        since = datetime.now(timezone.utc) - timedelta(days=THROUGHPUT_WINDOW_DAYS)
+        query = {"$or": [{"state": {"$ne": CLOSED_STATE}}, {"signed_at": {"$gte": since}}]}
+        rows: Dict[str, Dict[str, Any]] = {}
+        total_cases = 0
+        async for doc in self.cases.find(query, WORKLOAD_PROJECTION, batch_size=batch_size):
+            total_cases += 1
+            for owner, counters in workload_contributions(doc).items():
+                row = rows.setdefault(owner, {"_id": owner, "open": {}, "signed": {}})
+                name = (doc.get("assigned_pathologist") or {}).get("name")
+                if name and owner != UNASSIGNED_ID:
+                    row["pathologist_name"] = name
+                for field, value in counters.items():
+                    parent = row
+                    *path, leaf = field.split(".")
+                    for part in path:
+                        parent = parent.setdefault(part, {})
+                    parent[leaf] = parent.get(leaf, 0) + value
+
+        built_at = datetime.now(timezone.utc)
+        documents = [{**row, "updated_at": built_at} for row in rows.values()]
+        if not documents:
+            await self.collection.delete_many({})
+            return {"cases": 0, "pathologists": 0, "built_at": built_at}
+        temp = self.database[f"{WORKLOAD_COLLECTION}_rebuild"]
+        await temp.drop()
+        for start in range(0, len(documents), batch_size):
+            await temp.insert_many(documents[start:start + batch_size], ordered=False)
+        await temp.rename(WORKLOAD_COLLECTION, dropTarget=True)
+        return {"cases": total_cases, "pathologists": len(documents), "built_at": built_at}
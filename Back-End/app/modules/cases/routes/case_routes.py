@@ -14,6 +14,7 @@ from .pdf_routes import router as pdf_router
 # Importar las rutas de estadísticas
 from .statistics.statistics_router import router as statistics_router
 from .urgent_routes import router as urgent_router
+from .workload_routes import router as workload_router
 
 
 router = APIRouter(tags=["cases"]) 
@@ -25,6 +26,7 @@ router.include_router(pdf_router)
 # Incluir las rutas de estadísticas
 router.include_router(statistics_router)
 router.include_router(urgent_router)
+router.include_router(workload_router)
 
 
 def get_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> CaseService:
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
-import re
-from urllib.parse import quote
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config.database import get_database
 from app.modules.cases.services.pdf_service import CasePdfService
+from app.modules.cases.services.pdf_scheduler import pdf_scheduler, PdfQueueFullError
+from app.modules.auth.routes.auth_routes import get_current_user_id_optional
 from app.core.exceptions import NotFoundError, BadRequestError
+from app.core.tracing import record_phases, server_timing_header
 
 router = APIRouter(tags=["pdf"])
 
@@ -14,43 +16,51 @@ def get_pdf_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> CasePdf
     return CasePdfService(db)
 
 
+@router.get("/pdf/queue-metrics")
+async def get_pdf_queue_metrics():
+    """Estado de la cola de generación de PDF (cupos activos, en espera, tiempos de espera)"""
+    return pdf_scheduler.metrics()
+
+
 @router.get("/{case_code}/pdf")
 async def generate_case_pdf(
     case_code: str,
-    pdf_service: CasePdfService = Depends(get_pdf_service)
+    request: Request,
+    pdf_service: CasePdfService = Depends(get_pdf_service),
+    current_user_id: Optional[str] = Depends(get_current_user_id_optional)
 ):
     """
     Generar PDF del informe de resultados de un caso
     
     - **case_code**: Código del caso (ej: 2025-00001)
     
-    Retorna un archivo PDF con el informe completo del caso
+    Retorna un archivo PDF con el informe completo del caso.
+    Si la cola de generación está saturada responde 429 con el encabezado Retry-After.
     """
+    # Turno por usuario autenticado; sin token se agrupa por IP del cliente
+    user_key = current_user_id or (request.client.host if request.client else "anonymous")
     try:
-        pdf_bytes = await pdf_service.generate_case_pdf(case_code)
-
-        # Intentar obtener el nombre del paciente para el filename
-        patient_name = ""
-        try:
-            case_obj = await pdf_service.case_service.get_case(case_code)
-            case_data = case_obj.model_dump() if hasattr(case_obj, "model_dump") else {}
-            patient_name = (case_data.get("patient_info") or {}).get("name", "")
-        except Exception:
-            patient_name = ""
-
-        base_name = f"{case_code}-{patient_name}".strip(" -") or f"{case_code}"
-        # Sanitizar para filename seguro (mantener letras, números, guiones, espacios, puntos y guion bajo)
-        safe_name = re.sub(r"[^\w\-. ]+", "", base_name).replace(" ", "_")
-        utf8_name = quote(f"{base_name}.pdf")
+        with record_phases() as phases:
+            async with pdf_scheduler.slot(user_key):
+                # Los metadatos del archivo vienen del mismo contexto del informe (sin releer el caso)
+                pdf_bytes, file_meta = await pdf_service.generate_case_pdf(case_code)
 
         return StreamingResponse(
             iter([pdf_bytes]),
             media_type="application/pdf",
             headers={
-                "Content-Disposition": f"inline; filename=\"{safe_name}.pdf\"; filename*=UTF-8''{utf8_name}"
+                "Content-Disposition": f"inline; filename=\"{file_meta['filename']}\"; filename*=UTF-8''{file_meta['filename_utf8']}",
+                # Desglose por fase (cola, lectura del caso, render...) visible en las devtools
+                "Server-Timing": server_timing_header(phases),
             }
         )
-    except ValueError as e:
+    except PdfQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except (ValueError, NotFoundError) as e:
         raise HTTPException(status_code=404, detail=str(e))
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,5 +1,5 @@
 # Dashboard Statistics Routes
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config.database import get_database
@@ -10,6 +10,7 @@ from app.modules.cases.schemas.statistics.dashboard_statistics_schemas import (
     OpportunityResponse
 )
 from app.modules.cases.services.statistics.dashboard_statistics_service import DashboardStatisticsService
+from app.modules.cases.services.statistics.stats_cache import stats_cache
 from app.core.exceptions import BadRequestError
 
 router = APIRouter(tags=["statistics-dashboard"])
@@ -140,3 +141,37 @@ async def validate_pathologist(
 
 
 ## Eliminado endpoints de oportunidad para rehacerlos
+
+
+@router.get("/dashboard/bundle")
+async def get_dashboard_bundle(
+    response: Response,
+    widgets: Optional[str] = Query(None, description="Widgets separados por coma: overview, cases_by_month, metrics, opportunity"),
+    year: Optional[int] = Query(None, description="Año para cases_by_month (por defecto el actual)"),
+    pathologist_code: Optional[str] = Query(None, description="Código del patólogo para la vista por patólogo"),
+    service: DashboardStatisticsService = Depends(get_dashboard_service)
+):
+    """
+    Obtener en una sola llamada los widgets del dashboard
+
+    Calcula en paralelo los widgets pedidos (todos por defecto) y retorna sus datos, los errores
+    por widget y el tiempo de cada uno (también en el encabezado Server-Timing)
+    """
+    try:
+        result = await service.get_bundle(widgets, year, pathologist_code)
+        response.headers["Server-Timing"] = ", ".join(
+            f"dashboard-{name};dur={ms}" for name, ms in result["meta"]["timings_ms"].items()
+        )
+        return result
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+
+
+@router.get("/cache-metrics")
+async def get_statistics_cache_metrics():
+    """
+    Métricas de la caché de estadísticas del proceso (aciertos, fallos, invalidaciones, tamaño)
+    """
+    return stats_cache.metrics()
@@ -62,10 +62,13 @@ async def opportunity_monthly(
 async def opportunity_yearly(
     year: int,
     threshold_days: int = Query(7, ge=1, le=60, alias="thresholdDays"),
+    entity_code: str = Query(None, alias="entity"),
+    pathologist_code: str = Query(None, alias="pathologist"),
+    compare_years: str = Query(None, alias="compareYears", description="Años a comparar, separados por coma"),
     service: OpportunityStatisticsService = Depends(get_opportunity_service)
 ):
     try:
-        return await service.get_yearly(year, threshold_days)
+        return await service.get_yearly(year, threshold_days, entity_code, pathologist_code, compare_years)
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -104,3 +107,20 @@ async def opportunity_tests(
         raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
 
 
+@router.get("/percentiles")
+async def opportunity_percentiles(
+    year: int = Query(...),
+    month: int = Query(None, ge=1, le=12, description="Mes; si se omite, todo el año"),
+    group_by: str = Query(None, alias="groupBy", description="entity | pathologist | test"),
+    entity_code: str = Query(None, alias="entity"),
+    pathologist_code: str = Query(None, alias="pathologist"),
+    test_code: str = Query(None, alias="test"),
+    percentiles: str = Query(None, description="Percentiles separados por coma (por defecto 50,90,95)"),
+    service: OpportunityStatisticsService = Depends(get_opportunity_service)
+):
+    try:
+        return await service.get_percentiles(year, month, group_by, entity_code, pathologist_code, test_code, percentiles)
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
@@ -18,12 +18,12 @@ async def get_monthly_performance(
     month: int = Query(..., ge=1, le=12, description="Mes (1-12)"),
     year: int = Query(..., description="Año"),
     threshold_days: int = Query(7, ge=1, le=60, alias="thresholdDays", description="Días de oportunidad"),
-    pathologist_name: str = Query(None, alias="pathologist", description="Nombre del patólogo (opcional)"),
+    pathologist: str = Query(None, description="Código o nombre del patólogo (opcional)"),
     service: PathologistStatisticsService = Depends(get_pathologist_statistics_service)
 ):
     """Obtener rendimiento mensual de patólogos"""
     try:
-        return await service.get_monthly_performance(month, year, threshold_days, pathologist_name)
+        return await service.get_monthly_performance(month, year, threshold_days, pathologist)
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -32,14 +32,15 @@ async def get_monthly_performance(
 
 @router.get("/entities")
 async def get_pathologist_entities(
-    pathologist_name: str = Query(..., alias="patologo", description="Nombre del patólogo"),
+    pathologist_code: str = Query(None, alias="codigo", description="Código del patólogo"),
+    pathologist_name: str = Query(None, alias="patologo", description="Nombre del patólogo (si no se envía el código)"),
     month: int = Query(..., ge=1, le=12, description="Mes (1-12)"),
     year: int = Query(..., description="Año"),
     service: PathologistStatisticsService = Depends(get_pathologist_statistics_service)
 ):
     """Obtener entidades donde trabaja un patólogo"""
     try:
-        return await service.get_pathologist_entities(pathologist_name, month, year)
+        return await service.get_pathologist_entities(pathologist_code or pathologist_name, month, year)
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -48,14 +49,15 @@ async def get_pathologist_entities(
 
 @router.get("/tests")
 async def get_pathologist_tests(
-    pathologist_name: str = Query(..., alias="patologo", description="Nombre del patólogo"),
+    pathologist_code: str = Query(None, alias="codigo", description="Código del patólogo"),
+    pathologist_name: str = Query(None, alias="patologo", description="Nombre del patólogo (si no se envía el código)"),
     month: int = Query(..., ge=1, le=12, description="Mes (1-12)"),
     year: int = Query(..., description="Año"),
     service: PathologistStatisticsService = Depends(get_pathologist_statistics_service)
 ):
     """Obtener pruebas realizadas por un patólogo"""
     try:
-        return await service.get_pathologist_tests(pathologist_name, month, year)
+        return await service.get_pathologist_tests(pathologist_code or pathologist_name, month, year)
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -64,13 +66,14 @@ async def get_pathologist_tests(
 
 @router.get("/opportunity-summary")
 async def get_pathologist_opportunity_summary(
-    pathologist_name: str = Query(..., alias="patologo", description="Nombre del patólogo"),
+    pathologist_code: str = Query(None, alias="codigo", description="Código del patólogo"),
+    pathologist_name: str = Query(None, alias="patologo", description="Nombre del patólogo (si no se envía el código)"),
     threshold_days: int = Query(7, ge=1, le=60, alias="thresholdDays", description="Días de oportunidad"),
     service: PathologistStatisticsService = Depends(get_pathologist_statistics_service)
 ):
     """Obtener resumen de oportunidad de un patólogo"""
     try:
-        return await service.get_pathologist_opportunity_summary(pathologist_name, threshold_days)
+        return await service.get_pathologist_opportunity_summary(pathologist_code or pathologist_name, threshold_days)
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -79,14 +82,15 @@ async def get_pathologist_opportunity_summary(
 
 @router.get("/monthly-trends")
 async def get_pathologist_monthly_trends(
-    pathologist_name: str = Query(..., alias="patologo", description="Nombre del patólogo"),
+    pathologist_code: str = Query(None, alias="codigo", description="Código del patólogo"),
+    pathologist_name: str = Query(None, alias="patologo", description="Nombre del patólogo (si no se envía el código)"),
     year: int = Query(..., description="Año"),
     threshold_days: int = Query(7, ge=1, le=60, alias="thresholdDays", description="Días de oportunidad"),
     service: PathologistStatisticsService = Depends(get_pathologist_statistics_service)
 ):
     """Obtener tendencias mensuales de un patólogo"""
     try:
-        return await service.get_pathologist_monthly_trends(pathologist_name, year, threshold_days)
+        return await service.get_pathologist_monthly_trends(pathologist_code or pathologist_name, year, threshold_days)
     except BadRequestError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config.database import get_database
+from app.core.exceptions import BadRequestError
+from app.modules.cases.services.statistics.pivot_statistics_service import PivotStatisticsService
+
+
+router = APIRouter(prefix="/pivot", tags=["statistics-pivot"])
+
+
+def get_pivot_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> PivotStatisticsService:
+    return PivotStatisticsService(db)
+
+
+@router.get("")
+async def statistics_pivot(
+    dimensions: str = Query(..., description="Dimensiones separadas por coma: entity, pathologist, test, care_type, state, year, month"),
+    measures: str = Query("count", description="Medidas separadas por coma: count, samples, avg_business_days, within_opportunity, out_of_opportunity, within_pct"),
+    start: str = Query(..., alias="from", description="Mes inicial (AAAA-MM)"),
+    end: str = Query(None, alias="to", description="Mes final inclusive (AAAA-MM); por defecto el inicial"),
+    basis: str = Query("signed", description="Fecha de referencia: signed (firma) o created (creación)"),
+    entity: str = Query(None, description="Entidad (código, alias o nombre)"),
+    pathologist: str = Query(None, description="Patólogo (código o nombre)"),
+    test: str = Query(None, description="Código de prueba"),
+    care_type: str = Query(None, alias="careType", description="Tipo de atención"),
+    state: str = Query(None, description="Estado del caso"),
+    service: PivotStatisticsService = Depends(get_pivot_service)
+):
+    """Estadística parametrizada: agrupa por las dimensiones pedidas y calcula las medidas pedidas"""
+    try:
+        return await service.pivot(dimensions, measures, start, end, basis, entity, pathologist, test, care_type, state)
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Query, HTTPException
+from app.core.exceptions import BadRequestError, NotFoundError
+from app.modules.cases.services.statistics.snapshot_query_service import snapshot_queries
+
+router = APIRouter(prefix="/snapshot", tags=["statistics-snapshot"])
+
+
+@router.get("/status")
+async def get_snapshot_status():
+    """Estado del snapshot columnar de casos (versión, marca de agua y filas)"""
+    return await snapshot_queries.status()
+
+
+@router.get("/pivot")
+async def get_snapshot_pivot(
+    rows: str = Query(..., description="Dimensiones de las filas separadas por coma (entity, pathologist, test, care_type, state, year, month, tat_days)"),
+    columns: str = Query(None, description="Dimensión de las columnas (opcional)"),
+    measure: str = Query("cases", description="cases, tests, tat_mean, tat_median, tat_p90 o within_pct"),
+    basis: str = Query("signed", description="Fecha de referencia: signed (firma) o created (creación)"),
+    year: int = Query(None, description="Año"),
+    month: int = Query(None, ge=1, le=12, description="Mes (1-12)"),
+    entity: str = Query(None, description="Código de entidad"),
+    pathologist: str = Query(None, description="Código de patólogo"),
+    test: str = Query(None, description="Código de prueba"),
+    state: str = Query(None, description="Estado del caso"),
+):
+    """Tabla cruzada sobre el snapshot de casos (no consulta MongoDB)"""
+    try:
+        return await snapshot_queries.pivot(
+            [r.strip() for r in rows.split(",")], columns, measure, basis,
+            year, month, entity, pathologist, test, state,
+        )
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.config.database import get_database
 from app.modules.cases.services.urgent_cases_service import UrgentCasesService
@@ -39,3 +39,16 @@ async def list_urgent_cases_by_pathologist(
         raise HTTPException(status_code=500, detail=f"Error listando casos urgentes por patólogo: {str(e)}")
 
 
+@router.get("/urgent/overdue")
+async def list_overdue_cases(
+    code: Optional[str] = Query(None, min_length=1, description="Código del patólogo (opcional)"),
+    limit: int = Query(50, ge=1, le=1000, description="Máximo de casos a retornar"),
+    service: UrgentCasesService = Depends(get_service)
+):
+    try:
+        cases = await service.list_overdue(limit=limit, code=code)
+        return {"cases": cases, "count": len(cases)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listando casos vencidos: {str(e)}")
+
+
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config.database import get_database
+from app.core.exceptions import NotFoundError
+from app.modules.cases.services.workload_service import WorkloadService
+
+
+router = APIRouter(tags=["workload"])
+
+
+def get_service(db: AsyncIOMotorDatabase = Depends(get_database)) -> WorkloadService:
+    return WorkloadService(db)
+
+
+@router.get("/workload")
+async def list_workload(service: WorkloadService = Depends(get_service)):
+    try:
+        items = await service.list_workload()
+        return {"pathologists": items, "count": len(items)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo carga de trabajo: {str(e)}")
+
+
+@router.get("/workload/pathologist")
+async def get_pathologist_workload(
+    code: str = Query(..., min_length=1, description="Código del patólogo"),
+    service: WorkloadService = Depends(get_service)
+):
+    try:
+        return await service.get_pathologist_workload(code)
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obteniendo carga de trabajo del patólogo: {str(e)}")
@@ -99,6 +99,9 @@ class CaseResult(BaseModel):
     observations: Optional[str] = None
     cie10_diagnosis: Optional[Dict[str, str]] = None
     cieo_diagnosis: Optional[Dict[str, str]] = None
+    # HTML sanitizado en escritura (macro_result, micro_result, diagnosis, observations).
+    # Solo lo usa el render del PDF: no se serializa en las respuestas del API.
+    sanitized_html: Optional[Dict[str, str]] = Field(None, exclude=True)
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -122,6 +125,8 @@ class CaseResponse(BaseModel):
     delivered_to: Optional[str] = None
     delivered_at: Optional[datetime] = None
     business_days: Optional[int] = None
+    sla_days: Optional[int] = None
+    due_at: Optional[datetime] = None
     additional_notes: Optional[List[AdditionalNote]] = None
     complementary_tests: Optional[List[Dict[str, Any]]] = None
 
@@ -5,6 +5,10 @@ from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
 from app.modules.cases.schemas.case import CaseCreate, CaseUpdate, CaseResponse
 from app.modules.cases.repositories.case_repository import CaseRepository
 from app.modules.cases.repositories.consecutive_repository import CaseConsecutiveRepository
+from app.modules.cases.repositories.statistics.rollup_repository import CaseStatsRollupRepository
+from app.modules.cases.repositories.workload_repository import WorkloadRepository
+from app.modules.cases.services.due_dates import DueDateCalculator
+from app.modules.cases.services.statistics.stats_cache import stats_cache
 from bson import ObjectId
 
 
@@ -13,15 +17,23 @@ class CaseService:
         self.db = db
         self.repo = CaseRepository(db)
         self.seq = CaseConsecutiveRepository(db)
+        self.rollups = CaseStatsRollupRepository(db)
+        self.workload = WorkloadRepository(db)
+        self.due_dates = DueDateCalculator(db)
 
     # La inicialización de índices se moverá al arranque de la app
 
     async def create_case(self, payload: CaseCreate) -> CaseResponse:
-        year = datetime.now(timezone.utc).year
+        now = datetime.now(timezone.utc)
+        year = now.year
+        # La fecha límite depende solo de la creación y de las pruebas: se calcula una vez por caso
+        due = await self.due_dates.due_at(now, payload.model_dump(include={"samples"}).get("samples"))
         for _ in range(3):
             case_code = await self.seq.generate_case_code(year)
             data = payload.model_dump()
             data["case_code"] = case_code
+            data["created_at"] = now
+            data.update(due)
 
             # Normalizar patient_code canónico desde identificación
             patient_info = data.get("patient_info") or {}
@@ -35,6 +47,9 @@ class CaseService:
 
             try:
                 doc = await self.repo.create(data)
+                await self.rollups.apply_change(None, doc)
+                await self.workload.apply_change(None, doc)
+                await stats_cache.invalidate_case_change(doc)
                 return self._to_response(doc)
             except Exception as e:
                 if "duplicate key error" in str(e).lower():
@@ -53,15 +68,31 @@ class CaseService:
             if current_state != "Por entregar":
                 raise BadRequestError(f"No se puede marcar como completado el caso {case_code} que está en estado '{current_state}'. Solo se pueden completar casos en estado 'Por entregar'.")
         
-        updated = await self.repo.update_by_case_code(case_code, payload.model_dump(exclude_unset=True))
+        update = payload.model_dump(exclude_unset=True)
+        # Cambiar las pruebas cambia el tiempo de respuesta del caso
+        if "samples" in update and isinstance(doc.get("created_at"), datetime):
+            update.update(await self.due_dates.due_at(doc["created_at"], update.get("samples")))
+        # El estado previo sale de la misma escritura (no de la lectura de arriba), así dos
+        # actualizaciones concurrentes no aplican diferencias desde el mismo estado viejo
+        previous, updated = await self.repo.update_with_previous(case_code, update)
+        if previous is None:
+            raise NotFoundError(f"Caso con código {case_code} no encontrado")
+        # Cubre entrega (Completado), cambios de patólogo, entidad, pruebas y días hábiles
+        await self.rollups.apply_change(previous, updated)
+        await self.workload.apply_change(previous, updated)
+        await stats_cache.invalidate_case_change(previous, updated)
         return self._to_response(updated)
 
     async def delete_case(self, case_code: str) -> Dict[str, Any]:
         doc = await self.repo.get_by_case_code(case_code)
         if not doc:
             raise NotFoundError(f"Caso con código {case_code} no encontrado")
-        ok = await self.repo.delete_by_case_code(case_code)
-        return {"deleted": ok, "case_code": case_code}
+        deleted = await self.repo.delete_returning_previous(case_code)
+        if deleted:
+            await self.rollups.apply_change(deleted, None)
+            await self.workload.apply_change(deleted, None)
+            await stats_cache.invalidate_case_change(deleted)
+        return {"deleted": deleted is not None, "case_code": case_code}
 
     async def get_case(self, case_code: str) -> CaseResponse:
         doc = await self.repo.get_by_case_code(case_code)
@@ -208,6 +239,8 @@ class CaseService:
             "delivered_to": doc.get("delivered_to"),
             "delivered_at": doc.get("delivered_at"),
             "business_days": doc.get("business_days"),
+            "sla_days": doc.get("sla_days"),
+            "due_at": doc.get("due_at"),
             "additional_notes": doc.get("additional_notes") or [],
             "complementary_tests": doc.get("complementary_tests") or [],
         }
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.modules.tests.repositories.test_catalog import test_catalog
+from app.shared.services.business_calendar import exceeded_at
+
+# Días hábiles de respuesta cuando ninguna prueba del caso tiene tiempo en el catálogo (default de TestBase.time)
+DEFAULT_SLA_DAYS = 6
+
+
+def case_test_codes(samples: Optional[Iterable[Dict[str, Any]]]) -> List[str]:
+    return [
+        (test or {}).get("id")
+        for sample in samples or []
+        for test in (sample or {}).get("tests") or []
+        if (test or {}).get("id")
+    ]
+
+
+class DueDateCalculator:
+    """Fecha límite (due_at) de un caso: vence cuando lleva más días hábiles que el tiempo de
+    respuesta de su prueba más lenta. Se guarda en el caso para que urgentes y vencidos sean
+    un rango indexado sobre due_at en lugar de calcular días por caso en cada consulta."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.tests = getattr(db, "tests", None)
+
+    async def sla_days(self, test_codes: Iterable[str]) -> int:
+        codes = list(test_codes)
+        if not codes or self.tests is None:
+            return DEFAULT_SLA_DAYS
+        times = await test_catalog.times(self.tests, codes)
+        return max(times.values()) if times else DEFAULT_SLA_DAYS
+
+    async def due_at(self, created_at: datetime, samples: Optional[Iterable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Campos sla_days y due_at para guardar en el caso."""
+        sla_days = await self.sla_days(case_test_codes(samples))
+        return {"sla_days": sla_days, "due_at": exceeded_at(created_at, sla_days)}
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Dict
+
+# Campos del resultado que llegan como HTML del editor enriquecido
+HTML_RESULT_FIELDS = ("macro_result", "micro_result", "diagnosis", "observations")
+
+ALLOWED_TAGS = frozenset({"div", "span", "br", "p", "b", "strong", "i", "em", "u", "ul", "ol", "li"})
+ALLOWED_STYLE_PROPS = frozenset({"text-align", "font-weight", "font-style", "text-decoration"})
+
+# Un solo patrón para recorrer el HTML: comentarios, bloques script/style completos,
+# etiquetas y los '<' '>' sueltos (que se escapan para que no se formen etiquetas nuevas)
+_TOKEN_RE = re.compile(
+    r"<!--.*?(?:-->|$)"
+    r"|<(script|style)\b[^>]*>.*?(?:</\1\s*>|$)"
+    r"|</?[a-zA-Z][a-zA-Z0-9]*\b[^<>]*>"
+    r"|[<>]",
+    re.IGNORECASE | re.DOTALL,
+)
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)\b([^<>]*)>")
+_ATTR_RE = re.compile(r"""([^\s=/"'<>]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'>]+))?""")
+_SAFE_STYLE_VALUE = re.compile(r"^[a-zA-Z0-9 #%.,\-]+$")
+
+
+def sanitize_html(html: Any) -> str:
+    """Sanitiza HTML en una sola pasada permitiendo un subconjunto seguro de etiquetas y estilos.
+    Comentario: elimina scripts/estilos/comentarios y eventos on*, y escapa los '<' '>' sueltos
+    para que no se puedan formar etiquetas nuevas al quitar las no permitidas."""
+    if not html:
+        return ""
+    html = str(html)
+    if "<" not in html and ">" not in html:
+        return html
+    return _TOKEN_RE.sub(_replace_token, html)
+
+
+def _replace_token(match: re.Match) -> str:
+    token = match.group(0)
+    if token == "<":
+        return "&lt;"
+    if token == ">":
+        return "&gt;"
+    if match.group(1) or token.startswith("<!--"):
+        return ""
+    return _clean_tag(token)
+
+
+def sanitize_result_fields(data: Dict[str, Any]) -> Dict[str, str]:
+    """Versión sanitizada de los campos HTML presentes en un resultado (para guardar junto al original)."""
+    return {field: sanitize_html(data[field]) for field in HTML_RESULT_FIELDS if data.get(field) is not None}
+
+
+@lru_cache(maxsize=1024)
+def _clean_tag(token: str) -> str:
+    """Reescribe una etiqueta; las etiquetas del editor se repiten mucho, por eso se memorizan."""
+    parts = _TAG_RE.match(token)
+    closing, tag, attrs = parts.group(1), parts.group(2).lower(), parts.group(3)
+    if tag not in ALLOWED_TAGS:
+        return ""
+    if closing:
+        return f"</{tag}>"
+
+    kept = []
+    for attr in _ATTR_RE.finditer(attrs):
+        attr_name = attr.group(1).lower()
+        if attr_name.startswith("on"):
+            continue
+        if attr_name == "style":
+            style = _clean_style((attr.group(2) or "").strip("\"'"))
+            if style:
+                kept.append(f'style="{style}"')
+            continue
+        kept.append(attr.group(0))
+
+    self_closing = "/" if attrs.rstrip().endswith("/") else ""
+    return f"<{tag}{''.join(' ' + a for a in kept)}{self_closing}>"
+
+
+def _clean_style(style_val: str) -> str:
+    kept = []
+    for decl in style_val.split(";"):
+        if ":" not in decl:
+            continue
+        prop, val = decl.split(":", 1)
+        prop = prop.strip().lower()
+        val = val.strip()
+        if prop in ALLOWED_STYLE_PROPS and _SAFE_STYLE_VALUE.match(val):
+            kept.append(f"{prop}: {val}")
+    return "; ".join(kept)
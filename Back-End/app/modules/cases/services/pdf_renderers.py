@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.tracing import span
+
+FOOTER_NOTE = "Los informes de resultados, las placas y bloques de estudios anatomopatológicos se archivan por 15 años"
+
+_DAYS_ES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+_MONTHS_ES = [
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+]
+
+
+class PdfRenderer(ABC):
+    """Interfaz de los motores de PDF: reciben el contexto del informe y retornan los bytes."""
+
+    name = "base"
+
+    @abstractmethod
+    async def render(self, context: Dict[str, Any], logos: Dict[str, str]) -> bytes:
+        """Bytes del PDF del informe."""
+
+
+class ChromiumPdfRenderer(PdfRenderer):
+    """Renderiza la plantilla case_report.html con Chromium (Playwright)."""
+
+    name = "chromium"
+
+    def __init__(self, jinja_env: Any):
+        self.jinja_env = jinja_env
+
+    async def render(self, context: Dict[str, Any], logos: Dict[str, str]) -> bytes:
+        try:
+            from playwright.async_api import async_playwright  # type: ignore
+        except Exception as e:  # ImportError or runtime errors
+            raise RuntimeError(
+                "Playwright no está instalado o no se han instalado los navegadores. "
+                "Ejecuta: pip install playwright && playwright install chromium"
+            ) from e
+
+        # Renderizar template
+        with span("pdf.template_render"):
+            template = self.jinja_env.get_template("case_report.html")
+            html: str = await template.render_async(
+                case=context["case"],
+                pathologist_signature=context["pathologist_signature"],
+                pruebas_complementarias=context["pruebas_complementarias"],
+                logos=logos
+            )
+
+        # Generar PDF
+        async with async_playwright() as p:
+            with span("pdf.browser_launch"):
+                browser = await p.chromium.launch()
+                browser_context = await browser.new_context()
+                page = await browser_context.new_page()
+            with span("pdf.set_content", html_bytes=len(html)):
+                await page.set_content(html, wait_until="load")
+            with span("pdf.page_pdf"):
+                pdf_bytes = await page.pdf(
+                    format="Letter",
+                    margin={"top": "15mm", "right": "12mm", "bottom": "22mm", "left": "12mm"},
+                    print_background=True,
+                    display_header_footer=True,
+                    header_template="<span></span>",
+                    footer_template=(
+                        "<div style='font-family: Arial, sans-serif; font-size:10px; color:#000; width:100%; padding:0 15mm;'>"
+                        "<div style='text-align:center; font-style:italic; white-space:nowrap;'>"
+                        f"{FOOTER_NOTE}"
+                        "</div>"
+                        "<div style='border-top:1px solid #000; margin:2mm 0 0 0;'></div>"
+                        "<div style='text-align:right; font-weight:bold;'>Página <span class='pageNumber'></span> de <span class='totalPages'></span></div>"
+                        "</div>"
+                    ),
+                )
+            with span("pdf.browser_close"):
+                await browser_context.close()
+                await browser.close()
+
+        return pdf_bytes
+
+
+class ReportLabPdfRenderer(PdfRenderer):
+    """Construye el mismo informe directamente con ReportLab, sin navegador.
+    Comentario: el trabajo es CPU puro, por eso se ejecuta en un hilo aparte."""
+
+    name = "reportlab"
+
+    # Etiquetas inline que ReportLab entiende dentro de un Paragraph
+    _INLINE_TAGS = {"b": "b", "strong": "b", "i": "i", "em": "i", "u": "u"}
+    _BLOCK_BREAK = re.compile(r"(?i)<br\s*/?>|</(?:p|div|li|ul|ol)\s*>")
+    _LIST_ITEM = re.compile(r"(?i)<li\b[^>]*>")
+    _TAG = re.compile(r"<(/?)([a-zA-Z0-9]+)\b[^>]*?>")
+    # Logos y firmas ya reducidos, compartidos entre instancias
+    _image_cache: Dict[Tuple[str, float], Tuple[bytes, int, int]] = {}
+
+    def __init__(self):
+        try:
+            import reportlab  # type: ignore  # noqa: F401
+        except Exception as e:
+            raise RuntimeError(
+                "ReportLab no está instalado. Ejecuta: pip install reportlab"
+            ) from e
+
+    async def render(self, context: Dict[str, Any], logos: Dict[str, str]) -> bytes:
+        return await asyncio.to_thread(self.render_sync, context, logos)
+
+    def render_sync(self, context: Dict[str, Any], logos: Dict[str, str]) -> bytes:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import mm
+        from reportlab.platypus import SimpleDocTemplate
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=letter,
+            topMargin=15 * mm,
+            rightMargin=12 * mm,
+            bottomMargin=22 * mm,
+            leftMargin=12 * mm,
+            title=f"Informe {context['case'].get('caso_code') or ''}",
+        )
+        with span("pdf.build_story"):
+            story = self._build_story(context, logos, doc.width)
+        with span("pdf.layout"):
+            doc.build(story, canvasmaker=_numbered_canvas_class())
+        return buffer.getvalue()
+
+    # --- Construcción del contenido ---
+
+    def _build_story(self, context: Dict[str, Any], logos: Dict[str, str], width: float) -> list:
+        from reportlab.lib import colors
+        from reportlab.lib.styles import ParagraphStyle
+        from reportlab.lib.units import mm
+        from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+        case = context.get("case") or {}
+        paciente = case.get("paciente") or {}
+        patologo = case.get("patologo_asignado") or {}
+        resultado = case.get("resultado") or {}
+
+        base = ParagraphStyle("base", fontName="Helvetica", fontSize=9.5, leading=12.5)
+        bold = ParagraphStyle("bold", parent=base, fontName="Helvetica-Bold")
+        small = ParagraphStyle("small", parent=base, fontSize=8.5, leading=11)
+        title = ParagraphStyle(
+            "title", parent=base, fontName="Helvetica-Bold", fontSize=11,
+            alignment=1, textColor=colors.white,
+        )
+        section = ParagraphStyle("section", parent=bold, spaceBefore=3 * mm, spaceAfter=1 * mm)
+
+        story: list = []
+
+        # Encabezado: logos + caja de código de formato
+        logo_cells = [self._image(logos.get(key), 14 * mm) or "" for key in ("lime", "udea", "hama")]
+        code_box = Table(
+            [[Paragraph("Código:", bold), Paragraph("F-025-LIME", base)],
+             [Paragraph("Versión:", bold), Paragraph("05", base)]],
+            colWidths=[18 * mm, 24 * mm],
+        )
+        code_box.setStyle(TableStyle([("BOX", (0, 0), (-1, -1), 0.75, colors.black)]))
+        header = Table([logo_cells + [code_box]], colWidths=[(width - 44 * mm) / 3] * 3 + [44 * mm])
+        header.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "MIDDLE"), ("ALIGN", (-1, 0), (-1, 0), "RIGHT")]))
+        story.append(header)
+        story.append(Spacer(1, 2 * mm))
+
+        title_bar = Table([[Paragraph("INFORME DE RESULTADOS ANATOMOPATOLÓGICOS", title)]], colWidths=[width])
+        title_bar.setStyle(TableStyle([("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#1f2937"))]))
+        story.append(title_bar)
+        story.append(Spacer(1, 2 * mm))
+
+        # Departamento e información del informe
+        fecha_informe = case.get("fecha_firma") or case.get("fecha_entrega")
+        dept = Paragraph(
+            "<b>Departamento de Patología</b><br/>Hospital San Vicente Fundación<br/>"
+            "Calle 64 Carrera 51D. Bloque 13<br/>Tel. 6042192400", small,
+        )
+        info = Paragraph(
+            f"<b>Informe No {self._escape(case.get('caso_code') or case.get('id') or '')}</b><br/>"
+            f"<b>Fecha de Creación:</b> {self._escape(self._format_date(case.get('fecha_creacion')))}<br/>"
+            f"<b>Fecha de Informe:</b> {self._escape(self._format_date(fecha_informe))}", small,
+        )
+        dept_table = Table([[dept, info]], colWidths=[width / 2, width / 2])
+        dept_table.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")]))
+        story.append(dept_table)
+        story.append(Spacer(1, 2 * mm))
+
+        # Tabla del paciente
+        entidad = (paciente.get("entidad_info") or {}).get("nombre") or "Elija un elemento."
+        rows = [
+            ("Paciente:", paciente.get("nombre", ""), "Documento N°:", paciente.get("paciente_code", "")),
+            ("Institución:", entidad, "Edad:", paciente.get("edad", "")),
+            ("Servicio:", case.get("servicio") or "", "Sexo:", paciente.get("sexo", "")),
+            ("Patólogo Asignado:", patologo.get("nombre", ""), "Médico Remitente:", case.get("medico_solicitante") or ""),
+        ]
+        patient_table = Table(
+            [[Paragraph(l1, bold), Paragraph(self._escape(v1), base), Paragraph(l2, bold), Paragraph(self._escape(v2), base)]
+             for l1, v1, l2, v2 in rows],
+            colWidths=[width * 0.2, width * 0.3, width * 0.2, width * 0.3],
+        )
+        patient_table.setStyle(TableStyle([
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]))
+        story.append(patient_table)
+
+        # Secciones de contenido
+        muestras = ", ".join(m.get("region_cuerpo", "") for m in case.get("muestras") or [])
+        metodo = resultado.get("metodo")
+        if isinstance(metodo, (list, tuple)):
+            metodo = ", ".join(str(m) for m in metodo)
+        self._section(story, "MUESTRA:", self._escape(muestras), section, base)
+        self._section(story, "MÉTODO UTILIZADO:", self._escape(metodo or "Elija un elemento."), section, base)
+        self._html_section(story, "DESCRIPCIÓN MACROSCÓPICA", resultado.get("resultado_macro"), section, base)
+        self._html_section(story, "DESCRIPCIÓN MICROSCÓPICA", resultado.get("resultado_micro"), section, base)
+        self._html_section(story, "DIAGNÓSTICO:", resultado.get("diagnostico"), section, base)
+
+        for label, key in (("CIE-10:", "diagnostico_cie10"), ("CIE-O:", "diagnostico_cieo")):
+            diag = resultado.get(key) or {}
+            if diag.get("codigo"):
+                self._section(story, label, self._escape(f"{diag['codigo']} - {diag.get('nombre', '')}"), section, base)
+
+        pruebas = context.get("pruebas_complementarias") or {}
+        if pruebas.get("pruebas"):
+            lines = ["<b>Pruebas solicitadas:</b>"]
+            for test in pruebas["pruebas"]:
+                if test.get("codigo") and test.get("nombre"):
+                    cantidad = test.get("cantidad") or 1
+                    extra = f" (Cantidad: {cantidad})" if cantidad > 1 else ""
+                    lines.append(f"• {self._escape(test['codigo'])} - {self._escape(test['nombre'])}{extra}")
+            if pruebas.get("motivo"):
+                lines.append(f"<br/><b>Motivo:</b> {self._escape(pruebas['motivo'])}")
+            self._section(
+                story, "SE NECESITAN PRUEBAS COMPLEMENTARIAS PARA COMPLETAR EL DIAGNÓSTICO:",
+                "<br/>".join(lines), section, base,
+            )
+
+        notas = case.get("notas_adicionales") or []
+        if notas:
+            lines = []
+            for nota in notas:
+                fecha = nota.get("date")
+                fecha_txt = fecha.strftime("%d/%m/%Y") if hasattr(fecha, "strftime") else str(fecha or "")[:10]
+                prefix = f"<b>{fecha_txt}</b>" if fecha_txt else ""
+                lines.append(f"{prefix}: {self._escape(nota.get('note', ''))}")
+            self._section(story, "NOTAS ADICIONALES:", "<br/>".join(lines), section, base)
+
+        # Firma
+        story.append(Spacer(1, 8 * mm))
+        signature = self._image(context.get("pathologist_signature"), 15 * mm)
+        if signature is not None:
+            signature.hAlign = "LEFT"
+            story.append(signature)
+        line = Table([[""]], colWidths=[70 * mm], hAlign="LEFT")
+        line.setStyle(TableStyle([("LINEABOVE", (0, 0), (-1, -1), 0.75, colors.black)]))
+        story.append(line)
+        story.append(Paragraph(f"<b>Médico Patólogo:</b> {self._escape(patologo.get('nombre', ''))}", base))
+        return story
+
+    def _section(self, story: list, title: str, markup: str, title_style: Any, body_style: Any) -> None:
+        from reportlab.platypus import Paragraph
+
+        story.append(Paragraph(title, title_style))
+        story.append(self._paragraph(markup, body_style))
+
+    def _html_section(self, story: list, title: str, html: Optional[str], title_style: Any, body_style: Any) -> None:
+        from reportlab.platypus import Paragraph
+
+        story.append(Paragraph(title, title_style))
+        for block in self._html_to_blocks(html):
+            story.append(self._paragraph(block, body_style))
+
+    def _paragraph(self, markup: str, style: Any) -> Any:
+        from reportlab.platypus import Paragraph
+
+        try:
+            return Paragraph(markup, style)
+        except ValueError:
+            # Marcado desbalanceado: se degrada a texto plano
+            return Paragraph(self._escape(self._TAG.sub("", markup)), style)
+
+    def _html_to_blocks(self, html: Optional[str]) -> List[str]:
+        """Convierte el HTML ya sanitizado a párrafos con el marcado inline de ReportLab."""
+        if not html:
+            return []
+        text = self._LIST_ITEM.sub("\n• ", str(html))
+        text = self._BLOCK_BREAK.sub("\n", text)
+
+        def _inline(match: re.Match) -> str:
+            tag = self._INLINE_TAGS.get(match.group(2).lower())
+            return f"<{match.group(1)}{tag}>" if tag else ""
+
+        text = self._TAG.sub(_inline, text)
+        return [line.strip() for line in text.split("\n") if line.strip()]
+
+    def _image(self, data_url: Optional[str], height: float) -> Any:
+        """Imagen desde un data URL en base64, escalada a la altura indicada."""
+        if not data_url or "," not in data_url:
+            return None
+        from reportlab.platypus import Image
+
+        try:
+            raw, img_w, img_h = self._prepared_image(data_url, height)
+        except Exception:
+            return None
+        return Image(BytesIO(raw), width=height * img_w / img_h, height=height)
+
+    def _prepared_image(self, data_url: str, height: float) -> Tuple[bytes, int, int]:
+        """Decodifica y reduce la imagen a resolución de impresión (300 dpi) una sola vez por proceso.
+        Comentario: algunos logos vienen en miles de píxeles y embeberlos tal cual infla el PDF."""
+        cache_key = (data_url, round(height, 2))
+        cached = self._image_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        from reportlab.lib.utils import ImageReader
+
+        raw = base64.b64decode(data_url.split(",", 1)[1])
+        img_w, img_h = ImageReader(BytesIO(raw)).getSize()
+        target_h = int(height / 72 * 300)
+        if img_h > target_h * 1.1:
+            try:
+                from PIL import Image as PILImage  # dependencia de reportlab
+
+                with PILImage.open(BytesIO(raw)) as pil_img:
+                    pil_img.thumbnail((max(1, int(img_w * target_h / img_h)), target_h))
+                    out = BytesIO()
+                    pil_img.save(out, format="PNG", optimize=True)
+                    raw, (img_w, img_h) = out.getvalue(), pil_img.size
+            except Exception:
+                pass
+
+        if len(self._image_cache) >= 32:
+            self._image_cache.clear()
+        self._image_cache[cache_key] = (raw, img_w, img_h)
+        return raw, img_w, img_h
+
+    @staticmethod
+    def _escape(value: Any) -> str:
+        return (
+            str(value if value is not None else "")
+            .replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        )
+
+    @staticmethod
+    def _format_date(value: Any) -> str:
+        if isinstance(value, datetime):
+            return f"{_DAYS_ES[value.weekday()]} {value.day:02d} de {_MONTHS_ES[value.month - 1]}, {value.year}"
+        if value:
+            return str(value)[:10]
+        return "Haga clic aquí para escribir una fecha."
+
+
+def _numbered_canvas_class():
+    """Canvas que dibuja el pie de página con 'Página X de Y' (requiere conocer el total)."""
+    from reportlab.lib.units import mm
+    from reportlab.pdfgen import canvas
+
+    class NumberedCanvas(canvas.Canvas):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._saved_pages: list = []
+
+        def showPage(self):
+            self._saved_pages.append(dict(self.__dict__))
+            self._startPage()
+
+        def save(self):
+            total = len(self._saved_pages)
+            for state in self._saved_pages:
+                self.__dict__.update(state)
+                self._draw_footer(total)
+                super().showPage()
+            super().save()
+
+        def _draw_footer(self, total: int) -> None:
+            width, _ = self._pagesize
+            self.setFont("Helvetica-Oblique", 7.5)
+            self.drawCentredString(width / 2, 16 * mm, FOOTER_NOTE)
+            self.setLineWidth(0.75)
+            self.line(15 * mm, 14 * mm, width - 15 * mm, 14 * mm)
+            self.setFont("Helvetica-Bold", 7.5)
+            self.drawRightString(width - 15 * mm, 10 * mm, f"Página {self._pageNumber} de {total}")
+
+    return NumberedCanvas
+
+
+def get_pdf_renderer(name: str, jinja_env: Any) -> PdfRenderer:
+    """Selecciona el motor de PDF configurado (settings.PDF_RENDERER)."""
+    key = (name or "chromium").strip().lower()
+    if key == ChromiumPdfRenderer.name:
+        return ChromiumPdfRenderer(jinja_env)
+    if key == ReportLabPdfRenderer.name:
+        return ReportLabPdfRenderer()
+    raise RuntimeError(f"Motor de PDF no soportado: {name}. Opciones: chromium, reportlab")
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.config.settings import settings
+from app.core.tracing import span
+
+
+class PdfQueueFullError(Exception):
+    """La cola de PDFs está saturada; retry_after indica los segundos sugeridos de espera."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PdfJobScheduler:
+    """Limita cuántos PDFs se renderizan a la vez (cada uno abre un Chromium).
+    Las solicitudes que exceden el límite esperan en una cola por usuario que se atiende
+    en turno rotativo, de modo que un usuario con muchas solicitudes no bloquea a los demás.
+    max_per_user limita los renders simultáneos de un usuario: sus solicitudes adicionales
+    esperan turno (con el mismo plazo) aunque haya cupos libres, en lugar de rechazarse."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        max_queue: int = 20,
+        wait_timeout: float = 30.0,
+        max_per_user: int = 2,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.wait_timeout = wait_timeout
+        self.max_per_user = max(1, max_per_user)
+
+        self._active = 0
+        self._active_by_user: Dict[str, int] = defaultdict(int)
+        # Orden de las llaves = turno de atención entre usuarios
+        self._waiting: "OrderedDict[str, deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._render_avg: Optional[float] = None
+
+    @asynccontextmanager
+    async def slot(self, user_key: str) -> AsyncIterator[None]:
+        """Reservar un cupo de render para user_key durante el bloque."""
+        loop = asyncio.get_running_loop()
+        with span("pdf.queue_wait"):
+            await self._acquire(user_key)
+        started = loop.time()
+        try:
+            yield
+        finally:
+            self._record_render(loop.time() - started)
+            self._release(user_key)
+
+    async def _acquire(self, user_key: str) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._active < self.max_concurrency
+            and self._can_start(user_key)
+            and self._next_eligible() is None
+        ):
+            self._grant(user_key)
+            self._record_wait(0.0)
+            return
+
+        if self._queued >= self.max_queue:
+            self._rejected += 1
+            raise PdfQueueFullError("Cola de generación de PDF saturada", self.retry_after())
+
+        future: asyncio.Future = loop.create_future()
+        self._waiting.setdefault(user_key, deque()).append(future)
+        self._queued += 1
+        started = loop.time()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            # El cupo pudo asignarse justo al vencer el plazo; en ese caso se usa
+            if not future.done():
+                self._discard(user_key, future)
+                self._timed_out += 1
+                raise PdfQueueFullError("Tiempo de espera agotado en la cola de PDF", self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(user_key)
+            else:
+                self._discard(user_key, future)
+            raise
+        self._record_wait(loop.time() - started)
+
+    def _grant(self, user_key: str) -> None:
+        self._active += 1
+        self._active_by_user[user_key] += 1
+
+    def _release(self, user_key: str) -> None:
+        self._active -= 1
+        self._active_by_user[user_key] -= 1
+        if self._active_by_user[user_key] <= 0:
+            del self._active_by_user[user_key]
+        self._dispatch()
+
+    def _can_start(self, user_key: str) -> bool:
+        return self._active_by_user.get(user_key, 0) < self.max_per_user
+
+    def _next_eligible(self) -> Optional[str]:
+        """Primer usuario en turno que no está en su límite de renders simultáneos."""
+        return next((user_key for user_key in self._waiting if self._can_start(user_key)), None)
+
+    def _dispatch(self) -> None:
+        """Entregar cupos libres al siguiente usuario en turno que pueda renderizar."""
+        while self._active < self.max_concurrency:
+            user_key = self._next_eligible()
+            if user_key is None:
+                break
+            queue = self._waiting[user_key]
+            future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._waiting.move_to_end(user_key)
+            else:
+                del self._waiting[user_key]
+            if future.done():
+                continue
+            self._grant(user_key)
+            future.set_result(None)
+
+    def _discard(self, user_key: str, future: asyncio.Future) -> None:
+        queue = self._waiting.get(user_key)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self._queued -= 1
+        if not queue:
+            del self._waiting[user_key]
+        future.cancel()
+
+    def _record_wait(self, seconds: float) -> None:
+        self._wait_count += 1
+        self._wait_total += seconds
+        self._wait_max = max(self._wait_max, seconds)
+
+    def _record_render(self, seconds: float) -> None:
+        self._completed += 1
+        # Promedio móvil exponencial para estimar Retry-After
+        self._render_avg = seconds if self._render_avg is None else 0.8 * self._render_avg + 0.2 * seconds
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que haya cupo, según la duración promedio de render."""
+        per_job = self._render_avg or 2.0
+        rounds = (self._queued + 1) / self.max_concurrency
+        return max(1, math.ceil(per_job * rounds))
+
+    def metrics(self) -> Dict[str, Any]:
+        avg_wait = (self._wait_total / self._wait_count) if self._wait_count else 0.0
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "waiting_users": len(self._waiting),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_per_user": self.max_per_user,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "avg_wait_ms": round(avg_wait * 1000, 2),
+            "max_wait_ms": round(self._wait_max * 1000, 2),
+            "avg_render_ms": round((self._render_avg or 0.0) * 1000, 2),
+        }
+
+
+# Instancia compartida por proceso: el límite aplica a todo el API
+pdf_scheduler = PdfJobScheduler(
+    max_concurrency=settings.PDF_MAX_CONCURRENCY,
+    max_queue=settings.PDF_MAX_QUEUE,
+    wait_timeout=settings.PDF_QUEUE_TIMEOUT_SECONDS,
+    max_per_user=settings.PDF_MAX_PER_USER,
+)
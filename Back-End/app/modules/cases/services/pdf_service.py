@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, Tuple
 import asyncio
+import logging
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 from markupsafe import Markup
 import re
 from pathlib import Path
+from urllib.parse import quote
+from app.config.settings import settings
+from app.core.tracing import span
+from app.modules.cases.services.pdf_renderers import PdfRenderer, get_pdf_renderer
+from app.modules.cases.services.html_sanitizer import sanitize_html
+
+logger = logging.getLogger(__name__)
 
 
 class CasePdfService:
@@ -28,49 +36,14 @@ class CasePdfService:
         )
         assets_dir = self.templates_path.parent / "assets"
         self.logos = self._load_logos(assets_dir)
+        # Motor de PDF intercambiable (chromium | reportlab)
+        self.renderer: PdfRenderer = get_pdf_renderer(settings.PDF_RENDERER, self.jinja_env)
 
     # Sanitizador básico de HTML para PDF
     def _sanitize_html(self, html: Optional[str]) -> Markup:
         """Sanitiza HTML permitiendo un subconjunto seguro de etiquetas y estilos.
-        Comentario: Mantiene alineaciones simples de texto y elimina scripts/eventos."""
-        if not html:
-            return Markup("")
-
-        # Remover bloques peligrosos (script/style)
-        clean = re.sub(r"(?is)<(script|style).*?>.*?</\\1>", "", html)
-
-        # Eliminar atributos de eventos (onload, onclick, etc.)
-        clean = re.sub(r"\son[a-zA-Z]+\s*=\s*(\".*?\"|\'.*?\'|[^\s>]+)", "", clean)
-
-        # Permitir solo ciertos estilos en style="..."
-        allowed_props = {"text-align", "font-weight", "font-style", "text-decoration"}
-
-        def _clean_style(match: re.Match) -> str:
-            style_val = match.group(1)
-            parts = [p.strip() for p in style_val.split(";") if p.strip()]
-            kept = []
-            for decl in parts:
-                if ":" not in decl:
-                    continue
-                prop, val = decl.split(":", 1)
-                prop = prop.strip().lower()
-                val = val.strip()
-                if prop in allowed_props:
-                    kept.append(f"{prop}: {val}")
-            return f' style="{"; ".join(kept)}"' if kept else ""
-
-        clean = re.sub(r"\sstyle\s*=\s*\"(.*?)\"", _clean_style, clean)
-        clean = re.sub(r"\sstyle\s*=\s*\'(.*?)\'", _clean_style, clean)
-
-        # Remover etiquetas no permitidas, conservar: div, span, br, p, b, strong, i, em, u, ul, ol, li
-        allowed_tags = {"div", "span", "br", "p", "b", "strong", "i", "em", "u", "ul", "ol", "li"}
-
-        def _filter_tag(match: re.Match) -> str:
-            tag_name = match.group(1).lower()
-            return match.group(0) if tag_name in allowed_tags else ""
-
-        clean = re.sub(r"</?([a-zA-Z0-9]+)(\b[^>]*)?>", _filter_tag, clean)
-        return Markup(clean)
+        Comentario: solo se usa para resultados guardados antes de sanitizar en escritura."""
+        return Markup(sanitize_html(html))
 
     def _load_logos(self, assets_dir: Path) -> Dict[str, str]:
         logos: Dict[str, str] = {}
@@ -88,60 +61,50 @@ class CasePdfService:
                 logos[key] = ""
         return logos
 
-    async def generate_case_pdf(self, case_code: str) -> bytes:
-        try:
-            from playwright.async_api import async_playwright  # type: ignore
-        except Exception as e:  # ImportError or runtime errors
-            raise RuntimeError(
-                "Playwright no está instalado o no se han instalado los navegadores. "
-                "Ejecuta: pip install playwright && playwright install chromium"
-            ) from e
+    async def build_report_context(self, case_code: str) -> Dict[str, Any]:
+        """Reúne caso, pruebas complementarias y firma para el informe.
+        Comentario: una sola lectura del caso; las aprobaciones se consultan en paralelo."""
 
-        # Obtener datos del caso
-        case_data = await self._get_case_data(case_code)
-        
-        # Obtener pruebas complementarias pendientes de aprobación
-        complementary_tests = await self._get_complementary_tests(case_code)
-        
-        # Obtener firma del patólogo
-        pathologist_signature = await self._get_pathologist_signature(case_data)
-        print(f"DEBUG: Firma obtenida: {'SÍ' if pathologist_signature else 'NO'}")
+        async def _case_with_signature() -> Tuple[dict, Optional[str]]:
+            with span("pdf.case_read", case_code=case_code):
+                case_data = await self._get_case_data(case_code)
+            with span("pdf.signature"):
+                return case_data, await self._get_pathologist_signature(case_data)
 
-        # Renderizar template
-        template = self.jinja_env.get_template("case_report.html")
-        html: str = await template.render_async(
-            case=case_data, 
-            pathologist_signature=pathologist_signature,
-            pruebas_complementarias=complementary_tests,
-            logos=self.logos
-        )
+        async def _complementary_tests() -> Optional[dict]:
+            with span("pdf.approvals"):
+                return await self._get_complementary_tests(case_code)
 
-        # Generar PDF
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            context = await browser.new_context()
-            page = await context.new_page()
-            await page.set_content(html, wait_until="load")
-            pdf_bytes = await page.pdf(
-                format="Letter",
-                margin={"top": "15mm", "right": "12mm", "bottom": "22mm", "left": "12mm"},
-                print_background=True,
-                display_header_footer=True,
-                header_template="<span></span>",
-                footer_template=(
-                    "<div style='font-family: Arial, sans-serif; font-size:10px; color:#000; width:100%; padding:0 15mm;'>"
-                    "<div style='text-align:center; font-style:italic; white-space:nowrap;'>"
-                    "Los informes de resultados, las placas y bloques de estudios anatomopatológicos se archivan por 15 años"
-                    "</div>"
-                    "<div style='border-top:1px solid #000; margin:2mm 0 0 0;'></div>"
-                    "<div style='text-align:right; font-weight:bold;'>Página <span class='pageNumber'></span> de <span class='totalPages'></span></div>"
-                    "</div>"
-                ),
+        with span("pdf.context", case_code=case_code):
+            (case_data, pathologist_signature), complementary_tests = await asyncio.gather(
+                _case_with_signature(),
+                _complementary_tests(),
             )
-            await context.close()
-            await browser.close()
 
-        return pdf_bytes
+        return {
+            "case": case_data,
+            "pathologist_signature": pathologist_signature,
+            "pruebas_complementarias": complementary_tests,
+            "file": self._build_filename(case_code, case_data.get("paciente", {}).get("nombre", "")),
+        }
+
+    def _build_filename(self, case_code: str, patient_name: str) -> Dict[str, str]:
+        """Nombre de archivo del PDF: versión ASCII segura y versión UTF-8 codificada."""
+        base_name = f"{case_code}-{patient_name or ''}".strip(" -") or f"{case_code}"
+        # Sanitizar para filename seguro (mantener letras, números, guiones, espacios, puntos y guion bajo)
+        safe_name = re.sub(r"[^\w\-. ]+", "", base_name).replace(" ", "_")
+        return {
+            "filename": f"{safe_name}.pdf",
+            "filename_utf8": quote(f"{base_name}.pdf"),
+        }
+
+    async def generate_case_pdf(self, case_code: str) -> Tuple[bytes, Dict[str, str]]:
+        """Genera el PDF del caso y retorna los bytes junto con los metadatos del archivo."""
+        with span("pdf.generate", case_code=case_code, renderer=self.renderer.name):
+            context_data = await self.build_report_context(case_code)
+            with span("pdf.render", renderer=self.renderer.name):
+                pdf_bytes = await self.renderer.render(context_data, self.logos)
+        return pdf_bytes, context_data["file"]
 
     async def _get_case_data(self, case_code: str) -> dict:
         """Obtener datos del caso y convertirlos al formato esperado por la plantilla"""
@@ -151,6 +114,9 @@ class CasePdfService:
         
         # Convertir CaseResponse a diccionario compatible con la plantilla
         case_dict = case.model_dump()
+        # sanitized_html se excluye de la serialización; el render sí lo necesita
+        if case.result is not None and case_dict.get('result') is not None:
+            case_dict['result']['sanitized_html'] = case.result.sanitized_html
         
         # Mapear campos del nuevo formato al formato esperado por la plantilla
         mapped_case = {
@@ -235,13 +201,20 @@ class CasePdfService:
         if not result:
             return None
 
+        # HTML sanitizado al guardar; los resultados antiguos se sanitizan aquí
+        sanitized = result.get('sanitized_html') or {}
+
+        def _html(field: str) -> Markup:
+            if field in sanitized:
+                return Markup(sanitized[field] or '')
+            return self._sanitize_html(result.get(field, ''))
+
         mapped_result = {
             'metodo': result.get('method', []),
-            # Sanitizar campos con posible HTML
-            'resultado_macro': self._sanitize_html(result.get('macro_result', '')),
-            'resultado_micro': self._sanitize_html(result.get('micro_result', '')),
-            'diagnostico': self._sanitize_html(result.get('diagnosis', '')),
-            'observaciones': self._sanitize_html(result.get('observations', '')),
+            'resultado_macro': _html('macro_result'),
+            'resultado_micro': _html('micro_result'),
+            'diagnostico': _html('diagnosis'),
+            'observaciones': _html('observations'),
             'updated_at': result.get('updated_at'),
             
             # Diagnósticos CIE-10 y CIE-O
@@ -270,23 +243,10 @@ class CasePdfService:
     async def _get_complementary_tests(self, case_code: str) -> Optional[dict]:
         """Obtener pruebas complementarias pendientes de aprobación"""
         try:
-            # Buscar solicitudes de aprobación para este caso
-            from app.modules.approvals.schemas.approval import ApprovalRequestSearch
-            from app.modules.approvals.models.approval_request import ApprovalStateEnum
-            
-            search_params = ApprovalRequestSearch(
-                original_case_code=case_code,
-                approval_state=ApprovalStateEnum.REQUEST_MADE
-            )
-            approval_requests = await self.approval_service.search_approvals(search_params)
-            
-            if not approval_requests or len(approval_requests) == 0:
-                # Intentar buscar en pending_approval también
-                search_params.approval_state = ApprovalStateEnum.PENDING_APPROVAL
-                approval_requests = await self.approval_service.search_approvals(search_params)
-                
-                if not approval_requests or len(approval_requests) == 0:
-                    return None
+            # Una sola consulta sobre ambos estados pendientes (request_made primero)
+            approval_requests = await self.approval_service.get_pending_approvals_for_case(case_code)
+            if not approval_requests:
+                return None
             
             # Tomar la primera solicitud pendiente
             approval = approval_requests[0]
@@ -317,9 +277,7 @@ class CasePdfService:
             return complementary_tests
             
         except Exception as e:
-            print(f"Error obteniendo pruebas complementarias: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Error obteniendo pruebas complementarias de %s: %s", case_code, e, exc_info=True)
             return None
 
     async def _get_pathologist_signature(self, case_data: dict) -> Optional[str]:
@@ -329,56 +287,44 @@ class CasePdfService:
             if not patologo_asignado:
                 # Para pruebas, usar un patólogo fijo que sabemos que tiene firma
                 pathologist_id = "1129564009"
-                print(f"DEBUG: No hay patólogo asignado, usando patólogo de prueba: {pathologist_id}")
+                logger.debug("Caso sin patólogo asignado, usando patólogo de prueba: %s", pathologist_id)
             else:
                 pathologist_id = patologo_asignado.get('codigo') or patologo_asignado.get('id')
                 if not pathologist_id:
                     return None
-                print(f"DEBUG: Patólogo asignado encontrado: {pathologist_id}")
             
-            # Buscar archivo de firma en la carpeta uploads/signatures/
-            import os
-            from pathlib import Path
+            # Lectura de disco fuera del event loop
+            return await asyncio.to_thread(self._read_signature_file, pathologist_id)
             
-            # Obtener la ruta base del proyecto
-            project_root = Path(__file__).parent.parent.parent.parent.parent
-            signatures_dir = project_root / "uploads" / "signatures"
+        except Exception as e:
+            logger.warning("Error obteniendo firma del patólogo: %s", e)
+            return None
+
+    def _read_signature_file(self, pathologist_id: str) -> Optional[str]:
+        """Buscar y codificar en base64 la firma del patólogo en uploads/signatures/"""
+        # Obtener la ruta base del proyecto
+        project_root = Path(__file__).parent.parent.parent.parent.parent
+        signatures_dir = project_root / "uploads" / "signatures"
+        
+        # Buscar archivos que contengan el ID del patólogo
+        signature_files = list(signatures_dir.glob(f"*{pathologist_id}*"))
+        
+        if signature_files:
+            # Tomar el primer archivo encontrado
+            signature_file = signature_files[0]
             
-            # Buscar archivos que contengan el ID del patólogo
-            signature_files = list(signatures_dir.glob(f"*{pathologist_id}*"))
-            print(f"DEBUG: Buscando firmas para ID: {pathologist_id}")
-            print(f"DEBUG: Directorio: {signatures_dir}")
-            print(f"DEBUG: Archivos encontrados: {signature_files}")
+            # Convertir a base64 para usar en HTML
+            import base64
             
-            if signature_files:
-                # Tomar el primer archivo encontrado
-                signature_file = signature_files[0]
-                
-                # Convertir a base64 para usar en HTML
-                import base64
+            with open(signature_file, "rb") as img_file:
+                img_data = img_file.read()
+                img_base64 = base64.b64encode(img_data).decode('utf-8')
                 
-                with open(signature_file, "rb") as img_file:
-                    img_data = img_file.read()
-                    img_base64 = base64.b64encode(img_data).decode('utf-8')
-                    
-                    # Obtener la extensión del archivo
-                    file_ext = signature_file.suffix.lower()
-                    if file_ext == '.png':
-                        result = f"data:image/png;base64,{img_base64}"
-                        print(f"DEBUG: Firma cargada exitosamente (PNG): {len(img_base64)} chars")
-                        return result
-                    elif file_ext == '.jpg' or file_ext == '.jpeg':
-                        result = f"data:image/jpeg;base64,{img_base64}"
-                        print(f"DEBUG: Firma cargada exitosamente (JPEG): {len(img_base64)} chars")
-                        return result
-                    else:
-                        result = f"data:image/png;base64,{img_base64}"
-                        print(f"DEBUG: Firma cargada exitosamente (default PNG): {len(img_base64)} chars")
-                        return result
-            
-            print(f"DEBUG: No se encontraron archivos de firma para ID: {pathologist_id}")
-            return None
-            
-        except Exception as e:
-            print(f"Error obteniendo firma del patólogo: {e}")
-            return None
+                # Obtener la extensión del archivo
+                file_ext = signature_file.suffix.lower()
+                if file_ext == '.jpg' or file_ext == '.jpeg':
+                    return f"data:image/jpeg;base64,{img_base64}"
+                return f"data:image/png;base64,{img_base64}"
+        
+        logger.debug("No se encontraron archivos de firma para el patólogo %s", pathologist_id)
+        return None
@@ -4,6 +4,7 @@ from app.core.exceptions import NotFoundError, BadRequestError
 from app.modules.cases.schemas.result import ResultUpdate, ResultResponse
 from app.modules.cases.schemas.case import CaseResponse
 from app.modules.cases.repositories.result_repository import ResultRepository
+from app.modules.cases.services.html_sanitizer import sanitize_result_fields
 
 
 class ResultService:
@@ -60,6 +61,11 @@ class ResultService:
         for field, value in payload_dict.items():
             if value is not None:
                 result_data[field] = value
+
+        # Guardar el HTML sanitizado junto al original para no sanitizar en cada lectura
+        sanitized = sanitize_result_fields(result_data)
+        if sanitized:
+            result_data["sanitized_html"] = sanitized
         
         # Actualizar el resultado
         updated_doc = await self.repo.update_result(case_code, result_data)
@@ -124,6 +130,8 @@ class ResultService:
             "delivered_to": doc.get("delivered_to"),
             "delivered_at": doc.get("delivered_at"),
             "business_days": doc.get("business_days"),
+            "sla_days": doc.get("sla_days"),
+            "due_at": doc.get("due_at"),
             "additional_notes": doc.get("additional_notes") or [],
             "complementary_tests": doc.get("complementary_tests") or [],
         }
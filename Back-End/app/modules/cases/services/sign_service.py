@@ -5,12 +5,18 @@ from app.core.exceptions import NotFoundError, BadRequestError
 from app.modules.cases.schemas.sign import CaseSignRequest, CaseSignResponse, CaseSignValidation
 from app.modules.cases.schemas.case import CaseResponse
 from app.modules.cases.repositories.sign_repository import SignRepository
+from app.modules.cases.repositories.statistics.rollup_repository import CaseStatsRollupRepository
+from app.modules.cases.repositories.workload_repository import WorkloadRepository
+from app.modules.cases.services.statistics.stats_cache import stats_cache
+from app.modules.cases.services.html_sanitizer import sanitize_result_fields
 
 
 class SignService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.repo = SignRepository(db)
+        self.rollups = CaseStatsRollupRepository(db)
+        self.workload = WorkloadRepository(db)
 
     async def sign_case(self, case_code: str, payload: CaseSignRequest) -> CaseResponse:
         """Firmar un caso cambiando su estado de 'Por firmar' a 'Por entregar'"""
@@ -30,12 +36,20 @@ class SignService:
         for field, value in payload_dict.items():
             if value is not None:
                 sign_data[field] = value
+
+        # Guardar el HTML sanitizado junto al original para no sanitizar en cada lectura
+        sanitized = sanitize_result_fields(sign_data)
+        if sanitized:
+            sign_data["sanitized_html"] = sanitized
         
-        # Firmar el caso
-        updated_doc = await self.repo.sign_case(case_code, sign_data)
+        # Firmar el caso; el estado previo (de la misma escritura) mueve sus contadores en los rollups
+        previous_doc, updated_doc = await self.repo.sign_case_with_previous(case_code, sign_data)
         
         if not updated_doc:
             raise NotFoundError(f"Caso con código {case_code} no encontrado")
+        await self.rollups.apply_change(previous_doc, updated_doc)
+        await self.workload.apply_change(previous_doc, updated_doc)
+        await stats_cache.invalidate_case_change(previous_doc, updated_doc)
         
         # Convertir a CaseResponse
         return self._to_case_response(updated_doc)
@@ -135,6 +149,8 @@ class SignService:
             "delivered_to": doc.get("delivered_to"),
             "delivered_at": doc.get("delivered_at"),
             "business_days": doc.get("business_days"),
+            "sla_days": doc.get("sla_days"),
+            "due_at": doc.get("due_at"),
             "additional_notes": doc.get("additional_notes") or [],
             "complementary_tests": doc.get("complementary_tests") or [],
         }
@@ -1,8 +1,11 @@
 # Dashboard Statistics Service
-from typing import Dict, Any
+import asyncio
+import time
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.exceptions import BadRequestError
+from app.core.tracing import record_phases, span
 from app.modules.cases.schemas.statistics.dashboard_statistics_schemas import (
     CasesByMonthResponse,
     DashboardOverviewResponse,
@@ -10,12 +13,19 @@ from app.modules.cases.schemas.statistics.dashboard_statistics_schemas import (
     OpportunityResponse
 )
 from app.modules.cases.repositories.statistics.dashboard_statistics_repository import DashboardStatisticsRepository
+from app.modules.cases.services.statistics.opportunity_statistics_service import OpportunityStatisticsService
+from app.modules.cases.services.statistics.stats_cache import stats_cache, year_months
+
+# Widgets del bundle del dashboard; el resumen (overview) es del laboratorio y no tiene vista por patólogo
+DASHBOARD_WIDGETS = ("overview", "cases_by_month", "metrics", "opportunity")
+PATHOLOGIST_WIDGETS = ("cases_by_month", "metrics", "opportunity")
 
 
 class DashboardStatisticsService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.repo = DashboardStatisticsRepository(db)
+        self.opportunity = OpportunityStatisticsService(db)
 
     async def get_cases_by_month(self, year: int) -> CasesByMonthResponse:
         """Obtener estadísticas de casos por mes para un año específico"""
@@ -25,7 +35,10 @@ class DashboardStatisticsService:
             raise BadRequestError(f"Año debe estar entre 2020 y {current_year + 1}")
         
         try:
-            result = await self.repo.get_cases_by_month(year)
+            result = await stats_cache.get_or_compute(
+                "dashboard.cases_by_month", {"year": year},
+                lambda: self.repo.get_cases_by_month(year), months=year_months(year)
+            )
             return CasesByMonthResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener estadísticas por mes: {str(e)}")
@@ -42,7 +55,11 @@ class DashboardStatisticsService:
             raise BadRequestError("Código de patólogo es requerido")
         
         try:
-            result = await self.repo.get_cases_by_month_pathologist(year, pathologist_code.strip())
+            code = pathologist_code.strip()
+            result = await stats_cache.get_or_compute(
+                "dashboard.cases_by_month_pathologist", {"year": year, "pathologist": code},
+                lambda: self.repo.get_cases_by_month_pathologist(year, code), months=year_months(year)
+            )
             return CasesByMonthResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener estadísticas por mes del patólogo: {str(e)}")
@@ -50,7 +67,7 @@ class DashboardStatisticsService:
     async def get_dashboard_overview(self) -> DashboardOverviewResponse:
         """Obtener resumen general del dashboard"""
         try:
-            result = await self.repo.get_dashboard_overview()
+            result = await stats_cache.get_or_compute("dashboard.overview", {}, self.repo.get_dashboard_overview)
             return DashboardOverviewResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener resumen del dashboard: {str(e)}")
@@ -58,7 +75,7 @@ class DashboardStatisticsService:
     async def get_metrics_general(self) -> MetricsResponse:
         """Obtener métricas generales del laboratorio"""
         try:
-            result = await self.repo.get_metrics_general()
+            result = await stats_cache.get_or_compute("dashboard.metrics_general", {}, self.repo.get_metrics_general)
             return MetricsResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener métricas generales: {str(e)}")
@@ -70,13 +87,110 @@ class DashboardStatisticsService:
             raise BadRequestError("Código de patólogo es requerido")
         
         try:
-            result = await self.repo.get_metrics_pathologist(pathologist_code.strip())
+            code = pathologist_code.strip()
+            result = await stats_cache.get_or_compute(
+                "dashboard.metrics_pathologist", {"pathologist": code},
+                lambda: self.repo.get_metrics_pathologist(code)
+            )
             return MetricsResponse(**result)
         except Exception as e:
             raise BadRequestError(f"Error al obtener métricas del patólogo: {str(e)}")
 
     # Eliminadas funciones de oportunidad (se van a rehacer)
 
+    async def get_bundle(
+        self,
+        widgets: Optional[str] = None,
+        year: Optional[int] = None,
+        pathologist_code: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Todos los widgets pedidos del dashboard en una sola respuesta, calculados en paralelo.
+        Un widget que falla no tumba a los demás: su error queda en "errors"."""
+        code = pathologist_code.strip() if pathologist_code and pathologist_code.strip() else None
+        allowed = PATHOLOGIST_WIDGETS if code else DASHBOARD_WIDGETS
+        requested = self._parse_widgets(widgets, allowed)
+        current_year = datetime.now().year
+        if year is not None and (year < 2020 or year > current_year + 1):
+            raise BadRequestError(f"Año debe estar entre 2020 y {current_year + 1}")
+        year = year or current_year
+
+        jobs: Dict[str, Any] = {}
+        if "cases_by_month" in requested:
+            jobs["cases_by_month"] = (
+                lambda: self.get_cases_by_month_pathologist(year, code)
+            ) if code else (lambda: self.get_cases_by_month(year))
+        if "metrics" in requested:
+            jobs["metrics"] = (lambda: self.get_metrics_pathologist(code)) if code else self.get_metrics_general
+        if "opportunity" in requested:
+            jobs["opportunity"] = (lambda: self.opportunity.get_by_pathologist(code)) if code else self.opportunity.get_general
+        # Los conteos del mes actual/anterior del resumen son los mismos "casos" de las métricas generales:
+        # si se piden ambos, el resumen solo agrega el conteo por estado y reutiliza las métricas
+        share_month_counts = "overview" in requested and "metrics" in requested
+        if "overview" in requested:
+            jobs["overview"] = self._overview_state_counts if share_month_counts else self.get_dashboard_overview
+
+        started = time.perf_counter()
+        with record_phases() as phases:
+            names = list(jobs)
+            outcomes = await asyncio.gather(*(self._run_widget(name, jobs[name]) for name in names))
+        data: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, (value, error) in zip(names, outcomes):
+            if error is None:
+                data[name] = value
+            else:
+                errors[name] = error
+
+        if share_month_counts and "overview" in data:
+            state_counts = data.pop("overview")
+            if "metrics" in data:
+                casos = data["metrics"].casos
+                data["overview"] = DashboardOverviewResponse(
+                    **self.repo.build_overview(casos.mes_actual, casos.mes_anterior, state_counts)
+                )
+            else:
+                errors["overview"] = errors.get("metrics", "métricas no disponibles")
+
+        return {
+            "scope": "pathologist" if code else "general",
+            "pathologist_code": code,
+            "year": year,
+            "widgets": {name: data[name] for name in requested if name in data},
+            "errors": errors,
+            "meta": {
+                "timings_ms": {name: round(phases.get(f"dashboard.{name}", {}).get("ms", 0.0), 1) for name in names},
+                "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                "shared_month_counts": share_month_counts,
+            },
+        }
+
+    async def _run_widget(self, name: str, compute) -> tuple:
+        try:
+            with span(f"dashboard.{name}"):
+                return await compute(), None
+        except Exception as e:
+            return None, str(e)
+
+    async def _overview_state_counts(self) -> Dict[Any, int]:
+        return await stats_cache.get_or_compute("dashboard.state_counts", {}, self.repo.get_state_counts)
+
+    def _parse_widgets(self, widgets: Optional[str], allowed: tuple) -> List[str]:
+        # "overview,metrics" -> ["overview", "metrics"]; sin valor, todos los del alcance
+        if not widgets:
+            return list(allowed)
+        requested: List[str] = []
+        for raw in widgets.split(","):
+            name = raw.strip()
+            if not name:
+                continue
+            if name not in allowed:
+                raise BadRequestError(f"Widget no disponible: {name}. Opciones: {', '.join(allowed)}")
+            if name not in requested:
+                requested.append(name)
+        if not requested:
+            raise BadRequestError("Debe indicar al menos un widget")
+        return requested
+
     async def validate_pathologist_exists(self, pathologist_code: str) -> bool:
         """Validar que el patólogo existe en el sistema"""
         try:
@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional
 from app.modules.cases.repositories.statistics.entity_statistics_repository import EntityStatisticsRepository
+from app.modules.cases.services.statistics.stats_cache import stats_cache
 
 
 class EntityStatisticsService:
@@ -23,10 +24,12 @@ class EntityStatisticsService:
         if year < 2020 or year > 2030:
             raise ValueError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_monthly_entity_performance(
-            month=month,
-            year=year,
-            entity_name=entity_name
+        entity_key = await self.repository.entity_filter.cache_key(entity_name)
+        return await stats_cache.get_or_compute(
+            "entities.monthly_performance",
+            {"month": month, "year": year, "entity": entity_key},
+            lambda: self.repository.get_monthly_entity_performance(month=month, year=year, entity_name=entity_name),
+            months=[(year, month)]
         )
     
     async def get_entity_details(
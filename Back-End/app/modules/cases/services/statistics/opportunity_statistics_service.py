@@ -1,19 +1,34 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 from datetime import datetime, timezone
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.exceptions import BadRequestError
 from app.modules.cases.repositories.statistics.opportunity_statistics_repository import OpportunityStatisticsRepository
+from app.modules.cases.repositories.statistics.tat_sketch import DEFAULT_PERCENTILES
+from app.modules.cases.repositories.statistics.turnaround_statistics_repository import (
+    GROUP_FIELDS,
+    TurnaroundStatisticsRepository,
+)
 from app.modules.cases.schemas.statistics.dashboard_statistics_schemas import OpportunityResponse, OpportunityMetrics
+from app.modules.cases.services.statistics.stats_cache import stats_cache, year_months
+
+# Años adicionales permitidos en la comparación de la serie anual
+MAX_COMPARE_YEARS = 5
+# Percentiles distintos que se pueden pedir en una consulta
+MAX_PERCENTILES = 10
 
 
 class OpportunityStatisticsService:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.repo = OpportunityStatisticsRepository(db)
+        self.turnaround_repo = TurnaroundStatisticsRepository(db)
 
     async def get_general(self, opportunity_days_threshold: int = 7) -> OpportunityResponse:
         try:
-            data: Dict[str, Any] = await self.repo.get_opportunity_general(opportunity_days_threshold)
+            data: Dict[str, Any] = await stats_cache.get_or_compute(
+                "opportunity.general", {"threshold": opportunity_days_threshold},
+                lambda: self.repo.get_opportunity_general(opportunity_days_threshold)
+            )
             return OpportunityResponse(oportunity=OpportunityMetrics(**data))
         except Exception as e:
             raise BadRequestError(f"Error obteniendo oportunidad general: {str(e)}")
@@ -22,7 +37,11 @@ class OpportunityStatisticsService:
         if not pathologist_code or len(pathologist_code.strip()) == 0:
             raise BadRequestError("Código de patólogo es requerido")
         try:
-            data: Dict[str, Any] = await self.repo.get_opportunity_pathologist(pathologist_code.strip(), opportunity_days_threshold)
+            code = pathologist_code.strip()
+            data: Dict[str, Any] = await stats_cache.get_or_compute(
+                "opportunity.pathologist", {"pathologist": code, "threshold": opportunity_days_threshold},
+                lambda: self.repo.get_opportunity_pathologist(code, opportunity_days_threshold)
+            )
             return OpportunityResponse(oportunity=OpportunityMetrics(**data))
         except Exception as e:
             raise BadRequestError(f"Error obteniendo oportunidad por patólogo: {str(e)}")
@@ -46,21 +65,65 @@ class OpportunityStatisticsService:
         if threshold_days < 1 or threshold_days > 60:
             raise BadRequestError("thresholdDays must be between 1 and 60")
         try:
-            return await self.repo.get_monthly_opportunity(month, year, threshold_days, entity, pathologist)
+            entity_key = await self.repo.entity_filter.cache_key(entity)
+            return await stats_cache.get_or_compute(
+                "opportunity.monthly",
+                {"month": month, "year": year, "threshold": threshold_days, "entity": entity_key, "pathologist": pathologist},
+                lambda: self.repo.get_monthly_opportunity(month, year, threshold_days, entity, pathologist),
+                months=[(year, month)]
+            )
         except Exception as e:
             raise BadRequestError(f"Error computing monthly opportunity: {str(e)}")
 
-    async def get_yearly(self, year: int, threshold_days: int = 7) -> Dict[str, Any]:
+    async def get_yearly(
+        self,
+        year: int,
+        threshold_days: int = 7,
+        entity: str = None,
+        pathologist: str = None,
+        compare_years: str = None,
+    ) -> Dict[str, Any]:
         current_year = datetime.now(timezone.utc).year
         if year < 2020 or year > current_year + 1:
             raise BadRequestError(f"year must be between 2020 and {current_year + 1}")
         if threshold_days < 1 or threshold_days > 60:
             raise BadRequestError("thresholdDays must be between 1 and 60")
+        comparison = self._parse_compare_years(compare_years, year, current_year)
         try:
-            arr = await self.repo.get_yearly_opportunity(year, threshold_days)
-            return {"percentageByMonth": arr}
+            years = [year, *comparison]
+            entity_key = await self.repo.entity_filter.cache_key(entity)
+            series = await stats_cache.get_or_compute(
+                "opportunity.yearly",
+                {"years": years, "threshold": threshold_days, "entity": entity_key, "pathologist": pathologist},
+                lambda: self.repo.get_yearly_opportunity_series(years, threshold_days, entity, pathologist),
+                months=year_months(*years)
+            )
         except Exception as e:
             raise BadRequestError(f"Error computing yearly opportunity: {str(e)}")
+        result: Dict[str, Any] = {"percentageByMonth": series[year]}
+        if comparison:
+            result["comparison"] = [{"year": y, "percentageByMonth": series[y]} for y in comparison]
+        return result
+
+    def _parse_compare_years(self, compare_years: str, year: int, current_year: int) -> List[int]:
+        # "2023,2024" -> [2023, 2024]; se ignoran repetidos y el año principal
+        if not compare_years:
+            return []
+        years: List[int] = []
+        for raw in compare_years.split(","):
+            raw = raw.strip()
+            if not raw:
+                continue
+            if not raw.isdigit():
+                raise BadRequestError("compareYears must be a comma-separated list of years")
+            value = int(raw)
+            if value < 2020 or value > current_year + 1:
+                raise BadRequestError(f"compareYears must be between 2020 and {current_year + 1}")
+            if value != year and value not in years:
+                years.append(value)
+        if len(years) > MAX_COMPARE_YEARS:
+            raise BadRequestError(f"compareYears supports at most {MAX_COMPARE_YEARS} years")
+        return years
 
     async def get_pathologists(
         self,
@@ -82,3 +145,56 @@ class OpportunityStatisticsService:
         data = await self.get_monthly(month, year, threshold_days, entity, None)
         return {"tests": data.get("tests", [])}
 
+
+    async def get_percentiles(
+        self,
+        year: int,
+        month: int = None,
+        group_by: str = None,
+        entity: str = None,
+        pathologist: str = None,
+        test: str = None,
+        percentiles: str = None,
+    ) -> Dict[str, Any]:
+        current_year = datetime.now(timezone.utc).year
+        if year < 2020 or year > current_year + 1:
+            raise BadRequestError(f"year must be between 2020 and {current_year + 1}")
+        if month is not None and (month < 1 or month > 12):
+            raise BadRequestError("month must be between 1 and 12")
+        if group_by is not None and group_by not in GROUP_FIELDS:
+            raise BadRequestError(f"groupBy must be one of: {', '.join(GROUP_FIELDS)}")
+        values = self._parse_percentiles(percentiles)
+        try:
+            return await stats_cache.get_or_compute(
+                "opportunity.percentiles",
+                {
+                    "year": year, "month": month, "group_by": group_by, "entity": entity,
+                    "pathologist": pathologist, "test": test, "percentiles": values,
+                },
+                lambda: self.turnaround_repo.get_percentiles(year, month, group_by, entity, pathologist, test, values),
+                months=[(year, month)] if month else year_months(year)
+            )
+        except ValueError as e:
+            # Solo los parámetros inválidos son 400; los fallos de base de datos llegan al manejador de 500
+            raise BadRequestError(f"Error computing turnaround percentiles: {str(e)}")
+
+    def _parse_percentiles(self, percentiles: str) -> List[float]:
+        # "50,90,99.5" -> [50.0, 90.0, 99.5]
+        if not percentiles:
+            return list(DEFAULT_PERCENTILES)
+        values: List[float] = []
+        for raw in percentiles.split(","):
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                value = float(raw)
+            except ValueError:
+                raise BadRequestError("percentiles must be a comma-separated list of numbers")
+            if value <= 0 or value > 100:
+                raise BadRequestError("percentiles must be greater than 0 and at most 100")
+            if value not in values:
+                values.append(value)
+        if not values or len(values) > MAX_PERCENTILES:
+            raise BadRequestError(f"percentiles supports between 1 and {MAX_PERCENTILES} values")
+        return sorted(values)
@@ -0,0 +1,115 @@
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics.pivot_statistics_repository import (
+    BASIS_DATE_FIELDS,
+    PIVOT_DIMENSIONS,
+    PIVOT_MEASURES,
+    PivotStatisticsRepository,
+)
+from app.modules.cases.services.statistics.stats_cache import stats_cache
+
+# Límites de la consulta parametrizada; acotan la cardinalidad antes de consultar MongoDB
+MAX_PIVOT_DIMENSIONS = 4
+MAX_PIVOT_MONTHS = 36
+
+
+class PivotStatisticsService:
+    """Estadísticas con dimensiones, medidas y filtros a elección (ver PivotStatisticsRepository)."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.repo = PivotStatisticsRepository(db)
+
+    async def pivot(
+        self,
+        dimensions: str,
+        measures: str,
+        start: str,
+        end: Optional[str] = None,
+        basis: str = "signed",
+        entity: Optional[str] = None,
+        pathologist: Optional[str] = None,
+        test: Optional[str] = None,
+        care_type: Optional[str] = None,
+        state: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        dimension_list = self._parse_list(dimensions, PIVOT_DIMENSIONS, "Dimensión")
+        measure_list = self._parse_list(measures, PIVOT_MEASURES, "Medida") or ["count"]
+        if not dimension_list:
+            raise BadRequestError("Debe indicar al menos una dimensión")
+        if len(dimension_list) > MAX_PIVOT_DIMENSIONS:
+            raise BadRequestError(f"Máximo {MAX_PIVOT_DIMENSIONS} dimensiones por consulta")
+        if basis not in BASIS_DATE_FIELDS:
+            raise BadRequestError("La base debe ser 'signed' o 'created'")
+        if "samples" in measure_list and ("test" in dimension_list or test):
+            raise BadRequestError("La medida samples no aplica cuando se agrupa o filtra por prueba")
+
+        first = self._parse_month(start, "from")
+        last = self._parse_month(end, "to") if end else first
+        months = self._month_range(first, last)
+
+        # Llave con los códigos resueltos: código, alias o nombre comparten el mismo resultado
+        params = {
+            "dimensions": dimension_list, "measures": measure_list, "from": first, "to": last, "basis": basis,
+            "entity": await self.repo.entity_filter.cache_key(entity),
+            "pathologist": await self.repo.pathologist_filter.cache_key(pathologist),
+            "test": test, "care_type": care_type, "state": state,
+        }
+        result = await stats_cache.get_or_compute(
+            "pivot",
+            params,
+            lambda: self.repo.pivot(
+                dimension_list, measure_list, first, last, basis,
+                entity=entity, pathologist=pathologist, test=test, care_type=care_type, state=state,
+            ),
+            months=months,
+        )
+        return {
+            "dimensions": dimension_list,
+            "measures": measure_list,
+            "basis": basis,
+            "from": f"{first[0]:04d}-{first[1]:02d}",
+            "to": f"{last[0]:04d}-{last[1]:02d}",
+            "source": result["source"],
+            "groups": len(result["rows"]),
+            "rows": result["rows"],
+        }
+
+    @staticmethod
+    def _parse_list(raw: Optional[str], allowed: Dict[str, Any], label: str) -> List[str]:
+        values: List[str] = []
+        for item in (raw or "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            if item not in allowed:
+                raise BadRequestError(f"{label} no soportada: {item}. Use: {', '.join(allowed)}")
+            if item not in values:
+                values.append(item)
+        return values
+
+    @staticmethod
+    def _parse_month(value: str, label: str) -> Tuple[int, int]:
+        try:
+            year_text, month_text = (value or "").strip().split("-")
+            year, month = int(year_text), int(month_text)
+        except ValueError:
+            raise BadRequestError(f"'{label}' debe tener el formato AAAA-MM")
+        if not 1 <= month <= 12:
+            raise BadRequestError(f"El mes de '{label}' debe estar entre 1 y 12")
+        if year < 2020 or year > 2030:
+            raise BadRequestError("El año debe estar entre 2020 y 2030")
+        return year, month
+
+    @staticmethod
+    def _month_range(first: Tuple[int, int], last: Tuple[int, int]) -> List[Tuple[int, int]]:
+        if last < first:
+            raise BadRequestError("'to' no puede ser anterior a 'from'")
+        months = []
+        year, month = first
+        while (year, month) <= last:
+            months.append((year, month))
+            if len(months) > MAX_PIVOT_MONTHS:
+                raise BadRequestError(f"El rango no puede superar {MAX_PIVOT_MONTHS} meses")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
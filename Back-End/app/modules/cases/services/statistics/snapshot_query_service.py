@@ -0,0 +1,190 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from app.config.settings import settings
+from app.core.exceptions import BadRequestError, NotFoundError
+from app.modules.cases.repositories.statistics.case_snapshot import CaseSnapshotStore
+from app.modules.cases.repositories.statistics.tat_sketch import MAX_TRACKED_DAYS
+
+# Dimensión del pivote -> columna del snapshot (month/year se derivan de la fecha de la base elegida)
+PIVOT_DIMENSIONS = {
+    "entity": "entity_code",
+    "pathologist": "pathologist_code",
+    "test": "test_code",
+    "care_type": "care_type",
+    "state": "state",
+    "year": "year",
+    "month": "month",
+    "tat_days": "tat_days",
+}
+# Nombre legible que acompaña a las dimensiones con código
+DIMENSION_NAMES = {"entity": "entity_name", "pathologist": "pathologist_name", "test": "test_name"}
+PIVOT_MEASURES = ("cases", "tests", "tat_mean", "tat_median", "tat_p90", "within_pct")
+# Medidas que son conteos: se devuelven como enteros aunque unstack las convierta a float
+COUNT_MEASURES = ("cases", "tests")
+PIVOT_BASES = ("signed", "created")
+MAX_PIVOT_ROWS = 5000
+
+
+class SnapshotQueryService:
+    """Tablas cruzadas sobre el snapshot columnar de casos, calculadas con pandas en memoria.
+
+    El DataFrame se carga una vez por versión del snapshot; cada consulta corre en un hilo aparte
+    para no bloquear el event loop y no toca MongoDB."""
+
+    def __init__(self, store: CaseSnapshotStore):
+        self.store = store
+        self._frame = None
+        self._version: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def status(self) -> Dict[str, Any]:
+        manifest = self.store.read_manifest()
+        return {
+            "version": manifest["version"],
+            "watermark": manifest["watermark"],
+            "parts": len(manifest["parts"]),
+            "rows": manifest["rows"],
+            "exportedAt": manifest.get("exported_at"),
+        }
+
+    async def _load_frame(self):
+        manifest = self.store.read_manifest()
+        if not manifest["parts"]:
+            raise NotFoundError("No hay snapshot de casos; ejecute Scripts/export_cases_snapshot.py")
+        if self._frame is None or self._version != manifest["version"]:
+            async with self._lock:
+                if self._frame is None or self._version != manifest["version"]:
+                    table = await asyncio.to_thread(self.store.load_table, manifest)
+                    self._frame = await asyncio.to_thread(table.to_pandas)
+                    self._version = manifest["version"]
+        return self._frame, manifest
+
+    async def pivot(
+        self,
+        rows: List[str],
+        columns: Optional[str] = None,
+        measure: str = "cases",
+        basis: str = "signed",
+        year: Optional[int] = None,
+        month: Optional[int] = None,
+        entity: Optional[str] = None,
+        pathologist: Optional[str] = None,
+        test: Optional[str] = None,
+        state: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        rows = [r for r in rows if r]
+        if not rows:
+            raise BadRequestError("Debe indicar al menos una dimensión en rows")
+        for dimension in rows + ([columns] if columns else []):
+            if dimension not in PIVOT_DIMENSIONS:
+                raise BadRequestError(f"Dimensión no soportada: {dimension}. Use: {', '.join(PIVOT_DIMENSIONS)}")
+        if columns and columns in rows:
+            raise BadRequestError("La dimensión de columns no puede repetirse en rows")
+        if measure not in PIVOT_MEASURES:
+            raise BadRequestError(f"Medida no soportada: {measure}. Use: {', '.join(PIVOT_MEASURES)}")
+        if basis not in PIVOT_BASES:
+            raise BadRequestError("La base debe ser 'signed' o 'created'")
+        if month is not None and not 1 <= month <= 12:
+            raise BadRequestError("El mes debe estar entre 1 y 12")
+
+        frame, manifest = await self._load_frame()
+        filters = {"year": year, "month": month, "entity_code": entity, "pathologist_code": pathologist,
+                   "test_code": test, "state": state}
+        result = await asyncio.to_thread(pivot_frame, frame, rows, columns, measure, basis, filters)
+        result["snapshot"] = {"version": manifest["version"], "watermark": manifest["watermark"]}
+        return result
+
+
+def pivot_frame(
+    frame,
+    rows: List[str],
+    columns: Optional[str],
+    measure: str,
+    basis: str,
+    filters: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Calcula el pivote sobre un DataFrame con las columnas del snapshot (una fila por caso-prueba)."""
+    import pandas as pd
+
+    date_column = "signed_at" if basis == "signed" else "created_at"
+    df = frame[frame[date_column].notna()]
+    dates = pd.to_datetime(df[date_column])
+    df = df.assign(
+        year=dates.dt.year,
+        month=dates.dt.month,
+        tat_days=df["business_days"].round().clip(0, MAX_TRACKED_DAYS),
+    )
+    for column, value in filters.items():
+        if value is not None and value != "":
+            df = df[df[column] == value]
+
+    dimensions = rows + ([columns] if columns else [])
+    keys = [PIVOT_DIMENSIONS[d] for d in dimensions]
+    # Sin la prueba como dimensión, las medidas por caso cuentan cada caso una sola vez
+    if measure != "tests" and "test" not in dimensions:
+        df = df.drop_duplicates("case_code")
+    if measure in ("tat_mean", "tat_median", "tat_p90"):
+        df = df[df["business_days"].notna()]
+
+    grouped = df.groupby(keys, dropna=False, sort=True)
+    if measure == "cases":
+        values = grouped["case_code"].nunique()
+    elif measure == "tests":
+        values = grouped.size()
+    elif measure == "tat_mean":
+        values = grouped["business_days"].mean().round(2)
+    elif measure == "tat_median":
+        values = grouped["business_days"].median()
+    elif measure == "tat_p90":
+        values = grouped["business_days"].quantile(0.9, interpolation="higher")
+    else:
+        values = (grouped["within_opportunity"].mean() * 100).round(2)
+
+    names = {}
+    for dimension in dimensions:
+        if dimension in DIMENSION_NAMES and not df.empty:
+            column = PIVOT_DIMENSIONS[dimension]
+            names[dimension] = df.dropna(subset=[column]).groupby(column)[DIMENSION_NAMES[dimension]].first().to_dict()
+
+    cast = int if measure in COUNT_MEASURES else float
+
+    def label(dimension: str, value: Any) -> Dict[str, Any]:
+        value = None if pd.isna(value) else (value.item() if hasattr(value, "item") else value)
+        item = {"value": value}
+        if dimension in names:
+            item["name"] = names[dimension].get(value) or value
+        return item
+
+    if columns:
+        table = values.unstack(level=-1)
+        column_values = list(table.columns)
+        data = []
+        for index, series in table.iterrows():
+            index = index if isinstance(index, tuple) else (index,)
+            data.append({
+                "keys": {d: label(d, v) for d, v in zip(rows, index)},
+                "values": {str(label(columns, c)["value"]): (None if pd.isna(v) else cast(v)) for c, v in series.items()},
+            })
+        columns_out = [label(columns, c) for c in column_values]
+    else:
+        data = []
+        for index, value in values.items():
+            index = index if isinstance(index, tuple) else (index,)
+            data.append({"keys": {d: label(d, v) for d, v in zip(rows, index)}, "value": cast(value)})
+        columns_out = []
+
+    truncated = len(data) > MAX_PIVOT_ROWS
+    return {
+        "rows": rows,
+        "columns": columns,
+        "columnValues": columns_out,
+        "measure": measure,
+        "basis": basis,
+        "data": data[:MAX_PIVOT_ROWS],
+        "truncated": truncated,
+        "matchedRows": int(len(df)),
+    }
+
+
+# Instancia compartida por proceso: conserva el DataFrame entre consultas
+snapshot_queries = SnapshotQueryService(CaseSnapshotStore(settings.CASES_SNAPSHOT_DIR))
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.config.settings import settings
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics.closed_month_store import (
+    ClosedMonthStore,
+    Month,
+    closed_months_back,
+    is_closed_month,
+)
+from app.modules.cases.repositories.statistics.entity_statistics_repository import EntityStatisticsRepository
+from app.modules.cases.repositories.statistics.pathologist_statistics_repository import PathologistStatisticsRepository
+from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+from app.modules.cases.services.statistics.entity_statistics_service import EntityStatisticsService
+from app.modules.cases.services.statistics.opportunity_statistics_service import OpportunityStatisticsService
+from app.modules.cases.services.statistics.pathologist_statistics_service import PathologistStatisticsService
+from app.modules.cases.services.statistics.stats_cache import stats_cache
+from app.modules.cases.services.statistics.test_statistics_service import TestStatisticsService
+
+logger = logging.getLogger(__name__)
+
+# Resultados mensuales que se persisten y pre-calculan para los meses cerrados
+PREWARM_NAMESPACES = (
+    "opportunity.monthly",
+    "tests.monthly_performance",
+    "entities.monthly_performance",
+    "pathologists.monthly_performance",
+)
+# Consultas simultáneas contra MongoDB durante el pre-cálculo de un mes
+PREWARM_CONCURRENCY = 4
+
+
+class StatisticsPrewarmer:
+    """Pre-calcula las estadísticas mensuales de un mes cerrado: el resultado general y el de cada
+    entidad con casos completados en el mes (la tabla de pruebas incluye todas las pruebas).
+
+    Usa los mismos servicios que las rutas, así que los resultados quedan persistidos con las mismas
+    llaves con las que se consultan: los servicios resuelven la entidad a sus códigos antes de armar
+    la llave, y el código que se pre-calcula coincide con el nombre que envía el Front-End. No hay
+    variantes por patólogo: los reportes mensuales no filtran por patólogo."""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.store = ClosedMonthStore(db)
+        self.opportunity = OpportunityStatisticsService(db)
+        self.tests = TestStatisticsService(TestStatisticsRepository(db))
+        self.entities = EntityStatisticsService(EntityStatisticsRepository(db))
+        self.pathologists = PathologistStatisticsService(PathologistStatisticsRepository(db))
+
+    async def prewarm_month(self, year: int, month: int) -> Dict[str, Any]:
+        if not is_closed_month((year, month)):
+            raise BadRequestError("Solo se pre-calculan meses cerrados")
+        # Descarta lo guardado del mes para recalcularlo con los datos actuales
+        await stats_cache.invalidate_months([(year, month)])
+        entities = await self._entities(year, month)
+        generation = stats_cache.generation([(year, month)])
+        store_errors = stats_cache.metrics()["store_errors"]
+
+        jobs: List[Callable[[], Awaitable[Any]]] = [
+            lambda: self.opportunity.get_monthly(month, year),
+            lambda: self.tests.get_monthly_test_performance(month, year),
+            lambda: self.entities.get_monthly_performance(month, year),
+            lambda: self.pathologists.get_monthly_performance(month, year),
+        ]
+        for entity in entities:
+            jobs += [
+                lambda e=entity: self.opportunity.get_monthly(month, year, entity=e),
+                lambda e=entity: self.tests.get_monthly_test_performance(month, year, e),
+                lambda e=entity: self.entities.get_monthly_performance(month, year, e),
+            ]
+
+        semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+        failures = 0
+
+        async def run(job: Callable[[], Awaitable[Any]]) -> None:
+            nonlocal failures
+            async with semaphore:
+                try:
+                    await job()
+                except Exception as e:
+                    failures += 1
+                    logger.warning("Pre-cálculo de estadísticas %04d-%02d falló: %s", year, month, e)
+
+        await asyncio.gather(*(run(job) for job in jobs))
+        # Una invalidación del mes durante el cálculo o un fallo al persistir dejan resultados sin
+        # guardar: el mes sigue pendiente y se repite en el siguiente ciclo
+        stored = (
+            not failures
+            and stats_cache.generation([(year, month)]) == generation
+            and stats_cache.metrics()["store_errors"] == store_errors
+        )
+        if stored:
+            await self.store.mark_prewarmed((year, month), len(jobs))
+        return {
+            "year": year,
+            "month": month,
+            "results": len(jobs) - failures,
+            "failures": failures,
+            "stored": stored,
+            "entities": len(entities),
+        }
+
+    async def _entities(self, year: int, month: int) -> List[str]:
+        start = datetime(year, month, 1)
+        end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+        match = {"state": "Completado", "signed_at": {"$gte": start, "$lt": end}}
+        entities = await self.db.cases.distinct("patient_info.entity_info.id", match)
+        return sorted(e for e in entities if e)
+
+    async def pending_months(self, lookback_months: int) -> List[Month]:
+        """Meses cerrados de la ventana que no están pre-calculados (nuevos o invalidados)."""
+        months = closed_months_back(lookback_months)
+        done = await self.store.prewarmed_months(months)
+        return [m for m in months if m not in done]
+
+    async def run_pending(self, lookback_months: int) -> List[Dict[str, Any]]:
+        return [await self.prewarm_month(year, month) for year, month in await self.pending_months(lookback_months)]
+
+
+async def run_prewarm_scheduler(
+    db: AsyncIOMotorDatabase,
+    interval_seconds: Optional[float] = None,
+    lookback_months: Optional[int] = None,
+) -> None:
+    """Tarea de fondo: cada intervalo pre-calcula los meses cerrados pendientes. El candado en
+    MongoDB evita que varios procesos de la API hagan el mismo trabajo."""
+    interval = interval_seconds or settings.STATS_PREWARM_INTERVAL_SECONDS
+    lookback = lookback_months or settings.STATS_PREWARM_LOOKBACK_MONTHS
+    prewarmer = StatisticsPrewarmer(db)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        try:
+            if await prewarmer.store.acquire_lease(owner, interval * 2):
+                for summary in await prewarmer.run_pending(lookback):
+                    logger.info("Estadísticas pre-calculadas para %04d-%02d: %s", summary["year"], summary["month"], summary)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Pre-cálculo de estadísticas interrumpido: %s", e)
+        await asyncio.sleep(interval)
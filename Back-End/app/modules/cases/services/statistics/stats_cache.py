@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import logging
+import pickle
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+Month = Tuple[int, int]
+
+# Resultados que dependen de "ahora" (ventanas rodantes, mes en curso): cualquier escritura los invalida
+ROLLING_TAG = "rolling"
+
+
+def year_months(*years: int) -> List[Month]:
+    """Los 12 meses de cada año indicado."""
+    return [(year, month) for year in years for month in range(1, 13)]
+
+
+def case_months(*docs: Optional[Dict[str, Any]]) -> List[Month]:
+    """Meses de creación y de firma de los casos (antes y después de un cambio)."""
+    months = set()
+    for doc in docs:
+        for field in ("created_at", "signed_at"):
+            value = (doc or {}).get(field)
+            if isinstance(value, datetime):
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc)
+                months.add((value.year, value.month))
+    return sorted(months)
+
+
+def _month_tag(month: Month) -> str:
+    return f"m:{month[0]:04d}-{month[1]:02d}"
+
+
+def _tags_for(months: Optional[List[Month]]) -> FrozenSet[str]:
+    return frozenset(_month_tag(m) for m in months) if months else frozenset({ROLLING_TAG})
+
+
+class RedisStatsBackend:
+    """Caché compartida entre procesos. Cada llave incluye la generación de sus meses;
+    invalidar un mes es incrementar su generación, y las entradas viejas expiran solas."""
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "pathsys:stats"):
+        try:
+            import redis.asyncio as redis  # type: ignore
+        except ImportError as e:  # pragma: no cover - depende del entorno
+            raise RuntimeError("STATS_CACHE_REDIS_URL requiere el paquete 'redis' (pip install redis)") from e
+        self.client = redis.from_url(url)
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+
+    async def generations(self, tags: Iterable[str]) -> List[int]:
+        values = await self.client.mget([f"{self.prefix}:gen:{tag}" for tag in tags])
+        return [int(v or 0) for v in values]
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(f"{self.prefix}:val:{key}")
+        return pickle.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.client.set(f"{self.prefix}:val:{key}", pickle.dumps(value), ex=self.ttl_seconds)
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.incr(f"{self.prefix}:gen:{tag}")
+        await pipe.execute()
+
+
+class StatsCache:
+    """Caché de resultados de estadísticas: LRU en proceso con TTL y, opcionalmente, un backend compartido.
+
+    Cada resultado se etiqueta con los meses de los que depende. Los meses ya cerrados se invalidan
+    cuando una escritura toca ese mes y expiran con closed_month_ttl_seconds (la invalidación solo
+    alcanza al proceso que escribió); los del mes en curso y los resultados sin meses (ROLLING_TAG)
+    expiran con el TTL y se invalidan con cualquier escritura."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 60.0,
+        backend: Optional[RedisStatsBackend] = None,
+        local_ttl_with_backend: float = 5.0,
+        enabled: bool = True,
+        closed_month_ttl_seconds: Optional[float] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        # Sin backend, otros procesos no ven las invalidaciones: los meses cerrados también expiran
+        self.closed_month_ttl_seconds = ttl_seconds if closed_month_ttl_seconds is None else closed_month_ttl_seconds
+        self.backend = backend
+        # Con backend compartido, la copia local vive poco para que las invalidaciones de otros procesos se vean pronto
+        self.local_ttl_with_backend = local_ttl_with_backend
+        self.enabled = enabled
+
+        # llave -> (vence_en, valor, etiquetas)
+        self._entries: "OrderedDict[str, Tuple[float, Any, FrozenSet[str]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Generación por etiqueta (mes o ROLLING_TAG): un cálculo no se guarda si cambió la generación
+        # de alguna etiqueta de la que depende; escrituras en otros meses no lo descartan
+        self._generations: Dict[str, int] = {}
+
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._joined = 0
+        self._evictions = 0
+        self._invalidated = 0
+        self._backend_errors = 0
+
+        # Resultados persistidos de meses cerrados (ver attach_closed_month_store)
+        self.closed_store = None
+        self.closed_namespaces: FrozenSet[str] = frozenset()
+        self._stored_hits = 0
+        self._store_errors = 0
+
+    def generation(self, months: Optional[Iterable[Month]] = None) -> Tuple[int, ...]:
+        """Generaciones de las etiquetas de esos meses (None: resultados que dependen de la fecha
+        actual); si cambian durante un cálculo, su resultado no se guardó."""
+        month_list = sorted(set(months)) if months is not None else None
+        return self._generation_of(_tags_for(month_list))
+
+    def _generation_of(self, tags: FrozenSet[str]) -> Tuple[int, ...]:
+        return tuple(self._generations.get(tag, 0) for tag in sorted(tags))
+
+    def attach_closed_month_store(self, store: Any, namespaces: Iterable[str]) -> None:
+        """Persiste en `store` (ClosedMonthStore) los resultados de un único mes cerrado de esos
+        namespaces: se sirven desde ahí hasta que una escritura invalide el mes."""
+        self.closed_store = store
+        self.closed_namespaces = frozenset(namespaces)
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+        months: Optional[Iterable[Month]] = None,
+    ) -> Any:
+        """Retorna el resultado en caché para (namespace, params) o lo calcula con compute().
+        months: meses de los que depende el resultado; None si depende de la fecha actual.
+        Cada llamador recibe su propia copia: modificar el resultado no altera la entrada en caché."""
+        if not self.enabled:
+            return await compute()
+
+        key = f"{namespace}:{json.dumps(params, sort_keys=True, default=str)}"
+        month_list = sorted(set(months)) if months is not None else None
+        tags = _tags_for(month_list)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value, _ = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+
+        # Solicitudes simultáneas de la misma llave esperan un único cálculo
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._joined += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # Se canceló quien calculaba (no este llamador): se vuelve a intentar
+                return await self.get_or_compute(namespace, params, compute, months)
+
+        if self._persists(namespace, month_list):
+            compute = self._through_closed_store(key, namespace, month_list[0], tags, compute)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, tags, month_list, compute)
+            future.set_result(value)
+            return copy.deepcopy(value)
+        except asyncio.CancelledError:
+            # La cancelación es de este llamador: los que esperaban no la heredan, repiten el cálculo
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Evita el aviso de "excepción nunca recuperada" cuando nadie más esperaba
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load(
+        self,
+        key: str,
+        tags: FrozenSet[str],
+        months: Optional[List[Month]],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        shared_key = None
+        if self.backend is not None:
+            try:
+                ordered = sorted(tags)
+                generations = await self.backend.generations(ordered)
+                shared_key = f"{key}|{','.join(f'{t}={g}' for t, g in zip(ordered, generations))}"
+                value = await self.backend.get(shared_key)
+                if value is not None:
+                    self._shared_hits += 1
+                    self._store(key, value, tags, months)
+                    return value
+            except Exception as e:
+                self._backend_errors += 1
+                shared_key = None
+                logger.warning("Caché compartida de estadísticas no disponible: %s", e)
+
+        self._misses += 1
+        generation = self._generation_of(tags)
+        value = await compute()
+        if generation != self._generation_of(tags):
+            return value
+        self._store(key, value, tags, months)
+        if shared_key is not None:
+            try:
+                await self.backend.set(shared_key, value)
+            except Exception as e:
+                self._backend_errors += 1
+                logger.warning("No se pudo guardar en la caché compartida de estadísticas: %s", e)
+        return value
+
+    def _persists(self, namespace: str, months: Optional[List[Month]]) -> bool:
+        if self.closed_store is None or namespace not in self.closed_namespaces or not months or len(months) != 1:
+            return False
+        now = datetime.now(timezone.utc)
+        return months[0] < (now.year, now.month)
+
+    def _through_closed_store(
+        self,
+        key: str,
+        namespace: str,
+        month: Month,
+        tags: FrozenSet[str],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Callable[[], Awaitable[Any]]:
+        async def load() -> Any:
+            try:
+                stored = await self.closed_store.get(key)
+            except Exception as e:
+                self._store_errors += 1
+                stored = None
+                logger.warning("No se pudo leer el resultado persistido de estadísticas: %s", e)
+            if stored is not None:
+                self._stored_hits += 1
+                return stored
+            generation = self._generation_of(tags)
+            value = await compute()
+            if generation == self._generation_of(tags):
+                try:
+                    await self.closed_store.put(key, namespace, month, value)
+                except Exception as e:
+                    self._store_errors += 1
+                    logger.warning("No se pudo persistir el resultado de estadísticas: %s", e)
+            return value
+
+        return load
+
+    def _store(self, key: str, value: Any, tags: FrozenSet[str], months: Optional[List[Month]]) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl_for(months), value, tags)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _ttl_for(self, months: Optional[List[Month]]) -> float:
+        if self.backend is not None:
+            return min(self.ttl_seconds, self.local_ttl_with_backend)
+        now = datetime.now(timezone.utc)
+        if months and all(month < (now.year, now.month) for month in months):
+            return self.closed_month_ttl_seconds
+        return self.ttl_seconds
+
+    async def invalidate_months(self, months: Iterable[Month]) -> int:
+        """Descarta los resultados que dependen de esos meses y todos los que dependen de la fecha actual."""
+        months = list(months)
+        tags = {_month_tag(m) for m in months} | {ROLLING_TAG}
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        stale = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+        for key in stale:
+            del self._entries[key]
+        self._invalidated += len(stale)
+        if self.backend is not None:
+            try:
+                await self.backend.bump(sorted(tags))
+            except Exception as e:
+                self._backend_errors += 1
+                logger.warning("No se pudo invalidar la caché compartida de estadísticas: %s", e)
+        if self.closed_store is not None:
+            try:
+                await self.closed_store.drop_months(months)
+            except Exception as e:
+                self._store_errors += 1
+                logger.warning("No se pudieron descartar los resultados persistidos de estadísticas: %s", e)
+        return len(stale)
+
+    async def invalidate_case_change(self, *docs: Optional[Dict[str, Any]]) -> int:
+        """Invalidación tras escribir un caso: meses de creación/firma antes y después del cambio."""
+        if not self.enabled:
+            return 0
+        return await self.invalidate_months(case_months(*docs))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self._hits + self._shared_hits + self._misses + self._joined
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self.backend is not None else None,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "closed_month_ttl_seconds": self.closed_month_ttl_seconds,
+            "hits": self._hits,
+            "shared_hits": self._shared_hits,
+            "misses": self._misses,
+            "joined_inflight": self._joined,
+            "hit_ratio": round((lookups - self._misses) / lookups, 4) if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidated": self._invalidated,
+            "backend_errors": self._backend_errors,
+            "closed_store": self.closed_store is not None,
+            "stored_hits": self._stored_hits,
+            "store_errors": self._store_errors,
+        }
+
+
+def _build_stats_cache() -> StatsCache:
+    backend = None
+    if settings.STATS_CACHE_REDIS_URL:
+        backend = RedisStatsBackend(settings.STATS_CACHE_REDIS_URL, settings.STATS_CACHE_SHARED_TTL_SECONDS)
+    return StatsCache(
+        max_entries=settings.STATS_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.STATS_CACHE_TTL_SECONDS,
+        backend=backend,
+        enabled=settings.STATS_CACHE_ENABLED,
+        closed_month_ttl_seconds=settings.STATS_CACHE_CLOSED_MONTH_TTL_SECONDS,
+    )
+
+
+# Instancia compartida por proceso
+stats_cache = _build_stats_cache()
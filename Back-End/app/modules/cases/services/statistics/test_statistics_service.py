@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional, List
 from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+from app.modules.cases.services.statistics.stats_cache import stats_cache
 from app.core.exceptions import BadRequestError
 
 
@@ -24,7 +25,13 @@ class TestStatisticsService:
         if year < 2020 or year > 2030:
             raise BadRequestError("Year must be between 2020 and 2030")
         
-        return await self.repository.get_monthly_test_performance(month, year, entity_name)
+        entity_key = await self.repository.entity_filter.cache_key(entity_name)
+        return await stats_cache.get_or_compute(
+            "tests.monthly_performance",
+            {"month": month, "year": year, "entity": entity_key},
+            lambda: self.repository.get_monthly_test_performance(month, year, entity_name),
+            months=[(year, month)]
+        )
     
     async def get_test_details(
         self, 
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import unquote
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.exceptions import NotFoundError
+from app.modules.cases.repositories.workload_repository import (
+    THROUGHPUT_WINDOW_DAYS,
+    UNASSIGNED_ID,
+    WorkloadRepository,
+)
+
+# Estados que todavía dependen del patólogo (igual que los casos urgentes)
+PENDING_STATES = ("En proceso", "Por firmar")
+# Rangos de días en el sistema (desde la creación); el último no tiene tope
+AGE_BUCKETS = ((0, 2, "0-2"), (3, 5, "3-5"), (6, 10, "6-10"), (11, None, "11+"))
+
+
+def _age_bucket(days: int) -> str:
+    for low, high, label in AGE_BUCKETS:
+        if days >= low and (high is None or days <= high):
+            return label
+    return AGE_BUCKETS[0][2]
+
+
+def summarize_workload(doc: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Resumen de carga de un patólogo a partir de su documento de contadores: casos abiertos por
+    estado, prioridad y antigüedad, ritmo de firmas reciente y proyección para evacuar lo pendiente."""
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+    by_state: Dict[str, int] = {}
+    by_priority: Dict[str, int] = {}
+    by_age = {label: 0 for _, _, label in AGE_BUCKETS}
+    pending_by_age = {label: 0 for _, _, label in AGE_BUCKETS}
+    pending = 0
+    for day, states in (doc.get("open") or {}).items():
+        age = max(0, (today - datetime.strptime(day, "%Y-%m-%d").date()).days)
+        bucket = _age_bucket(age)
+        for state, priorities in (states or {}).items():
+            state = unquote(state)
+            for priority, count in (priorities or {}).items():
+                if count <= 0:
+                    continue
+                priority = unquote(priority)
+                by_state[state] = by_state.get(state, 0) + count
+                by_priority[priority] = by_priority.get(priority, 0) + count
+                by_age[bucket] += count
+                if state in PENDING_STATES:
+                    pending += count
+                    pending_by_age[bucket] += count
+
+    window_start = (today - timedelta(days=THROUGHPUT_WINDOW_DAYS)).strftime("%Y-%m-%d")
+    signed = sum(count for day, count in (doc.get("signed") or {}).items() if day > window_start and count > 0)
+    daily_rate = signed / THROUGHPUT_WINDOW_DAYS
+    days_to_clear = round(pending / daily_rate, 1) if daily_rate else None
+
+    code = doc.get("_id")
+    return {
+        "patologo_codigo": None if code == UNASSIGNED_ID else code,
+        "patologo_nombre": doc.get("pathologist_name"),
+        "casos_abiertos": sum(by_state.values()),
+        "pendientes": pending,
+        "por_estado": by_state,
+        "por_prioridad": by_priority,
+        "por_antiguedad": by_age,
+        "pendientes_por_antiguedad": pending_by_age,
+        "firmados_ventana": signed,
+        "ventana_dias": THROUGHPUT_WINDOW_DAYS,
+        "ritmo_diario": round(daily_rate, 2),
+        "dias_para_evacuar": days_to_clear,
+        "fecha_estimada_evacuacion": (today + timedelta(days=days_to_clear)).isoformat() if days_to_clear is not None else None,
+        "actualizado": doc.get("updated_at"),
+    }
+
+
+class WorkloadService:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.repo = WorkloadRepository(db)
+
+    async def get_pathologist_workload(self, code: str) -> Dict[str, Any]:
+        doc = await self.repo.get(code)
+        if not doc:
+            raise NotFoundError(f"No hay carga de trabajo registrada para el patólogo {code}")
+        return summarize_workload(doc)
+
+    async def list_workload(self) -> List[Dict[str, Any]]:
+        """Carga de todos los patólogos (y de los casos sin asignar), de mayor a menor pendiente."""
+        now = datetime.now(timezone.utc)
+        items = [summarize_workload(doc, now) for doc in await self.repo.list_all()]
+        items = [item for item in items if item["casos_abiertos"] or item["firmados_ventana"]]
+        items.sort(key=lambda item: (-item["pendientes"], -item["casos_abiertos"], item["patologo_nombre"] or ""))
+        return items
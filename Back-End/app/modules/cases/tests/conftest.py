@@ -10,6 +10,25 @@ BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, "..", "..", "..", ".."))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
+from app.modules.cases.services.statistics.stats_cache import stats_cache
+from app.modules.tests.repositories.test_catalog import test_catalog
+from app.modules.entities.repositories.entity_catalog import entity_catalog
+from app.modules.pathologists.repositories.pathologist_catalog import pathologist_catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_stats_cache():
+    # La caché de estadísticas es global al proceso; cada test empieza sin resultados guardados
+    stats_cache.clear()
+    test_catalog.invalidate()
+    entity_catalog.invalidate()
+    pathologist_catalog.invalidate()
+    yield
+    stats_cache.clear()
+    test_catalog.invalidate()
+    entity_catalog.invalidate()
+    pathologist_catalog.invalidate()
+
 
 @pytest.fixture
 def mock_db():
@@ -52,6 +71,8 @@ def sample_case_doc():
 
 
 class FakeCursor:
+    """Cursor de find/aggregate en memoria para los dobles de colecciones."""
+
     def __init__(self, docs):
         self._docs = docs
 
@@ -65,4 +86,10 @@ class FakeCursor:
         return self
 
     async def to_list(self, length=None):
-        return self._docs[: length or len(self._docs)]
\ No newline at end of file
+        return self._docs[: length or len(self._docs)]
+
+
+@pytest.fixture
+def fake_cursor():
+    """Clase FakeCursor: fake_cursor(docs) es lo que devuelven find() y aggregate() en los dobles."""
+    return FakeCursor
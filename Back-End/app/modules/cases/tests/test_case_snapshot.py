@@ -0,0 +1,128 @@
+import pytest
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from app.modules.cases.repositories.statistics.case_snapshot import (
+    CaseSnapshotExporter,
+    CaseSnapshotStore,
+    flatten_case,
+    tombstone,
+)
+from app.modules.cases.services.statistics.snapshot_query_service import pivot_frame
+
+
+def _case(code, entity, pathologist, tests, business_days, signed_at, state="Completado"):
+    return {
+        "case_code": code,
+        "state": state,
+        "created_at": signed_at,
+        "signed_at": signed_at,
+        "updated_at": signed_at,
+        "business_days": business_days,
+        "patient_info": {"entity_info": {"id": entity, "name": f"Entidad {entity}"}, "care_type": "Ambulatorio"},
+        "assigned_pathologist": {"id": pathologist, "name": f"Dr. {pathologist}"},
+        "samples": [{"tests": [{"id": t, "name": f"Prueba {t}"} for t in tests]}],
+    }
+
+
+CASES = [
+    _case("C-1", "HAMA", "P-1", ["T-1", "T-2"], 3, datetime(2025, 1, 10)),
+    _case("C-2", "HAMA", "P-2", ["T-1"], 9, datetime(2025, 1, 20)),
+    _case("C-3", "HGM", "P-1", ["T-2"], 5, datetime(2025, 2, 5)),
+    _case("C-4", "HGM", "P-1", [], None, None, state="En proceso"),
+]
+
+
+def _frame(cases=CASES):
+    return pd.DataFrame([row for case in cases for row in flatten_case(case)])
+
+
+def test_flatten_case_one_row_per_test():
+    rows = flatten_case(_case("C-9", "HAMA", "P-1", ["T-1", "T-2"], 8, datetime(2025, 1, 1, tzinfo=timezone.utc)))
+    assert [r["test_code"] for r in rows] == ["T-1", "T-2"]
+    assert rows[0]["entity_code"] == "HAMA" and rows[0]["within_opportunity"] is False
+    assert rows[0]["signed_at"].tzinfo is None
+    assert flatten_case(CASES[3])[0]["test_code"] is None
+
+
+def test_pivot_entity_by_month_counts_each_case_once():
+    result = pivot_frame(_frame(), ["entity"], "month", "cases", "signed", {})
+    assert [c["value"] for c in result["columnValues"]] == [1, 2]
+    hama, hgm = result["data"]
+    assert hama["keys"]["entity"] == {"value": "HAMA", "name": "Entidad HAMA"}
+    assert hama["values"] == {"1": 2, "2": None}
+    assert hgm["values"] == {"1": None, "2": 1}
+    assert isinstance(hama["values"]["1"], int)
+    assert all(isinstance(row["value"], int) for row in pivot_frame(_frame(), ["test"], None, "tests", "signed", {})["data"])
+    # El caso sin firma no entra con la base "signed"
+    assert result["matchedRows"] == 3
+
+
+def test_pivot_tat_by_test_with_filters():
+    result = pivot_frame(_frame(), ["test"], None, "tat_mean", "signed", {"entity_code": "HAMA", "year": 2025})
+    assert {row["keys"]["test"]["value"]: row["value"] for row in result["data"]} == {"T-1": 6.0, "T-2": 3.0}
+    within = pivot_frame(_frame(), ["pathologist"], None, "within_pct", "signed", {})
+    assert {row["keys"]["pathologist"]["value"]: row["value"] for row in within["data"]} == {"P-1": 100.0, "P-2": 0.0}
+
+
+def test_store_appends_parts_and_keeps_latest_version(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = CaseSnapshotStore(str(tmp_path))
+    first = [row for case in CASES[:3] for row in flatten_case(case)]
+    store.append(first, datetime(2025, 2, 5))
+    updated = _case("C-1", "HAMA", "P-1", ["T-1"], 4, datetime(2025, 1, 10))
+    manifest = store.append(flatten_case(updated) + [tombstone("C-3")], datetime(2025, 3, 1))
+    assert manifest["version"] == 2 and len(manifest["parts"]) == 2
+
+    frame = store.load_table().to_pandas()
+    assert sorted(frame["case_code"]) == ["C-1", "C-2"]
+    assert frame.loc[frame["case_code"] == "C-1", "business_days"].tolist() == [4.0]
+
+    compacted = store.compact()
+    assert len(compacted["parts"]) == 1 and compacted["watermark"] == "2025-03-01T00:00:00"
+    assert sorted(store.load_table().to_pandas()["case_code"]) == ["C-1", "C-2"]
+
+
+class _Cases:
+    """Colección mínima para el exportador: find filtra por updated_at >= $gte."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        since = query.get("updated_at", {}).get("$gte")
+        docs = [d for d in self.docs if since is None or d["updated_at"] >= since]
+
+        class Cursor:
+            def batch_size(self, size):
+                return self
+
+            async def __aiter__(self):
+                for doc in docs:
+                    yield doc
+
+        return Cursor()
+
+    async def distinct(self, field):
+        return [d[field] for d in self.docs]
+
+
+@pytest.mark.asyncio
+async def test_export_rereads_overlap_window_and_skips_unchanged_cases(tmp_path):
+    pytest.importorskip("pyarrow")
+    cases = _Cases([dict(case) for case in CASES[:3]])
+    exporter = CaseSnapshotExporter(SimpleNamespace(cases=cases), CaseSnapshotStore(str(tmp_path)))
+    first = await exporter.export()
+    assert first["full"] and first["manifest"]["watermark"] == "2025-02-05T00:00:00"
+
+    # Sin cambios: lo releído por la ventana ya está exportado
+    assert (await exporter.export())["cases"] == 0
+
+    # Escritura que se confirmó tarde con un updated_at anterior a la marca de agua
+    late = _case("C-1", "HAMA", "P-1", ["T-1"], 4, datetime(2025, 1, 10))
+    late["updated_at"] = datetime(2025, 2, 5) - timedelta(seconds=3)
+    cases.docs[0] = late
+    second = await exporter.export()
+    assert (second["cases"], second["rows"]) == (1, 1)
+    frame = exporter.store.load_table().to_pandas()
+    assert frame.loc[frame["case_code"] == "C-1", "business_days"].tolist() == [4.0]
@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.core.exceptions import BadRequestError
+from app.modules.cases.services.statistics.dashboard_statistics_service import DashboardStatisticsService
+
+METRICS = {
+    "pacientes": {"mes_actual": 4, "mes_anterior": 2, "cambio_porcentual": 100.0},
+    "casos": {"mes_actual": 6, "mes_anterior": 3, "cambio_porcentual": 50.0},
+}
+OPPORTUNITY = {
+    "porcentaje_oportunidad": 80.0, "cambio_porcentual": 5.0, "tiempo_promedio": 4.5,
+    "casos_dentro_oportunidad": 8, "casos_fuera_oportunidad": 2, "total_casos_mes_anterior": 10,
+    "mes_anterior": {"nombre": "Enero", "numero": 1, "inicio": "2025-01-01", "fin": "2025-02-01"},
+}
+CASES_BY_MONTH = {"datos": [1] * 12, "total": 12, "año": 2025}
+
+
+def _service():
+    service = DashboardStatisticsService(MagicMock())
+    service.repo.get_cases_by_month = AsyncMock(return_value=CASES_BY_MONTH)
+    service.repo.get_cases_by_month_pathologist = AsyncMock(return_value=CASES_BY_MONTH)
+    service.repo.get_metrics_general = AsyncMock(return_value=METRICS)
+    service.repo.get_metrics_pathologist = AsyncMock(return_value=METRICS)
+    service.repo.get_state_counts = AsyncMock(return_value={"Completado": 7, "En proceso": 5})
+    service.repo.get_dashboard_overview = AsyncMock()
+    service.opportunity.repo.get_opportunity_general = AsyncMock(return_value=OPPORTUNITY)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_bundle_general_reuses_metrics_month_counts_for_overview():
+    service = _service()
+    bundle = await service.get_bundle(year=2025)
+
+    assert bundle["scope"] == "general" and bundle["errors"] == {}
+    assert list(bundle["widgets"]) == ["overview", "cases_by_month", "metrics", "opportunity"]
+    overview = bundle["widgets"]["overview"]
+    assert (overview.total_casos, overview.casos_mes_actual, overview.casos_mes_anterior) == (12, 6, 3)
+    service.repo.get_dashboard_overview.assert_not_called()
+    assert bundle["meta"]["shared_month_counts"] is True
+    assert set(bundle["meta"]["timings_ms"]) == {"overview", "cases_by_month", "metrics", "opportunity"}
+
+
+@pytest.mark.asyncio
+async def test_bundle_isolates_widget_errors():
+    service = _service()
+    service.repo.get_metrics_general = AsyncMock(side_effect=RuntimeError("mongo caído"))
+    bundle = await service.get_bundle("metrics,opportunity,overview")
+    assert "mongo caído" in bundle["errors"]["metrics"]
+    assert "overview" in bundle["errors"]
+    assert bundle["widgets"]["opportunity"].oportunity.porcentaje_oportunidad == 80.0
+
+
+@pytest.mark.asyncio
+async def test_bundle_pathologist_scope():
+    service = _service()
+    with pytest.raises(BadRequestError):
+        await service.get_bundle("overview", pathologist_code="P-1")
+    service.opportunity.repo.get_opportunity_pathologist = AsyncMock(return_value=OPPORTUNITY)
+    bundle = await service.get_bundle(pathologist_code=" P-1 ")
+    assert bundle["scope"] == "pathologist" and bundle["pathologist_code"] == "P-1"
+    assert list(bundle["widgets"]) == ["cases_by_month", "metrics", "opportunity"]
+    service.repo.get_metrics_pathologist.assert_awaited_once_with("P-1")
+    service.opportunity.repo.get_opportunity_pathologist.assert_awaited_once_with("P-1", 7)
@@ -0,0 +1,193 @@
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.modules.cases.repositories.statistics import dashboard_statistics_repository as dashboard_module
+from app.modules.cases.repositories.statistics.dashboard_statistics_repository import (
+    DashboardStatisticsRepository,
+    PATIENT_KEY_EXPRESSION,
+)
+
+# Evaluador mínimo de agregaciones: solo los operadores que usan estas métricas
+
+
+def _path(doc, path):
+    value = doc
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _eval(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _path(doc, expr[1:])
+    if isinstance(expr, dict):
+        (op, args), = expr.items()
+        if op == "$ifNull":
+            value = _eval(args[0], doc)
+            return _eval(args[1], doc) if value is None else value
+        if op == "$cond":
+            return _eval(args[1], doc) if _eval(args[0], doc) else _eval(args[2], doc)
+        if op == "$and":
+            return all(_eval(a, doc) for a in args)
+        if op == "$strLenCP":
+            return len(_eval(args, doc))
+        if op == "$concat":
+            return "".join(_eval(a, doc) for a in args)
+        left, right = (_eval(a, doc) for a in args)
+        return {"$gt": left > right, "$gte": left >= right, "$lt": left < right}[op]
+    return expr
+
+
+def _matches(doc, conditions):
+    for field, cond in conditions.items():
+        value = _path(doc, field)
+        if isinstance(cond, dict):
+            if "$gte" in cond and not value >= cond["$gte"]:
+                return False
+            if "$lt" in cond and not value < cond["$lt"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _aggregate(docs, pipeline):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if _matches(d, spec)]
+        elif name == "$addFields":
+            docs = [{**d, **{k: _eval(v, d) for k, v in spec.items()}} for d in docs]
+        elif name == "$project":
+            docs = [{k: _eval(v, d) for k, v in spec.items()} for d in docs]
+        elif name == "$group":
+            groups = {}
+            for d in docs:
+                key = _eval(spec["_id"], d)
+                group = groups.setdefault(key, {"_id": key})
+                for field, acc in spec.items():
+                    if field == "_id":
+                        continue
+                    (op, arg), = acc.items()
+                    value = _eval(arg, d)
+                    if op == "$sum":
+                        group[field] = group.get(field, 0) + value
+                    else:
+                        group[field] = max(group.get(field, value), value)
+            docs = list(groups.values())
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+    return docs
+
+
+
+class FakeCollection:
+    def __init__(self, docs, cursor_class):
+        self.docs = docs
+        self.cursor_class = cursor_class
+        self.calls = 0
+
+    def aggregate(self, pipeline):
+        self.calls += 1
+        return self.cursor_class(_aggregate(self.docs, pipeline))
+
+
+NOW_UTC = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW_UTC if tz else NOW_UTC.replace(tzinfo=None)
+
+
+def _cases(tz):
+    rng = random.Random(7)
+    now = NOW_UTC if tz else NOW_UTC.replace(tzinfo=None)
+    docs = []
+    for i in range(300):
+        patient = {"identification_type": "CC", "identification_number": str(rng.randint(1, 60))}
+        if rng.random() < 0.6:
+            patient["patient_code"] = f"CC-{patient['identification_number']}"
+        docs.append({
+            "case_code": f"2025-{i:05d}",
+            "created_at": now - timedelta(days=rng.randint(0, 80), hours=rng.randint(0, 23)),
+            "patient_info": patient,
+            "assigned_pathologist": {"id": rng.choice(["P-1", "P-2"])},
+        })
+    return docs, now
+
+
+def _legacy_metrics(docs, now, previous_month_start, current_month_start, next_month_start, extra=None):
+    """Las ocho agregaciones independientes de la implementación anterior."""
+    extra = extra or {}
+
+    def count(start, end, patients):
+        pipeline = [{"$match": {"created_at": {"$gte": start, "$lt": end}, **extra}}]
+        if patients:
+            pipeline += [
+                {"$addFields": {"patient_key": PATIENT_KEY_EXPRESSION}},
+                {"$group": {"_id": "$patient_key", "count": {"$sum": 1}}},
+            ]
+        result = _aggregate(docs, pipeline + [{"$count": "total"}])
+        return result[0]["total"] if result else 0
+
+    def change(last30, prev30):
+        if prev30 > 0:
+            return round(((last30 - prev30) / prev30) * 100, 2)
+        return 100.0 if last30 > 0 else 0.0
+
+    last30_start, prev30_start = now - timedelta(days=30), now - timedelta(days=60)
+    out = {}
+    for kind, patients in (("pacientes", True), ("casos", False)):
+        out[kind] = {
+            "mes_actual": count(current_month_start, next_month_start, patients),
+            "mes_anterior": count(previous_month_start, current_month_start, patients),
+            "cambio_porcentual": change(count(last30_start, now, patients), count(prev30_start, last30_start, patients)),
+        }
+    return out
+
+
+@pytest.mark.asyncio
+async def test_metrics_general_matches_legacy_pipelines(monkeypatch, fake_cursor):
+    monkeypatch.setattr(dashboard_module, "datetime", FrozenDatetime)
+    docs, now = _cases(tz=True)
+    collection = FakeCollection(docs, fake_cursor)
+    repo = DashboardStatisticsRepository.__new__(DashboardStatisticsRepository)
+    repo.collection = collection
+
+    result = await repo.get_metrics_general()
+
+    utc = timezone.utc
+    expected = _legacy_metrics(
+        docs, now, datetime(2025, 2, 1, tzinfo=utc), datetime(2025, 3, 1, tzinfo=utc), datetime(2025, 4, 1, tzinfo=utc)
+    )
+    assert result == expected
+    assert collection.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_pathologist_matches_legacy_pipelines(monkeypatch, fake_cursor):
+    monkeypatch.setattr(dashboard_module, "datetime", FrozenDatetime)
+    docs, now = _cases(tz=False)
+    collection = FakeCollection(docs, fake_cursor)
+    repo = DashboardStatisticsRepository.__new__(DashboardStatisticsRepository)
+    repo.collection = collection
+
+    result = await repo.get_metrics_pathologist("P-2")
+
+    expected = _legacy_metrics(
+        docs, now, datetime(2025, 2, 1), datetime(2025, 3, 1), datetime(2025, 4, 1),
+        extra={"assigned_pathologist.id": "P-2"}
+    )
+    assert result == expected
+    assert collection.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_without_cases_are_zero(monkeypatch, fake_cursor):
+    monkeypatch.setattr(dashboard_module, "datetime", FrozenDatetime)
+    repo = DashboardStatisticsRepository.__new__(DashboardStatisticsRepository)
+    repo.collection = FakeCollection([], fake_cursor)
+    result = await repo.get_metrics_general()
+    assert result["casos"] == {"mes_actual": 0, "mes_anterior": 0, "cambio_porcentual": 0.0}
@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.modules.cases.repositories.urgent_cases_repository import UrgentCasesRepository
+from app.modules.cases.services.due_dates import DEFAULT_SLA_DAYS, DueDateCalculator
+from app.shared.services.business_calendar import (
+    business_days_between,
+    colombia_holidays,
+    exceeded_at,
+    reached_before,
+)
+
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_colombia_holidays_move_to_monday_and_follow_easter():
+    holidays = {d.isoformat() for d in colombia_holidays(2025)}
+    # Reyes (6 ene, lunes), San José (19 mar -> 24), jueves/viernes santo, Ascensión (2 jun)
+    assert {"2025-01-06", "2025-03-24", "2025-04-17", "2025-04-18", "2025-06-02", "2025-12-08"} <= holidays
+    assert "2025-03-19" not in holidays
+
+
+def test_business_days_skip_weekends_and_holidays_in_local_time():
+    # Viernes 14 mar 2025 a las 20:00 en Colombia (01:00 UTC del sábado)
+    created = _utc(2025, 3, 15, 1)
+    # Hasta el martes 25: lunes 17 a viernes 21 (5) y martes 25 (el lunes 24 es festivo)
+    assert business_days_between(created, _utc(2025, 3, 25, 18)) == 6
+    # Vence al empezar el día hábil número 7: miércoles 26 a medianoche de Colombia
+    assert exceeded_at(created, 6) == _utc(2025, 3, 26, 5)
+    # El martes 25 llevan al menos 6 días hábiles los casos creados hasta el domingo 16 (hora de Colombia)
+    assert reached_before(6, _utc(2025, 3, 25, 18)) == _utc(2025, 3, 17, 5)
+    assert business_days_between(_utc(2025, 3, 17, 4), _utc(2025, 3, 25, 18)) == 6
+
+
+@pytest.mark.asyncio
+async def test_due_date_uses_the_slowest_test(fake_cursor):
+    tests = MagicMock()
+    tests.find = MagicMock(return_value=fake_cursor([
+        {"test_code": "BX", "name": "Biopsia", "time": 5},
+        {"test_code": "IHQ", "name": "Inmunohistoquímica", "time": 10},
+    ]))
+    calculator = DueDateCalculator(SimpleNamespace(tests=tests))
+    samples = [{"tests": [{"id": "BX"}]}, {"tests": [{"id": "IHQ"}, {"id": "NUEVA"}]}]
+    due = await calculator.due_at(_utc(2025, 3, 15, 1), samples)
+    assert due["sla_days"] == 10
+    assert await calculator.sla_days(["NUEVA"]) == DEFAULT_SLA_DAYS
+
+
+@pytest.mark.asyncio
+async def test_overdue_cases_are_a_range_on_due_at(fake_cursor):
+    cases = MagicMock()
+    cases.aggregate = MagicMock(return_value=fake_cursor([{"case_code": "2025-00001", "created_at": _utc(2025, 3, 15, 1)}]))
+    items = await UrgentCasesRepository(SimpleNamespace(cases=cases)).find_overdue_cases(limit=5, pathologist_code="P-1")
+    pipeline = cases.aggregate.call_args[0][0]
+    assert set(pipeline[0]["$match"]) == {"state", "due_at", "assigned_pathologist.id"}
+    assert pipeline[1]["$sort"] == {"due_at": 1}
+    assert isinstance(items[0]["days_in_system"], int)
@@ -0,0 +1,69 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.modules.cases.repositories.statistics.entity_filter import EntityFilterResolver
+from app.modules.cases.repositories.statistics.entity_statistics_repository import EntityStatisticsRepository
+
+
+
+ENTITIES = [
+    {"entity_code": "HAMA", "name": "Hospital Alma Máter de Antioquia"},
+    {"entity_code": "HGM", "name": "Hospital General de Medellín Luz Castro G."},
+    {"code": "CES", "name": "Clínica CES"},
+]
+
+
+def _database(fake_cursor, aliases=()):
+    entities = MagicMock()
+    entities.find = MagicMock(return_value=fake_cursor(ENTITIES))
+    entity_aliases = MagicMock()
+    entity_aliases.find = MagicMock(return_value=fake_cursor(list(aliases)))
+    return SimpleNamespace(cases=MagicMock(), entities=entities, entity_aliases=entity_aliases)
+
+
+@pytest.mark.asyncio
+async def test_resolves_codes_aliases_and_names(fake_cursor):
+    db = _database(fake_cursor, [{"alias_key": "medellin", "entity_codes": ["HGM", "HAMA"]}])
+    resolver = EntityFilterResolver(db)
+    assert await resolver.codes(None) is None
+    assert await resolver.codes(" hama ") == ["HAMA"]
+    assert await resolver.codes("Medellín") == ["HGM", "HAMA"]
+    assert await resolver.codes("clinica ces") == ["CES"]
+    assert await resolver.codes("hospital") == ["HAMA", "HGM"]
+    assert await resolver.codes("Sin coincidencias") == []
+    # El catálogo se carga una sola vez para todas las consultas
+    assert db.entities.find.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_apply_builds_equality_or_in_condition(fake_cursor):
+    resolver = EntityFilterResolver(_database(fake_cursor))
+    assert await resolver.apply({}, "HGM") == {"patient_info.entity_info.id": "HGM"}
+    assert await resolver.apply({}, "Hospital", field="entity_id") == {"entity_id": {"$in": ["HAMA", "HGM"]}}
+    assert await resolver.apply({}, "") == {}
+
+
+@pytest.mark.asyncio
+async def test_apply_falls_back_to_name_regex_for_entities_missing_from_catalog(fake_cursor):
+    resolver = EntityFilterResolver(_database(fake_cursor))
+    assert await resolver.apply({}, " Clínica Nueva (Sede 2) ") == {
+        "patient_info.entity_info.name": {"$regex": r"Clínica\ Nueva\ \(Sede\ 2\)", "$options": "i"}
+    }
+    assert await resolver.apply({}, "Clínica Nueva", field="entity_id") == {
+        "entity_name": {"$regex": r"Clínica\ Nueva", "$options": "i"}
+    }
+
+
+@pytest.mark.asyncio
+async def test_entity_details_match_by_code_instead_of_regex(fake_cursor):
+    db = _database(fake_cursor)
+    db.cases.aggregate = MagicMock(side_effect=lambda pipeline: fake_cursor([]))
+    repo = EntityStatisticsRepository(db)
+    data = await repo.get_entity_details("Alma Máter", 2, 2025)
+    # Resumen, tiempos y pruebas salen de un único pipeline con $facet
+    assert db.cases.aggregate.call_count == 1
+    assert data["detalles"]["estadisticas_basicas"]["total_pacientes"] == 0
+    for call in db.cases.aggregate.call_args_list:
+        match = call[0][0][0]["$match"]
+        assert match["patient_info.entity_info.id"] == "HAMA"
+        assert "patient_info.entity_info.name" not in match
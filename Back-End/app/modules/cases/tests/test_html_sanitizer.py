@@ -0,0 +1,78 @@
+import random
+import re
+import pytest
+from unittest.mock import AsyncMock
+from app.modules.cases.services.html_sanitizer import ALLOWED_TAGS, sanitize_html, sanitize_result_fields
+from app.modules.cases.services.result_service import ResultService
+from app.modules.cases.schemas.case import CaseResult
+from app.modules.cases.schemas.result import ResultUpdate
+from app.core.exceptions import NotFoundError
+
+
+def test_sanitize_keeps_allowed_markup_and_styles():
+    html = '<p style="text-align: center; color: red">Hola <strong>mundo</strong><br/></p>'
+    assert sanitize_html(html) == '<p style="text-align: center">Hola <strong>mundo</strong><br/></p>'
+
+
+def test_sanitize_removes_scripts_events_and_unknown_tags():
+    html = '<div onclick="x()">a<script>alert(1)</script><STYLE>p{}</style><img src=x onerror=y>b<!-- c --></div>'
+    assert sanitize_html(html) == "<div>ab</div>"
+
+
+def test_sanitize_drops_unsafe_style_values():
+    assert sanitize_html('<span style="font-weight: expression(alert(1))">x</span>') == "<span>x</span>"
+
+
+def test_sanitize_escapes_tags_rebuilt_from_fragments():
+    out = sanitize_html("<scr<x>ipt>alert(1)</scr<x>ipt>")
+    assert "<script" not in out.lower()
+
+
+def test_sanitize_plain_text_passthrough():
+    assert sanitize_html("Sin HTML & con ampersand") == "Sin HTML & con ampersand"
+    assert sanitize_html(None) == ""
+
+
+_FRAGMENTS = [
+    "<", ">", "/", "=", '"', "'", " ", "script", "style", "div", "p", "b", "img", "iframe",
+    "onload", "onclick", "style=", "text-align:center", ";", "<!--", "-->", "alert(1)", "texto", "&amp;",
+    "<br/>", "</p>", "<li>", "\n",
+]
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)\b([^<>]*)>")
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_sanitize_fuzz_output_is_safe_and_idempotent(seed):
+    rng = random.Random(seed)
+    for _ in range(40):
+        html = "".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(1, 60)))
+        out = sanitize_html(html)
+        for tag in _TAG_RE.finditer(out):
+            assert tag.group(2).lower() in ALLOWED_TAGS
+            assert not re.search(r"\son[a-z]+\s*=", tag.group(3), re.IGNORECASE)
+        assert "<script" not in out.lower()
+        assert "<!--" not in out
+        assert sanitize_html(out) == out
+
+
+def test_sanitize_result_fields_only_html_fields():
+    data = {"macro_result": "<b>a</b><script>x</script>", "diagnosis": "c", "method": ["HE"]}
+    assert sanitize_result_fields(data) == {"macro_result": "<b>a</b>", "diagnosis": "c"}
+
+
+@pytest.mark.asyncio
+async def test_result_service_stores_sanitized_html_on_write(mock_db):
+    service = ResultService(mock_db)
+    service.repo.validate_case_not_completed = AsyncMock(return_value=True)
+    service.repo.update_result = AsyncMock(return_value=None)
+    with pytest.raises(NotFoundError):
+        await service.update_case_result("2025-00001", ResultUpdate(macro_result='<p onclick="x">Macro</p>'))
+    result_data = service.repo.update_result.call_args[0][1]
+    assert result_data["macro_result"] == '<p onclick="x">Macro</p>'
+    assert result_data["sanitized_html"] == {"macro_result": "<p>Macro</p>"}
+
+
+def test_sanitized_copy_is_not_serialized_in_case_responses():
+    result = CaseResult(macro_result="<p>Macro</p>", sanitized_html={"macro_result": "<p>Macro</p>"})
+    assert "sanitized_html" not in result.model_dump() and "sanitized_html" not in result.model_dump_json()
+    assert result.sanitized_html == {"macro_result": "<p>Macro</p>"}
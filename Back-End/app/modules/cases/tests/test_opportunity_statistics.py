@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics.opportunity_statistics_repository import OpportunityStatisticsRepository
+from app.modules.cases.services.statistics.opportunity_statistics_service import OpportunityStatisticsService
+
+
+
+def _repo(fake_cursor, rows):
+    collection = MagicMock()
+    collection.aggregate = MagicMock(return_value=fake_cursor(rows))
+    db = MagicMock()
+    db.cases = collection
+    db.entities.find = MagicMock(return_value=fake_cursor([{"entity_code": "HAMA", "name": "Hospital Alma Máter de Antioquia"}]))
+    db.entity_aliases.find = MagicMock(return_value=fake_cursor([]))
+    db.pathologists.find = MagicMock(return_value=fake_cursor([{"pathologist_code": "P-1", "pathologist_name": "Dra. Demo"}]))
+    return OpportunityStatisticsRepository(db), collection
+
+
+@pytest.mark.asyncio
+async def test_yearly_series_single_aggregation_for_all_years(fake_cursor):
+    repo, collection = _repo(fake_cursor, [
+        {"_id": {"year": 2025, "month": 1}, "total": 4, "within": 3},
+        {"_id": {"year": 2025, "month": 12}, "total": 3, "within": 1},
+        {"_id": {"year": 2024, "month": 2}, "total": 2, "within": 2},
+    ])
+    series = await repo.get_yearly_opportunity_series([2025, 2024], threshold_days=5, entity="HAMA", pathologist="P-1")
+
+    assert collection.aggregate.call_count == 1
+    pipeline = collection.aggregate.call_args[0][0]
+    match = pipeline[0]["$match"]
+    assert match["state"] == "Completado" and len(match["$or"]) == 2
+    assert match["patient_info.entity_info.id"] == "HAMA"
+    assert match["assigned_pathologist.id"] == "P-1" and "$and" not in match
+    within = pipeline[1]["$group"]["within"]["$sum"]["$cond"][0]
+    assert within == {"$lte": ["$business_days", 5]}
+    assert series[2025][0] == 75.0 and series[2025][11] == 33.3 and series[2025][5] == 0.0
+    assert series[2024][1] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_get_yearly_includes_comparison_years():
+    service = OpportunityStatisticsService(MagicMock())
+    service.repo.get_yearly_opportunity_series = AsyncMock(return_value={2025: [1.0] * 12, 2024: [2.0] * 12})
+    data = await service.get_yearly(2025, 7, compare_years="2024, 2025")
+    service.repo.get_yearly_opportunity_series.assert_awaited_once_with([2025, 2024], 7, None, None)
+    assert data == {"percentageByMonth": [1.0] * 12, "comparison": [{"year": 2024, "percentageByMonth": [2.0] * 12}]}
+
+
+@pytest.mark.asyncio
+async def test_get_yearly_cache_key_uses_entity_codes(fake_cursor):
+    repo, _ = _repo(fake_cursor, [])
+    service = OpportunityStatisticsService(MagicMock())
+    service.repo = repo
+    repo.get_yearly_opportunity_series = AsyncMock(return_value={2025: [1.0] * 12})
+    await service.get_yearly(2025, 7, entity="HAMA")
+    await service.get_yearly(2025, 7, entity="Hospital Alma Máter de Antioquia")
+    repo.get_yearly_opportunity_series.assert_awaited_once_with([2025], 7, "HAMA", None)
+
+
+@pytest.mark.asyncio
+async def test_get_yearly_rejects_invalid_comparison_years():
+    service = OpportunityStatisticsService(MagicMock())
+    with pytest.raises(BadRequestError):
+        await service.get_yearly(2025, 7, compare_years="2024,abc")
+    with pytest.raises(BadRequestError):
+        await service.get_yearly(2025, 7, compare_years="1999")
+
+
+@pytest.mark.asyncio
+async def test_compute_opportunity_for_range_uses_server_side_counts(fake_cursor):
+    repo, collection = _repo(fake_cursor, [{"_id": None, "count": 4, "within": 3, "out": 1, "sumDays": 22}])
+    data = await repo._compute_opportunity_for_range(None, None, pathologist_code="P-1")
+    match = collection.aggregate.call_args[0][0][0]["$match"]
+    assert match["state"] == "Completado" and match["assigned_pathologist.id"] == "P-1"
+    assert data == {
+        "porcentaje_oportunidad": 75.0,
+        "tiempo_promedio": 5.5,
+        "casos_dentro_oportunidad": 3,
+        "casos_fuera_oportunidad": 1,
+        "total_casos_mes_anterior": 4,
+    }
+
+
+@pytest.mark.asyncio
+async def test_monthly_opportunity_maps_facet_result(fake_cursor):
+    repo, collection = _repo(fake_cursor, [{
+        "summary": [{"_id": None, "count": 3, "within": 2, "out": 1, "sumDays": 20}],
+        "tests": [{"_id": "T-1", "code": "T-1", "name": "Biopsia", "count": 2, "within": 1, "out": 1, "sumDays": 15}],
+        "pathologists": [{"_id": "P-1", "code": "P-1", "name": "Dra. Demo", "count": 3, "within": 2, "out": 1, "sumDays": 20}],
+    }])
+    data = await repo.get_monthly_opportunity(2, 2025, 7)
+    assert collection.aggregate.call_count == 1
+    assert "$facet" in collection.aggregate.call_args[0][0][-1]
+    assert data["tests"] == [{"code": "T-1", "name": "Biopsia", "withinOpportunity": 1, "outOfOpportunity": 1, "averageDays": 7.5}]
+    assert data["pathologists"][0]["averageDays"] == 6.67
+    assert data["summary"] == {"total": 3, "within": 2, "out": 1, "averageDays": 6.67}
+
+
+@pytest.mark.asyncio
+async def test_monthly_opportunity_empty_month(fake_cursor):
+    repo, _ = _repo(fake_cursor, [{"summary": [], "tests": [], "pathologists": []}])
+    data = await repo.get_monthly_opportunity(2, 2025, 7)
+    assert data == {"tests": [], "pathologists": [], "summary": {"total": 0, "within": 0, "out": 0, "averageDays": 0.0}}
+
+
+@pytest.mark.asyncio
+async def test_monthly_opportunity_filters_pathologist_by_code(fake_cursor):
+    repo, collection = _repo(fake_cursor, [{"summary": [], "tests": [], "pathologists": []}])
+    await repo.get_monthly_opportunity(2, 2025, 7, pathologist="dra. demo")
+    match = collection.aggregate.call_args[0][0][0]["$match"]
+    assert match["assigned_pathologist.id"] == "P-1" and "$or" not in match
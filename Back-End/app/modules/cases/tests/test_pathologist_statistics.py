@@ -0,0 +1,59 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.modules.cases.repositories.statistics.pathologist_filter import PathologistFilterResolver
+from app.modules.cases.repositories.statistics.pathologist_statistics_repository import PathologistStatisticsRepository
+
+
+
+PATHOLOGISTS = [
+    {"pathologist_code": "P-1", "pathologist_name": "Dra. Ana María Gómez"},
+    {"pathologist_code": "P-2", "pathologist_name": "Dr. Luis Pérez"},
+    {"pathologist_code": "P-3", "pathologist_name": "Dra. Ana Ruiz"},
+]
+
+
+def _database(fake_cursor):
+    pathologists = MagicMock()
+    pathologists.find = MagicMock(return_value=fake_cursor(PATHOLOGISTS))
+    cases = MagicMock()
+    cases.aggregate = MagicMock(side_effect=lambda pipeline: fake_cursor([]))
+    return SimpleNamespace(cases=cases, pathologists=pathologists)
+
+
+@pytest.mark.asyncio
+async def test_resolves_codes_and_names_once(fake_cursor):
+    db = _database(fake_cursor)
+    resolver = PathologistFilterResolver(db)
+    assert await resolver.codes(None) is None
+    assert await resolver.codes("p-2") == ["P-2"]
+    assert await resolver.codes("dr. luis perez") == ["P-2"]
+    assert await resolver.codes("Ana") == ["P-1", "P-3"]
+    assert await resolver.codes("P-9") == []
+    assert db.pathologists.find.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_apply_falls_back_to_name_regex_for_pathologists_missing_from_catalog(fake_cursor):
+    resolver = PathologistFilterResolver(_database(fake_cursor))
+    assert await resolver.apply({}, " Dr. Nuevo (Retirado) ") == {
+        "assigned_pathologist.name": {"$regex": r"Dr\.\ Nuevo\ \(Retirado\)", "$options": "i"}
+    }
+    assert await resolver.apply({}, "Nuevo", field="pathologist_id") == {
+        "pathologist_name": {"$regex": "Nuevo", "$options": "i"}
+    }
+
+
+@pytest.mark.asyncio
+async def test_every_pipeline_starts_with_code_equality(fake_cursor):
+    db = _database(fake_cursor)
+    repo = PathologistStatisticsRepository(db)
+    await repo.get_pathologist_entities("Luis", 2, 2025)
+    await repo.get_pathologist_tests("P-1", 2, 2025)
+    await repo.get_pathologist_opportunity_summary("Dr. Luis Pérez")
+    await repo.get_pathologist_monthly_trends("Ana", 2025)
+    matches = [call[0][0][0]["$match"] for call in db.cases.aggregate.call_args_list]
+    assert [m["assigned_pathologist.id"] for m in matches] == ["P-2", "P-1", "P-2", {"$in": ["P-1", "P-3"]}]
+    for match in matches:
+        assert match["state"] == "Completado"
+        assert "assigned_pathologist.name" not in match and "pathologist.name" not in match
@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from markupsafe import Markup
+from app.modules.cases.services.pdf_renderers import (
+    ChromiumPdfRenderer,
+    ReportLabPdfRenderer,
+    get_pdf_renderer,
+)
+from app.modules.cases.services.pdf_service import CasePdfService
+
+
+def _context():
+    return {
+        "case": {
+            "caso_code": "2025-00001",
+            "fecha_creacion": datetime(2025, 3, 3, 10, 0),
+            "fecha_firma": datetime(2025, 3, 5, 10, 0),
+            "paciente": {
+                "nombre": "Juan Pérez",
+                "paciente_code": "1-12345678",
+                "edad": 35,
+                "sexo": "Masculino",
+                "entidad_info": {"nombre": "Entidad <Demo> & Cía"},
+            },
+            "servicio": "Consulta externa",
+            "medico_solicitante": "Dr. Remitente",
+            "patologo_asignado": {"nombre": "Dra. Demo", "codigo": "P-1"},
+            "muestras": [{"region_cuerpo": "Piel", "pruebas": []}],
+            "resultado": {
+                "metodo": ["Hematoxilina-Eosina"],
+                "resultado_macro": Markup("<p>Fragmento de <strong>1 cm</strong></p><ul><li>uno</li><li>dos</li></ul>"),
+                "resultado_micro": Markup("<div style=\"text-align: center\">Texto <em>micro</em><br>otra línea</div>"),
+                "diagnostico": Markup("<b>Carcinoma</b> basocelular"),
+                "diagnostico_cie10": {"codigo": "C44", "nombre": "Tumor maligno de la piel"},
+                "diagnostico_cieo": None,
+            },
+            "notas_adicionales": [{"date": datetime(2025, 3, 6), "note": "Nota de prueba"}],
+        },
+        "pathologist_signature": None,
+        "pruebas_complementarias": {
+            "pruebas": [{"codigo": "IHQ", "nombre": "Inmunohistoquímica", "cantidad": 2}],
+            "motivo": "Confirmar",
+        },
+    }
+
+
+def test_get_pdf_renderer_selects_backend():
+    assert isinstance(get_pdf_renderer("chromium", MagicMock()), ChromiumPdfRenderer)
+    with pytest.raises(RuntimeError):
+        get_pdf_renderer("wkhtmltopdf", MagicMock())
+
+
+def test_reportlab_html_to_blocks_keeps_inline_markup():
+    pytest.importorskip("reportlab")
+    renderer = ReportLabPdfRenderer()
+    blocks = renderer._html_to_blocks("<p>Fragmento de <strong>1 cm</strong></p><ul><li>uno</li><li>dos</li></ul>")
+    assert blocks == ["Fragmento de <b>1 cm</b>", "• uno", "• dos"]
+
+
+@pytest.mark.asyncio
+async def test_reportlab_renders_report_with_logos():
+    pytest.importorskip("reportlab")
+    logos = CasePdfService(MagicMock()).logos
+    pdf_bytes = await ReportLabPdfRenderer().render(_context(), logos)
+    assert pdf_bytes.startswith(b"%PDF")
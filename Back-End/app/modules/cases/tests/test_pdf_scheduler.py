@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from app.modules.cases.services.pdf_scheduler import PdfJobScheduler, PdfQueueFullError
+
+
+async def _hold(scheduler, user, gate, log):
+    async with scheduler.slot(user):
+        log.append(user)
+        await gate.wait()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_concurrency_and_queues():
+    scheduler = PdfJobScheduler(max_concurrency=1, max_queue=5, wait_timeout=5, max_per_user=3)
+    gate = asyncio.Event()
+    log = []
+    tasks = [asyncio.create_task(_hold(scheduler, "u1", gate, log)) for _ in range(3)]
+    await asyncio.sleep(0)
+    metrics = scheduler.metrics()
+    assert metrics["active"] == 1
+    assert metrics["queued"] == 2
+    gate.set()
+    await asyncio.gather(*tasks)
+    metrics = scheduler.metrics()
+    assert metrics["active"] == 0
+    assert metrics["queued"] == 0
+    assert metrics["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_when_queue_full():
+    scheduler = PdfJobScheduler(max_concurrency=1, max_queue=1, wait_timeout=5, max_per_user=5)
+    gate = asyncio.Event()
+    log = []
+    tasks = [asyncio.create_task(_hold(scheduler, f"u{i}", gate, log)) for i in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(PdfQueueFullError) as exc:
+        await scheduler._acquire("u9")
+    assert exc.value.retry_after >= 1
+    assert scheduler.metrics()["rejected"] == 1
+    gate.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rotates_between_users():
+    scheduler = PdfJobScheduler(max_concurrency=1, max_queue=10, wait_timeout=5, max_per_user=3)
+    gate = asyncio.Event()
+    log = []
+    tasks = [asyncio.create_task(_hold(scheduler, "busy", gate, log)) for _ in range(3)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(_hold(scheduler, "other", gate, log)))
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(*tasks)
+    # "other" no espera a que terminen todas las solicitudes de "busy"
+    assert log.index("other") == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_wait_timeout():
+    scheduler = PdfJobScheduler(max_concurrency=1, max_queue=5, wait_timeout=0.01, max_per_user=5)
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, "u1", gate, []))
+    await asyncio.sleep(0)
+    with pytest.raises(PdfQueueFullError):
+        await scheduler._acquire("u2")
+    metrics = scheduler.metrics()
+    assert metrics["timed_out"] == 1
+    assert metrics["queued"] == 0
+    gate.set()
+    await holder
+
+
+@pytest.mark.asyncio
+async def test_scheduler_queues_user_over_per_user_limit_with_free_slots():
+    scheduler = PdfJobScheduler(max_concurrency=3, max_queue=5, wait_timeout=5, max_per_user=1)
+    gate = asyncio.Event()
+    log = []
+    tasks = [asyncio.create_task(_hold(scheduler, "u1", gate, log)) for _ in range(2)]
+    await asyncio.sleep(0)
+    # La segunda solicitud de u1 espera turno (no 429) aunque haya cupos; otro usuario entra directo
+    assert scheduler.metrics()["active"] == 1 and scheduler.metrics()["queued"] == 1
+    tasks.append(asyncio.create_task(_hold(scheduler, "u2", gate, log)))
+    await asyncio.sleep(0)
+    assert log == ["u1", "u2"]
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.metrics()["rejected"] == 0 and scheduler.metrics()["completed"] == 3
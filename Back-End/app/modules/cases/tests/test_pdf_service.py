@@ -0,0 +1,120 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from datetime import datetime, timezone
+from app.modules.cases.services.pdf_service import CasePdfService
+from app.core.tracing import record_phases, server_timing_header
+from app.modules.cases.schemas.case import CaseResponse
+
+
+class FakeCaseService:
+    def __init__(self, doc):
+        self.doc = doc
+        self.calls = 0
+
+    async def get_case(self, code):
+        self.calls += 1
+        return CaseResponse(**self.doc)
+
+
+class FakeApprovalService:
+    def __init__(self, approvals):
+        self.approvals = approvals
+        self.calls = []
+
+    async def get_pending_approvals_for_case(self, code):
+        self.calls.append(code)
+        return self.approvals
+
+
+def _case_doc():
+    now = datetime.now(timezone.utc)
+    return {
+        "id": "656565656565656565656565",
+        "case_code": "2025-00001",
+        "patient_info": {
+            "patient_code": "1-12345678",
+            "identification_type": 1,
+            "identification_number": "12345678",
+            "name": "Juan Pérez",
+            "age": 35,
+            "gender": "Masculino",
+            "entity_info": {"id": "ENT-1", "name": "Entidad Demo"},
+            "care_type": "Ambulatorio",
+        },
+        "samples": [{"body_region": "Piel", "tests": [{"id": "T-1", "name": "Biopsia", "quantity": 1}]}],
+        "state": "Por entregar",
+        "priority": "Normal",
+        "created_at": now,
+        "updated_at": now,
+        "assigned_pathologist": {"id": "P-1", "name": "Dra. Demo"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_build_report_context_reads_case_once():
+    service = CasePdfService(MagicMock())
+    service.case_service = FakeCaseService(_case_doc())
+    approval = SimpleNamespace(
+        approval_info=SimpleNamespace(reason="Confirmar"),
+        created_at=datetime.now(timezone.utc),
+        approval_state=SimpleNamespace(value="request_made"),
+        complementary_tests=[SimpleNamespace(code="IHQ", name="Inmunohistoquímica", quantity=2)],
+    )
+    service.approval_service = FakeApprovalService([approval])
+
+    async def _no_signature(case_data):
+        return None
+
+    service._get_pathologist_signature = _no_signature
+
+    ctx = await service.build_report_context("2025-00001")
+    assert service.case_service.calls == 1
+    assert service.approval_service.calls == ["2025-00001"]
+    assert ctx["case"]["caso_code"] == "2025-00001"
+    assert ctx["pruebas_complementarias"]["pruebas"][0]["codigo"] == "IHQ"
+    assert ctx["file"]["filename"] == "2025-00001-Juan_Pérez.pdf"
+    assert ctx["file"]["filename_utf8"].endswith(".pdf")
+
+
+@pytest.mark.asyncio
+async def test_build_report_context_without_pending_approvals():
+    service = CasePdfService(MagicMock())
+    service.case_service = FakeCaseService(_case_doc())
+    service.approval_service = FakeApprovalService([])
+
+    async def _no_signature(case_data):
+        return None
+
+    service._get_pathologist_signature = _no_signature
+
+    ctx = await service.build_report_context("2025-00001")
+    assert ctx["pruebas_complementarias"] is None
+
+
+@pytest.mark.asyncio
+async def test_generate_case_pdf_records_phases():
+    service = CasePdfService(MagicMock())
+    service.case_service = FakeCaseService(_case_doc())
+    service.approval_service = FakeApprovalService([])
+
+    async def _no_signature(case_data):
+        return None
+
+    class FakeRenderer:
+        name = "fake"
+
+        async def render(self, context, logos):
+            return b"%PDF-fake"
+
+    service._get_pathologist_signature = _no_signature
+    service.renderer = FakeRenderer()
+
+    with record_phases() as phases:
+        pdf_bytes, file_meta = await service.generate_case_pdf("2025-00001")
+
+    assert pdf_bytes == b"%PDF-fake"
+    assert file_meta["filename"].endswith(".pdf")
+    assert {"pdf.generate", "pdf.context", "pdf.case_read", "pdf.approvals", "pdf.render"} <= set(phases)
+    assert all(p["calls"] == 1 for p in phases.values())
+    assert "pdf-render;dur=" in server_timing_header(phases)
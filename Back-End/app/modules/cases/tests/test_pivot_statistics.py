@@ -0,0 +1,96 @@
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics import rollup_repository
+from app.modules.cases.repositories.statistics.pivot_statistics_repository import (
+    MAX_PIVOT_GROUPS,
+    PivotStatisticsRepository,
+    compile_pivot,
+)
+from app.modules.cases.services.statistics.pivot_statistics_service import PivotStatisticsService
+
+
+
+@pytest.mark.asyncio
+async def test_pivot_compiles_to_one_rollup_aggregation(monkeypatch):
+    monkeypatch.setattr(rollup_repository.CaseStatsRollupRepository, "_ready", True)
+    cases = MagicMock()
+    repo = PivotStatisticsRepository(SimpleNamespace(cases=cases, case_stats_monthly=MagicMock()))
+    repo.rollups.aggregate = AsyncMock(return_value=[{"entity": "HAMA", "month": 11, "count": 4, "avg_business_days": 5.5}])
+    data = await repo.pivot(["entity", "month"], ["count", "avg_business_days"], (2024, 11), (2025, 2), pathologist="P-1")
+    cases.aggregate.assert_not_called()
+    assert data["source"] == "rollups" and data["rows"][0]["entity"] == "HAMA"
+
+    pipeline = repo.rollups.aggregate.call_args[0][0]
+    assert pipeline[0]["$match"] == {
+        "basis": "signed", "level": "case", "year": {"$gte": 2024, "$lte": 2025},
+        "$nor": [{"year": 2024, "month": {"$lt": 11}}, {"year": 2025, "month": {"$gt": 2}}],
+        "pathologist_id": "P-1",
+    }
+    group = pipeline[1]["$group"]
+    assert group["_id"] == {"entity": "$entity_id", "month": "$month"}
+    assert set(group) == {"_id", "entity_name", "cases", "business_days_sum", "business_days_count"}
+
+
+@pytest.mark.asyncio
+async def test_pivot_falls_back_to_cases_at_test_level(fake_cursor):
+    cases = MagicMock()
+    cases.aggregate = MagicMock(return_value=fake_cursor([]))
+    repo = PivotStatisticsRepository(SimpleNamespace(cases=cases))
+    data = await repo.pivot(["test"], ["within_pct"], (2025, 3), (2025, 3), basis="created", state="Completado")
+    assert data["source"] == "cases"
+    pipeline = cases.aggregate.call_args[0][0]
+    assert pipeline[0]["$match"] == {"created_at": {"$gte": datetime(2025, 3, 1), "$lt": datetime(2025, 4, 1)}, "state": "Completado"}
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$unwind", "$unwind", "$group", "$project", "$sort", "$limit"]
+
+
+def test_compiled_stages_are_cached_per_shape():
+    compile_pivot.cache_clear()
+    compile_pivot("rollups", "signed", ("entity",), ("count",))
+    compile_pivot("rollups", "signed", ("entity",), ("count",))
+    compile_pivot("rollups", "signed", ("pathologist",), ("count",))
+    assert compile_pivot.cache_info().hits == 1 and compile_pivot.cache_info().misses == 2
+
+
+@pytest.mark.asyncio
+async def test_pivot_rejects_too_many_groups(fake_cursor):
+    cases = MagicMock()
+    cases.aggregate = MagicMock(return_value=fake_cursor([{"entity": str(i), "count": 1} for i in range(MAX_PIVOT_GROUPS + 1)]))
+    repo = PivotStatisticsRepository(SimpleNamespace(cases=cases))
+    with pytest.raises(BadRequestError):
+        await repo.pivot(["entity"], ["count"], (2025, 1), (2025, 1))
+
+
+@pytest.mark.asyncio
+async def test_service_validates_request():
+    service = PivotStatisticsService(SimpleNamespace(cases=MagicMock()))
+    with pytest.raises(BadRequestError):
+        await service.pivot("entity,color", "count", "2025-01")
+    with pytest.raises(BadRequestError):
+        await service.pivot("entity", "count", "2025-06", "2025-01")
+    with pytest.raises(BadRequestError):
+        await service.pivot("entity", "count", "2021-01", "2025-01")
+    with pytest.raises(BadRequestError):
+        await service.pivot("test", "samples", "2025-01")
+
+    service.repo.pivot = AsyncMock(return_value={"source": "cases", "rows": [{"entity": "HAMA", "count": 3}]})
+    data = await service.pivot("entity", "", "2025-01", "2025-03")
+    assert data["measures"] == ["count"] and data["from"] == "2025-01" and data["to"] == "2025-03"
+    assert data["groups"] == 1
+
+
+@pytest.mark.asyncio
+async def test_service_cache_key_uses_resolved_codes(fake_cursor):
+    db = SimpleNamespace(
+        cases=MagicMock(),
+        entities=MagicMock(find=MagicMock(return_value=fake_cursor([{"entity_code": "HAMA", "name": "Hospital Alma Máter de Antioquia"}]))),
+        entity_aliases=None,
+        pathologists=MagicMock(find=MagicMock(return_value=fake_cursor([{"pathologist_code": "P-1", "pathologist_name": "Dra. Ana Gómez"}]))),
+    )
+    service = PivotStatisticsService(db)
+    service.repo.pivot = AsyncMock(return_value={"source": "rollups", "rows": []})
+    await service.pivot("month", "count", "2024-01", entity="HAMA", pathologist="P-1")
+    await service.pivot("month", "count", "2024-01", entity="Hospital Alma Máter de Antioquia", pathologist="dra. ana gómez")
+    service.repo.pivot.assert_awaited_once()
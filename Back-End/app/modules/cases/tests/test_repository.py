@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import AsyncMock
-from app.modules.cases.repositories.case_repository import CaseRepository
-from app.modules.cases.repositories.urgent_cases_repository import UrgentCasesRepository
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+from app.modules.cases.repositories.case_repository import CaseRepository, STATISTICS_INDEXES
+from app.modules.cases.repositories.urgent_cases_repository import OPEN_CASES_FILTER, UrgentCasesRepository
 
 
 @pytest.mark.asyncio
@@ -19,6 +21,17 @@ async def test_case_repository_update_sets_updated_at(mock_db):
     assert "updated_at" in set_doc
 
 
+@pytest.mark.asyncio
+async def test_case_repository_statistics_indexes_are_named_and_partial(mock_db):
+    repo = CaseRepository(mock_db)
+    mock_db.cases.drop_index = AsyncMock(side_effect=OperationFailure("index not found"))
+    await repo.ensure_statistics_indexes()
+    calls = {kwargs["name"]: kwargs for _, kwargs in mock_db.cases.create_index.call_args_list}
+    assert set(calls) == {name for name, _, _ in STATISTICS_INDEXES}
+    assert calls["stats_completed_signed"]["partialFilterExpression"] == {"state": "Completado"}
+    assert "partialFilterExpression" not in calls["stats_created_pathologist"]
+
+
 @pytest.mark.asyncio
 async def test_case_repository_delete_returns_bool(mock_db):
     repo = CaseRepository(mock_db)
@@ -51,4 +64,25 @@ async def test_urgent_cases_repository_builds_pipeline_with_pathologist_filter(m
     # Verifica que se construye filtro de estado por $in
     assert pipeline[0]["$match"]["state"]["$in"] == ["En proceso", "Por firmar"]
     # Asegura que se filtre por patólogo si se proporciona
-    assert pipeline[0]["$match"]["assigned_pathologist.id"] == "P-9"
\ No newline at end of file
+    assert pipeline[0]["$match"]["assigned_pathologist.id"] == "P-9"
+    # Orden y límite sobre created_at antes de proyectar; sin $unwind ni $group
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$sort", "$limit", "$project"]
+    assert pipeline[1]["$sort"] == {"created_at": 1} and pipeline[2]["$limit"] == 10
+
+
+@pytest.mark.asyncio
+async def test_urgent_indexes_are_partial_on_open_states(mock_db):
+    await UrgentCasesRepository(mock_db).ensure_indexes()
+    for _, kwargs in mock_db.cases.create_index.call_args_list:
+        assert kwargs["partialFilterExpression"] == OPEN_CASES_FILTER
+
+
+@pytest.mark.asyncio
+async def test_case_repository_update_returns_pre_image_of_the_same_write(mock_db):
+    repo = CaseRepository(mock_db)
+    mock_db.cases.find_one_and_update = AsyncMock(return_value={"case_code": "2025-00001", "state": "En proceso"})
+    before, after = await repo.update_with_previous("2025-00001", {"state": "Por firmar"})
+    assert before["state"] == "En proceso" and after["state"] == "Por firmar" and "updated_at" in after
+    assert mock_db.cases.find_one_and_update.call_args.kwargs["return_document"] == ReturnDocument.BEFORE
+    mock_db.cases.find_one_and_update = AsyncMock(return_value=None)
+    assert await repo.update_with_previous("2025-99999", {"state": "Por firmar"}) == (None, None)
@@ -28,6 +28,15 @@ class FakeRepo:
     async def delete_by_case_code(self, code):
         return bool(self._store.pop(code, None))
 
+    async def update_with_previous(self, code, update):
+        before = self._store.get(code)
+        if before is None:
+            return None, None
+        return before, await self.update_by_case_code(code, update)
+
+    async def delete_returning_previous(self, code):
+        return self._store.pop(code, None)
+
 
 class FakeSeq:
     def __init__(self, fixed_code="2025-00001"):
@@ -0,0 +1,178 @@
+"""Planes de consulta de las estadísticas contra un MongoDB real.
+
+Ejecuta cada endpoint de estadísticas sobre una base sintética con los índices de CaseRepository,
+captura los pipelines que envía y verifica con explain() que el $match inicial use un índice
+(IXSCAN, sin COLLSCAN) y que los documentos examinados estén acotados.
+
+Requiere STATS_EXPLAIN_MONGODB_URL (p. ej. mongodb://localhost:27017); sin ella se omite.
+Usa una base de datos desechable que se borra al terminar."""
+
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.modules.cases.repositories.case_repository import CaseRepository
+from app.modules.cases.repositories.statistics.dashboard_statistics_repository import DashboardStatisticsRepository
+from app.modules.cases.repositories.statistics.entity_statistics_repository import EntityStatisticsRepository
+from app.modules.cases.repositories.statistics.opportunity_statistics_repository import OpportunityStatisticsRepository
+from app.modules.cases.repositories.statistics.pathologist_statistics_repository import PathologistStatisticsRepository
+from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+
+MONGODB_URL = os.getenv("STATS_EXPLAIN_MONGODB_URL")
+DATABASE_NAME = "pathsys_explain_statistics"
+
+pytestmark = pytest.mark.skipif(not MONGODB_URL, reason="STATS_EXPLAIN_MONGODB_URL no configurada")
+
+NOW = datetime.now(timezone.utc)
+MONTH_START = datetime(NOW.year - 1, 12, 1) if NOW.month == 1 else datetime(NOW.year, NOW.month - 1, 1)
+MONTH, YEAR = MONTH_START.month, MONTH_START.year
+
+ENTITIES = [("HAMA", "Hospital Alma Máter de Antioquia"), ("HGM", "Hospital General de Medellín"), ("CES", "Clínica CES")]
+PATHOLOGISTS = [("P-1", "Dra. Ana Demo"), ("P-2", "Dr. Luis Demo"), ("P-3", "Dra. Eva Demo")]
+TESTS = [(f"T-{i:02d}", f"Prueba {i}") for i in range(30)]
+
+
+def _seed_cases(count: int = 4000):
+    rng = random.Random(38)
+    docs = []
+    for i in range(count):
+        created = NOW - timedelta(days=rng.randint(0, 420), hours=rng.randint(0, 23))
+        entity = rng.choice(ENTITIES)
+        pathologist = rng.choice(PATHOLOGISTS)
+        doc = {
+            "case_code": f"EX-{i:05d}",
+            "created_at": created,
+            "state": rng.choice(["Completado"] * 7 + ["En proceso", "Por firmar", "Por entregar"]),
+            "patient_info": {
+                "patient_code": f"CC-{rng.randint(1, 1500)}",
+                "identification_type": "CC",
+                "identification_number": str(rng.randint(1, 1500)),
+                "entity_info": {"id": entity[0], "name": entity[1]},
+                "care_type": rng.choice(["Ambulatorio", "Hospitalizado"]),
+            },
+            "assigned_pathologist": {"id": pathologist[0], "name": pathologist[1]},
+            "samples": [
+                {"body_region": "Piel", "tests": [dict(zip(("id", "name"), rng.choice(TESTS))) for _ in range(rng.randint(1, 3))]}
+                for _ in range(rng.randint(1, 2))
+            ],
+        }
+        if doc["state"] in ("Completado", "Por entregar"):
+            doc["signed_at"] = created + timedelta(days=rng.randint(1, 12))
+            doc["business_days"] = rng.randint(1, 12)
+        docs.append(doc)
+    return docs
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    from pymongo import MongoClient
+
+    client = MongoClient(MONGODB_URL)
+    client.drop_database(DATABASE_NAME)
+    db = client[DATABASE_NAME]
+    docs = _seed_cases()
+    db.cases.insert_many(docs)
+    db.entities.insert_many([{"entity_code": code, "name": name, "is_active": True} for code, name in ENTITIES])
+    db.tests.insert_many([{"test_code": code, "name": name, "is_active": True} for code, name in TESTS])
+    db.pathologists.insert_many([{"pathologist_code": code, "pathologist_name": name, "is_active": True} for code, name in PATHOLOGISTS])
+    yield
+    client.drop_database(DATABASE_NAME)
+    client.close()
+
+
+class RecordingCollection:
+    def __init__(self, inner):
+        self.inner = inner
+        self.pipelines = []
+
+    def aggregate(self, pipeline, *args, **kwargs):
+        self.pipelines.append(pipeline)
+        return self.inner.aggregate(pipeline, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+class RecordingDatabase:
+    def __init__(self, inner):
+        self.inner = inner
+        self.cases = RecordingCollection(inner.cases)
+
+    def __getitem__(self, name):
+        return self.cases if name == "cases" else self.inner[name]
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+def _plan_stages(plan):
+    # Recorre winningPlan; cubre el formato clásico y el de SBE (queryPlan anidado)
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+# (endpoint, repositorio, llamada); todo el filtro lo resuelve el índice, así que cada documento
+# examinado se devuelve
+ENDPOINTS = [
+    ("dashboard.cases_by_month", DashboardStatisticsRepository, lambda r: r.get_cases_by_month(YEAR)),
+    ("dashboard.cases_by_month_pathologist", DashboardStatisticsRepository, lambda r: r.get_cases_by_month_pathologist(YEAR, "P-1")),
+    ("dashboard.overview", DashboardStatisticsRepository, lambda r: r.get_dashboard_overview()),
+    ("dashboard.metrics_general", DashboardStatisticsRepository, lambda r: r.get_metrics_general()),
+    ("dashboard.metrics_pathologist", DashboardStatisticsRepository, lambda r: r.get_metrics_pathologist("P-2")),
+    ("opportunity.general", OpportunityStatisticsRepository, lambda r: r.get_opportunity_general(7)),
+    ("opportunity.pathologist", OpportunityStatisticsRepository, lambda r: r.get_opportunity_pathologist("P-1", 7)),
+    ("opportunity.monthly", OpportunityStatisticsRepository, lambda r: r.get_monthly_opportunity(MONTH, YEAR, 7)),
+    ("opportunity.monthly_entity", OpportunityStatisticsRepository, lambda r: r.get_monthly_opportunity(MONTH, YEAR, 7, "Hospital")),
+    ("opportunity.yearly", OpportunityStatisticsRepository, lambda r: r.get_yearly_opportunity_series([YEAR, YEAR - 1], 7)),
+    ("entity.monthly_performance", EntityStatisticsRepository, lambda r: r.get_monthly_entity_performance(MONTH, YEAR)),
+    ("entity.monthly_performance_filtered", EntityStatisticsRepository, lambda r: r.get_monthly_entity_performance(MONTH, YEAR, "CES")),
+    ("entity.details", EntityStatisticsRepository, lambda r: r.get_entity_details("Alma Máter", MONTH, YEAR)),
+    ("entity.pathologists", EntityStatisticsRepository, lambda r: r.get_entity_pathologists("HGM", MONTH, YEAR)),
+    ("test.monthly_performance", TestStatisticsRepository, lambda r: r.get_monthly_test_performance(MONTH, YEAR)),
+    ("test.monthly_performance_entity", TestStatisticsRepository, lambda r: r.get_monthly_test_performance(MONTH, YEAR, "HAMA")),
+    ("test.details", TestStatisticsRepository, lambda r: r.get_test_details("T-03", MONTH, YEAR)),
+    ("test.pathologists", TestStatisticsRepository, lambda r: r.get_test_pathologists("T-04", MONTH, YEAR)),
+    ("test.opportunity_summary", TestStatisticsRepository, lambda r: r.get_test_opportunity_summary(MONTH, YEAR, 7)),
+    ("test.monthly_trends", TestStatisticsRepository, lambda r: r.get_test_monthly_trends(YEAR)),
+    ("pathologist.monthly_performance", PathologistStatisticsRepository, lambda r: r.get_pathologist_monthly_performance(MONTH, YEAR)),
+    ("pathologist.entities", PathologistStatisticsRepository, lambda r: r.get_pathologist_entities("Ana", MONTH, YEAR)),
+    ("pathologist.tests", PathologistStatisticsRepository, lambda r: r.get_pathologist_tests("Luis", MONTH, YEAR)),
+    ("pathologist.monthly_performance_filtered", PathologistStatisticsRepository, lambda r: r.get_pathologist_monthly_performance(MONTH, YEAR, 7, "Ana")),
+    ("pathologist.opportunity_summary", PathologistStatisticsRepository, lambda r: r.get_pathologist_opportunity_summary("P-2")),
+    ("pathologist.monthly_trends", PathologistStatisticsRepository, lambda r: r.get_pathologist_monthly_trends("Dra. Eva Demo", YEAR)),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("label, repository_class, call", ENDPOINTS, ids=[e[0] for e in ENDPOINTS])
+async def test_statistics_match_uses_index(seeded, label, repository_class, call):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    try:
+        db = client[DATABASE_NAME]
+        await CaseRepository(db).ensure_indexes()
+        recording = RecordingDatabase(db)
+        await call(repository_class(recording))
+
+        matches = [p[0]["$match"] for p in recording.cases.pipelines if p and "$match" in p[0]]
+        assert matches, f"{label}: no se envió ningún $match a cases"
+        for match in matches:
+            explain = await db.cases.find(match).explain()
+            stages = set(_plan_stages(explain["queryPlanner"]["winningPlan"]))
+            assert "IXSCAN" in stages and "COLLSCAN" not in stages, f"{label}: {sorted(stages)} para {match}"
+
+            stats = explain["executionStats"]
+            assert stats["totalDocsExamined"] <= stats["nReturned"], (
+                f"{label}: examinó {stats['totalDocsExamined']} documentos (máximo {stats['nReturned']}) para {match}"
+            )
+    finally:
+        client.close()
@@ -0,0 +1,138 @@
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics.closed_month_store import closed_months_back, is_closed_month
+from app.modules.cases.services.statistics.statistics_prewarm import StatisticsPrewarmer
+from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+from app.modules.cases.services.statistics.stats_cache import StatsCache, stats_cache
+from app.modules.cases.services.statistics.test_statistics_service import TestStatisticsService
+
+
+class MemoryClosedMonthStore:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key, (None, None))[1]
+
+    async def put(self, key, namespace, month, value):
+        self.values[key] = (month, value)
+
+    async def drop_months(self, months):
+        months = set(months)
+        stale = [key for key, (month, _) in self.values.items() if month in months]
+        for key in stale:
+            del self.values[key]
+        return len(stale)
+
+
+def test_closed_months_are_before_the_current_month():
+    now = datetime(2025, 3, 15, tzinfo=timezone.utc)
+    assert is_closed_month((2025, 2), now) and not is_closed_month((2025, 3), now)
+    assert closed_months_back(3, now) == [(2025, 2), (2025, 1), (2024, 12)]
+
+
+@pytest.mark.asyncio
+async def test_closed_month_results_survive_the_process_and_invalidation_drops_them():
+    store = MemoryClosedMonthStore()
+    first = StatsCache()
+    first.attach_closed_month_store(store, ["tests.monthly_performance"])
+    compute = AsyncMock(return_value={"tests": [1]})
+    await first.get_or_compute("tests.monthly_performance", {"month": 1, "year": 2024}, compute, months=[(2024, 1)])
+
+    # Otro proceso (caché local vacía) lo sirve desde el almacén sin recalcular
+    second = StatsCache()
+    second.attach_closed_month_store(store, ["tests.monthly_performance"])
+    assert await second.get_or_compute("tests.monthly_performance", {"month": 1, "year": 2024}, compute, months=[(2024, 1)]) == {"tests": [1]}
+    compute.assert_awaited_once()
+    assert second.metrics()["stored_hits"] == 1
+
+    # El mes en curso y los namespaces no registrados no se persisten
+    now = datetime.now(timezone.utc)
+    await second.get_or_compute("tests.monthly_performance", {"month": now.month}, compute, months=[(now.year, now.month)])
+    await second.get_or_compute("other", {}, compute, months=[(2024, 1)])
+    assert len(store.values) == 1
+
+    await second.invalidate_months([(2024, 1)])
+    assert store.values == {}
+
+
+@pytest.mark.asyncio
+async def test_prewarm_month_covers_every_entity():
+    db = MagicMock()
+    db.cases.distinct = AsyncMock(return_value=["HAMA", "HGM", None])
+    prewarmer = StatisticsPrewarmer(db)
+    prewarmer.store = MagicMock(mark_prewarmed=AsyncMock())
+    prewarmer.opportunity.get_monthly = AsyncMock()
+    prewarmer.tests.get_monthly_test_performance = AsyncMock()
+    prewarmer.entities.get_monthly_performance = AsyncMock()
+    prewarmer.pathologists.get_monthly_performance = AsyncMock()
+
+    summary = await prewarmer.prewarm_month(2024, 5)
+    assert summary == {"year": 2024, "month": 5, "results": 10, "failures": 0, "stored": True, "entities": 2}
+    # General + HAMA + HGM; los reportes mensuales no filtran por patólogo
+    assert prewarmer.opportunity.get_monthly.await_count == 3
+    prewarmer.pathologists.get_monthly_performance.assert_awaited_once_with(5, 2024)
+    prewarmer.store.mark_prewarmed.assert_awaited_once_with((2024, 5), 10)
+
+    now = datetime.now(timezone.utc)
+    with pytest.raises(BadRequestError):
+        await prewarmer.prewarm_month(now.year, now.month)
+
+
+@pytest.mark.asyncio
+async def test_prewarm_month_stays_pending_when_an_invalidation_discards_results():
+    db = MagicMock()
+    db.cases.distinct = AsyncMock(return_value=["HAMA"])
+    prewarmer = StatisticsPrewarmer(db)
+    prewarmer.store = MagicMock(mark_prewarmed=AsyncMock())
+    prewarmer.tests.get_monthly_test_performance = AsyncMock()
+    prewarmer.entities.get_monthly_performance = AsyncMock()
+    prewarmer.pathologists.get_monthly_performance = AsyncMock()
+
+    async def write_during_prewarm(*args, **kwargs):
+        # Una escritura de caso invalida la caché mientras se calcula
+        await stats_cache.invalidate_months([(2024, 6)])
+
+    prewarmer.opportunity.get_monthly = AsyncMock(side_effect=write_during_prewarm)
+    summary = await prewarmer.prewarm_month(2024, 6)
+    assert summary["failures"] == 0 and summary["stored"] is False
+    prewarmer.store.mark_prewarmed.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_monthly_cache_key_uses_entity_codes_so_names_hit_prewarmed_results(fake_cursor):
+    db = SimpleNamespace(
+        cases=MagicMock(),
+        tests=MagicMock(),
+        entities=MagicMock(find=MagicMock(return_value=fake_cursor([{"entity_code": "HAMA", "name": "Hospital Alma Máter de Antioquia"}]))),
+        entity_aliases=None,
+    )
+    service = TestStatisticsService(TestStatisticsRepository(db))
+    service.repository.get_monthly_test_performance = AsyncMock(return_value={"tests": []})
+    await service.get_monthly_test_performance(5, 2024, "HAMA")
+    await service.get_monthly_test_performance(5, 2024, "Hospital Alma Máter de Antioquia")
+    service.repository.get_monthly_test_performance.assert_awaited_once_with(5, 2024, "HAMA")
+
+
+@pytest.mark.asyncio
+async def test_prewarm_month_is_marked_when_only_the_current_month_is_written():
+    db = MagicMock()
+    db.cases.distinct = AsyncMock(return_value=[])
+    prewarmer = StatisticsPrewarmer(db)
+    prewarmer.store = MagicMock(mark_prewarmed=AsyncMock())
+    prewarmer.tests.get_monthly_test_performance = AsyncMock()
+    prewarmer.entities.get_monthly_performance = AsyncMock()
+    prewarmer.pathologists.get_monthly_performance = AsyncMock()
+    now = datetime.now(timezone.utc)
+
+    async def write_today(*args, **kwargs):
+        # Un caso creado hoy no toca el mes que se pre-calcula
+        await stats_cache.invalidate_months([(now.year, now.month)])
+
+    prewarmer.opportunity.get_monthly = AsyncMock(side_effect=write_today)
+    summary = await prewarmer.prewarm_month(2024, 6)
+    assert summary["stored"] is True
+    prewarmer.store.mark_prewarmed.assert_awaited_once_with((2024, 6), 4)
@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+from app.modules.cases.services.statistics.stats_cache import StatsCache, case_months, year_months
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_and_metrics():
+    cache = StatsCache(max_entries=10, ttl_seconds=60)
+    compute = AsyncMock(return_value={"total": 3})
+    assert await cache.get_or_compute("ns", {"year": 2024}, compute, months=year_months(2024)) == {"total": 3}
+    assert await cache.get_or_compute("ns", {"year": 2024}, compute, months=year_months(2024)) == {"total": 3}
+    compute.assert_awaited_once()
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["hit_ratio"]) == (1, 1, 0.5)
+
+
+@pytest.mark.asyncio
+async def test_past_months_outlive_current_ones():
+    cache = StatsCache(ttl_seconds=0, closed_month_ttl_seconds=60)
+    now = datetime.now(timezone.utc)
+    past = AsyncMock(return_value=1)
+    current = AsyncMock(return_value=2)
+    for _ in range(2):
+        await cache.get_or_compute("past", {}, past, months=[(2020, 1)])
+        await cache.get_or_compute("current", {}, current, months=[(now.year, now.month)])
+    assert past.await_count == 1
+    assert current.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_past_months_expire_without_shared_backend():
+    # Otro proceso pudo escribir en ese mes: la copia local no puede vivir para siempre
+    cache = StatsCache(ttl_seconds=0)
+    past = AsyncMock(return_value=1)
+    for _ in range(2):
+        await cache.get_or_compute("past", {}, past, months=[(2020, 1)])
+    assert past.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_case_write_invalidates_affected_months_and_rolling_results():
+    cache = StatsCache()
+    calls = {"feb": 0, "mar": 0, "rolling": 0}
+
+    def compute(name):
+        async def run():
+            calls[name] += 1
+            return name
+        return run
+
+    for _ in range(2):
+        await cache.get_or_compute("feb", {}, compute("feb"), months=[(2024, 2)])
+        await cache.get_or_compute("mar", {}, compute("mar"), months=[(2024, 3)])
+        await cache.get_or_compute("rolling", {}, compute("rolling"))
+    old = {"created_at": datetime(2024, 2, 27), "signed_at": None}
+    new = {"created_at": datetime(2024, 2, 27), "signed_at": datetime(2024, 2, 29, tzinfo=timezone.utc)}
+    assert case_months(old, new) == [(2024, 2)]
+    assert await cache.invalidate_case_change(old, new) == 2
+    for name, months in (("feb", [(2024, 2)]), ("mar", [(2024, 3)]), ("rolling", None)):
+        await cache.get_or_compute(name, {}, compute(name), months=months)
+    assert calls == {"feb": 2, "mar": 1, "rolling": 2}
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_concurrent_misses_share_one_computation():
+    cache = StatsCache(max_entries=1)
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    compute = AsyncMock(side_effect=slow)
+    results = await asyncio.gather(*(cache.get_or_compute("a", {}, compute, months=[(2020, 1)]) for _ in range(5)))
+    assert results == ["ok"] * 5 and compute.await_count == 1
+    await cache.get_or_compute("b", {}, AsyncMock(return_value=1), months=[(2020, 1)])
+    assert cache.metrics()["evictions"] == 1 and cache.metrics()["joined_inflight"] == 4
+
+
+@pytest.mark.asyncio
+async def test_result_computed_during_invalidation_is_not_stored():
+    cache = StatsCache()
+
+    async def compute():
+        await cache.invalidate_months([(2020, 1)])
+        return "stale"
+
+    await cache.get_or_compute("a", {}, compute, months=[(2020, 1)])
+    assert cache.metrics()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_callers_get_independent_copies_of_cached_results():
+    cache = StatsCache()
+    compute = AsyncMock(return_value={"rows": [{"total": 1}]})
+    first = await cache.get_or_compute("ns", {}, compute, months=[(2020, 1)])
+    first["rows"].append({"total": 2})
+    second = await cache.get_or_compute("ns", {}, compute, months=[(2020, 1)])
+    second["rows"][0]["total"] = 99
+    assert await cache.get_or_compute("ns", {}, compute, months=[(2020, 1)]) == {"rows": [{"total": 1}]}
+    compute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_write_to_another_month_does_not_discard_a_closed_month_result():
+    store = AsyncMock(get=AsyncMock(return_value=None))
+    cache = StatsCache()
+    cache.attach_closed_month_store(store, ["ns"])
+    now = datetime.now(timezone.utc)
+
+    async def compute():
+        # Un caso creado hoy se escribe mientras se calcula un mes cerrado
+        await cache.invalidate_months([(now.year, now.month)])
+        return "closed"
+
+    await cache.get_or_compute("ns", {}, compute, months=[(2025, 3)])
+    store.put.assert_awaited_once()
+    assert cache.metrics()["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_recompute_when_the_leading_request_is_cancelled():
+    cache = StatsCache()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    leader = asyncio.create_task(cache.get_or_compute("a", {}, slow, months=[(2020, 1)]))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_compute("a", {}, AsyncMock(return_value="ok"), months=[(2020, 1)]))
+    await asyncio.sleep(0)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert await waiter == "ok"
+    assert cache.metrics()["joined_inflight"] == 1
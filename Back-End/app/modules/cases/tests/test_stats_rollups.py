@@ -0,0 +1,126 @@
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.modules.cases.repositories.statistics import rollup_repository
+from app.modules.cases.repositories.statistics.rollup_repository import (
+    CaseStatsRollupRepository,
+    KEY_FIELDS,
+    case_contributions,
+    diff_contributions,
+)
+from app.modules.cases.repositories.statistics.entity_statistics_repository import EntityStatisticsRepository
+from app.modules.cases.services.case_service import CaseService
+from app.modules.cases.schemas.case import CaseUpdate
+
+
+def _case(**overrides):
+    doc = {
+        "case_code": "2025-00001",
+        "created_at": datetime(2025, 1, 30, 15, 0, tzinfo=timezone.utc),
+        "state": "Por entregar",
+        "business_days": 9,
+        "patient_info": {"entity_info": {"id": "ENT-1", "name": "Entidad Demo"}, "care_type": "Ambulatorio"},
+        "assigned_pathologist": {"id": "P-1", "name": "Dra. Demo"},
+        "samples": [{"tests": [{"id": "T-1"}, {"id": "T-2"}]}, {"tests": [{"id": "T-1"}]}],
+        "signed_at": datetime(2025, 2, 3, 10, 0),
+    }
+    doc.update(overrides)
+    return doc
+
+
+def _row(rows, **dims):
+    matches = [v for k, v in rows.items() if all(dict(zip(KEY_FIELDS, k))[f] == val for f, val in dims.items())]
+    assert len(matches) == 1
+    return matches[0]
+
+
+def test_case_contributions_by_basis_and_level():
+    rows = case_contributions(_case())
+    created = _row(rows, basis="created", level="case")
+    assert (created["cases"], created["samples"], created["out_of_opportunity"]) == (1, 2, 1)
+    signed = _row(rows, basis="signed", level="case", year=2025, month=2)
+    assert signed["business_days_sum"] == 9 and signed["business_days_count"] == 1
+    # Una fila por prueba distinta; T-1 aparece dos veces en las muestras
+    assert _row(rows, basis="signed", level="test", test_code="T-1")["cases"] == 2
+    assert _row(rows, basis="signed", level="test", test_code="T-2")["cases"] == 1
+
+
+def test_case_without_signature_or_days_counts_within_opportunity():
+    rows = case_contributions(_case(signed_at=None, business_days=None, state="En proceso"))
+    assert {dict(zip(KEY_FIELDS, k))["basis"] for k in rows} == {"created"}
+    row = _row(rows, basis="created", level="case")
+    assert (row["within_opportunity"], row["business_days_count"]) == (1, 0)
+
+
+def test_diff_contributions_moves_counts_on_delivery():
+    before = _case()
+    after = _case(state="Completado")
+    delta = diff_contributions(before, after)
+    assert _row(delta, basis="signed", level="case", state="Completado")["cases"] == 1
+    assert _row(delta, basis="signed", level="case", state="Por entregar")["cases"] == -1
+    assert diff_contributions(before, dict(before)) == {}
+
+
+@pytest.mark.asyncio
+async def test_apply_change_increments_and_prunes_empty_rows():
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    collection.delete_many = AsyncMock()
+    repo = CaseStatsRollupRepository(SimpleNamespace(case_stats_monthly=collection))
+    await repo.apply_change(_case(), None)
+    operations = collection.bulk_write.call_args[0][0]
+    assert len(operations) == len(case_contributions(_case()))
+    assert all(op._doc["$inc"]["cases"] < 0 for op in operations)
+    collection.delete_many.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_apply_change_failure_does_not_raise():
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock(side_effect=RuntimeError("mongo caído"))
+    repo = CaseStatsRollupRepository(SimpleNamespace(case_stats_monthly=collection))
+    await repo.apply_change(None, _case())
+
+
+@pytest.mark.asyncio
+async def test_case_service_update_applies_rollup_change(monkeypatch, mock_db):
+    before = _case()
+    after = _case(state="Completado")
+    service = CaseService(db=mock_db)
+    service.repo = SimpleNamespace(
+        get_by_case_code=AsyncMock(return_value=before),
+        update_with_previous=AsyncMock(return_value=(before, after)),
+    )
+    service.rollups.apply_change = AsyncMock()
+    monkeypatch.setattr(service, "_to_response", lambda doc: doc)
+    await service.update_case("2025-00001", CaseUpdate(state="Completado"))
+    service.rollups.apply_change.assert_awaited_once_with(before, after)
+
+
+@pytest.mark.asyncio
+async def test_entity_performance_reads_rollups_when_ready(monkeypatch):
+    monkeypatch.setattr(rollup_repository.CaseStatsRollupRepository, "_ready", True)
+    cases = MagicMock()
+    repo = EntityStatisticsRepository(SimpleNamespace(cases=cases, case_stats_monthly=MagicMock()))
+    repo.rollups.aggregate = AsyncMock(return_value=[
+        {"nombre": "Entidad Demo", "codigo": "ENT-1", "ambulatorios": 2, "hospitalizados": 1, "total": 3, "avg_business_days": 4.0},
+        {"nombre": "Sin días", "codigo": "ENT-2", "ambulatorios": 1, "hospitalizados": 0, "total": 1, "avg_business_days": None},
+    ])
+    data = await repo.get_monthly_entity_performance(2, 2025)
+    cases.aggregate.assert_not_called()
+    pipeline = repo.rollups.aggregate.call_args[0][0]
+    assert pipeline[0]["$match"]["basis"] == "signed" and pipeline[0]["$match"]["state"] == "Completado"
+    assert data["summary"] == {"total": 4, "ambulatorios": 3, "hospitalizados": 1, "tiempoPromedio": 3.0}
+
+
+@pytest.mark.asyncio
+async def test_rollup_path_resolves_the_entity_once(monkeypatch):
+    monkeypatch.setattr(rollup_repository.CaseStatsRollupRepository, "_ready", True)
+    repo = EntityStatisticsRepository(SimpleNamespace(cases=MagicMock(), case_stats_monthly=MagicMock()))
+    repo.rollups.aggregate = AsyncMock(return_value=[])
+    repo.entity_filter.apply = AsyncMock(side_effect=lambda match, *args, **kwargs: match)
+    await repo.get_monthly_entity_performance(2, 2025, "HAMA")
+    # Solo el filtro sobre los rollups: el pipeline sobre los casos no se arma
+    repo.entity_filter.apply.assert_awaited_once()
+    assert repo.entity_filter.apply.await_args.kwargs == {"field": "entity_id"}
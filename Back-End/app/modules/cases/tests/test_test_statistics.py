@@ -0,0 +1,95 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from app.modules.tests.repositories.test_catalog import TestCatalogCache
+from app.modules.cases.repositories.statistics.test_statistics_repository import TestStatisticsRepository
+
+
+
+def _catalog_collection(fake_cursor, docs):
+    collection = MagicMock()
+    collection.find = MagicMock(side_effect=lambda *args, **kwargs: fake_cursor(docs))
+    return collection
+
+
+def _repo(fake_cursor, rows, catalog):
+    cases = MagicMock()
+    cases.aggregate = MagicMock(return_value=fake_cursor(rows))
+    tests = _catalog_collection(fake_cursor, catalog)
+    return TestStatisticsRepository(SimpleNamespace(cases=cases, tests=tests)), cases, tests
+
+
+@pytest.mark.asyncio
+async def test_catalog_loads_once_and_falls_back_to_code(fake_cursor):
+    collection = _catalog_collection(fake_cursor, [{"test_code": "T-1", "name": "Biopsia"}])
+    catalog = TestCatalogCache()
+    rows = [{"codigo": "T-1"}, {"codigo": "T-9", "nombre": "Guardado en el caso"}, {"codigo": "T-8"}]
+    await catalog.apply_names(collection, rows)
+    await catalog.names(collection, ["T-1", "T-9"])
+    assert [row["nombre"] for row in rows] == ["Biopsia", "Guardado en el caso", "T-8"]
+    # Los códigos desconocidos no recargan el catálogo en cada consulta
+    assert collection.find.call_count == 1
+    catalog.invalidate()
+    await catalog.names(collection, ["T-1"])
+    assert collection.find.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_monthly_performance_groups_before_resolving_names(fake_cursor):
+    repo, cases, tests = _repo(
+        fake_cursor,
+        [
+            {"codigo": "T-1", "solicitadas": 3, "completadas": 3, "tiempoPromedio": 4.0, "porcentajeCompletado": 100.0},
+            {"codigo": "T-2", "solicitadas": 1, "completadas": 1, "tiempoPromedio": 8.0, "porcentajeCompletado": 100.0},
+        ],
+        [{"test_code": "T-1", "name": "Biopsia"}, {"test_code": "T-2", "name": "Citología"}],
+    )
+    data = await repo.get_monthly_test_performance(2, 2025)
+    stages = [next(iter(stage)) for stage in cases.aggregate.call_args[0][0]]
+    assert "$lookup" not in stages and stages.index("$group") > stages.index("$unwind")
+    assert [t["nombre"] for t in data["tests"]] == ["Biopsia", "Citología"]
+    assert data["summary"] == {"totalSolicitadas": 4, "totalCompletadas": 4, "tiempoPromedio": 5.0}
+    assert tests.find.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_opportunity_summary_groups_by_code_only(fake_cursor):
+    repo, cases, _ = _repo(
+        fake_cursor,
+        [{"codigo": "T-1", "nombre": "Nombre viejo", "total_casos": 2, "dentro_oportunidad": 1, "fuera_oportunidad": 1}],
+        [{"test_code": "T-1", "name": "Biopsia"}],
+    )
+    data = await repo.get_test_opportunity_summary(2, 2025)
+    group = next(stage["$group"] for stage in cases.aggregate.call_args[0][0] if "$group" in stage)
+    assert group["_id"] == {"test_code": "$samples.tests.id"}
+    assert data["tests"][0]["nombre"] == "Biopsia"
+    assert data["summary"]["porcentaje_oportunidad"] == 50.0
+
+
+@pytest.mark.asyncio
+async def test_details_run_a_single_faceted_pipeline(fake_cursor):
+    repo, cases, _ = _repo(
+        fake_cursor,
+        [{
+            "resumen": [{"total_solicitadas": 4, "avg_business_days": 5.125, "dentro_oportunidad": 3, "fuera_oportunidad": 1}],
+            "patologos": [{"nombre": "Dra. Ana", "codigo": "P-1", "total_procesadas": 4, "tiempo_promedio": 5.13}],
+        }],
+        [],
+    )
+    data = await repo.get_test_details("T-1", 2, 2025)
+    assert cases.aggregate.call_count == 1
+    pipeline = cases.aggregate.call_args[0][0]
+    assert "$facet" in pipeline[-1]
+    assert "$push" not in str(pipeline)
+    assert data["estadisticas_principales"] == {"total_solicitadas": 4, "total_completadas": 4, "porcentaje_completado": 100.0}
+    assert data["tiempos_procesamiento"] == {"promedio_dias": 5.12, "dentro_oportunidad": 3, "fuera_oportunidad": 1, "total_casos": 4}
+    assert data["patologos"][0]["codigo"] == "P-1"
+
+
+@pytest.mark.asyncio
+async def test_details_without_cases_return_zeros(fake_cursor):
+    repo, _, _ = _repo(fake_cursor, [{"resumen": [], "patologos": []}], [])
+    data = await repo.get_test_details("T-1", 2, 2025)
+    assert data["estadisticas_principales"]["total_solicitadas"] == 0
+    assert data["tiempos_procesamiento"]["promedio_dias"] == 0
+    assert data["patologos"] == []
@@ -0,0 +1,85 @@
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.core.exceptions import BadRequestError
+from app.modules.cases.repositories.statistics import rollup_repository
+from app.modules.cases.repositories.statistics.rollup_repository import diff_contributions, _as_document
+from app.modules.cases.repositories.statistics.tat_sketch import MAX_TRACKED_DAYS, merge_sketches, sketch_percentiles
+from app.modules.cases.repositories.statistics.turnaround_statistics_repository import TurnaroundStatisticsRepository
+from app.modules.cases.services.statistics.opportunity_statistics_service import OpportunityStatisticsService
+
+
+
+def test_sketch_percentiles_match_nearest_rank_on_raw_values():
+    values = [1, 2, 2, 3, 3, 3, 4, 5, 8, 15, 40, 120]
+    sketch = merge_sketches([{"1": 1, "2": 2, "3": 3}, {"4": 1, "5": 1, "8": 1}, {"15": 1, "40": 1, str(MAX_TRACKED_DAYS): 1}])
+    stats = sketch_percentiles(sketch, [50, 90, 95])
+    ordered = sorted(min(v, MAX_TRACKED_DAYS) for v in values)
+    assert stats["p50"] == ordered[5] and stats["p90"] == ordered[10] and stats["p95"] == ordered[11]
+    assert stats["count"] == 12 and stats["max"] == MAX_TRACKED_DAYS
+    assert sketch_percentiles({}, [50]) == {"count": 0, "p50": None, "max": None}
+
+
+def test_rollup_rows_carry_business_days_histogram():
+    before = {"signed_at": datetime(2025, 2, 3), "state": "Completado", "business_days": 4, "samples": []}
+    after = {**before, "business_days": 9}
+    delta = diff_contributions(before, after)
+    (values,) = delta.values()
+    assert values == {"business_days_sum": 5, "within_opportunity": -1, "out_of_opportunity": 1, "tat_days.4": -1, "tat_days.9": 1}
+    doc = _as_document(next(iter(delta)), {"cases": 1, "tat_days.9": 1, "tat_days.4": 0})
+    assert doc["tat_days"] == {"9": 1} and doc["cases"] == 1
+
+
+@pytest.mark.asyncio
+async def test_percentiles_merge_sketches_from_rollups(monkeypatch):
+    monkeypatch.setattr(rollup_repository.CaseStatsRollupRepository, "_ready", True)
+    monkeypatch.setattr(rollup_repository.CaseStatsRollupRepository, "_version", 2)
+    cases = MagicMock()
+    repo = TurnaroundStatisticsRepository(SimpleNamespace(cases=cases, case_stats_monthly=MagicMock()))
+    repo.rollups.aggregate = AsyncMock(return_value=[
+        {"_id": "P-1", "name": "Dra. Demo", "buckets": [{"k": "3", "v": 8}, {"k": "12", "v": 2}]},
+        {"_id": "P-2", "name": "Dr. Demo", "buckets": [{"k": "5", "v": 1}]},
+    ])
+    data = await repo.get_percentiles(2025, group_by="pathologist", pathologist="P-1")
+    cases.aggregate.assert_not_called()
+    match = repo.rollups.aggregate.call_args[0][0][0]["$match"]
+    assert match == {"basis": "signed", "level": "case", "year": 2025, "state": "Completado", "pathologist_id": "P-1"}
+    assert data["source"] == "rollups"
+    assert data["summary"] == {"count": 11, "p50": 3, "p90": 12, "p95": 12, "max": 12}
+    assert [(g["code"], g["p90"]) for g in data["groups"]] == [("P-1", 12), ("P-2", 5)]
+
+
+@pytest.mark.asyncio
+async def test_percentiles_fall_back_to_case_histogram_without_sketches(fake_cursor):
+    cases = MagicMock()
+    cases.aggregate = MagicMock(return_value=fake_cursor([{"_id": None, "buckets": [{"k": 2, "v": 3}, {"k": 7, "v": 1}]}]))
+    repo = TurnaroundStatisticsRepository(SimpleNamespace(cases=cases))
+    data = await repo.get_percentiles(2025, month=2)
+    assert data["source"] == "cases" and data["groups"] == []
+    assert data["summary"]["p50"] == 2 and data["summary"]["p95"] == 7
+
+
+@pytest.mark.asyncio
+async def test_get_percentiles_validates_parameters():
+    service = OpportunityStatisticsService(MagicMock())
+    with pytest.raises(BadRequestError):
+        await service.get_percentiles(2025, group_by="hospital")
+    with pytest.raises(BadRequestError):
+        await service.get_percentiles(2025, percentiles="50,abc")
+    with pytest.raises(BadRequestError):
+        await service.get_percentiles(2025, percentiles="0,90")
+    service.turnaround_repo.get_percentiles = AsyncMock(return_value={"summary": {}})
+    await service.get_percentiles(2025, 3, percentiles="95, 50")
+    service.turnaround_repo.get_percentiles.assert_awaited_once_with(2025, 3, None, None, None, None, [50.0, 95.0])
+
+
+@pytest.mark.asyncio
+async def test_get_percentiles_lets_database_errors_reach_the_500_handler():
+    service = OpportunityStatisticsService(MagicMock())
+    service.turnaround_repo.get_percentiles = AsyncMock(side_effect=RuntimeError("connection reset"))
+    with pytest.raises(RuntimeError):
+        await service.get_percentiles(2025, 4)
+    service.turnaround_repo.get_percentiles = AsyncMock(side_effect=ValueError("bad sketch"))
+    with pytest.raises(BadRequestError):
+        await service.get_percentiles(2025, 5)
@@ -0,0 +1,99 @@
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from app.modules.cases.repositories.workload_repository import UNASSIGNED_ID, WorkloadRepository, diff_workload
+from app.modules.cases.services.workload_service import summarize_workload
+
+
+def _case(**overrides):
+    doc = {
+        "created_at": datetime(2025, 3, 3, 15, tzinfo=timezone.utc),
+        "state": "En proceso",
+        "priority": "Normal",
+        "assigned_pathologist": {"id": "P-1", "name": "Dra. Ruiz"},
+    }
+    doc.update(overrides)
+    return doc
+
+
+def test_assignment_moves_the_open_case_between_pathologists():
+    old = _case(assigned_pathologist=None)
+    new = _case(assigned_pathologist={"id": "P-1", "name": "Dra. Ruiz"})
+    assert diff_workload(old, new) == {
+        UNASSIGNED_ID: {"open.2025-03-03.En proceso.Normal": -1},
+        "P-1": {"open.2025-03-03.En proceso.Normal": 1},
+    }
+
+
+def test_signing_and_delivery_update_state_and_throughput():
+    open_case = _case(state="Por firmar")
+    signed = _case(state="Por entregar", signed_at=datetime(2025, 3, 10, tzinfo=timezone.utc))
+    assert diff_workload(open_case, signed) == {"P-1": {
+        "open.2025-03-03.Por firmar.Normal": -1,
+        "open.2025-03-03.Por entregar.Normal": 1,
+        "signed.2025-03-10": 1,
+    }}
+    # La entrega solo cierra el caso; la firma ya estaba contada
+    assert diff_workload(signed, {**signed, "state": "Completado"}) == {"P-1": {"open.2025-03-03.Por entregar.Normal": -1}}
+    # Cambios que no tocan los contadores no escriben nada
+    assert diff_workload(open_case, {**open_case, "observations": "x"}) == {}
+
+
+@pytest.mark.asyncio
+async def test_apply_change_issues_one_bulk_write():
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    repo = WorkloadRepository(SimpleNamespace(pathologist_workload=collection))
+    await repo.apply_change(None, _case(priority="Prioritario"))
+    (operation,), _ = collection.bulk_write.call_args
+    assert operation[0]._filter == {"_id": "P-1"}
+    assert operation[0]._doc["$inc"] == {"open.2025-03-03.En proceso.Prioritario": 1}
+    assert operation[0]._doc["$set"]["pathologist_name"] == "Dra. Ruiz"
+
+
+@pytest.mark.asyncio
+async def test_apply_change_removes_zeroed_counters_and_old_signed_days():
+    collection = MagicMock()
+    collection.bulk_write = AsyncMock()
+    repo = WorkloadRepository(SimpleNamespace(pathologist_workload=collection))
+    open_case = _case(state="Por firmar")
+    await repo.apply_change(open_case, {**open_case, "state": "Completado", "signed_at": datetime.now(timezone.utc)})
+    (cleanup,), kwargs = collection.bulk_write.call_args
+    assert kwargs == {"ordered": True}
+    leaf, state, day, signed = cleanup
+    assert leaf._filter == {"_id": "P-1", "open.2025-03-03.Por firmar.Normal": {"$lte": 0}}
+    assert leaf._doc == {"$unset": {"open.2025-03-03.Por firmar.Normal": ""}}
+    assert (state._filter, day._filter) == ({"_id": "P-1", "open.2025-03-03.Por firmar": {}}, {"_id": "P-1", "open.2025-03-03": {}})
+    # Pipeline que conserva solo los días de firma dentro de la ventana y con conteo positivo
+    assert "$arrayToObject" in signed._doc[0]["$set"]["signed"]
+
+
+def test_free_text_state_and_priority_cannot_break_the_field_path():
+    (counters,) = diff_workload(None, _case(state="Revisión 2.0", priority="$alta")).values()
+    (field,) = counters
+    assert field == "open.2025-03-03.Revisión 2%2E0.%24alta"
+    doc = {"_id": "P-1", "open": {"2025-03-03": {"Revisión 2%2E0": {"%24alta": 1}}}}
+    summary = summarize_workload(doc, datetime(2025, 3, 4, tzinfo=timezone.utc))
+    assert summary["por_estado"] == {"Revisión 2.0": 1} and summary["por_prioridad"] == {"$alta": 1}
+
+
+def test_summary_buckets_by_age_and_projects_backlog():
+    doc = {
+        "_id": "P-1",
+        "pathologist_name": "Dra. Ruiz",
+        "open": {
+            "2025-03-19": {"En proceso": {"Normal": 4, "Prioritario": 1}},
+            "2025-03-12": {"Por firmar": {"Normal": 2}, "Por entregar": {"Normal": 3}},
+            "2025-03-01": {"En proceso": {"Normal": 0}},
+        },
+        "signed": {"2025-03-18": 10, "2025-03-05": 4, "2025-01-02": 50},
+    }
+    summary = summarize_workload(doc, datetime(2025, 3, 20, tzinfo=timezone.utc))
+    assert summary["casos_abiertos"] == 10 and summary["pendientes"] == 7
+    assert summary["por_estado"] == {"En proceso": 5, "Por firmar": 2, "Por entregar": 3}
+    assert summary["por_prioridad"] == {"Normal": 9, "Prioritario": 1}
+    assert summary["por_antiguedad"] == {"0-2": 5, "3-5": 0, "6-10": 5, "11+": 0}
+    # 14 firmas en 28 días: medio caso diario, 14 días para evacuar los 7 pendientes
+    assert summary["firmados_ventana"] == 14 and summary["dias_para_evacuar"] == 14.0
+    assert summary["fecha_estimada_evacuacion"] == "2025-04-03"
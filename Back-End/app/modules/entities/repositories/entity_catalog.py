@@ -0,0 +1,62 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.shared.repositories.catalog_cache import CatalogCache, normalize_key
+
+ALIASES_COLLECTION = "entity_aliases"
+
+
+class EntityCatalogCache(CatalogCache):
+    """Catálogo de entidades y alias en memoria, compartido por el proceso.
+
+    Traduce el filtro de entidad que llega a las estadísticas (código, alias, nombre o parte del
+    nombre) a los códigos de entidad, para que las consultas filtren por igualdad sobre
+    patient_info.entity_info.id en lugar de una regex sobre el nombre en cada caso."""
+
+    def __init__(self, **kwargs):
+        super().__init__("entities", ("entity_code", "code", "name"), **kwargs)
+        # (código, nombre normalizado)
+        self._entities: List[Tuple[str, str]] = []
+        self._aliases: Dict[str, List[str]] = {}
+
+    async def resolve(self, entities_collection, aliases_collection, entity: Optional[str]) -> Optional[List[str]]:
+        """Códigos de entidad para el filtro; None si no hay filtro y lista vacía si nada coincide."""
+        key = normalize_key(entity)
+        if not key:
+            return None
+        await self.ensure_loaded(entities_collection, aliases=aliases_collection)
+        return self._match(key)
+
+    def _match(self, key: str) -> List[str]:
+        # Orden de precedencia: alias explícito, código exacto, nombre exacto y, por último, parte del nombre
+        if key in self._aliases:
+            return list(self._aliases[key])
+        for candidates in (
+            [code for code, _ in self._entities if normalize_key(code) == key],
+            [code for code, name in self._entities if name == key],
+            [code for code, name in self._entities if key in name],
+        ):
+            if candidates:
+                return sorted(set(candidates))
+        return []
+
+    async def _load(self, collection, aliases=None) -> None:
+        alias_map: Dict[str, List[str]] = {}
+        if aliases is not None:
+            for doc in await aliases.find({}, {"_id": 0, "alias_key": 1, "entity_codes": 1}).to_list(length=None):
+                if doc.get("alias_key") and doc.get("entity_codes"):
+                    alias_map[doc["alias_key"]] = list(doc["entity_codes"])
+        await super()._load(collection)
+        self._aliases = alias_map
+
+    def _build(self, docs: List[Dict[str, Any]]) -> None:
+        entities = []
+        for doc in docs:
+            # Compat: algunas entidades antiguas guardan el código en 'code'
+            code = doc.get("entity_code") or doc.get("code")
+            if code:
+                entities.append((code, normalize_key(doc.get("name"))))
+        self._entities = entities
+
+
+# Instancia compartida por proceso
+entity_catalog = EntityCatalogCache()
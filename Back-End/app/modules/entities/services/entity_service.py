@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from ..schemas import EntityCreate, EntityUpdate, EntityResponse, EntitySearch
 from ..repositories import EntityRepository
 from app.core.exceptions import BadRequestError, NotFoundError, ConflictError
+from app.modules.entities.repositories.entity_catalog import entity_catalog
 
 class EntityService:
     def __init__(self, database: AsyncIOMotorDatabase):
@@ -12,6 +13,7 @@ class EntityService:
         if await self.repository.exists_code(data.entity_code):
             raise ConflictError(f"Entity with code {data.entity_code} already exists")
         created = await self.repository.create(data)
+        entity_catalog.invalidate()
         return EntityResponse(**created)
 
     async def get_by_code(self, code: str) -> EntityResponse:
@@ -35,12 +37,15 @@ class EntityService:
         updated = await self.repository.update_by_code(code, update)
         if not updated:
             raise NotFoundError(f"Entity with code {code} not found")
+        entity_catalog.invalidate()
         return EntityResponse(**updated)
 
     async def delete_by_code(self, code: str) -> bool:
         if not await self.repository.get_by_code(code):
             raise NotFoundError(f"Entity with code {code} not found")
-        return await self.repository.delete_by_code(code)
+        deleted = await self.repository.delete_by_code(code)
+        entity_catalog.invalidate()
+        return deleted
 
 entity_service: Optional[EntityService] = None
 
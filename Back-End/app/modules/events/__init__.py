@@ -0,0 +1 @@
+"""Módulo de eventos en tiempo real (SSE / WebSocket) sobre los cambios de casos y aprobaciones"""
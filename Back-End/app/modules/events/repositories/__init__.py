@@ -0,0 +1,5 @@
+"""Repositorios para el módulo de eventos"""
+
+from .change_sources import ChangeSource, build_sources
+
+__all__ = ["ChangeSource", "build_sources"]
@@ -0,0 +1,204 @@
+"""
+Fuentes de cambios para el hub de eventos: un change stream de MongoDB por colección o, cuando
+el servidor no lo soporta (MongoDB local standalone, sin replica set), una consulta periódica
+por updated_at.
+"""
+import asyncio
+import logging
+import socket
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure, PyMongoError
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TOKENS_COLLECTION = "event_stream_tokens"
+# Códigos de MongoDB: change streams no soportados (standalone) y token fuera del oplog
+CHANGE_STREAMS_UNSUPPORTED = {40573}
+CHANGE_STREAM_HISTORY_LOST = {136, 280, 286}
+# Segundos mínimos entre escrituras del token de reanudación (no se escribe uno por evento)
+TOKEN_SAVE_INTERVAL_SECONDS = 2.0
+RETRY_SECONDS = 5.0
+POLL_BATCH_SIZE = 500
+
+# Campos que viajan en cada evento, por colección: llave, estado y patólogo (para filtrar)
+SOURCE_FIELDS: Dict[str, Dict[str, Optional[str]]] = {
+    "cases": {"key": "case_code", "case_code": "case_code", "state": "state", "pathologist": "assigned_pathologist.id"},
+    "approval_requests": {"key": "approval_code", "case_code": "original_case_code", "state": "approval_state", "pathologist": None},
+    "unread_cases": {"key": "case_code", "case_code": "case_code", "state": "status", "pathologist": None},
+}
+
+
+def _get_path(doc: Dict[str, Any], path: Optional[str]) -> Any:
+    if not path:
+        return None
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _document_fields(collection: str) -> List[str]:
+    return sorted({path for path in SOURCE_FIELDS[collection].values() if path})
+
+
+def to_event(collection: str, operation: str, document: Optional[Dict[str, Any]], **extra: Any) -> Dict[str, Any]:
+    """Evento compacto (sin el documento completo) para los clientes."""
+    document = document or {}
+    fields = SOURCE_FIELDS[collection]
+    event = {
+        "collection": collection,
+        "operation": operation,
+        "key": _get_path(document, fields["key"]),
+        "case_code": _get_path(document, fields["case_code"]),
+        "state": _get_path(document, fields["state"]),
+        "pathologist": _get_path(document, fields["pathologist"]),
+    }
+    event.update(extra)
+    return event
+
+
+def change_stream_pipeline(collection: str) -> List[Dict[str, Any]]:
+    """Recorta cada cambio en el servidor: solo los campos del evento y los nombres (no los valores)
+    de los campos modificados, para no transferir resultados ni notas completas."""
+    projection: Dict[str, Any] = {
+        "operationType": 1,
+        "documentKey": 1,
+        "clusterTime": 1,
+        "updatedFields": {
+            "$map": {
+                "input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+                "in": "$$this.k",
+            }
+        },
+    }
+    projection.update({f"fullDocument.{path}": 1 for path in _document_fields(collection)})
+    return [
+        {"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}},
+        {"$project": projection},
+    ]
+
+
+def consumer_id() -> str:
+    return settings.EVENTS_CONSUMER_ID or socket.gethostname()
+
+
+class ResumeTokenStore:
+    """Último token de reanudación por consumidor y colección, para continuar el change stream tras
+    un reinicio. Cada proceso de la API tiene su propio hub, así que cada uno guarda su posición:
+    con un documento compartido un proceso reanudaría desde la posición de otro."""
+
+    def __init__(self, database: AsyncIOMotorDatabase, consumer: Optional[str] = None):
+        self.collection = getattr(database, TOKENS_COLLECTION)
+        self.consumer = consumer or consumer_id()
+
+    def _key(self, name: str) -> str:
+        return f"{self.consumer}:{name}"
+
+    async def get(self, name: str) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one({"_id": self._key(name)})
+        return doc.get("token") if doc else None
+
+    async def save(self, name: str, token: Optional[Dict[str, Any]]) -> None:
+        await self.collection.update_one(
+            {"_id": self._key(name)},
+            {"$set": {
+                "consumer": self.consumer,
+                "collection": name,
+                "token": token,
+                "updated_at": datetime.now(timezone.utc),
+            }},
+            upsert=True,
+        )
+
+
+class ChangeSource:
+    def __init__(self, database: AsyncIOMotorDatabase, name: str, poll_interval: Optional[float] = None):
+        self.name = name
+        self.collection = getattr(database, name)
+        self.tokens = ResumeTokenStore(database)
+        self.poll_interval = poll_interval or settings.EVENTS_POLL_INTERVAL_SECONDS
+        self.mode = "change_stream"
+
+    async def run(self, hub) -> None:
+        """Sigue la colección hasta que se cancela la tarea; cae a consulta periódica si hace falta."""
+        while True:
+            try:
+                if self.mode == "change_stream":
+                    await self._watch(hub)
+                else:
+                    await self._poll(hub)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    logger.info("Change streams no disponibles para %s; se usa consulta periódica", self.name)
+                    self.mode = "polling"
+                    continue
+                if e.code in CHANGE_STREAM_HISTORY_LOST:
+                    # El token ya no está en el oplog: se reanuda desde ahora y los clientes resincronizan
+                    logger.warning("Token de reanudación de %s expirado; se reinicia el change stream", self.name)
+                    await self.tokens.save(self.name, None)
+                    hub.resync_all("historial de cambios perdido")
+                    continue
+                logger.warning("Change stream de %s interrumpido: %s", self.name, e)
+                await asyncio.sleep(RETRY_SECONDS)
+            except PyMongoError as e:
+                logger.warning("Fuente de eventos de %s interrumpida: %s", self.name, e)
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def _watch(self, hub) -> None:
+        token = await self.tokens.get(self.name)
+        last_saved = 0.0
+        loop = asyncio.get_running_loop()
+        async with self.collection.watch(
+            change_stream_pipeline(self.name),
+            full_document="updateLookup",
+            resume_after=token,
+        ) as stream:
+            async for change in stream:
+                hub.publish(to_event(
+                    self.name,
+                    change.get("operationType"),
+                    change.get("fullDocument"),
+                    document_id=str((change.get("documentKey") or {}).get("_id")),
+                    fields=change.get("updatedFields") or [],
+                ))
+                if loop.time() - last_saved >= TOKEN_SAVE_INTERVAL_SECONDS:
+                    await self.tokens.save(self.name, stream.resume_token)
+                    last_saved = loop.time()
+
+    async def _poll(self, hub) -> None:
+        """Consulta periódica por updated_at (no ve borrados; usa el índice de updated_at de cada
+        colección). La posición es (updated_at, _id): muchos documentos con el mismo updated_at
+        (p. ej. un update_many) se recorren por lotes sin repetir ni quedarse en el mismo lote."""
+        watermark = datetime.now(timezone.utc)
+        last_id: Any = None
+        projection = {path: 1 for path in _document_fields(self.name)}
+        projection.update({"created_at": 1, "updated_at": 1})
+        while True:
+            if last_id is None:
+                query: Dict[str, Any] = {"updated_at": {"$gte": watermark}}
+            else:
+                query = {"$or": [
+                    {"updated_at": {"$gt": watermark}},
+                    {"updated_at": watermark, "_id": {"$gt": last_id}},
+                ]}
+            docs = await self.collection.find(query, projection).sort(
+                [("updated_at", 1), ("_id", 1)]
+            ).limit(POLL_BATCH_SIZE).to_list(length=POLL_BATCH_SIZE)
+            for doc in docs:
+                operation = "insert" if doc.get("created_at") == doc.get("updated_at") else "update"
+                hub.publish(to_event(self.name, operation, doc, document_id=str(doc["_id"]), fields=[]))
+                watermark, last_id = doc["updated_at"], doc["_id"]
+            # Con un lote completo se sigue leyendo de inmediato
+            if len(docs) < POLL_BATCH_SIZE:
+                await asyncio.sleep(self.poll_interval)
+
+
+def build_sources(database: AsyncIOMotorDatabase, names: List[str]) -> List[ChangeSource]:
+    return [ChangeSource(database, name) for name in names]
@@ -0,0 +1,5 @@
+"""Rutas para el módulo de eventos"""
+
+from .event_routes import router as events_router
+
+__all__ = ["events_router"]
@@ -0,0 +1,101 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.config.settings import settings
+from app.core.exceptions import BadRequestError
+from app.modules.events.services.event_hub import HubFullError, Subscription, event_hub, parse_filters
+
+
+router = APIRouter(tags=["events"])
+
+
+def _to_json(event: Dict[str, Any]) -> str:
+    return json.dumps(event, default=str, ensure_ascii=False)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {_to_json(event)}\n\n"
+
+
+def _subscribe(collections: Optional[str], pathologist: Optional[str], state: Optional[str], last_event_id: Optional[str]):
+    try:
+        return event_hub.subscribe(last_event_id=last_event_id, **parse_filters(collections, pathologist, state))
+    except BadRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HubFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _next_event(subscription: Subscription) -> Optional[Dict[str, Any]]:
+    """Siguiente evento, o None si pasó el intervalo de latido sin eventos."""
+    try:
+        return await asyncio.wait_for(subscription.queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+    except asyncio.TimeoutError:
+        return None
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    collections: Optional[str] = Query(None, description="Colecciones separadas por coma: cases, approval_requests, unread_cases"),
+    pathologist: Optional[str] = Query(None, description="Código del patólogo asignado (solo casos)"),
+    state: Optional[str] = Query(None, description="Estados separados por coma"),
+    last_event_id: Optional[str] = Query(None, description="Último id recibido (alternativa al encabezado Last-Event-ID)"),
+    last_event_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Eventos de cambio por Server-Sent Events. EventSource reenvía Last-Event-ID al reconectar,
+    así que los eventos perdidos durante la desconexión se entregan al volver."""
+    subscription, backlog = _subscribe(collections, pathologist, state, last_event_header or last_event_id)
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            for event in backlog:
+                yield format_sse(event)
+            while not await request.is_disconnected():
+                event = await _next_event(subscription)
+                # Comentario SSE como latido: mantiene abiertas las conexiones a través de proxies
+                yield format_sse(event) if event else ": ping\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def events_websocket(
+    websocket: WebSocket,
+    collections: Optional[str] = None,
+    pathologist: Optional[str] = None,
+    state: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+):
+    """Los mismos eventos por WebSocket (mensajes JSON); el cliente reanuda con ?last_event_id=."""
+    try:
+        subscription, backlog = event_hub.subscribe(
+            last_event_id=last_event_id, **parse_filters(collections, pathologist, state)
+        )
+    except (BadRequestError, HubFullError) as e:
+        await websocket.close(code=1008 if isinstance(e, BadRequestError) else 1013, reason=str(e))
+        return
+    await websocket.accept()
+    try:
+        for event in backlog:
+            await websocket.send_text(_to_json(event))
+        while True:
+            event = await _next_event(subscription)
+            await websocket.send_text(_to_json(event or {"type": "ping", "id": event_hub.position}))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+@router.get("/status")
+async def events_status():
+    return event_hub.metrics()
@@ -0,0 +1,5 @@
+"""Servicios para el módulo de eventos"""
+
+from .event_hub import EventHub, event_hub
+
+__all__ = ["EventHub", "event_hub"]
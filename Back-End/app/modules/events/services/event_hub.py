@@ -0,0 +1,170 @@
+"""
+Distribución en proceso de eventos de cambio (casos, aprobaciones, casos sin lectura) a los
+clientes conectados por SSE o WebSocket.
+
+Cada evento recibe un id "<época>-<secuencia>"; la época cambia al reiniciar el proceso. Los
+últimos eventos se guardan en un búfer circular para que un cliente que se reconecta con su
+último id reciba lo que se perdió. Si ese id ya no está en el búfer (o es de otra época), el
+cliente recibe un evento "resync" y debe volver a consultar sus listas una vez.
+"""
+import asyncio
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from app.config.settings import settings
+from app.core.exceptions import BadRequestError
+
+# Colecciones que publican eventos
+EVENT_COLLECTIONS = ("cases", "approval_requests", "unread_cases")
+
+
+class HubFullError(Exception):
+    """Se alcanzó el máximo de suscriptores del proceso."""
+
+
+class Subscription:
+    def __init__(
+        self,
+        collections: Optional[Set[str]] = None,
+        pathologist: Optional[str] = None,
+        states: Optional[Set[str]] = None,
+        queue_size: int = 256,
+    ):
+        self.collections = collections
+        self.pathologist = pathologist
+        self.states = states
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if event.get("type") != "change":
+            return True
+        if self.collections and event.get("collection") not in self.collections:
+            return False
+        if self.pathologist and event.get("pathologist") != self.pathologist:
+            return False
+        if self.states and event.get("state") not in self.states:
+            return False
+        return True
+
+
+def parse_filters(
+    collections: Optional[str] = None,
+    pathologist: Optional[str] = None,
+    state: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Filtros de suscripción desde parámetros de consulta ("cases,unread_cases", "En proceso,Por firmar")."""
+    wanted = {c.strip() for c in (collections or "").split(",") if c.strip()} or None
+    unknown = (wanted or set()) - set(EVENT_COLLECTIONS)
+    if unknown:
+        raise BadRequestError(f"Colecciones no soportadas: {', '.join(sorted(unknown))}")
+    states = {s.strip() for s in (state or "").split(",") if s.strip()} or None
+    return {"collections": wanted, "pathologist": (pathologist or "").strip() or None, "states": states}
+
+
+class EventHub:
+    def __init__(
+        self,
+        buffer_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_subscribers: Optional[int] = None,
+    ):
+        self.buffer_size = buffer_size or settings.EVENTS_BUFFER_SIZE
+        self.queue_size = queue_size or settings.EVENTS_QUEUE_SIZE
+        self.max_subscribers = max_subscribers or settings.EVENTS_MAX_SUBSCRIBERS
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=self.buffer_size)
+        self._subscribers: Set[Subscription] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._published = 0
+
+    @property
+    def position(self) -> str:
+        return f"{self.epoch}-{self._seq}"
+
+    def publish(self, change: Dict[str, Any]) -> Dict[str, Any]:
+        """Asigna id al cambio, lo guarda en el búfer y lo entrega a los suscriptores que lo filtran."""
+        self._seq += 1
+        event = {"type": "change", **change, "id": f"{self.epoch}-{self._seq}"}
+        event.setdefault("at", datetime.now(timezone.utc))
+        self._buffer.append(event)
+        self._published += 1
+        for subscription in list(self._subscribers):
+            if subscription.matches(event):
+                self._deliver(subscription, event)
+        return event
+
+    def resync_all(self, reason: str) -> None:
+        """Los cambios se perdieron (p. ej. el token de reanudación expiró): todos deben volver a consultar."""
+        self._buffer.clear()
+        for subscription in list(self._subscribers):
+            self._deliver(subscription, self._resync_event(reason))
+
+    def _resync_event(self, reason: str) -> Dict[str, Any]:
+        return {"type": "resync", "id": self.position, "reason": reason}
+
+    def _deliver(self, subscription: Subscription, event: Dict[str, Any]) -> None:
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: se descarta su cola y se le pide resincronizar en lugar de frenar a los demás
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+                subscription.dropped += 1
+            subscription.queue.put_nowait(self._resync_event("cola llena"))
+
+    def subscribe(
+        self,
+        last_event_id: Optional[str] = None,
+        **filters: Any,
+    ) -> Tuple[Subscription, List[Dict[str, Any]]]:
+        """Registra un suscriptor y devuelve los eventos pendientes desde last_event_id (o un resync)."""
+        if len(self._subscribers) >= self.max_subscribers:
+            raise HubFullError("Demasiados clientes conectados a eventos")
+        subscription = Subscription(queue_size=self.queue_size, **filters)
+        backlog = self._replay(last_event_id, subscription) if last_event_id else []
+        self._subscribers.add(subscription)
+        return subscription, backlog
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def _replay(self, last_event_id: str, subscription: Subscription) -> List[Dict[str, Any]]:
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return [self._resync_event("reinicio del servidor")]
+        last = int(seq)
+        oldest = int(self._buffer[0]["id"].split("-")[1]) if self._buffer else self._seq + 1
+        if last + 1 < oldest:
+            return [self._resync_event("eventos fuera del búfer")]
+        return [
+            event for event in self._buffer
+            if int(event["id"].split("-")[1]) > last and subscription.matches(event)
+        ]
+
+    def start(self, sources: Iterable[Any]) -> None:
+        """Arranca las fuentes de cambios (ver repositories/change_sources.py) como tareas de fondo."""
+        for source in sources:
+            self._tasks.append(asyncio.create_task(source.run(self)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "epoch": self.epoch,
+            "position": self.position,
+            "published": self._published,
+            "buffered": len(self._buffer),
+            "subscribers": len(self._subscribers),
+            "sources": len(self._tasks),
+        }
+
+
+# Instancia compartida por proceso
+event_hub = EventHub()
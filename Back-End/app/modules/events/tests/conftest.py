@@ -0,0 +1,8 @@
+import os
+import sys
+
+
+# Asegurar que el paquete 'app' sea importable en pytest
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
@@ -0,0 +1,165 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.exceptions import BadRequestError
+from app.modules.events.repositories.change_sources import (
+    POLL_BATCH_SIZE,
+    ChangeSource,
+    ResumeTokenStore,
+    change_stream_pipeline,
+    to_event,
+)
+from app.modules.events.routes.event_routes import format_sse, router
+from app.modules.events.services.event_hub import EventHub, parse_filters
+
+
+def _case_event(code, state="En proceso", pathologist="P-1"):
+    return to_event("cases", "update", {"case_code": code, "state": state, "assigned_pathologist": {"id": pathologist}})
+
+
+@pytest.mark.asyncio
+async def test_events_fan_out_by_pathologist_and_state():
+    hub = EventHub(buffer_size=10, queue_size=10, max_subscribers=5)
+    mine, _ = hub.subscribe(**parse_filters("cases", "P-1", "En proceso,Por firmar"))
+    everything, _ = hub.subscribe()
+    hub.publish(_case_event("2025-00001"))
+    hub.publish(_case_event("2025-00002", pathologist="P-2"))
+    hub.publish(_case_event("2025-00003", state="Completado"))
+    hub.publish(to_event("unread_cases", "insert", {"case_code": "L-1", "status": "En proceso"}))
+    assert mine.queue.qsize() == 1 and (await mine.queue.get())["key"] == "2025-00001"
+    assert everything.queue.qsize() == 4
+
+
+def test_reconnecting_client_gets_missed_events_or_resync():
+    hub = EventHub(buffer_size=3, queue_size=10, max_subscribers=5)
+    first = hub.publish(_case_event("2025-00001"))
+    hub.publish(_case_event("2025-00002"))
+    _, backlog = hub.subscribe(last_event_id=first["id"])
+    assert [e["key"] for e in backlog] == ["2025-00002"]
+
+    # Otra época (reinicio) o eventos que ya salieron del búfer: el cliente debe resincronizar
+    _, backlog = hub.subscribe(last_event_id="otraepoca-1")
+    assert backlog[0]["type"] == "resync"
+    for i in range(3, 7):
+        hub.publish(_case_event(f"2025-0000{i}"))
+    _, backlog = hub.subscribe(last_event_id=first["id"])
+    assert [e["type"] for e in backlog] == ["resync"]
+
+
+def test_slow_subscriber_is_asked_to_resync():
+    hub = EventHub(buffer_size=10, queue_size=2, max_subscribers=5)
+    slow, _ = hub.subscribe()
+    for i in range(3):
+        hub.publish(_case_event(f"2025-0000{i}"))
+    assert slow.queue.qsize() == 1 and slow.queue.get_nowait()["type"] == "resync"
+    assert slow.dropped == 2
+
+
+def test_filters_and_sse_format():
+    with pytest.raises(BadRequestError):
+        parse_filters("cases,pacientes")
+    hub = EventHub(buffer_size=10, queue_size=10, max_subscribers=5)
+    event = hub.publish(_case_event("2025-00001"))
+    text = format_sse(event)
+    assert text.startswith(f"id: {event['id']}\nevent: change\ndata: {{") and text.endswith("\n\n")
+    # El change stream proyecta solo los campos del evento, no el documento completo
+    projection = change_stream_pipeline("cases")[1]["$project"]
+    assert "fullDocument.assigned_pathologist.id" in projection and "fullDocument" not in projection
+
+
+class FakeFindCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, *_):
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self._docs
+
+
+def _matches(doc, query):
+    if "$or" in query:
+        return any(_matches(doc, branch) for branch in query["$or"])
+    for field, cond in query.items():
+        value = doc[field]
+        if isinstance(cond, dict):
+            if "$gt" in cond and not value > cond["$gt"]:
+                return False
+            if "$gte" in cond and not value >= cond["$gte"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class FakePollCollection:
+    """Aplica la consulta del poller en orden (updated_at, _id); se cancela tras `polls` lecturas."""
+
+    def __init__(self, docs, polls):
+        self.docs = sorted(docs, key=lambda d: (d["updated_at"], d["_id"]))
+        self.polls = polls
+        self.queries = []
+
+    def find(self, query, projection=None):
+        if len(self.queries) == self.polls:
+            raise asyncio.CancelledError()
+        self.queries.append(query)
+        return FakeFindCursor([d for d in self.docs if _matches(d, query)])
+
+
+@pytest.mark.asyncio
+async def test_polling_fallback_publishes_each_change_once():
+    now = datetime.now(timezone.utc) + timedelta(minutes=1)
+    docs = [{"_id": 1, "case_code": "2025-00001", "state": "En proceso", "created_at": now, "updated_at": now}]
+    cases = FakePollCollection(docs, polls=2)
+    source = ChangeSource(SimpleNamespace(cases=cases, event_stream_tokens=MagicMock()), "cases", poll_interval=0.001)
+    hub = MagicMock()
+    with pytest.raises(asyncio.CancelledError):
+        await source._poll(hub)
+    hub.publish.assert_called_once()
+    assert hub.publish.call_args[0][0]["operation"] == "insert"
+
+
+@pytest.mark.asyncio
+async def test_polling_pages_through_a_full_batch_sharing_one_timestamp():
+    # Un update_many estampa el mismo updated_at en más documentos de los que caben en un lote
+    now = datetime.now(timezone.utc) + timedelta(minutes=1)
+    docs = [
+        {"_id": i, "case_code": f"2025-{i:05d}", "status": "unread", "created_at": now, "updated_at": now}
+        for i in range(POLL_BATCH_SIZE + 5)
+    ]
+    unread = FakePollCollection(docs, polls=3)
+    source = ChangeSource(SimpleNamespace(unread_cases=unread, event_stream_tokens=MagicMock()), "unread_cases", poll_interval=0.001)
+    hub = MagicMock()
+    with pytest.raises(asyncio.CancelledError):
+        await source._poll(hub)
+    published = [call[0][0]["document_id"] for call in hub.publish.call_args_list]
+    assert len(published) == len(set(published)) == POLL_BATCH_SIZE + 5
+    assert unread.queries[1]["$or"][1] == {"updated_at": now, "_id": {"$gt": POLL_BATCH_SIZE - 1}}
+
+
+@pytest.mark.asyncio
+async def test_resume_tokens_are_kept_per_consumer():
+    tokens = MagicMock(find_one=AsyncMock(return_value=None), update_one=AsyncMock())
+    db = SimpleNamespace(event_stream_tokens=tokens)
+    await ResumeTokenStore(db, consumer="api-1").save("cases", {"_data": "A"})
+    await ResumeTokenStore(db, consumer="api-2").get("cases")
+    assert tokens.update_one.call_args[0][0] == {"_id": "api-1:cases"}
+    assert tokens.find_one.call_args[0][0] == {"_id": "api-2:cases"}
+
+
+def test_status_route_and_invalid_filters():
+    app = FastAPI()
+    app.include_router(router, prefix="/events")
+    client = TestClient(app)
+    assert "subscribers" in client.get("/events/status").json()
+    assert client.get("/events/stream", params={"collections": "pacientes"}).status_code == 400
@@ -0,0 +1,46 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.shared.repositories.catalog_cache import CatalogCache, normalize_key
+
+
+class PathologistCatalogCache(CatalogCache):
+    """Catálogo de patólogos (código y nombre) en memoria, compartido por el proceso.
+
+    Traduce el patólogo que llega a las estadísticas (código, nombre o parte del nombre) a sus
+    códigos, para que cada pipeline empiece con una igualdad sobre assigned_pathologist.id."""
+
+    def __init__(self, **kwargs):
+        super().__init__("pathologists", ("pathologist_code", "pathologist_name"), **kwargs)
+        # (código, nombre normalizado)
+        self._pathologists: List[Tuple[str, str]] = []
+
+    async def resolve(self, collection, pathologist: Optional[str]) -> Optional[List[str]]:
+        """Códigos para el filtro; None si no hay filtro y lista vacía si el valor no coincide
+        con ningún código ni nombre del catálogo."""
+        key = normalize_key(pathologist)
+        if not key:
+            return None
+        await self.ensure_loaded(collection)
+        return self._match(key)
+
+    def _match(self, key: str) -> List[str]:
+        # Orden de precedencia: código exacto, nombre exacto y, por último, parte del nombre
+        for candidates in (
+            [code for code, _ in self._pathologists if normalize_key(code) == key],
+            [code for code, name in self._pathologists if name == key],
+            [code for code, name in self._pathologists if key in name],
+        ):
+            if candidates:
+                return sorted(set(candidates))
+        return []
+
+    def _build(self, docs: List[Dict[str, Any]]) -> None:
+        self._pathologists = [
+            (doc["pathologist_code"], normalize_key(doc.get("pathologist_name")))
+            for doc in docs
+            if doc.get("pathologist_code")
+        ]
+
+
+# Instancia compartida por proceso
+pathologist_catalog = PathologistCatalogCache()
@@ -7,6 +7,7 @@ from app.core.exceptions import NotFoundError, ConflictError, BadRequestError
 from app.modules.pathologists.schemas.pathologist import PathologistCreate, PathologistUpdate, PathologistResponse, PathologistSearch
 from app.modules.pathologists.repositories.pathologist_repository import PathologistRepository
 from app.shared.services.user_management import UserManagementService
+from app.modules.pathologists.repositories.pathologist_catalog import pathologist_catalog
 
 class PathologistService:
     """Servicio para la lógica de negocio de Pathologists"""
@@ -50,6 +51,7 @@ class PathologistService:
             await self.repo.delete_by_pathologist_code(payload.pathologist_code)
             raise ConflictError("Failed to create user account")
         
+        pathologist_catalog.invalidate()
         return self._to_response(doc)
     
     async def get_pathologist(self, pathologist_code: str) -> PathologistResponse:
@@ -108,6 +110,7 @@ class PathologistService:
                 # (opcional: implementar rollback si es crítico)
                 pass
         
+        pathologist_catalog.invalidate()
         return self._to_response(updated)
     
     async def delete_pathologist(self, pathologist_code: str) -> Dict[str, Any]:
@@ -117,6 +120,7 @@ class PathologistService:
             raise NotFoundError(f"Pathologist with code {pathologist_code} not found")
         
         ok = await self.repo.delete_by_pathologist_code(pathologist_code)
+        pathologist_catalog.invalidate()
         return {"deleted": ok, "pathologist_code": pathologist_code}
     
     async def update_signature(self, pathologist_code: str, signature_url: str) -> PathologistResponse:
@@ -0,0 +1,61 @@
+import time
+from typing import Any, Dict, Iterable, List
+
+from app.shared.repositories.catalog_cache import CATALOG_TTL_SECONDS, CatalogCache
+
+# Un código desconocido fuerza una recarga, pero no más de una vez por este intervalo
+MISS_REFRESH_SECONDS = 30.0
+
+
+class TestCatalogCache(CatalogCache):
+    """Nombres (y tiempos de respuesta) de pruebas por código, cargados una vez del catálogo y
+    compartidos por el proceso.
+
+    Las estadísticas agrupan por código y resuelven el nombre aquí, en lugar de hacer
+    $lookup a tests por cada prueba desenrollada."""
+
+    def __init__(self, ttl_seconds: float = CATALOG_TTL_SECONDS, miss_refresh_seconds: float = MISS_REFRESH_SECONDS):
+        super().__init__("tests", ("test_code", "name", "time"), ttl_seconds)
+        self.miss_refresh_seconds = miss_refresh_seconds
+        self._names: Dict[str, str] = {}
+        self._times: Dict[str, int] = {}
+
+    async def names(self, collection, codes: Iterable[str]) -> Dict[str, str]:
+        """Nombre de cada código solicitado; los que no están en el catálogo se omiten."""
+        wanted = [code for code in set(codes) if code]
+        await self.ensure_loaded(collection, wanted)
+        return {code: self._names[code] for code in wanted if code in self._names}
+
+    async def times(self, collection, codes: Iterable[str]) -> Dict[str, int]:
+        """Tiempo de respuesta (campo time, días hábiles) de cada código solicitado que lo tenga."""
+        wanted = [code for code in set(codes) if code]
+        await self.ensure_loaded(collection, wanted)
+        return {code: self._times[code] for code in wanted if code in self._times}
+
+    def _is_stale(self, wanted: List[str]) -> bool:
+        if super()._is_stale(wanted):
+            return True
+        age = time.monotonic() - self._loaded_at
+        return age > self.miss_refresh_seconds and any(code not in self._names for code in wanted)
+
+    def _build(self, docs: List[Dict[str, Any]]) -> None:
+        self._names = {doc["test_code"]: doc["name"] for doc in docs if doc.get("test_code") and doc.get("name")}
+        self._times = {doc["test_code"]: int(doc["time"]) for doc in docs if doc.get("test_code") and doc.get("time")}
+
+    async def apply_names(
+        self,
+        collection,
+        rows: List[Dict[str, Any]],
+        code_field: str = "codigo",
+        name_field: str = "nombre",
+    ) -> List[Dict[str, Any]]:
+        """Completa name_field en cada fila; sin nombre en el catálogo se conserva el que traiga la fila o el código."""
+        names = await self.names(collection, (row.get(code_field) for row in rows))
+        for row in rows:
+            code = row.get(code_field)
+            row[name_field] = names.get(code) or row.get(name_field) or code
+        return rows
+
+
+# Instancia compartida por proceso
+test_catalog = TestCatalogCache()
@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from ..schemas import TestCreate, TestUpdate, TestResponse, TestSearch
 from ..repositories import TestRepository
 from app.core.exceptions import NotFoundError, ConflictError
+from app.modules.tests.repositories.test_catalog import test_catalog
 
 class TestService:
     def __init__(self, database: AsyncIOMotorDatabase):
@@ -12,6 +13,7 @@ class TestService:
         if await self.repository.exists_code(data.test_code):
             raise ConflictError(f"Test with code {data.test_code} already exists")
         created = await self.repository.create(data)
+        test_catalog.invalidate()
         return TestResponse(**created)
 
     async def get_by_code(self, code: str) -> TestResponse:
@@ -35,12 +37,15 @@ class TestService:
         updated = await self.repository.update_by_code(code, update)
         if not updated:
             raise NotFoundError(f"Test with code {code} not found")
+        test_catalog.invalidate()
         return TestResponse(**updated)
 
     async def delete_by_code(self, code: str) -> bool:
         if not await self.repository.get_by_code(code):
             raise NotFoundError(f"Test with code {code} not found")
-        return await self.repository.delete_by_code(code)
+        deleted = await self.repository.delete_by_code(code)
+        test_catalog.invalidate()
+        return deleted
 
 _test_service: Optional[TestService] = None
 
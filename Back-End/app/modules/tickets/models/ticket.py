@@ -32,6 +32,7 @@ class Ticket(BaseModel):
     category: TicketCategoryEnum = Field(..., description="Ticket category")
     description: str = Field(..., max_length=500, min_length=1, description="Detailed description")
     image: Optional[str] = Field(None, description="Attached image URL")
+    image_thumbnail: Optional[str] = Field(None, description="Attached image thumbnail URL")
     ticket_date: datetime = Field(default_factory=datetime.utcnow, description="Ticket creation date")
     status: TicketStatusEnum = Field(default=TicketStatusEnum.OPEN, description="Current ticket status")
     created_by: str = Field(..., description="ID of the user who created the ticket")
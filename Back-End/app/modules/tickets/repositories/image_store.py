@@ -0,0 +1,203 @@
+"""GridFS storage for ticket images.
+
+Images live in the "ticket_images" bucket instead of inside the ticket document. Each file id is
+the SHA-256 of its bytes, so the same image uploaded twice is stored once and a given URL always
+serves the same content (clients can cache it forever). A small WEBP thumbnail is stored next to
+the original under "<id>-thumb". Uploads and downloads move in GridFS-sized chunks, so the API
+never holds a whole image in memory.
+"""
+
+import asyncio
+import hashlib
+import io
+import re
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional, Tuple
+
+from fastapi import UploadFile
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+
+from app.config.settings import settings
+from app.core.exceptions import BadRequestError, ConflictError, NotFoundError
+
+BUCKET_NAME = "ticket_images"
+CHUNK_SIZE = 255 * 1024  # GridFS default chunk size: one read per stored chunk
+THUMBNAIL_MAX_SIDE = 320
+THUMBNAIL_SUFFIX = "-thumb"
+THUMBNAIL_CONTENT_TYPE = "image/webp"
+IMAGE_URL_PREFIX = f"{settings.API_V1_STR}/tickets/images/"
+
+# Types served back to browsers; anything else is sent as a download
+SAFE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+_IMAGE_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_image_id(image_id: str) -> bool:
+    return bool(_IMAGE_ID.match(image_id or ""))
+
+
+def image_url(image_id: str) -> str:
+    return f"{IMAGE_URL_PREFIX}{image_id}"
+
+
+def thumbnail_url(image_id: str) -> str:
+    return f"{IMAGE_URL_PREFIX}{image_id}/thumbnail"
+
+
+def image_id_from_url(url: Optional[str]) -> Optional[str]:
+    """Id of a stored image from its URL, or None for legacy data URLs and external links."""
+    if not url or not url.startswith(IMAGE_URL_PREFIX):
+        return None
+    image_id = url[len(IMAGE_URL_PREFIX):].split("/", 1)[0]
+    return image_id if is_image_id(image_id) else None
+
+
+def inspect_image(source: BinaryIO) -> Tuple[Optional[str], Optional[bytes]]:
+    """Detected MIME type and WEBP thumbnail of an image file.
+
+    Returns (None, None) when Pillow is not installed; the upload is then stored without
+    thumbnail and with the type declared by the client.
+    """
+    try:
+        from PIL import Image, UnidentifiedImageError
+    except ImportError:
+        return None, None
+
+    try:
+        with Image.open(source) as image:
+            mime = Image.MIME.get(image.format or "")
+            # JPEG decodes directly at a reduced scale; other formats ignore the hint
+            image.draft("RGB", (THUMBNAIL_MAX_SIDE, THUMBNAIL_MAX_SIDE))
+            image.thumbnail((THUMBNAIL_MAX_SIDE, THUMBNAIL_MAX_SIDE))
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            output = io.BytesIO()
+            image.save(output, format="WEBP", quality=80)
+            return mime, output.getvalue()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError, ValueError):
+        raise BadRequestError("The file must be an image")
+
+
+class TicketImageStore:
+    """Content-addressed ticket images in GridFS."""
+
+    def __init__(self, database: Any, bucket_name: str = BUCKET_NAME):
+        self.database = database
+        self.bucket_name = bucket_name
+        self._bucket: Optional[AsyncIOMotorGridFSBucket] = None
+
+    @property
+    def bucket(self) -> AsyncIOMotorGridFSBucket:
+        # Created on first use: services are built per request and most requests never touch images
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(
+                self.database, bucket_name=self.bucket_name, chunk_size_bytes=CHUNK_SIZE
+            )
+        return self._bucket
+
+    async def save(self, file: UploadFile, max_size: Optional[int] = None) -> Dict[str, Any]:
+        """Store an uploaded image and its thumbnail; returns the image id and metadata."""
+        digest, size = await self._digest(file, max_size)
+
+        await file.seek(0)
+        detected, thumbnail = await asyncio.to_thread(inspect_image, file.file)
+        content_type = detected or file.content_type or "application/octet-stream"
+
+        if not await self.exists(digest):
+            await file.seek(0)
+            await self._upload(digest, file, {
+                "content_type": content_type,
+                "size": size,
+                "original_name": file.filename,
+            })
+        thumbnail_id = digest + THUMBNAIL_SUFFIX
+        if thumbnail and not await self.exists(thumbnail_id):
+            try:
+                await self.bucket.upload_from_stream_with_id(
+                    thumbnail_id, thumbnail_id, thumbnail,
+                    metadata={"content_type": THUMBNAIL_CONTENT_TYPE, "size": len(thumbnail), "original": digest},
+                )
+            except DuplicateKeyError:
+                pass
+
+        return {
+            "id": digest,
+            "size": size,
+            "content_type": content_type,
+            "has_thumbnail": thumbnail is not None,
+        }
+
+    async def _digest(self, file: UploadFile, max_size: Optional[int]) -> Tuple[str, int]:
+        """SHA-256 and size read chunk by chunk, rejecting oversized files without reading them whole."""
+        sha = hashlib.sha256()
+        size = 0
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_size and size > max_size:
+                raise BadRequestError(f"The image cannot exceed {max_size / (1024 * 1024)}MB")
+            sha.update(chunk)
+        if not size:
+            raise BadRequestError("The image is empty")
+        return sha.hexdigest(), size
+
+    async def _upload(self, file_id: str, file: UploadFile, metadata: Dict[str, Any]) -> None:
+        grid_in = self.bucket.open_upload_stream_with_id(file_id, file_id, metadata=metadata)
+        try:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                await grid_in.write(chunk)
+            await grid_in.close()
+        except DuplicateKeyError:
+            # Another request stored the same content at the same time: that copy is identical.
+            # If neither finished, drop the partial chunks so the next attempt starts clean.
+            if not await self.exists(file_id):
+                await grid_in.abort()
+                raise ConflictError("The same image is being uploaded, try again")
+        except BaseException:
+            await grid_in.abort()
+            raise
+
+    async def exists(self, file_id: str) -> bool:
+        cursor = self.bucket.find({"_id": file_id}, limit=1)
+        return bool(await cursor.to_list(length=1))
+
+    async def open(self, image_id: str, thumbnail: bool = False):
+        """Open a stored image for streaming (GridOut). Falls back to the original when the
+        thumbnail does not exist (images stored without Pillow installed)."""
+        if not is_image_id(image_id):
+            raise NotFoundError("Image not found")
+        file_ids = [image_id + THUMBNAIL_SUFFIX, image_id] if thumbnail else [image_id]
+        for file_id in file_ids:
+            try:
+                return await self.bucket.open_download_stream(file_id)
+            except NoFile:
+                continue
+        raise NotFoundError("Image not found")
+
+    async def delete(self, image_id: str) -> None:
+        """Delete an image and its thumbnail (missing files are ignored)."""
+        for file_id in (image_id, image_id + THUMBNAIL_SUFFIX):
+            try:
+                await self.bucket.delete(file_id)
+            except NoFile:
+                pass
+
+
+async def iter_chunks(grid_out) -> AsyncIterator[bytes]:
+    """Chunks of an open GridOut, one stored chunk at a time."""
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        yield chunk
+
+
+def safe_content_type(metadata: Optional[Dict[str, Any]]) -> str:
+    content_type = (metadata or {}).get("content_type")
+    return content_type if content_type in SAFE_CONTENT_TYPES else "application/octet-stream"
@@ -279,6 +279,13 @@ class TicketRepository(BaseRepository[Ticket, TicketCreate, TicketUpdate]):
         except Exception as e:
             raise ValueError(f"Error listing tickets: {str(e)}")
 
+    async def count_image_references(self, image_url: str, exclude_ticket_code: Optional[str] = None) -> int:
+        """Count tickets that point to a stored image (images are shared by content)."""
+        query: Dict[str, Any] = {"image": image_url}
+        if exclude_ticket_code:
+            query["ticket_code"] = {"$ne": exclude_ticket_code}
+        return await self.collection.count_documents(query, limit=1)
+
     async def initialize_indexes(self):
         """Create indexes to optimize queries."""
         await self.collection.create_index("ticket_code", unique=True)  # MAIN - unique
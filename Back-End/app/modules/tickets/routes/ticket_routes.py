@@ -2,11 +2,18 @@
 
 from typing import List, Optional
 from functools import wraps
-from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
 from app.modules.tickets.services.ticket_service import TicketService
+from app.modules.tickets.repositories.image_store import (
+    THUMBNAIL_SUFFIX,
+    is_image_id,
+    iter_chunks,
+    safe_content_type,
+)
 from app.modules.tickets.schemas.ticket import (
     TicketCreate,
     TicketUpdate,
@@ -118,6 +125,53 @@ async def get_next_consecutive(
     }
 
 
+# Image ids are content hashes, so a URL always serves the same bytes and can be cached for good
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+async def _image_response(request: Request, image_id: str, ticket_service: TicketService, thumbnail: bool):
+    if not is_image_id(image_id):
+        raise NotFoundError("Image not found")
+    etag = f'"{image_id}{THUMBNAIL_SUFFIX if thumbnail else ""}"'
+    headers = {"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL, "X-Content-Type-Options": "nosniff"}
+    # Revalidation needs no database access: the ETag is the id itself
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    grid_out = await ticket_service.open_image(image_id, thumbnail=thumbnail)
+    headers["Content-Length"] = str(grid_out.length)
+    return StreamingResponse(
+        iter_chunks(grid_out),
+        media_type=safe_content_type(grid_out.metadata),
+        headers=headers,
+    )
+
+
+@router.get("/images/{image_id}")
+@handle_exceptions
+async def get_ticket_image(
+    image_id: str,
+    request: Request,
+    ticket_service: TicketService = Depends(get_ticket_service)
+):
+    """Stream a ticket image.
+
+    No bearer token is required so the URL works in <img> tags; the id is the SHA-256 of the
+    image and cannot be guessed.
+    """
+    return await _image_response(request, image_id, ticket_service, thumbnail=False)
+
+
+@router.get("/images/{image_id}/thumbnail")
+@handle_exceptions
+async def get_ticket_image_thumbnail(
+    image_id: str,
+    request: Request,
+    ticket_service: TicketService = Depends(get_ticket_service)
+):
+    """Stream the thumbnail of a ticket image (the original when it has none)."""
+    return await _image_response(request, image_id, ticket_service, thumbnail=True)
+
+
 @router.get("/{ticket_code}", response_model=TicketResponse)
 @handle_exceptions
 async def get_ticket(
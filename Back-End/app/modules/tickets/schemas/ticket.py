@@ -37,6 +37,7 @@ class TicketUpdate(BaseModel):
     category: Optional[TicketCategoryEnum] = None
     description: Optional[str] = Field(None, max_length=500, min_length=1)
     image: Optional[str] = None
+    image_thumbnail: Optional[str] = None
     status: Optional[TicketStatusEnum] = None
 
     @field_validator('title', mode='before')
@@ -85,6 +86,7 @@ class TicketResponse(BaseModel):
     category: TicketCategoryEnum = Field(..., description="Ticket category")
     description: str = Field(..., description="Detailed description")
     image: Optional[str] = Field(None, description="Attached image URL")
+    image_thumbnail: Optional[str] = Field(None, description="Attached image thumbnail URL")
     ticket_date: datetime = Field(..., description="Ticket creation date")
     status: TicketStatusEnum = Field(..., description="Current ticket status")
     created_by: Optional[str] = Field(None, description="ID of the user who created the ticket")
@@ -101,6 +103,7 @@ class TicketListResponse(BaseModel):
     description: str = Field(..., description="Brief ticket description")
     status: TicketStatusEnum = Field(..., description="Current ticket status")
     image: Optional[str] = Field(None, description="Attached image URL")
+    image_thumbnail: Optional[str] = Field(None, description="Attached image thumbnail URL")
     ticket_date: datetime = Field(..., description="Ticket creation date")
 
     class Config:
@@ -110,6 +113,7 @@ class TicketListResponse(BaseModel):
 class ImageUploadResponse(BaseModel):
     """Response schema for image upload."""
     image_url: str = Field(..., description="Uploaded image URL")
+    thumbnail_url: Optional[str] = Field(None, description="Uploaded image thumbnail URL")
     message: str = Field(..., description="Confirmation message")
 
     class Config:
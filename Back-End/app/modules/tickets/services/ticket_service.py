@@ -8,6 +8,12 @@ from fastapi import UploadFile
 
 from app.modules.tickets.repositories.ticket_repository import TicketRepository
 from app.modules.tickets.repositories.consecutive_repository import ConsecutiveTicketRepository
+from app.modules.tickets.repositories.image_store import (
+    TicketImageStore,
+    image_id_from_url,
+    image_url,
+    thumbnail_url,
+)
 from app.modules.tickets.models.ticket import Ticket, TicketStatusEnum
 from app.modules.tickets.schemas.ticket import (
     TicketCreate,
@@ -27,6 +33,7 @@ class TicketService:
     def __init__(self, database: Any):
         self.repository = TicketRepository(database)
         self.consecutive_repository = ConsecutiveTicketRepository(database)
+        self.image_store = TicketImageStore(database)
         self.upload_dir = os.getenv("TICKETS_UPLOAD_DIR", "/tmp/uploads/tickets/images")
         self.max_image_size = int(os.getenv("TICKETS_MAX_IMAGE_SIZE", "5242880"))  # 5MB
         
@@ -157,9 +164,9 @@ class TicketService:
         if not existing_ticket:
             raise NotFoundError(f"Ticket with code {ticket_code} not found")
         
-        # If has image, delete it from disk
+        # If has image, delete it from the image store
         if existing_ticket.image:
-            await self._delete_image_file(existing_ticket.image)
+            await self._delete_image_file(existing_ticket.image, ticket_code)
         
         return await self.repository.delete_by_ticket_code(ticket_code)
     
@@ -182,19 +189,23 @@ class TicketService:
         # Validate file
         self._validate_image(file)
         
-        # Delete previous image if exists
-        if existing_ticket.image:
-            await self._delete_image_file(existing_ticket.image)
-        
-        # Save new image
-        image_url = await self._save_image(file, ticket_code)
+        # Save new image (streamed; size is enforced while reading)
+        previous_image = existing_ticket.image
+        stored = await self.image_store.save(file, self.max_image_size)
+        new_image_url = image_url(stored["id"])
+        new_thumbnail_url = thumbnail_url(stored["id"])
         
-        # Update ticket with new URL
-        update_data = TicketUpdate(image=image_url)
+        # Update ticket with new URLs
+        update_data = TicketUpdate(image=new_image_url, image_thumbnail=new_thumbnail_url)
         await self.repository.update_by_ticket_code(ticket_code, update_data)
         
+        # Delete previous image once the ticket no longer points to it
+        if previous_image and previous_image != new_image_url:
+            await self._delete_image_file(previous_image, ticket_code)
+        
         return ImageUploadResponse(
-            image_url=image_url,
+            image_url=new_image_url,
+            thumbnail_url=new_thumbnail_url,
             message="Image uploaded successfully"
         )
     
@@ -216,13 +227,14 @@ class TicketService:
         if not existing_ticket.image:
             raise BadRequestError("The ticket has no attached image")
         
-        # Delete file from disk
-        await self._delete_image_file(existing_ticket.image)
-        
         # Update ticket removing the image
-        update_data = TicketUpdate(image=None)
+        previous_image = existing_ticket.image
+        update_data = TicketUpdate(image=None, image_thumbnail=None)
         await self.repository.update_by_ticket_code(ticket_code, update_data)
         
+        # Delete file from the image store
+        await self._delete_image_file(previous_image, ticket_code)
+        
         return {"message": "Image deleted successfully"}
     
     def _validate_image(self, file: UploadFile) -> None:
@@ -240,21 +252,21 @@ class TicketService:
             if ext not in allowed_extensions:
                 raise BadRequestError("Image format not allowed. Use: JPG, PNG, GIF, WEBP")
     
-    async def _save_image(self, file: UploadFile, ticket_code: str) -> str:
-        """Generate a Data URL base64 to store the image in the DB (similar to signatures)."""
-        content = await file.read()
-        try:
-            import base64
-            mime = file.content_type or "image/png"
-            b64 = base64.b64encode(content).decode("utf-8")
-            return f"data:{mime};base64,{b64}"
-        except Exception:
-            # Fallback: no valid image
-            return ""
+    async def open_image(self, image_id: str, thumbnail: bool = False):
+        """Open a stored ticket image (or its thumbnail) for streaming."""
+        return await self.image_store.open(image_id, thumbnail=thumbnail)
     
-    async def _delete_image_file(self, image_url: str) -> None:
-        """No physical deletion required: we store as Data URL in DB."""
-        return None
+    async def _delete_image_file(self, image_url: str, ticket_code: str) -> None:
+        """Delete a stored image unless another ticket uses the same content.
+        
+        Legacy Data URLs live inside the ticket document and need no deletion.
+        """
+        image_id = image_id_from_url(image_url)
+        if not image_id:
+            return None
+        if await self.repository.count_image_references(image_url, exclude_ticket_code=ticket_code):
+            return None
+        await self.image_store.delete(image_id)
     
     def _to_response(self, ticket: Ticket) -> TicketResponse:
         """Convert Ticket model to TicketResponse."""
@@ -264,6 +276,7 @@ class TicketService:
             category=ticket.category,
             description=ticket.description,
             image=ticket.image,
+            image_thumbnail=ticket.image_thumbnail,
             ticket_date=ticket.ticket_date,
             status=ticket.status,
             created_by=ticket.created_by
@@ -278,5 +291,6 @@ class TicketService:
             description=ticket.description,
             status=ticket.status,
             image=ticket.image,
+            image_thumbnail=ticket.image_thumbnail,
             ticket_date=ticket.ticket_date
         )
@@ -0,0 +1,176 @@
+import io
+import pytest
+from datetime import datetime, timezone
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from gridfs.errors import NoFile
+from PIL import Image
+from starlette.datastructures import Headers, UploadFile
+
+from app.core.exceptions import BadRequestError
+from app.modules.auth.routes.auth_routes import get_current_user_id
+from app.modules.tickets.models.ticket import Ticket
+from app.modules.tickets.repositories.image_store import CHUNK_SIZE, image_id_from_url
+from app.modules.tickets.routes.ticket_routes import get_ticket_service, router
+from app.modules.tickets.schemas.ticket import TicketUpdate
+from app.modules.tickets.services.ticket_service import TicketService
+
+
+class FakeGridIn:
+    def __init__(self, files, file_id, metadata):
+        self.files, self.file_id, self.metadata, self.data = files, file_id, metadata, b""
+        self.writes = 0
+
+    async def write(self, chunk):
+        self.data += chunk
+        self.writes += 1
+
+    async def close(self):
+        self.files[self.file_id] = (self.data, self.metadata)
+
+    async def abort(self):
+        pass
+
+
+class FakeGridOut:
+    def __init__(self, data, metadata):
+        self.length, self.metadata = len(data), metadata
+        self._stream = io.BytesIO(data)
+
+    async def readchunk(self):
+        return self._stream.read(4)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    async def to_list(self, length=None):
+        return self._docs
+
+
+class FakeBucket:
+    def __init__(self):
+        self.files = {}
+        self.uploads = []
+
+    def open_upload_stream_with_id(self, file_id, filename, metadata=None):
+        grid_in = FakeGridIn(self.files, file_id, metadata)
+        self.uploads.append(grid_in)
+        return grid_in
+
+    async def upload_from_stream_with_id(self, file_id, filename, source, metadata=None):
+        self.files[file_id] = (source, metadata)
+
+    def find(self, query, limit=0):
+        return FakeCursor([{"_id": query["_id"]}] if query["_id"] in self.files else [])
+
+    async def open_download_stream(self, file_id):
+        if file_id not in self.files:
+            raise NoFile(file_id)
+        return FakeGridOut(*self.files[file_id])
+
+    async def delete(self, file_id):
+        if self.files.pop(file_id, None) is None:
+            raise NoFile(file_id)
+
+
+class FakeTicketRepo:
+    def __init__(self, *codes):
+        now = datetime.now(timezone.utc)
+        self._by_code = {
+            code: Ticket(ticket_code=code, title="Falla", category="technical", description="Sin imagen",
+                         created_by="user-123", ticket_date=now)
+            for code in codes
+        }
+
+    async def get_by_ticket_code(self, code):
+        return self._by_code.get(code)
+
+    async def update_by_ticket_code(self, code, update: TicketUpdate):
+        ticket = self._by_code[code]
+        for key, value in update.model_dump(exclude_unset=True).items():
+            setattr(ticket, key, value)
+        return ticket
+
+    async def count_image_references(self, image_url, exclude_ticket_code=None):
+        return sum(1 for t in self._by_code.values() if t.image == image_url and t.ticket_code != exclude_ticket_code)
+
+
+def _png(size=(1200, 800)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def _upload(content: bytes, name="foto.png", content_type="image/png") -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=name, headers=Headers({"content-type": content_type}))
+
+
+def _service(mock_db, *codes):
+    service = TicketService(database=mock_db)
+    service.repository = FakeTicketRepo(*codes)
+    bucket = FakeBucket()
+    service.image_store._bucket = bucket
+    return service, bucket
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_to_store_with_thumbnail_and_shares_identical_images(mock_db):
+    service, bucket = _service(mock_db, "T-2025-001", "T-2025-002")
+    content = _png()
+
+    first = await service.upload_ticket_image("T-2025-001", _upload(content), "user-123")
+    second = await service.upload_ticket_image("T-2025-002", _upload(content), "user-123")
+
+    image_id = image_id_from_url(first.image_url)
+    assert first.image_url == second.image_url and first.thumbnail_url.endswith(f"{image_id}/thumbnail")
+    # Una sola copia del original (escrito por bloques) y una miniatura WEBP pequeña
+    assert len(bucket.uploads) == 1 and bucket.uploads[0].data == content
+    assert bucket.uploads[0].writes == -(-len(content) // CHUNK_SIZE)
+    thumbnail, metadata = bucket.files[f"{image_id}-thumb"]
+    assert metadata["content_type"] == "image/webp" and max(Image.open(io.BytesIO(thumbnail)).size) == 320
+    ticket = await service.get_ticket_by_code("T-2025-001")
+    assert ticket.image == first.image_url and ticket.image_thumbnail == first.thumbnail_url
+
+    # El archivo se conserva mientras otro ticket lo use
+    await service.delete_ticket_image("T-2025-001", "user-123")
+    assert image_id in bucket.files
+    await service.delete_ticket_image("T-2025-002", "user-123")
+    assert bucket.files == {}
+
+
+@pytest.mark.asyncio
+async def test_upload_rejects_oversized_and_fake_images(mock_db):
+    service, bucket = _service(mock_db, "T-2025-001")
+    service.max_image_size = 1024
+    with pytest.raises(BadRequestError):
+        await service.upload_ticket_image("T-2025-001", _upload(b"x" * 4096), "user-123")
+    with pytest.raises(BadRequestError):
+        await service.upload_ticket_image("T-2025-001", _upload(b"<svg onload=alert(1)>"), "user-123")
+    assert bucket.files == {}
+
+
+@pytest.mark.asyncio
+async def test_image_route_streams_with_cache_headers_and_revalidates_without_database(mock_db):
+    service, bucket = _service(mock_db, "T-2025-001")
+    uploaded = await service.upload_ticket_image("T-2025-001", _upload(_png((40, 30))), "user-123")
+    image_id = image_id_from_url(uploaded.image_url)
+
+    app = FastAPI()
+    app.dependency_overrides[get_ticket_service] = lambda: service
+    app.dependency_overrides[get_current_user_id] = lambda: "user-123"
+    app.include_router(router, prefix="/tickets")
+    client = TestClient(app)
+
+    response = client.get(f"/tickets/images/{image_id}")
+    assert response.status_code == 200 and response.headers["content-type"] == "image/png"
+    assert response.content == bucket.files[image_id][0]
+    assert response.headers["etag"] == f'"{image_id}"' and "immutable" in response.headers["cache-control"]
+    assert client.get(f"/tickets/images/{image_id}/thumbnail").headers["content-type"] == "image/webp"
+
+    bucket.files.clear()
+    cached = client.get(f"/tickets/images/{image_id}", headers={"If-None-Match": f'"{image_id}"'})
+    assert cached.status_code == 304
+    assert client.get(f"/tickets/images/{image_id}").status_code == 404
+    assert client.get("/tickets/images/no-es-un-id").status_code == 404
@@ -21,6 +21,8 @@ class UnreadCaseRepository:
         await self.collection.create_index("status")
         await self.collection.create_index("entity_code")
         await self.collection.create_index("patient_document")
+        # Consulta periódica del hub de eventos cuando no hay change streams
+        await self.collection.create_index("updated_at")
 
     async def _get_next_sequence(self, prefix: str) -> int:
         doc = await self.counter_collection.find_one_and_update(
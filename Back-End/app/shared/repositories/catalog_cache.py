@@ -0,0 +1,59 @@
+"""Catálogos pequeños (pruebas, entidades, patólogos) leídos completos y guardados en memoria por proceso."""
+
+import asyncio
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+# Los catálogos son pequeños (cientos de documentos) y cambian poco
+CATALOG_TTL_SECONDS = 300.0
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Llave de comparación: sin tildes, sin distinguir mayúsculas y con espacios colapsados."""
+    text = unicodedata.normalize("NFKD", value or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+class CatalogCache(ABC):
+    """Copia en memoria de una colección de catálogo, compartida por el proceso.
+
+    Se recarga cuando vence el TTL o tras invalidate(); las corrutinas que la encuentran vencida
+    esperan una sola lectura (doble verificación bajo un asyncio.Lock). Cada subclase indica la
+    colección y los campos que lee, e indexa los documentos en _build."""
+
+    def __init__(self, collection_name: str, fields: Iterable[str], ttl_seconds: float = CATALOG_TTL_SECONDS):
+        self.collection_name = collection_name
+        self.fields = tuple(fields)
+        self.ttl_seconds = ttl_seconds
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def collection(self, database):
+        """Colección del catálogo en database; None en dobles de prueba que no la tienen."""
+        return getattr(database, self.collection_name, None)
+
+    async def ensure_loaded(self, collection, wanted: Iterable[str] = (), **related) -> None:
+        """Carga el catálogo si está vencido; wanted son las llaves que el llamador va a buscar."""
+        wanted = list(wanted)
+        if self._is_stale(wanted):
+            async with self._lock:
+                if self._is_stale(wanted):
+                    await self._load(collection, **related)
+                    self._loaded_at = time.monotonic()
+
+    def _is_stale(self, wanted: List[str]) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    async def _load(self, collection, **related) -> None:
+        projection = {"_id": 0, **{field: 1 for field in self.fields}}
+        self._build(await collection.find({}, projection).to_list(length=None))
+
+    @abstractmethod
+    def _build(self, docs: List[Dict[str, Any]]) -> None:
+        """Indexa en memoria los documentos leídos del catálogo."""
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
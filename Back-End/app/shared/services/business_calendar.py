@@ -0,0 +1,108 @@
+"""
+Calendario de días hábiles de Colombia: lunes a viernes sin festivos nacionales.
+
+Replica la regla del Front-End (holidayUtils.ts con date-holidays "CO") para que los días hábiles
+que calcula el Back-End coincidan con los que se muestran en las listas de casos. Los días se
+cuentan en hora de Colombia (UTC-5, sin horario de verano).
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
+LOCAL_TZ = timezone(timedelta(hours=-5))
+
+# Festivos de fecha fija que no se trasladan
+_FIXED_HOLIDAYS = ((1, 1), (5, 1), (7, 20), (8, 7), (12, 8), (12, 25))
+# Festivos que se trasladan al lunes siguiente (Ley 51 de 1983)
+_MONDAY_HOLIDAYS = ((1, 6), (3, 19), (6, 29), (8, 15), (10, 12), (11, 1), (11, 11))
+# Festivos relativos al domingo de Pascua: jueves y viernes santo (fijos); Ascensión, Corpus Christi
+# y Sagrado Corazón ya trasladados a lunes
+_EASTER_OFFSETS = (-3, -2, 43, 64, 71)
+
+
+def _easter_sunday(year: int) -> date:
+    # Algoritmo anónimo gregoriano (Meeus/Jones/Butcher)
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _next_monday(value: date) -> date:
+    return value + timedelta(days=(7 - value.weekday()) % 7)
+
+
+@lru_cache(maxsize=64)
+def colombia_holidays(year: int) -> FrozenSet[date]:
+    holidays = {date(year, month, day) for month, day in _FIXED_HOLIDAYS}
+    holidays.update(_next_monday(date(year, month, day)) for month, day in _MONDAY_HOLIDAYS)
+    easter = _easter_sunday(year)
+    holidays.update(easter + timedelta(days=offset) for offset in _EASTER_OFFSETS)
+    return frozenset(holidays)
+
+
+def is_business_day(value: date) -> bool:
+    return value.weekday() < 5 and value not in colombia_holidays(value.year)
+
+
+def local_date(value: datetime) -> date:
+    """Fecha en Colombia de un instante (las fechas naive de MongoDB están en UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(LOCAL_TZ).date()
+
+
+def local_midnight(value: date) -> datetime:
+    """Inicio del día en Colombia, en UTC."""
+    return datetime.combine(value, time.min, tzinfo=LOCAL_TZ).astimezone(timezone.utc)
+
+
+def business_days_between(start: datetime, end: Optional[datetime] = None) -> int:
+    """Días hábiles transcurridos entre dos instantes: los días hábiles después del día de inicio
+    y hasta el día final inclusive (igual que la columna de días hábiles del Front-End)."""
+    end = end or datetime.now(timezone.utc)
+    current, last = local_date(start), local_date(end)
+    days = 0
+    while current < last:
+        current += timedelta(days=1)
+        if is_business_day(current):
+            days += 1
+    return days
+
+
+def add_business_days(start: date, days: int) -> date:
+    """El día hábil número `days` después de `start` (sin contar `start`)."""
+    current = start
+    remaining = max(0, days)
+    while remaining:
+        current += timedelta(days=1)
+        if is_business_day(current):
+            remaining -= 1
+    return current
+
+
+def exceeded_at(start: datetime, days: int) -> datetime:
+    """Primer instante (UTC) en que han transcurrido más de `days` días hábiles desde `start`:
+    el inicio del día hábil número days + 1."""
+    return local_midnight(add_business_days(local_date(start), days + 1))
+
+
+def reached_before(days: int, now: Optional[datetime] = None) -> datetime:
+    """Límite de creación para llevar al menos `days` días hábiles en el sistema: un caso creado
+    antes de este instante (UTC) cumple business_days_between(created_at, now) >= days."""
+    now = now or datetime.now(timezone.utc)
+    current = local_date(now)
+    counted = 0
+    while counted < days:
+        if is_business_day(current):
+            counted += 1
+        current -= timedelta(days=1)
+    # `current` es el último día de creación admitido; el límite es el inicio del día siguiente
+    return local_midnight(current + timedelta(days=1))
@@ -20,6 +20,7 @@ export interface SupportTicket {
   category: TicketCategoryEnum           // ✅ Campo en inglés del nuevo backend
   description: string                    // ✅ Campo en inglés del nuevo backend
   image?: string                         // ✅ Campo en inglés del nuevo backend
+  image_thumbnail?: string               // Miniatura de la imagen adjunta
   ticket_date: string                    // ✅ Campo en inglés del nuevo backend
   status: TicketStatusEnum               // ✅ Campo en inglés del nuevo backend
   created_by?: string                    // ✅ ID del creador